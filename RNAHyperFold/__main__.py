@@ -0,0 +1,5 @@
+import sys
+
+from RNAHyperFold.cli import main
+
+sys.exit(main())
@@ -0,0 +1,430 @@
+import argparse
+import json
+import multiprocessing
+import os
+import re
+import sys
+import time
+
+from RNAHyperFold.hypergraph_folding.fold_archive import save_folding_hypergraph
+from RNAHyperFold.hypergraph_folding.folding_conditions import (
+    DEFAULT_PARAMETERS,
+    DEFAULT_SALT,
+    PARAMETER_SETS,
+    FoldingConditions,
+)
+from RNAHyperFold.hypergraph_folding.rna_folder import RNAFolder
+from RNAHyperFold.hypergraph_folding.temperature_grid import (
+    normalize_temperature,
+    temperature_range,
+)
+from RNAHyperFold.hypergraph_folding.temperature_hypergraph import (
+    BasicTemporalHypergraph,
+    MemoryOptimizedFoldingHypergraph,
+    SearchOptimizedFoldingHypergraph,
+    SingleFoldingHypergraph,
+    TemperatureFoldingHypergraph,
+)
+from RNAHyperFold.hypergraph_folding.work_queue import WorkQueue, run_worker
+from RNAHyperFold.incidence_producers.vienna_incidence_producer import (
+    ViennaIncidenceProducer,
+)
+from RNAHyperFold.lazy_modules import lazy_module
+from RNAHyperFold.profiling.stage_profiler import PROFILER
+from RNAHyperFold.rna_stats.rna_analyst import (
+    RnaAnalyst,
+    TemperatureFoldingStats,
+)
+
+SeqIO = lazy_module("Bio.SeqIO")
+
+# il runner è headless: nessun grafico viene mai mostrato, matplotlib viene importato solo se serve
+os.environ.setdefault("MPLBACKEND", "Agg")
+
+BACKENDS = {
+    "basic": BasicTemporalHypergraph,
+    "memory": MemoryOptimizedFoldingHypergraph,
+    "search": SearchOptimizedFoldingHypergraph,
+    "single": SingleFoldingHypergraph,
+}
+
+
+def _structures(
+    stats: TemperatureFoldingStats, start: float, end: float, step: float = 1
+) -> dict:
+    """
+    Restituisce le strutture secondarie rilevate per ogni temperatura dell'intervallo.
+
+    Args:
+        stats (TemperatureFoldingStats): Le statistiche della sequenza.
+        start (float): La temperatura iniziale.
+        end (float): La temperatura finale.
+        step (float): Il passo tra le temperature.
+
+    Returns:
+        dict: Per ogni temperatura il dizionario delle strutture secondarie.
+    """
+    stats.THG.insert_temperature_range(start, end, step)
+    return {
+        temp: RnaAnalyst(stats.THG.get_hypergraph(temp)).secondary_structures()
+        for temp in temperature_range(start, end, step)
+    }
+
+
+ANALYSES = {
+    "structures": _structures,
+    "sensibility": TemperatureFoldingStats.get_nucleotide_sensibility_to_changes,
+    "structure-differences": TemperatureFoldingStats.get_structure_differences,
+    "connection-differences": TemperatureFoldingStats.get_connection_differences,
+    "connection-sensibility": TemperatureFoldingStats.get_nucleotide_sensibility_to_change_connection,
+}
+
+
+def _temperature(value: str) -> float:
+    """Converte un argomento in una temperatura, intera se possibile."""
+    return normalize_temperature(float(value))
+
+
+def _conditions(args: argparse.Namespace) -> FoldingConditions:
+    """Restituisce le condizioni di folding indicate dagli argomenti, a meno della temperatura."""
+    return FoldingConditions(
+        salt=args.salt,
+        parameters=args.parameters,
+        dangles=args.dangles,
+        no_lonely_pairs=args.no_lonely_pairs,
+    )
+
+
+def read_sequences(path: str) -> list[tuple[str, str]]:
+    """
+    Legge le sequenze di RNA da un file FASTA o da un file JSON di Forna.
+
+    Args:
+        path (str): Il percorso del file.
+
+    Returns:
+        list[tuple[str, str]]: Le coppie (nome, sequenza) lette dal file.
+    """
+    if path.endswith(".json"):
+        with open(path, "r") as json_file:
+            molecules = json.load(json_file)["rnas"]
+        base = os.path.splitext(os.path.basename(path))[0]
+        return [
+            (base if len(molecules) == 1 else f"{base}_{name}", molecule["seq"])
+            for name, molecule in molecules.items()
+        ]
+    return [
+        (record.id, str(record.seq).upper().replace("T", "U"))
+        for record in SeqIO.parse(path, "fasta")
+    ]
+
+
+def _safe_name(name: str) -> str:
+    """Rende il nome di una sequenza utilizzabile come nome di cartella."""
+    return re.sub(r"[^A-Za-z0-9_.-]+", "_", name).strip("_") or "sequence"
+
+
+def _write_json(path: str, data) -> None:
+    """
+    Scrive un file JSON in modo atomico, così che un'esecuzione interrotta non lasci file parziali.
+
+    Args:
+        path (str): Il percorso del file.
+        data: I dati da scrivere.
+    """
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as json_file:
+        json.dump(data, json_file)
+    os.replace(tmp_path, path)
+
+
+def run_sequence(name: str, sequence: str, args: argparse.Namespace) -> bool:
+    """
+    Esegue le analisi richieste su una sequenza e ne scrive i risultati.
+
+    Args:
+        name (str): Il nome della sequenza.
+        sequence (str): La sequenza di RNA.
+        args (argparse.Namespace): Gli argomenti della riga di comando.
+
+    Returns:
+        bool: True se la sequenza è stata analizzata, False se i risultati erano già presenti.
+    """
+    output_dir = os.path.join(args.output_dir, _safe_name(name))
+    summary_path = os.path.join(output_dir, "summary.json")
+    if args.resume and os.path.exists(summary_path):
+        return False
+    os.makedirs(output_dir, exist_ok=True)
+
+    begin = time.perf_counter()
+    if args.profile:
+        PROFILER.reset()
+    THG = TemperatureFoldingHypergraph(
+        ViennaIncidenceProducer(RNAFolder(sequence, _conditions(args))),
+        BACKENDS[args.backend](),
+        max_workers=args.workers,
+        deduplicate=args.deduplicate,
+        threads=args.threads,
+    )
+    if args.queue is not None:
+        with WorkQueue(args.queue) as queue:
+            queue.fill_hypergraph(THG)
+    change_points = None
+    if args.adaptive:
+        change_points = THG.insert_temperature_range_adaptive(
+            args.start, args.end, args.step
+        )
+    stats = TemperatureFoldingStats(THG)
+    for analysis in args.analyses:
+        path = os.path.join(output_dir, f"{analysis}.json")
+        if args.resume and os.path.exists(path):
+            continue
+        _write_json(
+            path, ANALYSES[analysis](stats, args.start, args.end, step=args.step)
+        )
+
+    if args.save_folding:
+        save_folding_hypergraph(THG, os.path.join(output_dir, "folding.rhf"))
+
+    if args.profile:
+        PROFILER.export_chrome_trace(os.path.join(output_dir, "profile_trace.json"))
+        PROFILER.export_json(os.path.join(output_dir, "profile_report.json"))
+    _write_json(
+        summary_path,
+        {
+            "name": name,
+            "sequence": sequence,
+            "start_temperature": args.start,
+            "end_temperature": args.end,
+            "step": args.step,
+            "salt": args.salt,
+            "parameters": args.parameters,
+            "dangles": args.dangles,
+            "no_lonely_pairs": args.no_lonely_pairs,
+            "backend": args.backend,
+            "adaptive": args.adaptive,
+            "change_points": change_points,
+            "analyses": args.analyses,
+            "elapsed_seconds": time.perf_counter() - begin,
+        },
+    )
+    return True
+
+
+def run_queue(sequences: list[tuple[str, str]], args: argparse.Namespace) -> bool:
+    """
+    Inserisce nella coda di folding i folding delle sequenze, avvia i worker locali e
+    attende che tutti i task siano completati, anche da worker su altri nodi.
+
+    Args:
+        sequences (list[tuple[str, str]]): Le coppie (nome, sequenza).
+        args (argparse.Namespace): Gli argomenti della riga di comando.
+
+    Returns:
+        bool: True se tutti i task sono stati completati, False se alcuni sono falliti.
+    """
+    with WorkQueue(args.queue) as queue:
+        for name, sequence in sequences:
+            queue.submit_sweep(
+                name, sequence, args.start, args.end, args.step, _conditions(args)
+            )
+        workers = [
+            multiprocessing.Process(
+                target=run_worker, args=(args.queue,), kwargs={"wait": True}
+            )
+            for _ in range(
+                args.queue_workers
+                if args.queue_workers is not None
+                else args.workers or os.cpu_count() or 1
+            )
+        ]
+        for worker in workers:
+            worker.start()
+        counts = queue.wait(
+            [name for name, _ in sequences],
+            report=lambda counts: print(
+                ", ".join(f"{status}: {count}" for status, count in counts.items()),
+                file=sys.stderr,
+            ),
+        )
+        for worker in workers:
+            worker.join()
+        for name, conditions, error in queue.failures():
+            print(f"{name}: folding fallito {conditions!r}: {error}", file=sys.stderr)
+    return counts["failed"] == 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """
+    Costruisce il parser degli argomenti della riga di comando.
+
+    Returns:
+        argparse.ArgumentParser: Il parser.
+    """
+    parser = argparse.ArgumentParser(
+        prog="rnahyperfold",
+        description="Analizza il folding di sequenze di RNA in un intervallo di temperature.",
+    )
+    parser.add_argument(
+        "inputs", nargs="+", help="File FASTA o file JSON di Forna da analizzare."
+    )
+    parser.add_argument(
+        "-o",
+        "--output-dir",
+        required=True,
+        help="Cartella in cui scrivere i risultati.",
+    )
+    parser.add_argument(
+        "--start", type=_temperature, default=0, help="Temperatura iniziale."
+    )
+    parser.add_argument(
+        "--end", type=_temperature, default=100, help="Temperatura finale."
+    )
+    parser.add_argument(
+        "--step",
+        type=_temperature,
+        default=1,
+        help="Passo tra le temperature, anche non intero (ad esempio 0.1).",
+    )
+    parser.add_argument(
+        "--salt",
+        type=float,
+        default=DEFAULT_SALT,
+        help="Concentrazione salina in mol/L.",
+    )
+    parser.add_argument(
+        "--parameters",
+        default=DEFAULT_PARAMETERS,
+        help=f"Parametri energetici: uno tra {', '.join(PARAMETER_SETS)} o il percorso di un file.",
+    )
+    parser.add_argument(
+        "--dangles",
+        type=int,
+        choices=[0, 1, 2, 3],
+        default=2,
+        help="Modello delle dangling end.",
+    )
+    parser.add_argument(
+        "--no-lonely-pairs",
+        action="store_true",
+        help="Non ammette coppie isolate (noLP).",
+    )
+    parser.add_argument(
+        "--adaptive",
+        action="store_true",
+        help="Computa solo i folding necessari a individuare i punti di cambiamento, "
+        "senza eseguire analisi.",
+    )
+    parser.add_argument(
+        "--backend",
+        choices=sorted(BACKENDS),
+        default="memory",
+        help="Ipergrafo temporale usato per memorizzare i folding.",
+    )
+    parser.add_argument(
+        "--analyses",
+        nargs="+",
+        choices=sorted(ANALYSES),
+        default=None,
+        help="Analisi da eseguire. Default è sensibility, nessuna con --adaptive.",
+    )
+    parser.add_argument(
+        "-j", "--workers", type=int, default=None, help="Numero di processi di folding."
+    )
+    parser.add_argument(
+        "--threads",
+        action="store_true",
+        help="Esegue i folding in un pool di thread invece che di processi.",
+    )
+    parser.add_argument(
+        "--deduplicate",
+        action="store_true",
+        help="Invia le temperature ai processi a blocchi e trasferisce ogni struttura distinta una sola volta.",
+    )
+    parser.add_argument(
+        "--queue",
+        default=None,
+        help="Esegue i folding tramite una coda SQLite condivisa, a cui possono partecipare "
+        "worker su altri nodi (python -m RNAHyperFold.hypergraph_folding.work_queue worker).",
+    )
+    parser.add_argument(
+        "--queue-workers",
+        type=int,
+        default=None,
+        help="Worker locali avviati per la coda. Default è il numero di processi di folding, "
+        "0 per usare solo worker esterni.",
+    )
+    parser.add_argument(
+        "--no-resume",
+        dest="resume",
+        action="store_false",
+        help="Ricalcola anche i risultati già presenti nella cartella di output.",
+    )
+    parser.add_argument(
+        "--save-folding",
+        action="store_true",
+        help="Salva i folding computati nell'archivio binario folding.rhf, ricaricabile con fold_archive.",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Salva le misurazioni delle fasi della pipeline per ogni sequenza.",
+    )
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    """
+    Punto di ingresso della riga di comando.
+
+    Args:
+        argv (list[str] | None): Gli argomenti, di default quelli del processo.
+
+    Returns:
+        int: Il codice di uscita.
+    """
+    args = build_parser().parse_args(argv)
+    if args.step <= 0:
+        print("Il passo deve essere positivo", file=sys.stderr)
+        return 2
+    if args.start > args.end:
+        print("La temperatura iniziale deve precedere quella finale", file=sys.stderr)
+        return 2
+    if args.profile:
+        PROFILER.enable()
+    if args.queue is not None and args.adaptive:
+        print("La coda di folding non supporta --adaptive", file=sys.stderr)
+        return 2
+    # le analisi richiedono i folding di tutta la griglia, che --adaptive non computa
+    if args.adaptive and args.analyses:
+        print("--adaptive non supporta --analyses", file=sys.stderr)
+        return 2
+    if args.analyses is None:
+        args.analyses = [] if args.adaptive else ["sensibility"]
+    os.makedirs(args.output_dir, exist_ok=True)
+    sequences = [
+        (name, sequence)
+        for path in args.inputs
+        for name, sequence in read_sequences(path)
+    ]
+    pending = [
+        (name, sequence)
+        for name, sequence in sequences
+        if not args.resume
+        or not os.path.exists(
+            os.path.join(args.output_dir, _safe_name(name), "summary.json")
+        )
+    ]
+    if args.queue is not None and pending and not run_queue(pending, args):
+        print(
+            "Alcuni folding sono falliti e verranno ricomputati localmente",
+            file=sys.stderr,
+        )
+    for name, sequence in sequences:
+        analyzed = run_sequence(name, sequence, args)
+        print(f"{name}: {'completata' if analyzed else 'già presente, saltata'}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
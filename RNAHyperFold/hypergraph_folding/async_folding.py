@@ -0,0 +1,187 @@
+from __future__ import annotations
+
+import asyncio
+from collections.abc import AsyncIterator
+from concurrent.futures import Executor
+
+from RNAHyperFold.hypergraph_folding.executors import get_shared_process_pool
+from RNAHyperFold.hypergraph_folding.fold_scheduler import FoldScheduler
+from RNAHyperFold.hypergraph_folding.temperature_grid import (
+    Temperature,
+    normalize_temperature,
+    temperature_range,
+)
+from RNAHyperFold.hypergraph_folding.temperature_hypergraph import (
+    TemperatureFoldingHypergraph,
+)
+from RNAHyperFold.lazy_modules import lazy_module
+from RNAHyperFold.profiling.stage_profiler import PROFILER
+
+hnx = lazy_module("hypernetx")
+
+
+class AsyncTemperatureFoldingHypergraph:
+    """
+    Interfaccia asyncio di un TemperatureFoldingHypergraph, per usare gli sweep di folding
+    all'interno di servizi senza bloccare l'event loop. I folding sono eseguiti con
+    run_in_executor su un pool di processi condiviso, al più max_concurrency alla volta per
+    ogni sweep; i risultati vengono memorizzati nell'ipergrafo temporale man mano che terminano.
+    """
+
+    def __init__(
+        self,
+        THG: TemperatureFoldingHypergraph,
+        executor: Executor | None = None,
+        max_concurrency: int = 8,
+        scheduler: FoldScheduler | None = None,
+    ) -> None:
+        """
+        Inizializza un'istanza della classe AsyncTemperatureFoldingHypergraph.
+
+        Args:
+            THG (TemperatureFoldingHypergraph): L'ipergrafo temporale in cui memorizzare i folding.
+            executor (Executor | None): L'executor su cui eseguire i folding. Default è il pool di processi condiviso.
+            max_concurrency (int): Il numero massimo di folding in esecuzione per ogni sweep.
+            scheduler (FoldScheduler | None): Lo scheduler con cui condividere i folding con altre istanze,
+                se indicato executor viene ignorato.
+        """
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency deve essere almeno 1")
+        self.THG: TemperatureFoldingHypergraph = THG
+        self.__executor: Executor | None = executor
+        self.__max_concurrency: int = max_concurrency
+        self.__scheduler: FoldScheduler | None = scheduler
+        # folding in corso: temperatura -> (future del folding, numero di chiamanti in attesa)
+        self.__pending: dict[Temperature, list] = {}
+
+    def __store(self, temperature: Temperature, future: asyncio.Future) -> None:
+        """Memorizza un folding terminato, anche se nessun chiamante lo sta più aspettando."""
+        self.__pending.pop(temperature, None)
+        if future.cancelled() or future.exception() is not None:
+            return
+        self.THG.add_folding(temperature, future.result())
+
+    async def insert_temperature(self, temperature: Temperature) -> hnx.Hypergraph:
+        """
+        Computa il folding a una certa temperatura, se non già computato.
+        Chiamate concorrenti per la stessa temperatura condividono lo stesso folding; se tutti
+        i chiamanti vengono annullati prima che il folding inizi, il folding viene annullato.
+
+        Args:
+            temperature (Temperature): La temperatura a cui computare il folding.
+
+        Returns:
+            hnx.Hypergraph: L'ipergrafo associato alla temperatura.
+        """
+        temperature = normalize_temperature(temperature)
+        if self.THG.is_analyzed(temperature):
+            PROFILER.count("temperature_hypergraph.cache_hits")
+            return self.THG.get_hypergraph(temperature)
+        entry = self.__pending.get(temperature)
+        if entry is None:
+            if self.__scheduler is not None:
+                future = asyncio.wrap_future(
+                    self.__scheduler.submit(self.THG.producer, temperature)
+                )
+            else:
+                future = asyncio.get_running_loop().run_in_executor(
+                    self.__executor or get_shared_process_pool(),
+                    self.THG.producer.get_temperature_incidence_dict,
+                    temperature,
+                )
+            future.add_done_callback(lambda done: self.__store(temperature, done))
+            entry = [future, 0]
+            self.__pending[temperature] = entry
+        else:
+            PROFILER.count("temperature_hypergraph.coalesced")
+        entry[1] += 1
+        try:
+            await asyncio.shield(entry[0])
+        except asyncio.CancelledError:
+            entry[1] -= 1
+            # i folding dello scheduler possono essere attesi anche da altre istanze
+            if entry[1] == 0 and self.__scheduler is None:
+                entry[0].cancel()
+            raise
+        entry[1] -= 1
+        if not self.THG.is_analyzed(temperature):
+            self.__store(temperature, entry[0])
+        return self.THG.get_hypergraph(temperature)
+
+    async def iter_temperature_range(
+        self,
+        start_temperature: Temperature,
+        end_temperature: Temperature,
+        step: Temperature = 1,
+    ) -> AsyncIterator[tuple[Temperature, hnx.Hypergraph]]:
+        """
+        Computa i folding di un intervallo di temperature restituendoli man mano che terminano.
+        Le temperature già computate vengono restituite subito. Nuovi folding vengono avviati solo
+        quando il chiamante consuma i risultati (backpressure); chiudere l'iteratore (ad esempio
+        con contextlib.aclosing) o annullare il task annulla i folding non ancora iniziati.
+
+        Args:
+            start_temperature (Temperature): La temperatura iniziale dell'intervallo.
+            end_temperature (Temperature): La temperatura finale dell'intervallo.
+            step (Temperature, opzionale): Il passo tra le temperature nell'intervallo, anche non intero. Default è 1.
+
+        Returns:
+            AsyncIterator[tuple[Temperature, hnx.Hypergraph]]: Le coppie (temperatura, ipergrafo) in ordine di completamento.
+        """
+        missing = []
+        for temperature in temperature_range(start_temperature, end_temperature, step):
+            if self.THG.is_analyzed(temperature):
+                PROFILER.count("temperature_hypergraph.cache_hits")
+                yield temperature, self.THG.get_hypergraph(temperature)
+            else:
+                missing.append(temperature)
+        missing.reverse()
+        running: dict[asyncio.Task, Temperature] = {}
+        try:
+            while len(missing) > 0 or len(running) > 0:
+                while len(missing) > 0 and len(running) < self.__max_concurrency:
+                    temperature = missing.pop()
+                    task = asyncio.ensure_future(self.insert_temperature(temperature))
+                    running[task] = temperature
+                done, _ = await asyncio.wait(
+                    running.keys(), return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    temperature = running.pop(task)
+                    yield temperature, task.result()
+        finally:
+            for task in running:
+                task.cancel()
+            if len(running) > 0:
+                await asyncio.gather(*running, return_exceptions=True)
+
+    async def insert_temperature_range(
+        self,
+        start_temperature: Temperature,
+        end_temperature: Temperature,
+        step: Temperature = 1,
+    ) -> None:
+        """
+        Computa i folding per un intervallo di temperature senza bloccare l'event loop.
+
+        Args:
+            start_temperature (Temperature): La temperatura iniziale dell'intervallo.
+            end_temperature (Temperature): La temperatura finale dell'intervallo.
+            step (Temperature, opzionale): Il passo tra le temperature nell'intervallo, anche non intero. Default è 1.
+        """
+        async for _ in self.iter_temperature_range(
+            start_temperature, end_temperature, step
+        ):
+            pass
+
+    async def get_hypergraph(self, temperature: Temperature) -> hnx.Hypergraph:
+        """
+        Restituisce l'ipergrafo per una certa temperatura, computandone il folding se necessario.
+
+        Args:
+            temperature (Temperature): La temperatura per cui ottenere l'ipergrafo.
+
+        Returns:
+            hnx.Hypergraph: L'ipergrafo associato alla temperatura specificata.
+        """
+        return await self.insert_temperature(temperature)
@@ -0,0 +1,202 @@
+from __future__ import annotations
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from RNAHyperFold.hypergraph_folding.edge_model import EdgeTable
+from RNAHyperFold.hypergraph_folding.fold_scheduler import FoldScheduler
+from RNAHyperFold.hypergraph_folding.folding_conditions import FoldingConditions
+from RNAHyperFold.hypergraph_folding.temperature_grid import (
+    Temperature,
+    temperature_range,
+)
+from RNAHyperFold.hypergraph_folding.temperature_hypergraph import (
+    SearchOptimizedFoldingHypergraph,
+    TemperatureFoldingHypergraph,
+)
+from RNAHyperFold.incidence_producers.temperature_incidence_producer import (
+    TemperatureIncidenceProducer,
+)
+from RNAHyperFold.lazy_modules import lazy_module
+from RNAHyperFold.profiling.stage_profiler import PROFILER, profiled
+
+hnx = lazy_module("hypernetx")
+
+
+def _fold(task: tuple) -> dict:
+    """
+    Computa un folding, eseguito nei processi worker.
+
+    Args:
+        task (tuple): Il produttore di incidenze e la temperatura.
+
+    Returns:
+        dict: Il dizionario di incidenza.
+    """
+    producer, temperature = task
+    return dict(producer.get_temperature_incidence_dict(temperature))
+
+
+class ConditionGridHypergraph:
+    """
+    Ipergrafo dei folding di una sequenza su una griglia di condizioni (temperatura, concentrazione
+    salina, parametri energetici, opzioni del modello). Ogni combinazione delle condizioni diverse
+    dalla temperatura è una fetta della griglia, memorizzata in un TemperatureFoldingHypergraph
+    che comprime i folding per intervalli di temperatura; i folding di tutte le fette vengono
+    computati in parallelo e ogni tupla di condizioni viene computata una sola volta.
+    """
+
+    def __init__(
+        self,
+        producer: TemperatureIncidenceProducer,
+        temporal_hypergraph_factory=SearchOptimizedFoldingHypergraph,
+        max_workers: int | None = None,
+        scheduler: FoldScheduler | None = None,
+    ) -> None:
+        """
+        Inizializza un'istanza della classe ConditionGridHypergraph.
+
+        Args:
+            producer (TemperatureIncidenceProducer): Il produttore di incidenze della sequenza.
+            temporal_hypergraph_factory: La classe dell'ipergrafo temporale usato per ogni fetta della griglia.
+            max_workers (int | None): Il numero massimo di processi usati per i folding. Default è il numero di CPU.
+            scheduler (FoldScheduler | None): Lo scheduler con cui condividere i folding con altre istanze,
+                se indicato max_workers viene ignorato.
+        """
+        self.__producer: TemperatureIncidenceProducer = producer
+        self.__factory = temporal_hypergraph_factory
+        self.__max_workers: int | None = max_workers
+        self.__scheduler: FoldScheduler | None = scheduler
+        self.__slices: dict[tuple, TemperatureFoldingHypergraph] = {}
+
+    def get_slice(self, conditions: FoldingConditions) -> TemperatureFoldingHypergraph:
+        """
+        Restituisce l'ipergrafo temporale della fetta della griglia con le condizioni indicate,
+        creandolo se necessario. La temperatura delle condizioni viene ignorata, per cui il
+        risultato può essere usato con le analisi esistenti (ad esempio TemperatureFoldingStats).
+
+        Args:
+            conditions (FoldingConditions): Le condizioni della fetta.
+
+        Returns:
+            TemperatureFoldingHypergraph: L'ipergrafo temporale della fetta.
+        """
+        key = conditions.base_key()
+        THG = self.__slices.get(key)
+        if THG is None:
+            THG = TemperatureFoldingHypergraph(
+                self.__producer.with_conditions(conditions),
+                self.__factory(),
+                max_workers=self.__max_workers,
+                scheduler=self.__scheduler,
+            )
+            self.__slices[key] = THG
+        return THG
+
+    def slices(self) -> dict[tuple, TemperatureFoldingHypergraph]:
+        """
+        Restituisce le fette della griglia create finora.
+
+        Returns:
+            dict[tuple, TemperatureFoldingHypergraph]: Gli ipergrafi temporali, indicizzati per FoldingConditions.base_key().
+        """
+        return dict(self.__slices)
+
+    def is_analyzed(self, conditions: FoldingConditions) -> bool:
+        """
+        Verifica se il folding nelle condizioni indicate è già stato computato.
+
+        Args:
+            conditions (FoldingConditions): Le condizioni da verificare.
+
+        Returns:
+            bool: True se il folding è già stato computato.
+        """
+        THG = self.__slices.get(conditions.base_key())
+        return THG is not None and THG.is_analyzed(conditions.temperature)
+
+    @profiled("condition_grid.insert_conditions")
+    def insert_conditions(self, conditions: list[FoldingConditions]) -> None:
+        """
+        Computa in parallelo i folding mancanti per una lista di condizioni, ad esempio
+        ottenuta con FoldingConditions.grid. Condizioni ripetute vengono computate una volta sola.
+
+        Args:
+            conditions (list[FoldingConditions]): Le condizioni a cui computare i folding.
+        """
+        tasks = []
+        for condition in dict.fromkeys(conditions):
+            THG = self.get_slice(condition)
+            if THG.is_analyzed(condition.temperature):
+                PROFILER.count("temperature_hypergraph.cache_hits")
+            else:
+                tasks.append((THG, condition.temperature))
+        if len(tasks) == 0:
+            return
+        if self.__scheduler is not None:
+            futures = [
+                self.__scheduler.submit(THG.producer, temperature)
+                for THG, temperature in tasks
+            ]
+            for (THG, temperature), future in zip(tasks, futures):
+                THG.add_folding(temperature, future.result())
+            return
+        workers = self.__max_workers or os.cpu_count() or 1
+        with ProcessPoolExecutor(max_workers=self.__max_workers) as executor:
+            results = executor.map(
+                _fold,
+                [(THG.producer, temperature) for THG, temperature in tasks],
+                chunksize=max(1, len(tasks) // (4 * workers)),
+            )
+            for (THG, temperature), incidence in zip(tasks, results):
+                THG.add_folding(temperature, incidence)
+
+    def insert_temperature_range(
+        self,
+        start_temperature: Temperature,
+        end_temperature: Temperature,
+        step: Temperature = 1,
+        conditions: list[FoldingConditions] | None = None,
+    ) -> None:
+        """
+        Computa i folding per un intervallo di temperature in ognuna delle condizioni indicate.
+
+        Args:
+            start_temperature (Temperature): La temperatura iniziale dell'intervallo.
+            end_temperature (Temperature): La temperatura finale dell'intervallo.
+            step (Temperature, opzionale): Il passo tra le temperature nell'intervallo, anche non intero. Default è 1.
+            conditions (list[FoldingConditions] | None): Le condizioni, di cui viene ignorata la
+                temperatura. Default sono le condizioni predefinite.
+        """
+        temperatures = temperature_range(start_temperature, end_temperature, step)
+        self.insert_conditions(
+            [
+                condition.with_temperature(temperature)
+                for condition in conditions or [FoldingConditions()]
+                for temperature in temperatures
+            ]
+        )
+
+    def get_hypergraph(self, conditions: FoldingConditions) -> hnx.Hypergraph:
+        """
+        Restituisce l'ipergrafo del folding nelle condizioni indicate.
+
+        Args:
+            conditions (FoldingConditions): Le condizioni del folding.
+
+        Returns:
+            hnx.Hypergraph: L'ipergrafo associato alle condizioni.
+        """
+        return self.get_slice(conditions).get_hypergraph(conditions.temperature)
+
+    def get_edge_table(self, conditions: FoldingConditions) -> EdgeTable | None:
+        """
+        Restituisce la tabella degli iperarchi del folding nelle condizioni indicate.
+
+        Args:
+            conditions (FoldingConditions): Le condizioni del folding.
+
+        Returns:
+            EdgeTable | None: La tabella degli iperarchi del folding.
+        """
+        return self.get_slice(conditions).get_edge_table(conditions.temperature)
@@ -0,0 +1,423 @@
+from __future__ import annotations
+
+import weakref
+from enum import IntEnum
+
+import numpy as np
+
+from RNAHyperFold.hypergraph_folding.pair_table import UNPAIRED, node_position
+from RNAHyperFold.lazy_modules import lazy_module
+
+hnx = lazy_module("hypernetx")
+
+
+class EdgeType(IntEnum):
+    """Tipo di un iperarco, ricavato una sola volta dal prefisso del suo nome."""
+
+    BACKBONE = 0
+    PAIR = 1
+    STEM = 2
+    INTERIOR_LOOP = 3
+    HAIRPIN_LOOP = 4
+    MULTILOOP = 5
+    FIVE_PRIME = 6
+    THREE_PRIME = 7
+    OTHER = 8
+
+    @property
+    def prefix(self) -> str:
+        """Il prefisso dei nomi degli iperarchi di questo tipo."""
+        return PREFIXES[self]
+
+    @property
+    def is_element(self) -> bool:
+        """True se il tipo rappresenta una struttura secondaria."""
+        return self not in (EdgeType.BACKBONE, EdgeType.PAIR, EdgeType.OTHER)
+
+
+PREFIXES = {
+    EdgeType.BACKBONE: "l",
+    EdgeType.PAIR: "db",
+    EdgeType.STEM: "s",
+    EdgeType.INTERIOR_LOOP: "i",
+    EdgeType.HAIRPIN_LOOP: "h",
+    EdgeType.MULTILOOP: "m",
+    EdgeType.FIVE_PRIME: "f",
+    EdgeType.THREE_PRIME: "t",
+    EdgeType.OTHER: "",
+}
+"""Il prefisso dei nomi degli iperarchi di ogni tipo."""
+
+_TYPE_BY_PREFIX = {
+    prefix: edge_type for edge_type, prefix in PREFIXES.items() if prefix != ""
+}
+
+
+def parse_edge_name(name: str) -> tuple[EdgeType, int] | None:
+    """
+    Scompone il nome di un iperarco nel formato "{prefisso}_{indice}".
+
+    Args:
+        name (str): Il nome dell'iperarco.
+
+    Returns:
+        tuple[EdgeType, int] | None: Il tipo e l'indice, None se il nome non è nel formato atteso.
+    """
+    prefix, _, index = name.partition("_")
+    edge_type = _TYPE_BY_PREFIX.get(prefix)
+    # indici con zeri iniziali non sarebbero ricostruiti uguali dal nome lazy
+    if edge_type is None or not index.isdigit() or index != str(int(index)):
+        return None
+    return edge_type, int(index)
+
+
+class EdgeTable:
+    """
+    Rappresentazione compatta degli iperarchi di un folding: ogni iperarco ha un id intero
+    (la sua posizione nel dizionario di incidenza), un tipo, un indice di elemento e i suoi
+    nodi memorizzati in array paralleli in formato CSR. I nomi testuali sono ricostruiti solo
+    quando richiesti, per compatibilità con HyperNetX.
+    """
+
+    __slots__ = (
+        "types",
+        "indexes",
+        "offsets",
+        "nodes",
+        "length",
+        "__by_type",
+        "__element_edges",
+        "__irregular_names",
+        "__node_names",
+        "__names",
+        "__node_index",
+    )
+
+    def __init__(
+        self,
+        types: np.ndarray,
+        indexes: np.ndarray,
+        offsets: np.ndarray,
+        nodes: np.ndarray,
+        irregular_names: dict[int, str] | None = None,
+        node_names: list | None = None,
+    ) -> None:
+        """
+        Inizializza un'istanza della classe EdgeTable.
+
+        Args:
+            types (np.ndarray): Il tipo (EdgeType) di ogni iperarco.
+            indexes (np.ndarray): L'indice numerico del nome di ogni iperarco.
+            offsets (np.ndarray): Gli iperarchi e hanno i nodi nodes[offsets[e]:offsets[e + 1]].
+            nodes (np.ndarray): Le posizioni dei nodi di tutti gli iperarchi, concatenate.
+            irregular_names (dict[int, str] | None): I nomi degli iperarchi non nel formato "{prefisso}_{indice}".
+            node_names (list | None): Il nodo originale di ogni posizione, se i nodi non sono interi.
+        """
+        self.types: np.ndarray = types
+        self.indexes: np.ndarray = indexes
+        self.offsets: np.ndarray = offsets
+        self.nodes: np.ndarray = nodes
+        self.length: int = int(nodes.max()) + 1 if len(nodes) > 0 else 0
+        """Il numero di nucleotidi."""
+        self.__irregular_names: dict[int, str] = irregular_names or {}
+        self.__node_names: list | None = node_names
+        # ids degli iperarchi di ogni tipo, in ordine di id
+        order = np.argsort(types, kind="stable")
+        bounds = np.searchsorted(types[order], np.arange(len(EdgeType) + 1))
+        self.__by_type: dict[EdgeType, np.ndarray] = {
+            edge_type: order[bounds[edge_type] : bounds[edge_type + 1]]
+            for edge_type in EdgeType
+        }
+        self.__element_edges: np.ndarray = np.sort(
+            np.concatenate(
+                [
+                    self.__by_type[edge_type]
+                    for edge_type in EdgeType
+                    if edge_type.is_element
+                ]
+            )
+        )
+        self.__names: list[str] | None = None
+        self.__node_index: NodeIndex | None = None
+
+    @classmethod
+    def from_incidence_dict(cls, incidence_dict: dict) -> "EdgeTable":
+        """
+        Costruisce la tabella a partire da un dizionario di incidenza, leggendo ogni nome una sola volta.
+
+        Args:
+            incidence_dict (dict): Il dizionario di incidenza.
+
+        Returns:
+            EdgeTable: La tabella degli iperarchi.
+        """
+        count = len(incidence_dict)
+        types = np.empty(count, dtype=np.int8)
+        indexes = np.empty(count, dtype=np.int32)
+        offsets = np.zeros(count + 1, dtype=np.int64)
+        nodes = []
+        irregular_names = {}
+        node_names = {}
+        for edge, (name, edge_nodes) in enumerate(incidence_dict.items()):
+            parsed = parse_edge_name(name)
+            if parsed is None:
+                parsed = (EdgeType.OTHER, edge)
+                irregular_names[edge] = name
+            types[edge], indexes[edge] = parsed
+            for node in edge_nodes:
+                position = node_position(node)
+                if not isinstance(node, (int, np.integer)):
+                    node_names[position] = node
+                nodes.append(position)
+            offsets[edge + 1] = len(nodes)
+        nodes = np.array(nodes, dtype=np.int32)
+        if len(node_names) > 0:
+            node_names = [node_names.get(i, i) for i in range(int(nodes.max()) + 1)]
+        return cls(types, indexes, offsets, nodes, irregular_names, node_names or None)
+
+    def __len__(self) -> int:
+        return len(self.types)
+
+    def of_type(self, edge_type: EdgeType) -> np.ndarray:
+        """
+        Restituisce gli id degli iperarchi di un tipo, precalcolati alla costruzione.
+
+        Args:
+            edge_type (EdgeType): Il tipo.
+
+        Returns:
+            np.ndarray: Gli id degli iperarchi, in ordine crescente.
+        """
+        return self.__by_type[edge_type]
+
+    def element_edges(self) -> np.ndarray:
+        """
+        Restituisce gli id degli iperarchi che rappresentano strutture secondarie.
+
+        Returns:
+            np.ndarray: Gli id degli iperarchi, in ordine crescente.
+        """
+        return self.__element_edges
+
+    def edge_nodes(self, edge: int) -> np.ndarray:
+        """
+        Restituisce le posizioni dei nodi di un iperarco.
+
+        Args:
+            edge (int): L'id dell'iperarco.
+
+        Returns:
+            np.ndarray: Le posizioni dei nodi.
+        """
+        return self.nodes[self.offsets[edge] : self.offsets[edge + 1]]
+
+    def edge_sizes(self) -> np.ndarray:
+        """
+        Restituisce il numero di nodi di ogni iperarco.
+
+        Returns:
+            np.ndarray: La dimensione di ogni iperarco.
+        """
+        return np.diff(self.offsets)
+
+    def name(self, edge: int) -> str:
+        """
+        Restituisce il nome testuale di un iperarco.
+
+        Args:
+            edge (int): L'id dell'iperarco.
+
+        Returns:
+            str: Il nome dell'iperarco.
+        """
+        if self.__names is not None:
+            return self.__names[edge]
+        irregular = self.__irregular_names.get(edge)
+        if irregular is not None:
+            return irregular
+        return f"{PREFIXES[EdgeType(self.types[edge])]}_{self.indexes[edge]}"
+
+    @property
+    def names(self) -> list[str]:
+        """I nomi testuali di tutti gli iperarchi, costruiti al primo accesso."""
+        if self.__names is None:
+            self.__names = [self.name(edge) for edge in range(len(self))]
+        return self.__names
+
+    def pairs(self) -> np.ndarray:
+        """
+        Restituisce le coppie di basi, nell'ordine degli iperarchi.
+
+        Returns:
+            np.ndarray: La matrice k×2 dei nodi di ogni iperarco di tipo PAIR.
+        """
+        starts = self.offsets[self.of_type(EdgeType.PAIR)]
+        return np.column_stack((self.nodes[starts], self.nodes[starts + 1]))
+
+    def pair_table(self, length: int | None = None) -> np.ndarray:
+        """
+        Restituisce la tabella delle coppie del folding.
+
+        Args:
+            length (int | None): Il numero di nucleotidi, se None viene dedotto dai nodi.
+
+        Returns:
+            np.ndarray: Per ogni nucleotide l'indice del nucleotide appaiato, UNPAIRED se non appaiato.
+        """
+        pair_table = np.full(
+            self.length if length is None else length, UNPAIRED, dtype=np.int32
+        )
+        pairs = self.pairs()
+        pair_table[pairs[:, 0]] = pairs[:, 1]
+        pair_table[pairs[:, 1]] = pairs[:, 0]
+        return pair_table
+
+    @property
+    def node_index(self) -> "NodeIndex":
+        """L'indice inverso nucleotide → iperarchi, costruito al primo accesso."""
+        if self.__node_index is None:
+            self.__node_index = NodeIndex(self)
+        return self.__node_index
+
+    def node(self, position: int):
+        """
+        Restituisce il nodo originale (intero o stringa) di una posizione.
+
+        Args:
+            position (int): La posizione del nucleotide.
+
+        Returns:
+            Il nodo, come compare nel dizionario di incidenza.
+        """
+        if self.__node_names is None:
+            return int(position)
+        return self.__node_names[position]
+
+    def edge_node_list(self, edge: int) -> list:
+        """
+        Restituisce i nodi originali di un iperarco, come nel dizionario di incidenza.
+
+        Args:
+            edge (int): L'id dell'iperarco.
+
+        Returns:
+            list: I nodi dell'iperarco.
+        """
+        return [self.node(position) for position in self.edge_nodes(edge)]
+
+    def to_incidence_dict(self, edges=None) -> dict:
+        """
+        Ricostruisce il dizionario di incidenza con i nomi testuali, per HyperNetX.
+
+        Args:
+            edges: Gli id degli iperarchi da includere. Default sono tutti.
+
+        Returns:
+            dict: Il dizionario di incidenza.
+        """
+        if edges is None:
+            edges = range(len(self))
+        return {self.name(edge): self.edge_node_list(edge) for edge in edges}
+
+
+class NodeIndex:
+    """
+    Indice inverso di un folding: per ogni nucleotide gli id degli iperarchi che lo contengono,
+    in formato CSR, e l'id della struttura secondaria di cui fa parte. Le interrogazioni su un
+    nucleotide costano quanto il suo grado.
+    """
+
+    __slots__ = ("offsets", "edges", "element_labels")
+
+    def __init__(self, table: EdgeTable) -> None:
+        """
+        Inizializza un'istanza della classe NodeIndex.
+
+        Args:
+            table (EdgeTable): La tabella degli iperarchi del folding.
+        """
+        entry_edges = np.repeat(
+            np.arange(len(table), dtype=np.int32), table.edge_sizes()
+        )
+        order = np.argsort(table.nodes, kind="stable")
+        self.edges: np.ndarray = entry_edges[order]
+        """Gli id degli iperarchi, raggruppati per nucleotide."""
+        self.offsets: np.ndarray = np.zeros(table.length + 1, dtype=np.int64)
+        """Il nucleotide i è contenuto negli iperarchi edges[offsets[i]:offsets[i + 1]]."""
+        np.cumsum(
+            np.bincount(table.nodes, minlength=table.length), out=self.offsets[1:]
+        )
+        self.element_labels: np.ndarray = np.full(table.length, -1, dtype=np.int32)
+        """L'id dell'iperarco della struttura secondaria di ogni nucleotide, -1 se nessuna."""
+        elements = table.element_edges()
+        element_entries = np.repeat(elements, table.edge_sizes()[elements])
+        element_nodes = (
+            np.concatenate([table.edge_nodes(edge) for edge in elements])
+            if len(elements) > 0
+            else np.zeros(0, dtype=np.int32)
+        )
+        self.element_labels[element_nodes] = element_entries
+
+    def edges_of(self, position: int) -> np.ndarray:
+        """
+        Restituisce gli id degli iperarchi che contengono un nucleotide.
+
+        Args:
+            position (int): La posizione del nucleotide.
+
+        Returns:
+            np.ndarray: Gli id degli iperarchi.
+        """
+        if position < 0 or position >= len(self.element_labels):
+            return self.edges[0:0]
+        return self.edges[self.offsets[position] : self.offsets[position + 1]]
+
+    def element_of(self, position: int) -> int:
+        """
+        Restituisce l'id della struttura secondaria di cui fa parte un nucleotide.
+
+        Args:
+            position (int): La posizione del nucleotide.
+
+        Returns:
+            int: L'id dell'iperarco, -1 se il nucleotide non fa parte di nessuna struttura.
+        """
+        return int(self.element_labels[position])
+
+    def window_edges(self, start: int, end: int) -> np.ndarray:
+        """
+        Restituisce gli id degli iperarchi che contengono almeno un nucleotide di una finestra.
+
+        Args:
+            start (int): La prima posizione della finestra.
+            end (int): L'ultima posizione della finestra (inclusa).
+
+        Returns:
+            np.ndarray: Gli id degli iperarchi, senza ripetizioni e in ordine crescente.
+        """
+        start = max(start, 0)
+        end = min(end, len(self.element_labels) - 1)
+        if start > end:
+            return self.edges[0:0]
+        return np.unique(self.edges[self.offsets[start] : self.offsets[end + 1]])
+
+
+# tabelle già costruite, rilasciate insieme al rispettivo ipergrafo
+_tables: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+
+
+def edge_table(HG: hnx.Hypergraph) -> EdgeTable:
+    """
+    Restituisce la tabella degli iperarchi di un ipergrafo, costruendola una sola volta per ipergrafo.
+
+    Args:
+        HG (hnx.Hypergraph): L'ipergrafo.
+
+    Returns:
+        EdgeTable: La tabella degli iperarchi.
+    """
+    table = _tables.get(HG)
+    if table is None:
+        table = EdgeTable.from_incidence_dict(HG.incidence_dict)
+        _tables[HG] = table
+    return table
@@ -0,0 +1,599 @@
+from __future__ import annotations
+
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from ViennaRNA import RNA
+
+from RNAHyperFold.hypergraph_folding.folding_conditions import FoldingConditions
+from RNAHyperFold.hypergraph_folding.pair_table import (
+    UNPAIRED,
+    dotbracket_from_pair_table,
+    pair_table_from_dotbracket,
+)
+from RNAHyperFold.hypergraph_folding.rna_folder import RNAFolder
+from RNAHyperFold.hypergraph_folding.temperature_grid import (
+    Temperature,
+    normalize_temperature,
+    temperature_range,
+)
+from RNAHyperFold.hypergraph_folding.temperature_hypergraph import (
+    SearchOptimizedFoldingHypergraph,
+    TemperatureFoldingHypergraph,
+    TemporalHypergraph,
+)
+from RNAHyperFold.incidence_producers.vienna_incidence_producer import (
+    ViennaIncidenceProducer,
+)
+from RNAHyperFold.profiling.stage_profiler import PROFILER, profiled
+
+
+class SequenceEdit:
+    """
+    Modifica di una sequenza: i nucleotidi deleted a partire da position vengono sostituiti
+    con inserted. Sostituzioni, inserimenti, cancellazioni e aggiunte in coda sono casi
+    particolari della stessa modifica.
+    """
+
+    __slots__ = ("position", "deleted", "inserted")
+
+    def __init__(self, position: int, deleted: str, inserted: str) -> None:
+        """
+        Inizializza un'istanza della classe SequenceEdit.
+
+        Args:
+            position (int): La posizione del primo nucleotide modificato (a partire da 0).
+            deleted (str): I nucleotidi rimossi.
+            inserted (str): I nucleotidi inseriti al loro posto.
+        """
+        self.position: int = position
+        self.deleted: str = deleted
+        self.inserted: str = inserted
+
+    def apply(self, sequence: str) -> str:
+        """
+        Applica la modifica a una sequenza.
+
+        Args:
+            sequence (str): La sequenza prima della modifica.
+
+        Returns:
+            str: La sequenza modificata.
+        """
+        end = self.position + len(self.deleted)
+        if sequence[self.position : end] != self.deleted:
+            raise ValueError(
+                f"La sequenza non contiene {self.deleted!r} in posizione {self.position}"
+            )
+        return sequence[: self.position] + self.inserted + sequence[end:]
+
+    def position_map(self, length: int) -> np.ndarray:
+        """
+        Restituisce la posizione dopo la modifica di ogni nucleotide della sequenza originale.
+        Con deleted e inserted della stessa lunghezza i nucleotidi sostituiti mantengono la
+        posizione, altrimenti i nucleotidi rimossi non hanno una posizione.
+
+        Args:
+            length (int): La lunghezza della sequenza prima della modifica.
+
+        Returns:
+            np.ndarray: La nuova posizione di ogni nucleotide, -1 se rimosso.
+        """
+        mapping = np.arange(length, dtype=np.int32)
+        end = self.position + len(self.deleted)
+        if len(self.deleted) != len(self.inserted):
+            mapping[self.position : end] = -1
+            mapping[end:] += len(self.inserted) - len(self.deleted)
+        return mapping
+
+    def span(self, length: int) -> tuple[int, int]:
+        """
+        Restituisce l'intervallo, nelle posizioni dopo la modifica, da ripiegare: i nucleotidi
+        inseriti oppure, per una cancellazione, i due nucleotidi ai lati del punto di giunzione.
+
+        Args:
+            length (int): La lunghezza della sequenza dopo la modifica.
+
+        Returns:
+            tuple[int, int]: Le posizioni iniziale e finale, incluse.
+        """
+        if len(self.inserted) > 0:
+            return self.position, self.position + len(self.inserted) - 1
+        return max(0, self.position - 1), min(length - 1, self.position)
+
+    def __repr__(self) -> str:
+        return f"SequenceEdit({self.position}, {self.deleted!r}, {self.inserted!r})"
+
+
+class _FoldState:
+    """
+    Il folding di una temperatura nella versione corrente della sequenza: la tabella delle
+    coppie, l'intervallo che differisce dall'ultimo folding completo (None se non ci sono
+    state modifiche da allora) e se il folding va ricomputato dopo l'ultima modifica.
+    """
+
+    __slots__ = ("pair_table", "region", "pending")
+
+    def __init__(
+        self,
+        pair_table: np.ndarray,
+        region: tuple[int, int] | None = None,
+        pending: bool = False,
+    ) -> None:
+        self.pair_table: np.ndarray = pair_table
+        self.region: tuple[int, int] | None = region
+        self.pending: bool = pending
+
+
+def _map_interval(
+    interval: tuple[int, int], edit: SequenceEdit, length: int
+) -> tuple[int, int]:
+    """Porta un intervallo di posizioni oltre una modifica, allargandolo ai nucleotidi modificati."""
+    end = edit.position + len(edit.deleted)
+    shift = len(edit.inserted) - len(edit.deleted)
+
+    def move(position: int) -> int:
+        if position < edit.position:
+            return position
+        if position >= end:
+            return position + shift
+        return edit.position
+
+    span = edit.span(length)
+    return (
+        max(0, min(move(interval[0]), span[0])),
+        min(length - 1, max(move(interval[1]), span[1])),
+    )
+
+
+def _exterior_unpaired(pair_table: np.ndarray) -> np.ndarray:
+    """Restituisce una maschera dei nucleotidi non appaiati del loop esterno."""
+    indexes = np.arange(len(pair_table))
+    depth = np.zeros(len(pair_table) + 1, dtype=np.int32)
+    opening = indexes[pair_table > indexes]
+    np.add.at(depth, opening, 1)
+    np.add.at(depth, pair_table[opening] + 1, -1)
+    return (pair_table == UNPAIRED) & (np.cumsum(depth[:-1]) == 0)
+
+
+def refold_window(
+    pair_table: np.ndarray, start: int, end: int, max_window: int
+) -> tuple[int, int, bool] | None:
+    """
+    Individua la finestra da ripiegare perché un intervallo di nucleotidi possa cambiare
+    struttura senza modificare il resto del folding. La finestra è delimitata dalla coppia più
+    esterna che racchiude l'intervallo entro max_window nucleotidi oppure, se nessuna coppia lo
+    racchiude, dai nucleotidi non appaiati del loop esterno più lontani entro max_window (o
+    dalle estremità della sequenza). Finestre più ampie lasciano più libertà al nuovo folding.
+
+    Args:
+        pair_table (np.ndarray): La tabella delle coppie del folding.
+        start (int): La posizione iniziale dell'intervallo.
+        end (int): La posizione finale dell'intervallo, inclusa.
+        max_window (int): La lunghezza massima della finestra.
+
+    Returns:
+        tuple[int, int, bool] | None: Le posizioni iniziale e finale della finestra, incluse, e
+            se è delimitata da una coppia. None se non esiste una finestra abbastanza piccola
+            diversa dall'intera sequenza.
+    """
+    n = len(pair_table)
+    indexes = np.arange(n)
+    enclosing = np.flatnonzero((indexes < start) & (pair_table > end))
+    if len(enclosing) > 0:
+        fitting = enclosing[pair_table[enclosing] - enclosing < max_window]
+        if len(fitting) == 0:
+            return None
+        first = int(fitting[0])
+        return first, int(pair_table[first]), True
+    exterior = np.flatnonzero(_exterior_unpaired(pair_table))
+    before = np.append(0, exterior[exterior < start]) if start > 0 else np.array([0])
+    after = (
+        np.append(exterior[exterior > end], n - 1) if end < n - 1 else np.array([n - 1])
+    )
+    for first in before:
+        last = after[np.searchsorted(after, first + max_window) - 1]
+        if last > end and (first, last) != (0, n - 1):
+            return int(first), int(last), False
+    return None
+
+
+def fold_window(
+    sequence: str,
+    conditions: FoldingConditions,
+    start: int,
+    end: int,
+    closed: bool,
+) -> str | None:
+    """
+    Ripiega una finestra della sequenza mantenendone i vincoli con il resto del folding: se
+    la finestra è delimitata da una coppia questa viene forzata, altrimenti vengono forzati
+    non appaiati i nucleotidi di confine del loop esterno. Il folding della finestra è quello
+    a energia minima tra le strutture della sequenza completa che coincidono con il resto del
+    folding, perché l'energia si decompone nei loop interni ed esterni alla finestra e quelli
+    esterni dipendono solo da nucleotidi non modificati.
+
+    Args:
+        sequence (str): La sequenza completa.
+        conditions (FoldingConditions): Le condizioni del folding, temperatura inclusa.
+        start (int): La posizione iniziale della finestra.
+        end (int): La posizione finale della finestra, inclusa.
+        closed (bool): Se True la finestra è delimitata dalla coppia (start, end).
+
+    Returns:
+        str | None: La rappresentazione punto-parentesi della finestra, None se ViennaRNA non
+            rispetta i vincoli (ad esempio per una coppia isolata con no_lonely_pairs).
+    """
+    window = sequence[start : end + 1]
+    fc = conditions.fold_compound(window)
+    context = RNA.CONSTRAINT_CONTEXT_ALL_LOOPS
+    if closed:
+        fc.hc_add_bp(1, len(window), RNA.CONSTRAINT_CONTEXT_ENFORCE | context)
+    else:
+        if start > 0:
+            fc.hc_add_up(1, context)
+        if end < len(sequence) - 1:
+            fc.hc_add_up(len(window), context)
+    dotbracket, _ = fc.mfe()
+    if closed:
+        pair_table = pair_table_from_dotbracket(dotbracket)
+        if pair_table[0] != len(window) - 1:
+            return None
+    elif (start > 0 and dotbracket[0] != ".") or (
+        end < len(sequence) - 1 and dotbracket[-1] != "."
+    ):
+        return None
+    return dotbracket
+
+
+def _full_fold(task: tuple) -> str:
+    """Computa il folding completo di una sequenza, eseguito nei processi worker."""
+    folder, temperature = task
+    return folder.get_dot_bracket(temperature)
+
+
+class EditSession:
+    """
+    Sessione di modifica di una sequenza che tiene la storia delle modifiche e i folding
+    già computati per temperatura. Di default (exact=True) ogni folding di una sequenza nuova
+    viene ricomputato per intero, ma i folding completi sono memorizzati per sequenza, per cui
+    annullare una modifica o tornare a una variante già vista non ripiega nulla.
+    Con exact=False il folding viene invece aggiornato ripiegando solo la finestra che contiene
+    le posizioni modificate, delimitata dalla coppia più esterna che le racchiude o dai
+    nucleotidi non appaiati del loop esterno, e il resto del folding resta quello precedente.
+    Il risultato è ottimo solo tra le strutture che conservano il confine della finestra e non
+    è garantito che sia il folding a energia minima della sequenza: è un'approssimazione, i cui
+    errori si propagano alle modifiche successive fino al prossimo folding completo.
+    """
+
+    def __init__(
+        self,
+        sequence: str,
+        conditions: FoldingConditions | None = None,
+        max_window: int = 300,
+        margin: int = 30,
+        exact: bool = True,
+        max_cached: int = 10000,
+        max_workers: int | None = None,
+    ) -> None:
+        """
+        Inizializza un'istanza della classe EditSession.
+
+        Args:
+            sequence (str): La sequenza iniziale.
+            conditions (FoldingConditions | None): Le condizioni del folding, di cui viene ignorata
+                la temperatura. Default sono quelle predefinite.
+            max_window (int): La lunghezza massima delle finestre ripiegate localmente: le finestre
+                più lunghe vengono sostituite da un folding completo. Default è 300.
+            margin (int): I nucleotidi aggiunti a ogni lato delle posizioni modificate prima di
+                cercare la finestra, per lasciare spazio a riarrangiamenti vicini. Default è 30.
+            exact (bool): Se True, ogni sequenza nuova viene ripiegata per intero; se False, i folding
+                vengono aggiornati localmente in modo approssimato. Default è True.
+            max_cached (int): Il numero massimo di folding completi memorizzati. Default è 10000.
+            max_workers (int | None): Il numero massimo di processi per i folding completi. Default è il numero di CPU.
+        """
+        self.__sequence: str = sequence
+        self.conditions: FoldingConditions = (
+            conditions if conditions is not None else FoldingConditions()
+        )
+        self.max_window: int = max_window
+        self.margin: int = margin
+        self.exact: bool = exact
+        self.__max_cached: int = max_cached
+        self.__max_workers: int | None = max_workers
+        self.__states: dict[Temperature, _FoldState] = {}
+        self.__history: list[SequenceEdit] = []
+        self.__undo: list[tuple[str, dict[Temperature, _FoldState]]] = []
+        self.__full_folds: OrderedDict[tuple[str, Temperature], str] = OrderedDict()
+        self.stats: dict[str, int] = {"cached": 0, "local": 0, "full": 0}
+        """Il numero di folding riutilizzati, ripiegati localmente e ripiegati per intero."""
+
+    @property
+    def sequence(self) -> str:
+        """La sequenza corrente."""
+        return self.__sequence
+
+    @property
+    def history(self) -> list[SequenceEdit]:
+        """Le modifiche applicate alla sequenza iniziale, in ordine."""
+        return list(self.__history)
+
+    def temperatures(self) -> list[Temperature]:
+        """
+        Restituisce le temperature di cui la sessione conserva un folding.
+
+        Returns:
+            list[Temperature]: Le temperature in ordine crescente.
+        """
+        return sorted(self.__states)
+
+    def edit(self, position: int, length: int, inserted: str) -> str:
+        """
+        Sostituisce length nucleotidi a partire da position con inserted. I folding già
+        computati vengono portati nelle nuove posizioni e ricomputati alla prossima richiesta.
+
+        Args:
+            position (int): La posizione del primo nucleotide modificato.
+            length (int): Il numero di nucleotidi rimossi.
+            inserted (str): I nucleotidi inseriti.
+
+        Returns:
+            str: La sequenza modificata.
+        """
+        if position < 0 or length < 0 or position + length > len(self.__sequence):
+            raise ValueError(
+                f"Modifica fuori dalla sequenza: posizione {position}, lunghezza {length}"
+            )
+        if length == 0 and len(inserted) == 0:
+            return self.__sequence
+        edit = SequenceEdit(
+            position, self.__sequence[position : position + length], inserted
+        )
+        sequence = edit.apply(self.__sequence)
+        if len(sequence) == 0:
+            raise ValueError("La sequenza modificata non può essere vuota")
+        mapping = edit.position_map(len(self.__sequence))
+        states = {}
+        for temperature, state in self.__states.items():
+            pair_table = np.full(len(sequence), UNPAIRED, dtype=np.int32)
+            paired = np.flatnonzero(state.pair_table != UNPAIRED)
+            new_positions = mapping[paired]
+            partners = mapping[state.pair_table[paired]]
+            kept = (new_positions >= 0) & (partners >= 0)
+            pair_table[new_positions[kept]] = partners[kept]
+            region = edit.span(len(sequence))
+            if state.region is not None:
+                region = _map_interval(state.region, edit, len(sequence))
+            states[temperature] = _FoldState(pair_table, region, True)
+        self.__undo.append((self.__sequence, self.__states))
+        self.__history.append(edit)
+        self.__sequence = sequence
+        self.__states = states
+        return sequence
+
+    def substitute(self, position: int, nucleotides: str) -> str:
+        """
+        Sostituisce i nucleotidi a partire da una posizione.
+
+        Args:
+            position (int): La posizione del primo nucleotide sostituito.
+            nucleotides (str): I nuovi nucleotidi.
+
+        Returns:
+            str: La sequenza modificata.
+        """
+        return self.edit(position, len(nucleotides), nucleotides)
+
+    def insert(self, position: int, nucleotides: str) -> str:
+        """
+        Inserisce dei nucleotidi prima di una posizione.
+
+        Args:
+            position (int): La posizione prima della quale inserire, len(sequence) per aggiungere in coda.
+            nucleotides (str): I nucleotidi inseriti.
+
+        Returns:
+            str: La sequenza modificata.
+        """
+        return self.edit(position, 0, nucleotides)
+
+    def delete(self, position: int, length: int = 1) -> str:
+        """
+        Rimuove dei nucleotidi.
+
+        Args:
+            position (int): La posizione del primo nucleotide rimosso.
+            length (int): Il numero di nucleotidi rimossi. Default è 1.
+
+        Returns:
+            str: La sequenza modificata.
+        """
+        return self.edit(position, length, "")
+
+    def append(self, nucleotides: str) -> str:
+        """
+        Estende la sequenza in coda.
+
+        Args:
+            nucleotides (str): I nucleotidi aggiunti.
+
+        Returns:
+            str: La sequenza modificata.
+        """
+        return self.edit(len(self.__sequence), 0, nucleotides)
+
+    def undo(self) -> str:
+        """
+        Annulla l'ultima modifica, ripristinando anche i folding della versione precedente.
+
+        Returns:
+            str: La sequenza ripristinata.
+        """
+        if len(self.__undo) == 0:
+            raise ValueError("Nessuna modifica da annullare")
+        self.__sequence, self.__states = self.__undo.pop()
+        self.__history.pop()
+        return self.__sequence
+
+    def __remember(self, temperature: Temperature, dotbracket: str) -> None:
+        key = (self.__sequence, temperature)
+        self.__full_folds[key] = dotbracket
+        self.__full_folds.move_to_end(key)
+        while len(self.__full_folds) > self.__max_cached:
+            self.__full_folds.popitem(last=False)
+
+    def __local_fold(self, temperature: Temperature, state: _FoldState) -> bool:
+        """Ripiega localmente un folding in attesa, False se serve un folding completo."""
+        if self.exact or state.region is None:
+            return False
+        n = len(self.__sequence)
+        start = max(0, state.region[0] - self.margin)
+        end = min(n - 1, state.region[1] + self.margin)
+        window = refold_window(state.pair_table, start, end, self.max_window)
+        if window is None:
+            return False
+        first, last, closed = window
+        with PROFILER.stage("edit_session.local_fold"):
+            dotbracket = fold_window(
+                self.__sequence,
+                self.conditions.with_temperature(temperature),
+                first,
+                last,
+                closed,
+            )
+        if dotbracket is None:
+            return False
+        pair_table = state.pair_table.copy()
+        local = pair_table_from_dotbracket(dotbracket)
+        pair_table[first : last + 1] = np.where(
+            local == UNPAIRED, UNPAIRED, local + first
+        )
+        self.__states[temperature] = _FoldState(pair_table, (first, last))
+        self.stats["local"] += 1
+        return True
+
+    @profiled("edit_session.fold")
+    def fold_temperatures(
+        self, temperatures: list[Temperature]
+    ) -> dict[Temperature, str]:
+        """
+        Restituisce i folding della sequenza corrente alle temperature indicate, ripiegando
+        solo quelli che non sono aggiornati: i folding memorizzati per la stessa sequenza
+        vengono riutilizzati, quelli di una versione precedente vengono ripiegati per intero, in
+        parallelo, o localmente quando exact è False e la finestra lo consente.
+
+        Args:
+            temperatures (list[Temperature]): Le temperature.
+
+        Returns:
+            dict[Temperature, str]: La rappresentazione punto-parentesi di ogni temperatura.
+        """
+        temperatures = list(dict.fromkeys(map(normalize_temperature, temperatures)))
+        missing = []
+        for temperature in temperatures:
+            state = self.__states.get(temperature)
+            if state is not None and not state.pending:
+                continue
+            cached = self.__full_folds.get((self.__sequence, temperature))
+            if cached is not None:
+                self.__states[temperature] = _FoldState(
+                    pair_table_from_dotbracket(cached)
+                )
+                self.stats["cached"] += 1
+                PROFILER.count("edit_session.cached")
+            elif state is None or not self.__local_fold(temperature, state):
+                missing.append(temperature)
+        if len(missing) > 0:
+            folder = RNAFolder(self.__sequence, self.conditions)
+            tasks = [(folder, temperature) for temperature in missing]
+            if len(tasks) == 1 or self.__max_workers == 1:
+                results = list(map(_full_fold, tasks))
+            else:
+                with ProcessPoolExecutor(max_workers=self.__max_workers) as executor:
+                    results = list(executor.map(_full_fold, tasks))
+            for temperature, dotbracket in zip(missing, results):
+                self.__remember(temperature, dotbracket)
+                self.__states[temperature] = _FoldState(
+                    pair_table_from_dotbracket(dotbracket)
+                )
+            self.stats["full"] += len(missing)
+            PROFILER.count("edit_session.full", len(missing))
+        return {
+            temperature: dotbracket_from_pair_table(
+                self.__states[temperature].pair_table
+            )
+            for temperature in temperatures
+        }
+
+    def fold(self, temperature: Temperature) -> str:
+        """
+        Restituisce il folding della sequenza corrente a una temperatura.
+
+        Args:
+            temperature (Temperature): La temperatura.
+
+        Returns:
+            str: La rappresentazione punto-parentesi del folding.
+        """
+        return next(iter(self.fold_temperatures([temperature]).values()))
+
+    def fold_temperature_range(
+        self,
+        start_temperature: Temperature,
+        end_temperature: Temperature,
+        step: Temperature = 1,
+    ) -> dict[Temperature, str]:
+        """
+        Restituisce i folding della sequenza corrente in un intervallo di temperature.
+
+        Args:
+            start_temperature (Temperature): La temperatura iniziale dell'intervallo.
+            end_temperature (Temperature): La temperatura finale dell'intervallo.
+            step (Temperature, opzionale): Il passo tra le temperature nell'intervallo, anche non intero. Default è 1.
+
+        Returns:
+            dict[Temperature, str]: La rappresentazione punto-parentesi di ogni temperatura.
+        """
+        return self.fold_temperatures(
+            temperature_range(start_temperature, end_temperature, step)
+        )
+
+    def folding_hypergraph(
+        self,
+        temperatures: list[Temperature] | None = None,
+        temporal_hypergraph: TemporalHypergraph | None = None,
+    ) -> TemperatureFoldingHypergraph:
+        """
+        Costruisce l'ipergrafo dei folding della sequenza corrente, da usare con le analisi
+        esistenti. Le strutture uguali a più temperature vengono convertite una sola volta.
+
+        Args:
+            temperatures (list[Temperature] | None): Le temperature. Default sono quelle della sessione.
+            temporal_hypergraph (TemporalHypergraph | None): L'ipergrafo temporale in cui memorizzare
+                i folding. Default è un SearchOptimizedFoldingHypergraph.
+
+        Returns:
+            TemperatureFoldingHypergraph: L'ipergrafo dei folding.
+        """
+        folds = self.fold_temperatures(
+            self.temperatures() if temperatures is None else temperatures
+        )
+        producer = ViennaIncidenceProducer(RNAFolder(self.__sequence, self.conditions))
+        THG = TemperatureFoldingHypergraph(
+            producer,
+            (
+                temporal_hypergraph
+                if temporal_hypergraph is not None
+                else SearchOptimizedFoldingHypergraph()
+            ),
+            max_workers=self.__max_workers,
+        )
+        incidence_dicts: dict[str, dict] = {}
+        for temperature, dotbracket in sorted(folds.items()):
+            incidence_dict = incidence_dicts.get(dotbracket)
+            if incidence_dict is None:
+                incidence_dict = producer.get_dotbracket_incidence_dict(dotbracket)
+                incidence_dicts[dotbracket] = incidence_dict
+            THG.add_folding(temperature, incidence_dict)
+        return THG
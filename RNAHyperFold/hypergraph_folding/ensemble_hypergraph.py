@@ -0,0 +1,320 @@
+from __future__ import annotations
+
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from RNAHyperFold.hypergraph_folding.edge_model import EdgeTable, edge_table
+from RNAHyperFold.hypergraph_folding.rna_folder import RNAFolder
+from RNAHyperFold.hypergraph_folding.temperature_grid import (
+    Temperature,
+    normalize_temperature,
+    temperature_range,
+)
+from RNAHyperFold.incidence_producers.vienna_incidence_producer import (
+    ViennaIncidenceProducer,
+)
+from RNAHyperFold.lazy_modules import lazy_module
+from RNAHyperFold.profiling.stage_profiler import PROFILER, profiled
+
+hnx = lazy_module("hypernetx")
+
+GAS_CONSTANT: float = 1.98717e-3
+"""La costante dei gas in kcal/(mol·K)."""
+
+MODES = ("suboptimal", "sampled")
+"""I modi con cui si ottengono le strutture dell'ensemble."""
+
+
+def boltzmann_weights(energies: list[float], temperature: Temperature) -> np.ndarray:
+    """
+    Restituisce i pesi di Boltzmann normalizzati di un insieme di strutture.
+
+    Args:
+        energies (list[float]): Le energie libere delle strutture, in kcal/mol.
+        temperature (Temperature): La temperatura in gradi Celsius.
+
+    Returns:
+        np.ndarray: I pesi, con somma 1.
+    """
+    energies = np.asarray(energies, dtype=float)
+    kT = GAS_CONSTANT * (temperature + 273.15)
+    weights = np.exp(-(energies - energies.min()) / kT)
+    return weights / weights.sum()
+
+
+def _ensemble(task: tuple) -> tuple[list[str], list[float]]:
+    """
+    Computa le strutture di un ensemble e i loro pesi, eseguito nei processi worker.
+
+    Args:
+        task (tuple): Il folder, la temperatura, il modo, l'ampiezza della banda di energia,
+            il numero massimo di strutture e il numero di campioni.
+
+    Returns:
+        tuple[list[str], list[float]]: Le strutture distinte e i loro pesi.
+    """
+    folder, temperature, mode, delta_energy, max_structures, samples = task
+    if mode == "suboptimal":
+        solutions = folder.get_suboptimal_structures(
+            delta_energy, max_structures, temperature
+        )
+        structures = [structure for structure, _ in solutions]
+        weights = boltzmann_weights([energy for _, energy in solutions], temperature)
+        return structures, weights.tolist()
+    counts = Counter(folder.sample_structures(samples, temperature))
+    return list(counts.keys()), [count / samples for count in counts.values()]
+
+
+class EnsembleHypergraph:
+    """
+    Insieme di strutture alternative dello stesso RNA (strutture subottimali o campionate)
+    rappresentato come un unico ipergrafo: gli iperarchi con lo stesso tipo e gli stessi nodi
+    vengono unificati tra le strutture e il peso di ogni iperarco, ovvero la somma dei pesi
+    delle strutture in cui compare, è memorizzato a parte in edge_weights.
+    """
+
+    def __init__(
+        self,
+        producer: ViennaIncidenceProducer,
+        structures: list[str],
+        weights: list[float] | None = None,
+    ) -> None:
+        """
+        Inizializza un'istanza della classe EnsembleHypergraph.
+
+        Args:
+            producer (ViennaIncidenceProducer): Il produttore con cui costruire gli iperarchi di ogni struttura.
+            structures (list[str]): Le strutture in dot-bracket.
+            weights (list[float] | None): Il peso di ogni struttura, normalizzati a somma 1. Default sono pesi uniformi.
+        """
+        if len(structures) == 0:
+            raise ValueError("L'ensemble deve contenere almeno una struttura")
+        if weights is None:
+            weights = np.ones(len(structures))
+        weights = np.asarray(weights, dtype=float)
+        self.structures: list[str] = list(structures)
+        self.weights: np.ndarray = weights / weights.sum()
+        """Il peso di ogni struttura, con somma 1."""
+        self.incidence_dict: dict[str, list] = {}
+        self.edge_weights: dict[str, float] = {}
+        """Per ogni iperarco la somma dei pesi delle strutture che lo contengono."""
+        names: dict[tuple, str] = {}
+        counters: Counter = Counter()
+        with PROFILER.stage("ensemble.merge"):
+            for structure, weight in zip(self.structures, self.weights):
+                incidence_dict = producer.get_dotbracket_incidence_dict(structure)
+                for name, nodes in incidence_dict.items():
+                    prefix = name.split("_", 1)[0]
+                    key = (prefix, tuple(nodes))
+                    merged = names.get(key)
+                    if merged is None:
+                        merged = f"{prefix}_{counters[prefix]}"
+                        counters[prefix] += 1
+                        names[key] = merged
+                        self.incidence_dict[merged] = list(nodes)
+                        self.edge_weights[merged] = 0.0
+                    self.edge_weights[merged] += float(weight)
+        with PROFILER.stage("hnx.hypergraph"):
+            self.HG: hnx.Hypergraph = hnx.Hypergraph(self.incidence_dict)
+            """L'ipergrafo unione delle strutture."""
+
+    @classmethod
+    def from_suboptimals(
+        cls,
+        producer: ViennaIncidenceProducer,
+        temperature: Temperature,
+        delta_energy: float,
+        max_structures: int | None = None,
+    ) -> "EnsembleHypergraph":
+        """
+        Costruisce l'ensemble delle strutture entro delta_energy dalla struttura a energia minima,
+        pesate con la distribuzione di Boltzmann ristretta all'ensemble.
+
+        Args:
+            producer (ViennaIncidenceProducer): Il produttore della sequenza.
+            temperature (Temperature): La temperatura.
+            delta_energy (float): L'ampiezza della banda di energia, in kcal/mol.
+            max_structures (int | None): Il numero massimo di strutture.
+
+        Returns:
+            EnsembleHypergraph: L'ensemble.
+        """
+        structures, weights = _ensemble(
+            (
+                producer.folder,
+                temperature,
+                "suboptimal",
+                delta_energy,
+                max_structures,
+                None,
+            )
+        )
+        return cls(producer, structures, weights)
+
+    @classmethod
+    def from_samples(
+        cls, producer: ViennaIncidenceProducer, temperature: Temperature, samples: int
+    ) -> "EnsembleHypergraph":
+        """
+        Costruisce l'ensemble di strutture estratte dall'ensemble di Boltzmann, pesate con la loro frequenza.
+
+        Args:
+            producer (ViennaIncidenceProducer): Il produttore della sequenza.
+            temperature (Temperature): La temperatura.
+            samples (int): Il numero di strutture da estrarre.
+
+        Returns:
+            EnsembleHypergraph: L'ensemble.
+        """
+        structures, weights = _ensemble(
+            (producer.folder, temperature, "sampled", None, None, samples)
+        )
+        return cls(producer, structures, weights)
+
+    @property
+    def edge_table(self) -> EdgeTable:
+        """La tabella degli iperarchi dell'ipergrafo unione."""
+        return edge_table(self.HG)
+
+    def weight_vector(self) -> np.ndarray:
+        """
+        Restituisce i pesi degli iperarchi allineati agli id della tabella degli iperarchi.
+
+        Returns:
+            np.ndarray: Il peso di ogni iperarco.
+        """
+        return np.array([self.edge_weights[name] for name in self.edge_table.names])
+
+    def entropy(self) -> float:
+        """
+        Restituisce l'entropia di Shannon della distribuzione delle strutture.
+
+        Returns:
+            float: L'entropia, in nat.
+        """
+        weights = self.weights[self.weights > 0]
+        return float(-(weights * np.log(weights)).sum())
+
+    def __len__(self) -> int:
+        return len(self.structures)
+
+
+class EnsembleFoldingHypergraph:
+    """
+    Classe che permette di computare e memorizzare, a diverse temperature, l'ensemble di
+    strutture subottimali o campionate di un RNA, un EnsembleHypergraph per temperatura.
+    """
+
+    def __init__(
+        self,
+        producer: ViennaIncidenceProducer,
+        mode: str = "suboptimal",
+        delta_energy: float = 1.0,
+        max_structures: int | None = None,
+        samples: int = 1000,
+        max_workers: int | None = None,
+    ) -> None:
+        """
+        Inizializza un'istanza della classe EnsembleFoldingHypergraph.
+
+        Args:
+            producer (ViennaIncidenceProducer): Il produttore della sequenza.
+            mode (str): "suboptimal" enumera le strutture entro delta_energy dalla struttura a energia
+                minima, "sampled" estrae samples strutture dall'ensemble di Boltzmann.
+            delta_energy (float): L'ampiezza della banda di energia, in kcal/mol. Default è 1.
+            max_structures (int | None): Il numero massimo di strutture subottimali per temperatura.
+            samples (int): Il numero di strutture estratte per temperatura. Default è 1000.
+            max_workers (int | None): Il numero massimo di processi usati. Default è il numero di CPU.
+        """
+        if mode not in MODES:
+            raise ValueError(f"Modalità non supportata: {mode}, usare una tra {MODES}")
+        if mode == "sampled" and samples < 1:
+            raise ValueError("samples deve essere almeno 1")
+        self.producer: ViennaIncidenceProducer = producer
+        self.mode: str = mode
+        self.__delta_energy: float = delta_energy
+        self.__max_structures: int | None = max_structures
+        self.__samples: int = samples
+        self.__max_workers: int | None = max_workers
+        self.__ensembles: dict[Temperature, EnsembleHypergraph] = {}
+
+    def __task(self, temperature: Temperature) -> tuple:
+        folder = RNAFolder(self.producer.sequence, self.producer.folder.conditions)
+        return (
+            folder,
+            temperature,
+            self.mode,
+            self.__delta_energy,
+            self.__max_structures,
+            self.__samples,
+        )
+
+    @profiled("ensemble.insert_temperatures")
+    def insert_temperatures(self, temperatures: list[Temperature]) -> None:
+        """
+        Computa in parallelo gli ensemble mancanti per una lista di temperature.
+
+        Args:
+            temperatures (list[Temperature]): Le temperature.
+        """
+        missing = []
+        for temperature in map(normalize_temperature, temperatures):
+            if temperature in self.__ensembles or temperature in missing:
+                PROFILER.count("ensemble.cache_hits")
+            else:
+                missing.append(temperature)
+        if len(missing) == 0:
+            return
+        with ProcessPoolExecutor(max_workers=self.__max_workers) as executor:
+            results = executor.map(_ensemble, [self.__task(t) for t in missing])
+            for temperature, (structures, weights) in zip(missing, results):
+                self.__ensembles[temperature] = EnsembleHypergraph(
+                    self.producer, structures, weights
+                )
+
+    def insert_temperature_range(
+        self,
+        start_temperature: Temperature,
+        end_temperature: Temperature,
+        step: Temperature = 1,
+    ) -> None:
+        """
+        Computa gli ensemble per un intervallo di temperature.
+
+        Args:
+            start_temperature (Temperature): La temperatura iniziale dell'intervallo.
+            end_temperature (Temperature): La temperatura finale dell'intervallo.
+            step (Temperature, opzionale): Il passo tra le temperature nell'intervallo, anche non intero. Default è 1.
+        """
+        self.insert_temperatures(
+            temperature_range(start_temperature, end_temperature, step)
+        )
+
+    def get_ensemble(self, temperature: Temperature) -> EnsembleHypergraph:
+        """
+        Restituisce l'ensemble a una certa temperatura, computandolo se necessario.
+
+        Args:
+            temperature (Temperature): La temperatura.
+
+        Returns:
+            EnsembleHypergraph: L'ensemble delle strutture.
+        """
+        temperature = normalize_temperature(temperature)
+        if temperature not in self.__ensembles:
+            self.insert_temperatures([temperature])
+        return self.__ensembles[temperature]
+
+    def get_hypergraph(self, temperature: Temperature) -> hnx.Hypergraph:
+        """
+        Restituisce l'ipergrafo unione dell'ensemble a una certa temperatura.
+
+        Args:
+            temperature (Temperature): La temperatura.
+
+        Returns:
+            hnx.Hypergraph: L'ipergrafo unione delle strutture.
+        """
+        return self.get_ensemble(temperature).HG
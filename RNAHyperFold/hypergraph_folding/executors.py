@@ -0,0 +1,43 @@
+import atexit
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+_shared_pool: ProcessPoolExecutor | None = None
+_shared_pool_lock = threading.Lock()
+
+
+def get_shared_process_pool(max_workers: int | None = None) -> ProcessPoolExecutor:
+    """
+    Restituisce il pool di processi condiviso da tutto il processo, creandolo al primo utilizzo.
+    Permette a più sweep concorrenti (ad esempio le richieste di un servizio) di usare gli
+    stessi processi invece di crearne un pool per ogni richiesta.
+
+    Args:
+        max_workers (int | None): Il numero massimo di processi, usato solo alla creazione del pool.
+            Default è il numero di CPU.
+
+    Returns:
+        ProcessPoolExecutor: Il pool condiviso.
+    """
+    global _shared_pool
+    with _shared_pool_lock:
+        if _shared_pool is None:
+            _shared_pool = ProcessPoolExecutor(max_workers=max_workers)
+        return _shared_pool
+
+
+def shutdown_shared_process_pool(cancel_futures: bool = False) -> None:
+    """
+    Chiude il pool di processi condiviso, se esiste. Un utilizzo successivo ne crea uno nuovo.
+
+    Args:
+        cancel_futures (bool): Se True, i folding non ancora iniziati vengono annullati.
+    """
+    global _shared_pool
+    with _shared_pool_lock:
+        pool, _shared_pool = _shared_pool, None
+    if pool is not None:
+        pool.shutdown(wait=True, cancel_futures=cancel_futures)
+
+
+atexit.register(shutdown_shared_process_pool, cancel_futures=True)
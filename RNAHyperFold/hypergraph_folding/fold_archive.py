@@ -0,0 +1,537 @@
+from __future__ import annotations
+
+import bisect
+import json
+import mmap
+import os
+import struct
+import zlib
+
+import numpy as np
+
+from RNAHyperFold.hypergraph_folding.edge_model import EdgeTable, EdgeType, edge_table
+from RNAHyperFold.hypergraph_folding.folding_conditions import FoldingConditions
+from RNAHyperFold.hypergraph_folding.rna_folder import RNAFolder
+from RNAHyperFold.hypergraph_folding.temperature_grid import (
+    Temperature,
+    normalize_temperature,
+)
+from RNAHyperFold.hypergraph_folding.temperature_hypergraph import (
+    SearchOptimizedFoldingHypergraph,
+    TemperatureFoldingHypergraph,
+    TemporalHypergraph,
+)
+from RNAHyperFold.incidence_producers.temperature_incidence_producer import (
+    TemperatureIncidenceProducer,
+)
+from RNAHyperFold.incidence_producers.vienna_incidence_producer import (
+    ViennaIncidenceProducer,
+)
+from RNAHyperFold.lazy_modules import lazy_module
+from RNAHyperFold.profiling.stage_profiler import PROFILER, profiled
+
+# zstandard è opzionale: senza, gli array vengono compressi con zlib
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+hnx = lazy_module("hypernetx")
+
+MAGIC: bytes = b"RNAHFOLD"
+"""I byte iniziali di ogni archivio di folding."""
+
+FORMAT_VERSION: int = 1
+"""La versione del formato scritta da save_folding_hypergraph."""
+
+COMPRESSIONS = ("zstd", "zlib", "none")
+"""Gli algoritmi di compressione degli array supportati."""
+
+# magic, versione, flag riservati e lunghezza dell'header JSON
+_PREAMBLE = struct.Struct(f"<{len(MAGIC)}sHHI")
+_ALIGNMENT = 8
+
+# array memorizzati per ogni struttura distinta, nell'ordine in cui vengono scritti
+_STRUCTURE_ARRAYS = (
+    "types",
+    "indexes",
+    "offsets",
+    "nodes",
+    "pair_table",
+    "element_labels",
+)
+
+
+def _default_compression() -> str:
+    return "zstd" if zstandard is not None else "zlib"
+
+
+def _compress(data: bytes, compression: str) -> bytes:
+    if compression == "zstd":
+        return zstandard.ZstdCompressor().compress(data)
+    if compression == "zlib":
+        return zlib.compress(data)
+    return data
+
+
+def _decompress(data: bytes, compression: str) -> bytes:
+    if compression == "zstd":
+        return zstandard.ZstdDecompressor().decompress(data)
+    if compression == "zlib":
+        return zlib.decompress(data)
+    return data
+
+
+def _padding(size: int) -> int:
+    return -size % _ALIGNMENT
+
+
+class _BlockWriter:
+    """Accumula gli array compressi della sezione dati e ne restituisce i descrittori per l'header."""
+
+    def __init__(self, compression: str) -> None:
+        self.compression: str = compression
+        self.chunks: list[bytes] = []
+        self.size: int = 0
+
+    def add(self, array: np.ndarray) -> dict:
+        array = np.ascontiguousarray(array)
+        data = _compress(array.tobytes(), self.compression)
+        block = {
+            "offset": self.size,
+            "length": len(data),
+            "dtype": array.dtype.str,
+            "shape": list(array.shape),
+        }
+        self.chunks.append(data)
+        self.chunks.append(b"\0" * _padding(len(data)))
+        self.size += len(data) + _padding(len(data))
+        return block
+
+
+def _structure_key(HG: hnx.Hypergraph) -> frozenset:
+    return frozenset((edge, tuple(nodes)) for edge, nodes in HG.incidence_dict.items())
+
+
+def _node_names(table: EdgeTable) -> list | None:
+    """Restituisce i nodi originali di ogni posizione, None se i nodi sono le posizioni stesse."""
+    names = [table.node(position) for position in range(table.length)]
+    if all(isinstance(name, (int, np.integer)) for name in names):
+        return None
+    return names
+
+
+@profiled("fold_archive.save")
+def save_folding_hypergraph(
+    THG: TemperatureFoldingHypergraph, path: str, compression: str | None = None
+) -> None:
+    """
+    Salva i folding di un TemperatureFoldingHypergraph in un archivio binario versionato.
+    L'archivio contiene un header JSON con la sequenza, le condizioni, la tabella degli
+    intervalli di temperature e l'indice degli array; ogni struttura distinta è memorizzata
+    una sola volta come tabella degli iperarchi, tabella delle coppie ed etichette degli
+    elementi, in array compressi indipendenti che possono essere letti singolarmente.
+
+    Args:
+        THG (TemperatureFoldingHypergraph): L'ipergrafo dei folding da salvare.
+        path (str): Il percorso del file.
+        compression (str | None): Uno tra COMPRESSIONS. Default è zstd se il pacchetto zstandard
+            è installato, altrimenti zlib.
+    """
+    compression = compression or _default_compression()
+    if compression not in COMPRESSIONS:
+        raise ValueError(
+            f"Compressione non supportata: {compression}, usare una tra {COMPRESSIONS}"
+        )
+    if compression == "zstd" and zstandard is None:
+        raise ValueError("La compressione zstd richiede il pacchetto zstandard")
+
+    temperatures = THG.analyzed_temperatures()
+    structure_ids: dict[frozenset, int] = {}
+    hypergraphs: list[hnx.Hypergraph] = []
+    known: dict[int, int] = {}
+    # intervalli [inizio, fine, struttura] delle temperature consecutive con lo stesso folding
+    runs: list[list] = []
+    with PROFILER.stage("fold_archive.intervals"):
+        for temperature in temperatures:
+            HG = THG.get_hypergraph(temperature)
+            structure = known.get(id(HG))
+            if structure is None:
+                structure = structure_ids.setdefault(
+                    _structure_key(HG), len(structure_ids)
+                )
+                if structure == len(hypergraphs):
+                    hypergraphs.append(HG)
+                known[id(HG)] = structure
+            if len(runs) > 0 and runs[-1][2] == structure:
+                runs[-1][1] = temperature
+            else:
+                runs.append([temperature, temperature, structure])
+
+    blocks = _BlockWriter(compression)
+    with PROFILER.stage("fold_archive.compress"):
+        structures = []
+        for HG in hypergraphs:
+            table = edge_table(HG)
+            arrays = {
+                "types": table.types,
+                "indexes": table.indexes,
+                "offsets": table.offsets,
+                "nodes": table.nodes,
+                "pair_table": table.pair_table(),
+                "element_labels": table.node_index.element_labels,
+            }
+            structures.append(
+                {
+                    "arrays": {
+                        name: blocks.add(arrays[name]) for name in _STRUCTURE_ARRAYS
+                    },
+                    "irregular_names": {
+                        str(edge): table.name(edge)
+                        for edge in table.of_type(EdgeType.OTHER).tolist()
+                    },
+                    "node_names": _node_names(table),
+                }
+            )
+        intervals = {
+            "starts": blocks.add(np.array([run[0] for run in runs], dtype=np.float64)),
+            "ends": blocks.add(np.array([run[1] for run in runs], dtype=np.float64)),
+            "structures": blocks.add(
+                np.array([run[2] for run in runs], dtype=np.int32)
+            ),
+        }
+        temperature_block = blocks.add(np.array(temperatures, dtype=np.float64))
+
+    producer = THG.producer
+    folder = getattr(producer, "folder", None)
+    conditions = folder.conditions if folder is not None else FoldingConditions()
+    header = {
+        "producer": type(producer).__name__,
+        "sequence": getattr(producer, "sequence", None),
+        "conditions": {
+            "salt": conditions.salt,
+            "parameters": conditions.parameters,
+            "dangles": conditions.dangles,
+            "no_lonely_pairs": conditions.no_lonely_pairs,
+        },
+        "compression": compression,
+        "temperatures": temperature_block,
+        "intervals": intervals,
+        "structures": structures,
+    }
+    encoded = json.dumps(header, separators=(",", ":")).encode("utf-8")
+    preamble = _PREAMBLE.pack(MAGIC, FORMAT_VERSION, 0, len(encoded))
+
+    tmp_path = f"{path}.tmp"
+    with PROFILER.stage("fold_archive.write"), open(tmp_path, "wb") as archive:
+        archive.write(preamble)
+        archive.write(encoded)
+        archive.write(b"\0" * _padding(len(preamble) + len(encoded)))
+        for chunk in blocks.chunks:
+            archive.write(chunk)
+    os.replace(tmp_path, path)
+
+
+class FoldArchive:
+    """
+    Lettore di un archivio scritto da save_folding_hypergraph. Il file viene mappato in memoria
+    e all'apertura viene letto solo l'header: gli array di una struttura vengono letti e
+    decompressi solo quando si richiede un folding che la usa, per cui è possibile ripristinare
+    una singola temperatura senza leggere il resto dell'archivio.
+    """
+
+    def __init__(self, path: str) -> None:
+        """
+        Inizializza un'istanza della classe FoldArchive.
+
+        Args:
+            path (str): Il percorso dell'archivio.
+        """
+        self.path: str = path
+        self.__file = open(path, "rb")
+        self.__map: mmap.mmap | None = None
+        try:
+            self.__map = mmap.mmap(self.__file.fileno(), 0, access=mmap.ACCESS_READ)
+            if len(self.__map) < _PREAMBLE.size:
+                raise ValueError(f"{path} non è un archivio di folding")
+            magic, version, _, header_length = _PREAMBLE.unpack_from(self.__map, 0)
+            if magic != MAGIC:
+                raise ValueError(f"{path} non è un archivio di folding")
+            if version > FORMAT_VERSION:
+                raise ValueError(
+                    f"Versione dell'archivio non supportata: {version} (massima {FORMAT_VERSION})"
+                )
+            header_end = _PREAMBLE.size + header_length
+            self.__header: dict = json.loads(self.__map[_PREAMBLE.size : header_end])
+        except Exception:
+            self.close()
+            raise
+        self.version: int = version
+        """La versione del formato dell'archivio."""
+        self.__data_start: int = header_end + _padding(header_end)
+        self.__compression: str = self.__header["compression"]
+        if self.__compression == "zstd" and zstandard is None:
+            self.close()
+            raise ValueError("L'archivio è compresso con zstd: installare zstandard")
+        intervals = self.__header["intervals"]
+        self.__starts: list[Temperature] = [
+            normalize_temperature(t) for t in self.__read(intervals["starts"]).tolist()
+        ]
+        self.__ends: list[Temperature] = [
+            normalize_temperature(t) for t in self.__read(intervals["ends"]).tolist()
+        ]
+        self.__structure_ids: list[int] = self.__read(intervals["structures"]).tolist()
+        self.__temperatures: list[Temperature] | None = None
+        self.__tables: dict[int, EdgeTable] = {}
+
+    def __read(self, block: dict) -> np.ndarray:
+        """Legge e decomprime un singolo array della sezione dati."""
+        start = self.__data_start + block["offset"]
+        data = _decompress(
+            self.__map[start : start + block["length"]], self.__compression
+        )
+        return np.frombuffer(data, dtype=np.dtype(block["dtype"])).reshape(
+            block["shape"]
+        )
+
+    @property
+    def sequence(self) -> str | None:
+        """La sequenza di RNA dei folding."""
+        return self.__header["sequence"]
+
+    @property
+    def producer_name(self) -> str:
+        """Il nome della classe del produttore che ha computato i folding."""
+        return self.__header["producer"]
+
+    @property
+    def conditions(self) -> FoldingConditions:
+        """Le condizioni dei folding, a meno della temperatura."""
+        return FoldingConditions(**self.__header["conditions"])
+
+    @property
+    def compression(self) -> str:
+        """L'algoritmo di compressione degli array."""
+        return self.__compression
+
+    @property
+    def structure_count(self) -> int:
+        """Il numero di strutture distinte memorizzate."""
+        return len(self.__header["structures"])
+
+    @property
+    def temperatures(self) -> list[Temperature]:
+        """Le temperature a cui è stato computato il folding, in ordine crescente."""
+        if self.__temperatures is None:
+            self.__temperatures = [
+                normalize_temperature(t)
+                for t in self.__read(self.__header["temperatures"]).tolist()
+            ]
+        return self.__temperatures
+
+    def intervals(self) -> list[tuple[tuple[Temperature, Temperature], int]]:
+        """
+        Restituisce la tabella degli intervalli di temperature consecutive con lo stesso folding.
+
+        Returns:
+            list[tuple[tuple[Temperature, Temperature], int]]: Le coppie (intervallo, id della struttura), in ordine di temperatura.
+        """
+        return [
+            ((start, end), structure)
+            for start, end, structure in zip(
+                self.__starts, self.__ends, self.__structure_ids
+            )
+        ]
+
+    def structure_id(self, temperature: Temperature) -> int | None:
+        """
+        Restituisce l'id della struttura del folding a una certa temperatura.
+
+        Args:
+            temperature (Temperature): La temperatura.
+
+        Returns:
+            int | None: L'id della struttura, None se la temperatura non è stata computata.
+        """
+        temperature = normalize_temperature(temperature)
+        index = bisect.bisect_right(self.__starts, temperature) - 1
+        if index < 0 or temperature > self.__ends[index]:
+            return None
+        # gli intervalli coprono solo temperature computate, ma non tutte quelle interne
+        temperatures = self.temperatures
+        position = bisect.bisect_left(temperatures, temperature)
+        if position == len(temperatures) or temperatures[position] != temperature:
+            return None
+        return self.__structure_ids[index]
+
+    def structure_table(self, structure: int) -> EdgeTable:
+        """
+        Restituisce la tabella degli iperarchi di una struttura, leggendola al primo accesso.
+
+        Args:
+            structure (int): L'id della struttura.
+
+        Returns:
+            EdgeTable: La tabella degli iperarchi.
+        """
+        table = self.__tables.get(structure)
+        if table is None:
+            with PROFILER.stage("fold_archive.read"):
+                entry = self.__header["structures"][structure]
+                arrays = entry["arrays"]
+                table = EdgeTable(
+                    self.__read(arrays["types"]),
+                    self.__read(arrays["indexes"]),
+                    self.__read(arrays["offsets"]),
+                    self.__read(arrays["nodes"]),
+                    {
+                        int(edge): name
+                        for edge, name in entry["irregular_names"].items()
+                    },
+                    entry["node_names"],
+                )
+            self.__tables[structure] = table
+        return table
+
+    def __array(self, temperature: Temperature, name: str) -> np.ndarray | None:
+        structure = self.structure_id(temperature)
+        if structure is None:
+            return None
+        return self.__read(self.__header["structures"][structure]["arrays"][name])
+
+    def edge_table(self, temperature: Temperature) -> EdgeTable | None:
+        """
+        Restituisce la tabella degli iperarchi del folding a una certa temperatura.
+
+        Args:
+            temperature (Temperature): La temperatura.
+
+        Returns:
+            EdgeTable | None: La tabella degli iperarchi, None se la temperatura non è stata computata.
+        """
+        structure = self.structure_id(temperature)
+        return None if structure is None else self.structure_table(structure)
+
+    def pair_table(self, temperature: Temperature) -> np.ndarray | None:
+        """
+        Restituisce la tabella delle coppie del folding a una certa temperatura.
+
+        Args:
+            temperature (Temperature): La temperatura.
+
+        Returns:
+            np.ndarray | None: La tabella delle coppie, None se la temperatura non è stata computata.
+        """
+        return self.__array(temperature, "pair_table")
+
+    def element_labels(self, temperature: Temperature) -> np.ndarray | None:
+        """
+        Restituisce per ogni nucleotide l'id della struttura secondaria di cui fa parte.
+
+        Args:
+            temperature (Temperature): La temperatura.
+
+        Returns:
+            np.ndarray | None: Gli id degli iperarchi, -1 se nessuna, None se la temperatura non è stata computata.
+        """
+        return self.__array(temperature, "element_labels")
+
+    def incidence_dict(self, temperature: Temperature) -> dict | None:
+        """
+        Restituisce il dizionario di incidenza del folding a una certa temperatura.
+
+        Args:
+            temperature (Temperature): La temperatura.
+
+        Returns:
+            dict | None: Il dizionario di incidenza, None se la temperatura non è stata computata.
+        """
+        table = self.edge_table(temperature)
+        return None if table is None else table.to_incidence_dict()
+
+    def hypergraph(self, temperature: Temperature) -> hnx.Hypergraph | None:
+        """
+        Ripristina l'ipergrafo del folding a una certa temperatura, senza leggere le altre strutture.
+
+        Args:
+            temperature (Temperature): La temperatura.
+
+        Returns:
+            hnx.Hypergraph | None: L'ipergrafo, None se la temperatura non è stata computata.
+        """
+        incidence_dict = self.incidence_dict(temperature)
+        return None if incidence_dict is None else hnx.Hypergraph(incidence_dict)
+
+    @profiled("fold_archive.load")
+    def load(
+        self,
+        temporal_hypergraph: TemporalHypergraph | None = None,
+        producer: TemperatureIncidenceProducer | None = None,
+    ) -> TemperatureFoldingHypergraph:
+        """
+        Ripristina l'intero TemperatureFoldingHypergraph.
+
+        Args:
+            temporal_hypergraph (TemporalHypergraph | None): L'ipergrafo temporale in cui memorizzare i folding.
+                Default è un SearchOptimizedFoldingHypergraph.
+            producer (TemperatureIncidenceProducer | None): Il produttore con cui computare nuovi folding.
+                Default è un ViennaIncidenceProducer con la sequenza e le condizioni dell'archivio.
+
+        Returns:
+            TemperatureFoldingHypergraph: L'ipergrafo dei folding.
+        """
+        if producer is None:
+            if self.sequence is None:
+                raise ValueError(
+                    "L'archivio non contiene la sequenza: indicare il produttore"
+                )
+            producer = ViennaIncidenceProducer(
+                RNAFolder(self.sequence, self.conditions)
+            )
+        THG = TemperatureFoldingHypergraph(
+            producer, temporal_hypergraph or SearchOptimizedFoldingHypergraph()
+        )
+        temperatures = self.temperatures
+        incidence_dicts: dict[int, dict] = {}
+        for (start, end), structure in self.intervals():
+            incidence_dict = incidence_dicts.get(structure)
+            if incidence_dict is None:
+                incidence_dict = self.structure_table(structure).to_incidence_dict()
+                incidence_dicts[structure] = incidence_dict
+            first = bisect.bisect_left(temperatures, start)
+            last = bisect.bisect_right(temperatures, end)
+            for temperature in temperatures[first:last]:
+                THG.add_folding(temperature, incidence_dict)
+        return THG
+
+    def close(self) -> None:
+        """Chiude l'archivio."""
+        if self.__map is not None:
+            self.__map.close()
+        self.__file.close()
+
+    def __enter__(self) -> "FoldArchive":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def load_folding_hypergraph(
+    path: str,
+    temporal_hypergraph: TemporalHypergraph | None = None,
+    producer: TemperatureIncidenceProducer | None = None,
+) -> TemperatureFoldingHypergraph:
+    """
+    Ripristina un TemperatureFoldingHypergraph salvato con save_folding_hypergraph.
+
+    Args:
+        path (str): Il percorso dell'archivio.
+        temporal_hypergraph (TemporalHypergraph | None): L'ipergrafo temporale in cui memorizzare i folding.
+        producer (TemperatureIncidenceProducer | None): Il produttore con cui computare nuovi folding.
+
+    Returns:
+        TemperatureFoldingHypergraph: L'ipergrafo dei folding.
+    """
+    with FoldArchive(path) as archive:
+        return archive.load(temporal_hypergraph, producer)
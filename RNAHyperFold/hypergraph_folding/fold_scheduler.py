@@ -0,0 +1,150 @@
+import threading
+from collections import OrderedDict
+from concurrent.futures import Executor, Future
+
+from RNAHyperFold.hypergraph_folding.executors import get_shared_process_pool
+from RNAHyperFold.incidence_producers.temperature_incidence_producer import (
+    TemperatureIncidenceProducer,
+)
+from RNAHyperFold.profiling.stage_profiler import PROFILER
+
+
+def _fold(producer: TemperatureIncidenceProducer, temperature: int) -> dict:
+    """
+    Computa un folding restituendo una copia del dizionario di incidenza, che il produttore riutilizza.
+
+    Args:
+        producer (TemperatureIncidenceProducer): Il produttore di incidenze.
+        temperature (int): La temperatura.
+
+    Returns:
+        dict: Il dizionario di incidenza.
+    """
+    return dict(producer.get_temperature_incidence_dict(temperature))
+
+
+class FoldScheduler:
+    """
+    Scheduler dei folding condiviso da tutto il processo. Richieste identiche (stessa chiave del
+    produttore e stessa temperatura) in corso vengono unite in un'unica future e i folding
+    completati vengono condivisi tra tutti gli ipergrafi temporali della stessa sequenza.
+    I dizionari di incidenza restituiti sono condivisi e non devono essere modificati.
+    """
+
+    def __init__(
+        self, executor: Executor | None = None, max_results: int | None = 100_000
+    ) -> None:
+        """
+        Inizializza un'istanza della classe FoldScheduler.
+
+        Args:
+            executor (Executor | None): L'executor su cui eseguire i folding. Default è il pool di processi condiviso.
+            max_results (int | None): Il numero massimo di folding completati da mantenere,
+                i meno recenti vengono scartati. None per non porre limiti.
+        """
+        self.__executor: Executor | None = executor
+        self.__max_results: int | None = max_results
+        self.__results: OrderedDict = OrderedDict()
+        self.__in_flight: dict[tuple, Future] = {}
+        self.__lock = threading.Lock()
+        self.__stats: dict[str, int] = {
+            "requests": 0,
+            "hits": 0,
+            "coalesced": 0,
+            "folds": 0,
+            "uncacheable": 0,
+        }
+
+    def submit(
+        self, producer: TemperatureIncidenceProducer, temperature: int
+    ) -> Future:
+        """
+        Richiede il folding di un produttore a una certa temperatura.
+
+        Args:
+            producer (TemperatureIncidenceProducer): Il produttore di incidenze.
+            temperature (int): La temperatura.
+
+        Returns:
+            Future: La future del dizionario di incidenza, già completata se il folding era disponibile.
+        """
+        executor = self.__executor or get_shared_process_pool()
+        fold_key = producer.fold_key()
+        with self.__lock:
+            self.__stats["requests"] += 1
+            if fold_key is None:
+                self.__stats["uncacheable"] += 1
+                self.__stats["folds"] += 1
+                return executor.submit(_fold, producer, temperature)
+            key = (fold_key, temperature)
+            if key in self.__results:
+                self.__stats["hits"] += 1
+                PROFILER.count("fold_scheduler.hits")
+                self.__results.move_to_end(key)
+                future = Future()
+                future.set_result(self.__results[key])
+                return future
+            future = self.__in_flight.get(key)
+            if future is not None:
+                self.__stats["coalesced"] += 1
+                PROFILER.count("fold_scheduler.coalesced")
+                return future
+            self.__stats["folds"] += 1
+            future = executor.submit(_fold, producer, temperature)
+            self.__in_flight[key] = future
+        future.add_done_callback(lambda done: self.__complete(key, done))
+        return future
+
+    def __complete(self, key: tuple, future: Future) -> None:
+        """Sposta un folding terminato tra i risultati condivisi."""
+        with self.__lock:
+            self.__in_flight.pop(key, None)
+            if future.cancelled() or future.exception() is not None:
+                return
+            self.__results[key] = future.result()
+            if (
+                self.__max_results is not None
+                and len(self.__results) > self.__max_results
+            ):
+                self.__results.popitem(last=False)
+
+    def fold_many(
+        self, producer: TemperatureIncidenceProducer, temperatures: list[int]
+    ) -> list[dict]:
+        """
+        Computa i folding di un produttore per una lista di temperature.
+
+        Args:
+            producer (TemperatureIncidenceProducer): Il produttore di incidenze.
+            temperatures (list[int]): Le temperature.
+
+        Returns:
+            list[dict]: I dizionari di incidenza, nello stesso ordine delle temperature.
+        """
+        futures = [self.submit(producer, temperature) for temperature in temperatures]
+        return [future.result() for future in futures]
+
+    def stats(self) -> dict[str, int]:
+        """
+        Restituisce le statistiche dello scheduler.
+
+        Returns:
+            dict[str, int]: Il numero di richieste, di folding già disponibili (hits), di richieste
+            unite a un folding in corso (coalesced), di folding eseguiti e di richieste non condivisibili.
+        """
+        with self.__lock:
+            stats = dict(self.__stats)
+            stats["cached"] = len(self.__results)
+            stats["in_flight"] = len(self.__in_flight)
+        return stats
+
+    def clear(self) -> None:
+        """Scarta i folding completati e azzera le statistiche."""
+        with self.__lock:
+            self.__results.clear()
+            for name in self.__stats:
+                self.__stats[name] = 0
+
+
+SCHEDULER = FoldScheduler()
+"""Lo scheduler dei folding condiviso da tutto il processo."""
@@ -0,0 +1,236 @@
+import itertools
+import threading
+
+from ViennaRNA import RNA
+
+from RNAHyperFold.hypergraph_folding.temperature_grid import (
+    Temperature,
+    normalize_temperature,
+)
+
+PARAMETER_SETS: dict = {
+    "turner2004": RNA.params_load_RNA_Turner2004,
+    "turner1999": RNA.params_load_RNA_Turner1999,
+    "andronescu2007": RNA.params_load_RNA_Andronescu2007,
+    "langdon2018": RNA.params_load_RNA_Langdon2018,
+}
+"""I set di parametri energetici inclusi in ViennaRNA, utilizzabili per nome."""
+
+DEFAULT_PARAMETERS = "turner2004"
+"""Il set di parametri energetici predefinito di ViennaRNA."""
+
+DEFAULT_SALT: float = RNA.md().salt
+"""La concentrazione salina predefinita di ViennaRNA, in mol/L."""
+
+# i parametri energetici di ViennaRNA sono globali: si ricorda quelli caricati nel processo
+_loaded_parameters: str = DEFAULT_PARAMETERS
+_parameters_lock = threading.RLock()
+
+
+def load_parameters(parameters: str) -> None:
+    """
+    Carica nel processo un set di parametri energetici, se non è già quello caricato.
+
+    Args:
+        parameters (str): Il nome di un set incluso in ViennaRNA (vedi PARAMETER_SETS) o il percorso di un file di parametri.
+    """
+    global _loaded_parameters
+    with _parameters_lock:
+        if parameters == _loaded_parameters:
+            return
+        loader = PARAMETER_SETS.get(parameters.lower())
+        loaded = loader() if loader is not None else RNA.params_load(parameters)
+        if not loaded:
+            raise ValueError(
+                f"Impossibile caricare i parametri energetici: {parameters}"
+            )
+        _loaded_parameters = parameters
+
+
+class FoldingConditions:
+    """
+    Condizioni sperimentali e di modello di un folding: temperatura, concentrazione salina,
+    set di parametri energetici e opzioni del modello di ViennaRNA. Le istanze sono immutabili
+    e confrontabili, così da poter essere usate come chiavi delle cache e delle griglie di sweep.
+    """
+
+    def __init__(
+        self,
+        temperature: Temperature = 37,
+        salt: float = DEFAULT_SALT,
+        parameters: str = DEFAULT_PARAMETERS,
+        dangles: int = 2,
+        no_lonely_pairs: bool = False,
+    ) -> None:
+        """
+        Inizializza un'istanza della classe FoldingConditions.
+
+        Args:
+            temperature (Temperature): La temperatura in gradi Celsius. Default è 37.
+            salt (float): La concentrazione salina in mol/L. Default è quella di ViennaRNA (1.021).
+            parameters (str): Il set di parametri energetici (vedi PARAMETER_SETS) o il percorso di un file di parametri.
+            dangles (int): Il modello delle dangling end di ViennaRNA (0, 1, 2 o 3). Default è 2.
+            no_lonely_pairs (bool): Se True, le coppie isolate non sono ammesse (noLP). Default è False.
+        """
+        if dangles not in (0, 1, 2, 3):
+            raise ValueError("dangles deve essere 0, 1, 2 o 3")
+        self.__temperature: Temperature = normalize_temperature(temperature)
+        self.__salt: float = float(salt)
+        self.__parameters: str = parameters
+        self.__dangles: int = dangles
+        self.__no_lonely_pairs: bool = bool(no_lonely_pairs)
+
+    @property
+    def temperature(self) -> Temperature:
+        """La temperatura in gradi Celsius."""
+        return self.__temperature
+
+    @property
+    def salt(self) -> float:
+        """La concentrazione salina in mol/L."""
+        return self.__salt
+
+    @property
+    def parameters(self) -> str:
+        """Il set di parametri energetici."""
+        return self.__parameters
+
+    @property
+    def dangles(self) -> int:
+        """Il modello delle dangling end."""
+        return self.__dangles
+
+    @property
+    def no_lonely_pairs(self) -> bool:
+        """Se le coppie isolate non sono ammesse."""
+        return self.__no_lonely_pairs
+
+    def key(self) -> tuple:
+        """
+        Restituisce la tupla che identifica le condizioni.
+
+        Returns:
+            tuple: Temperatura, concentrazione salina, parametri, dangles e noLP.
+        """
+        return (self.__temperature,) + self.base_key()
+
+    def base_key(self) -> tuple:
+        """
+        Restituisce la tupla che identifica le condizioni a meno della temperatura, ovvero la
+        fetta della griglia di condizioni lungo cui i folding sono compressi per intervalli.
+
+        Returns:
+            tuple: Concentrazione salina, parametri, dangles e noLP.
+        """
+        return (
+            self.__salt,
+            self.__parameters,
+            self.__dangles,
+            self.__no_lonely_pairs,
+        )
+
+    def with_temperature(self, temperature: Temperature) -> "FoldingConditions":
+        """
+        Restituisce le stesse condizioni a un'altra temperatura.
+
+        Args:
+            temperature (Temperature): La nuova temperatura.
+
+        Returns:
+            FoldingConditions: Le nuove condizioni.
+        """
+        return FoldingConditions(
+            temperature,
+            self.__salt,
+            self.__parameters,
+            self.__dangles,
+            self.__no_lonely_pairs,
+        )
+
+    def model_details(self) -> RNA.md:
+        """
+        Carica il set di parametri energetici e restituisce i dettagli del modello di ViennaRNA.
+
+        Returns:
+            RNA.md: I dettagli del modello con cui creare un fold compound.
+        """
+        load_parameters(self.__parameters)
+        md = RNA.md()
+        md.temperature = self.__temperature
+        md.salt = self.__salt
+        md.dangles = self.__dangles
+        md.noLP = int(self.__no_lonely_pairs)
+        return md
+
+    def fold_compound(
+        self, sequence: str, unique_multiloops: bool = False, partition: bool = False
+    ) -> RNA.fold_compound:
+        """
+        Crea un fold compound di ViennaRNA per una sequenza in queste condizioni. I parametri
+        energetici globali vengono copiati nel fold compound alla sua creazione, per cui il
+        caricamento e la creazione avvengono sotto lo stesso lock: i folding successivi non
+        dipendono da stato condiviso e possono essere eseguiti da più thread contemporaneamente.
+
+        Args:
+            sequence (str): La sequenza di RNA.
+            unique_multiloops (bool): Se True, abilita la decomposizione unica dei multiloop
+                (uniq_ML), necessaria per strutture subottimali e campionamento.
+            partition (bool): Se True, prepara anche i parametri della funzione di partizione.
+
+        Returns:
+            RNA.fold_compound: Il fold compound.
+        """
+        with _parameters_lock:
+            md = self.model_details()
+            md.uniq_ML = int(unique_multiloops)
+            if partition:
+                return RNA.fold_compound(sequence, md, RNA.OPTION_MFE | RNA.OPTION_PF)
+            return RNA.fold_compound(sequence, md)
+
+    @staticmethod
+    def grid(
+        temperatures: list[Temperature] | None = None,
+        salts: list[float] | None = None,
+        parameters: list[str] | None = None,
+        dangles: list[int] | None = None,
+        no_lonely_pairs: list[bool] | None = None,
+    ) -> list["FoldingConditions"]:
+        """
+        Restituisce il prodotto cartesiano di più valori per ogni dimensione delle condizioni.
+        Le dimensioni non indicate usano il valore predefinito.
+
+        Args:
+            temperatures (list[Temperature] | None): Le temperature.
+            salts (list[float] | None): Le concentrazioni saline.
+            parameters (list[str] | None): I set di parametri energetici.
+            dangles (list[int] | None): I modelli delle dangling end.
+            no_lonely_pairs (list[bool] | None): I valori dell'opzione noLP.
+
+        Returns:
+            list[FoldingConditions]: Le condizioni della griglia, con la temperatura come dimensione più interna.
+        """
+        return [
+            FoldingConditions(t, s, p, d, n)
+            for s, p, d, n, t in itertools.product(
+                salts or [DEFAULT_SALT],
+                parameters or [DEFAULT_PARAMETERS],
+                dangles or [2],
+                no_lonely_pairs or [False],
+                temperatures or [37],
+            )
+        ]
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, FoldingConditions):
+            return NotImplemented
+        return self.key() == other.key()
+
+    def __hash__(self) -> int:
+        return hash(self.key())
+
+    def __repr__(self) -> str:
+        return (
+            f"FoldingConditions(temperature={self.__temperature}, salt={self.__salt}, "
+            f"parameters={self.__parameters!r}, dangles={self.__dangles}, "
+            f"no_lonely_pairs={self.__no_lonely_pairs})"
+        )
@@ -0,0 +1,128 @@
+from collections import deque
+
+import numpy as np
+
+UNPAIRED: int = -1
+"""Valore della tabella delle coppie per i nucleotidi non appaiati."""
+
+
+def node_position(node) -> int:
+    """
+    Restituisce la posizione nella sequenza di un nodo dell'ipergrafo.
+
+    Args:
+        node: Il nodo, un intero o una stringa nel formato "{indice}_{nucleotide}".
+
+    Returns:
+        int: La posizione del nucleotide (a partire da 0).
+    """
+    if isinstance(node, str):
+        return int(node.split("_", 1)[0])
+    return int(node)
+
+
+def pair_table_from_dotbracket(dotbracket: str) -> np.ndarray:
+    """
+    Costruisce la tabella delle coppie di una rappresentazione punto-parentesi.
+
+    Args:
+        dotbracket (str): La rappresentazione punto-parentesi.
+
+    Returns:
+        np.ndarray: Per ogni nucleotide l'indice del nucleotide appaiato, UNPAIRED se non appaiato.
+    """
+    pair_table = np.full(len(dotbracket), UNPAIRED, dtype=np.int32)
+    stack = deque()
+    for i, value in enumerate(dotbracket):
+        if value == "(":
+            stack.append(i)
+        elif value == ")":
+            if len(stack) == 0:
+                raise (ValueError("Closing bracket not matching"))
+            start = stack.pop()
+            pair_table[start] = i
+            pair_table[i] = start
+    return pair_table
+
+
+def sequence_length(incidence_dict: dict) -> int:
+    """
+    Restituisce il numero di nucleotidi rappresentati da un dizionario di incidenza.
+
+    Args:
+        incidence_dict (dict): Il dizionario di incidenza.
+
+    Returns:
+        int: Il numero di nucleotidi.
+    """
+    return (
+        max(
+            (
+                node_position(node)
+                for nodes in incidence_dict.values()
+                for node in nodes
+            ),
+            default=-1,
+        )
+        + 1
+    )
+
+
+def pair_table_from_incidence_dict(
+    incidence_dict: dict, length: int | None = None
+) -> np.ndarray:
+    """
+    Costruisce la tabella delle coppie a partire dagli iperarchi "db" di un dizionario di incidenza.
+
+    Args:
+        incidence_dict (dict): Il dizionario di incidenza.
+        length (int | None): Il numero di nucleotidi, se None viene dedotto dal dizionario.
+
+    Returns:
+        np.ndarray: Per ogni nucleotide l'indice del nucleotide appaiato, UNPAIRED se non appaiato.
+    """
+    if length is None:
+        length = sequence_length(incidence_dict)
+    pair_table = np.full(length, UNPAIRED, dtype=np.int32)
+    for key, nodes in incidence_dict.items():
+        if key[0:2] == "db":
+            i, j = node_position(nodes[0]), node_position(nodes[1])
+            pair_table[i] = j
+            pair_table[j] = i
+    return pair_table
+
+
+def dotbracket_from_pair_table(pair_table: np.ndarray) -> str:
+    """
+    Costruisce la rappresentazione punto-parentesi di una tabella delle coppie.
+
+    Args:
+        pair_table (np.ndarray): La tabella delle coppie.
+
+    Returns:
+        str: La rappresentazione punto-parentesi.
+    """
+    chars = np.full(len(pair_table), ".", dtype="<U1")
+    indexes = np.arange(len(pair_table))
+    chars[(pair_table > indexes)] = "("
+    chars[(pair_table != UNPAIRED) & (pair_table < indexes)] = ")"
+    return "".join(chars)
+
+
+def base_pair_distance(pair_table: np.ndarray, other: np.ndarray) -> int:
+    """
+    Restituisce la distanza tra due strutture, ovvero il numero di coppie presenti in una sola delle due.
+
+    Args:
+        pair_table (np.ndarray): La tabella delle coppie della prima struttura.
+        other (np.ndarray): La tabella delle coppie della seconda struttura.
+
+    Returns:
+        int: Il numero di coppie non condivise.
+    """
+    indexes = np.arange(len(pair_table))
+    different = pair_table != other
+    return int(
+        np.count_nonzero(different & (pair_table > indexes))
+        + np.count_nonzero(different & (other > indexes))
+    )
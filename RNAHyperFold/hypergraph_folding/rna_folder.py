@@ -1,33 +1,125 @@
-from ViennaRNA import RNA, fold
+from RNAHyperFold.hypergraph_folding.folding_conditions import FoldingConditions
+from RNAHyperFold.profiling.stage_profiler import profiled
 
 
 class RNAFolder:
-    """Classe di configurazione che permette di computare dei folding di sequenze di rna"""
+    """
+    Classe di configurazione che permette di computare dei folding di sequenze di rna.
+    I metodi di folding accettano la temperatura come argomento e non modificano l'istanza,
+    per cui lo stesso folder può essere usato da più thread contemporaneamente.
+    """
 
-    def __init__(self, sequence: str) -> None:
+    def __init__(
+        self, sequence: str, conditions: FoldingConditions | None = None
+    ) -> None:
         """
         Inizializza un'istanza della classe RNAFolder.
 
         Args:
             sequence (str): La sequenza di RNA da foldare.
+            conditions (FoldingConditions | None): Le condizioni del folding. Default sono quelle predefinite di ViennaRNA a 37°C.
         """
         self.sequence: str = sequence
+        self.conditions: FoldingConditions = (
+            conditions if conditions is not None else FoldingConditions()
+        )
 
-    def set_temperature(self, temperature: int) -> None:
+    def set_temperature(self, temperature: float) -> None:
         """
-        Imposta la temperatura per il calcolo del folding.
+        Imposta la temperatura per il calcolo del folding, mantenendo le altre condizioni.
+        Modifica l'istanza: con più thread passare la temperatura ai metodi di folding.
 
         Args:
-            temperature (int): La temperatura da impostare.
+            temperature (float): La temperatura da impostare, anche non intera.
         """
-        RNA.cvar.temperature = temperature
+        self.conditions = self.conditions.with_temperature(temperature)
 
-    def get_dot_bracket(self) -> str:
+    def set_conditions(self, conditions: FoldingConditions) -> None:
+        """
+        Imposta le condizioni per il calcolo del folding.
+
+        Args:
+            conditions (FoldingConditions): Le condizioni da impostare.
+        """
+        self.conditions = conditions
+
+    def conditions_at(self, temperature: float | None = None) -> FoldingConditions:
+        """
+        Restituisce le condizioni del folder a una certa temperatura, senza modificarlo.
+
+        Args:
+            temperature (float | None): La temperatura. Se None, quella del folder.
+
+        Returns:
+            FoldingConditions: Le condizioni.
+        """
+        if temperature is None:
+            return self.conditions
+        return self.conditions.with_temperature(temperature)
+
+    @profiled("rna_folder.fold")
+    def get_dot_bracket(self, temperature: float | None = None) -> str:
         """
         Restituisce la rappresentazione dot-bracket della sequenza di RNA.
 
+        Args:
+            temperature (float | None): La temperatura del folding. Se None, quella del folder.
+
         Returns:
             str: La rappresentazione dot-bracket della sequenza di RNA.
         """
-        dot_bracket, _ = fold(self.sequence)
+        fc = self.conditions_at(temperature).fold_compound(self.sequence)
+        dot_bracket, _ = fc.mfe()
         return dot_bracket
+
+    @profiled("rna_folder.subopt")
+    def get_suboptimal_structures(
+        self,
+        delta_energy: float,
+        max_structures: int | None = None,
+        temperature: float | None = None,
+    ) -> list[tuple[str, float]]:
+        """
+        Restituisce le strutture con energia entro delta_energy da quella minima.
+
+        Args:
+            delta_energy (float): L'ampiezza della banda di energia, in kcal/mol.
+            max_structures (int | None): Il numero massimo di strutture, le meno stabili vengono scartate.
+            temperature (float | None): La temperatura del folding. Se None, quella del folder.
+
+        Returns:
+            list[tuple[str, float]]: Le coppie (dot-bracket, energia), in ordine di energia crescente.
+        """
+        fc = self.conditions_at(temperature).fold_compound(
+            self.sequence, unique_multiloops=True
+        )
+        solutions = sorted(
+            (
+                (solution.structure, solution.energy)
+                for solution in fc.subopt(int(round(delta_energy * 100)))
+            ),
+            key=lambda solution: (solution[1], solution[0]),
+        )
+        return solutions[:max_structures]
+
+    @profiled("rna_folder.sample")
+    def sample_structures(
+        self, samples: int, temperature: float | None = None
+    ) -> list[str]:
+        """
+        Estrae delle strutture dall'ensemble di Boltzmann (backtracking stocastico).
+
+        Args:
+            samples (int): Il numero di strutture da estrarre.
+            temperature (float | None): La temperatura del folding. Se None, quella del folder.
+
+        Returns:
+            list[str]: Le strutture estratte in dot-bracket, con ripetizioni.
+        """
+        fc = self.conditions_at(temperature).fold_compound(
+            self.sequence, unique_multiloops=True, partition=True
+        )
+        _, mfe = fc.mfe()
+        fc.exp_params_rescale(mfe)
+        fc.pf()
+        return list(fc.pbacktrack(samples))
@@ -0,0 +1,282 @@
+from __future__ import annotations
+
+import hashlib
+import uuid
+from concurrent.futures import Executor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from RNAHyperFold.hypergraph_folding.edge_model import EdgeTable
+from RNAHyperFold.hypergraph_folding.pair_table import UNPAIRED
+from RNAHyperFold.hypergraph_folding.temperature_grid import (
+    Temperature,
+    normalize_temperature,
+)
+from RNAHyperFold.incidence_producers.temperature_incidence_producer import (
+    TemperatureIncidenceProducer,
+)
+from RNAHyperFold.profiling.stage_profiler import PROFILER, profiled
+
+# digest delle strutture già inviate al padre da questo processo worker, per lo sweep corrente
+_sent_sweep: str | None = None
+_sent_digests: set[bytes] = set()
+
+
+def _structure_digest(incidence_dict: dict) -> bytes:
+    """Restituisce un'impronta del contenuto di un dizionario di incidenza."""
+    return hashlib.blake2b(
+        repr([(edge, list(nodes)) for edge, nodes in incidence_dict.items()]).encode(),
+        digest_size=16,
+    ).digest()
+
+
+def _first_sent(sweep: str, incidence_dict: dict) -> tuple[bytes, dict | None]:
+    """
+    Restituisce l'impronta di una struttura e il suo dizionario di incidenza, oppure None al
+    posto del dizionario se il processo lo ha già inviato al padre nello stesso sweep.
+
+    Args:
+        sweep (str): L'identificativo dello sweep.
+        incidence_dict (dict): Il dizionario di incidenza computato dal worker.
+
+    Returns:
+        tuple[bytes, dict | None]: L'impronta della struttura e il dizionario di incidenza, se nuovo.
+    """
+    global _sent_sweep
+    digest = _structure_digest(incidence_dict)
+    if _sent_sweep != sweep:
+        _sent_sweep = sweep
+        _sent_digests.clear()
+    if digest in _sent_digests:
+        return digest, None
+    _sent_digests.add(digest)
+    return digest, incidence_dict
+
+
+def _fold_deduplicated(task: tuple) -> tuple[bytes, dict | None]:
+    """
+    Computa un folding nei processi worker restituendo il dizionario di incidenza solo la
+    prima volta che il processo incontra la struttura nello sweep.
+
+    Args:
+        task (tuple): Il produttore, la temperatura e l'identificativo dello sweep.
+
+    Returns:
+        tuple[bytes, dict | None]: L'impronta della struttura e il dizionario di incidenza, se nuovo.
+    """
+    producer, temperature, sweep = task
+    return _first_sent(
+        sweep, dict(producer.get_temperature_incidence_dict(temperature))
+    )
+
+
+class _StructureCollector:
+    """Ricostruisce nel padre i dizionari di incidenza a partire dalle impronte inviate dai worker."""
+
+    def __init__(self) -> None:
+        self.incidence_dicts: list[dict] = []
+        self.__structures: dict[bytes, int] = {}
+
+    def collect(self, row: int, digest: bytes, incidence_dict: dict | None) -> int:
+        """
+        Registra il risultato di una riga dello sweep.
+
+        Args:
+            row (int): L'indice della temperatura nello sweep.
+            digest (bytes): L'impronta della struttura.
+            incidence_dict (dict | None): Il dizionario di incidenza, None se già inviato.
+
+        Returns:
+            int: L'id della struttura distinta.
+        """
+        structure = self.__structures.get(digest)
+        if structure is not None:
+            PROFILER.count("shared_folding.reused_structures")
+            return structure
+        if incidence_dict is None:
+            raise RuntimeError(f"Struttura della riga {row} non ricevuta dal worker")
+        structure = len(self.incidence_dicts)
+        self.__structures[digest] = structure
+        self.incidence_dicts.append(incidence_dict)
+        return structure
+
+
+def fold_deduplicated(
+    executor: Executor,
+    producer: TemperatureIncidenceProducer,
+    temperatures: list[Temperature],
+    chunksize: int = 1,
+):
+    """
+    Computa i dizionari di incidenza di una lista di temperature su un executor di processi,
+    inviando le temperature ai worker a blocchi di chunksize. Ogni processo trasferisce una
+    struttura al padre una sola volta per sweep: per le temperature successive con la stessa
+    struttura viaggia solo un'impronta, e il padre restituisce lo stesso dizionario.
+
+    Args:
+        executor (Executor): Un executor di processi su cui distribuire i folding.
+        producer (TemperatureIncidenceProducer): Il produttore di incidenze della sequenza.
+        temperatures (list[Temperature]): Le temperature a cui computare i folding.
+        chunksize (int): Il numero di temperature inviate insieme a ogni worker. Default è 1.
+
+    Returns:
+        Un iteratore sui dizionari di incidenza, nello stesso ordine delle temperature.
+    """
+    sweep = uuid.uuid4().hex
+    collector = _StructureCollector()
+    tasks = [(producer, temperature, sweep) for temperature in temperatures]
+    for row, (digest, incidence_dict) in enumerate(
+        executor.map(_fold_deduplicated, tasks, chunksize=chunksize)
+    ):
+        yield collector.incidence_dicts[collector.collect(row, digest, incidence_dict)]
+
+
+def _fold_shared(task: tuple) -> tuple[int, bytes, dict | None]:
+    """
+    Computa un folding nei processi worker e ne scrive la tabella delle coppie e le etichette
+    degli elementi nella riga indicata delle matrici condivise. Il dizionario di incidenza
+    viene restituito solo la prima volta che il processo incontra la struttura nello sweep:
+    il padre lo ha già ricevuto con una riga precedente.
+
+    Args:
+        task (tuple): Il produttore, la temperatura, la riga, i nomi dei blocchi di memoria condivisa e la forma delle matrici.
+
+    Returns:
+        tuple[int, bytes, dict | None]: La riga, l'impronta della struttura e il dizionario di incidenza, se nuovo.
+    """
+    producer, temperature, row, names, shape = task
+    incidence_dict = dict(producer.get_temperature_incidence_dict(temperature))
+    table = EdgeTable.from_incidence_dict(incidence_dict)
+    labels = table.node_index.element_labels
+    blocks = [shared_memory.SharedMemory(name=name) for name in names]
+    try:
+        pair_tables, element_labels = (
+            np.ndarray(shape, dtype=np.int32, buffer=block.buf) for block in blocks
+        )
+        pair_tables[row] = table.pair_table(shape[1])
+        element_labels[row, : len(labels)] = labels
+        element_labels[row, len(labels) :] = -1
+        # le viste vanno rilasciate prima di chiudere i blocchi
+        del pair_tables, element_labels
+    finally:
+        for block in blocks:
+            block.close()
+    return (row, *_first_sent(names[0], incidence_dict))
+
+
+class SharedFoldSweep:
+    """
+    Sweep di folding i cui risultati vengono trasferiti dai processi worker tramite memoria
+    condivisa: le tabelle delle coppie e le etichette degli elementi di tutte le temperature
+    sono scritte in due matrici T×n preallocate, che il padre legge come viste NumPy senza
+    copie né deserializzazione. Dei dizionari di incidenza viaggia solo un'impronta, tranne
+    la prima volta che una struttura viene incontrata, per cui il padre ricostruisce ogni
+    struttura distinta una sola volta. Serve a chi usa direttamente le matrici, come
+    StructureDistanceMatrix; se bastano i dizionari di incidenza, fold_deduplicated evita
+    l'allocazione della memoria condivisa.
+    """
+
+    def __init__(
+        self,
+        producer: TemperatureIncidenceProducer,
+        temperatures: list[Temperature],
+        length: int | None = None,
+    ) -> None:
+        """
+        Inizializza un'istanza della classe SharedFoldSweep e alloca la memoria condivisa.
+
+        Args:
+            producer (TemperatureIncidenceProducer): Il produttore di incidenze della sequenza.
+            temperatures (list[Temperature]): Le temperature dello sweep.
+            length (int | None): Il numero di nucleotidi. Default è la lunghezza della sequenza del produttore.
+        """
+        self.__producer: TemperatureIncidenceProducer = producer
+        self.temperatures: list[Temperature] = [
+            normalize_temperature(temperature) for temperature in temperatures
+        ]
+        if length is None:
+            length = len(producer.sequence)
+        shape = (len(self.temperatures), length)
+        size = max(1, shape[0] * shape[1] * np.dtype(np.int32).itemsize)
+        self.__blocks: list[shared_memory.SharedMemory] = []
+        try:
+            for _ in range(2):
+                self.__blocks.append(shared_memory.SharedMemory(create=True, size=size))
+        except Exception:
+            self.close()
+            raise
+        self.pair_tables: np.ndarray = np.ndarray(
+            shape, dtype=np.int32, buffer=self.__blocks[0].buf
+        )
+        """La tabella delle coppie di ogni temperatura, una riga per temperatura."""
+        self.element_labels: np.ndarray = np.ndarray(
+            shape, dtype=np.int32, buffer=self.__blocks[1].buf
+        )
+        """Per ogni temperatura e nucleotide l'id della struttura secondaria, -1 se nessuna."""
+        self.pair_tables.fill(UNPAIRED)
+        self.element_labels.fill(-1)
+        self.structure_ids: np.ndarray = np.full(shape[0], -1, dtype=np.int32)
+        """L'id della struttura distinta di ogni temperatura, -1 se non ancora computata."""
+        self.__collector: _StructureCollector = _StructureCollector()
+
+    @property
+    def shape(self) -> tuple[int, int]:
+        """Il numero di temperature e di nucleotidi."""
+        return self.pair_tables.shape
+
+    @profiled("shared_folding.run")
+    def run(self, executor: Executor, chunksize: int = 1) -> None:
+        """
+        Computa i folding dello sweep sull'executor indicato.
+
+        Args:
+            executor (Executor): Un executor di processi su cui distribuire i folding.
+            chunksize (int): Il numero di temperature inviate insieme a ogni worker. Default è 1.
+        """
+        names = tuple(block.name for block in self.__blocks)
+        tasks = [
+            (self.__producer, temperature, row, names, self.shape)
+            for row, temperature in enumerate(self.temperatures)
+        ]
+        for row, digest, incidence_dict in executor.map(
+            _fold_shared, tasks, chunksize=chunksize
+        ):
+            self.structure_ids[row] = self.__collector.collect(
+                row, digest, incidence_dict
+            )
+
+    @property
+    def incidence_dicts(self) -> list[dict]:
+        """Il dizionario di incidenza di ogni struttura distinta."""
+        return self.__collector.incidence_dicts
+
+    def incidence_dict(self, row: int) -> dict:
+        """
+        Restituisce il dizionario di incidenza del folding di una riga dello sweep.
+
+        Args:
+            row (int): L'indice della temperatura in temperatures.
+
+        Returns:
+            dict: Il dizionario di incidenza, condiviso tra le righe con la stessa struttura.
+        """
+        return self.incidence_dicts[self.structure_ids[row]]
+
+    def close(self) -> None:
+        """
+        Rilascia e distrugge la memoria condivisa. Le matrici pair_tables ed element_labels
+        non sono più utilizzabili: vanno copiate prima se servono oltre lo sweep.
+        """
+        self.pair_tables = None
+        self.element_labels = None
+        for block in self.__blocks:
+            block.close()
+            block.unlink()
+        self.__blocks = []
+
+    def __enter__(self) -> "SharedFoldSweep":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
@@ -0,0 +1,69 @@
+import math
+
+Temperature = int | float
+"""Una temperatura in gradi Celsius, intera o con decimali."""
+
+TEMPERATURE_DIGITS = 6
+"""Le cifre decimali con cui le temperature vengono rappresentate (virgola fissa)."""
+
+
+def normalize_temperature(temperature: Temperature) -> Temperature:
+    """
+    Riporta una temperatura alla sua rappresentazione in virgola fissa, così che temperature
+    ottenute con calcoli diversi (ad esempio 20.1 e 20.0 + 0.1) abbiano la stessa chiave.
+    Le temperature intere restano di tipo int.
+
+    Args:
+        temperature (Temperature): La temperatura.
+
+    Returns:
+        Temperature: La temperatura arrotondata a TEMPERATURE_DIGITS cifre decimali.
+    """
+    if isinstance(temperature, int):
+        return temperature
+    rounded = round(float(temperature), TEMPERATURE_DIGITS)
+    if rounded.is_integer():
+        return int(rounded)
+    return rounded
+
+
+def temperature_range(
+    start_temperature: Temperature,
+    end_temperature: Temperature,
+    step: Temperature = 1,
+) -> list[Temperature]:
+    """
+    Restituisce le temperature di un intervallo, estremi inclusi, anche con passi non interi.
+    Con estremi e passo interi equivale a range(start_temperature, end_temperature + 1, step).
+
+    Args:
+        start_temperature (Temperature): La temperatura iniziale dell'intervallo.
+        end_temperature (Temperature): La temperatura finale dell'intervallo.
+        step (Temperature, opzionale): Il passo tra le temperature. Default è 1.
+
+    Returns:
+        list[Temperature]: Le temperature in virgola fissa.
+    """
+    if step <= 0:
+        raise ValueError("Il passo deve essere positivo")
+    if all(isinstance(t, int) for t in (start_temperature, end_temperature, step)):
+        return list(range(start_temperature, end_temperature + 1, step))
+    tolerance = 10**-TEMPERATURE_DIGITS
+    count = math.floor((end_temperature - start_temperature) / step + tolerance) + 1
+    return [normalize_temperature(start_temperature + i * step) for i in range(count)]
+
+
+def consecutive_pairs(
+    temperatures: list[Temperature],
+) -> list[tuple[Temperature, Temperature]]:
+    """
+    Restituisce le coppie di temperature consecutive di una griglia, per confrontare ogni
+    temperatura con quella campionata successiva invece che con temperatura + 1.
+
+    Args:
+        temperatures (list[Temperature]): Le temperature della griglia, in ordine crescente.
+
+    Returns:
+        list[tuple[Temperature, Temperature]]: Le coppie (temperatura, temperatura successiva).
+    """
+    return list(zip(temperatures, temperatures[1:]))
@@ -1,12 +1,49 @@
-import re
+from __future__ import annotations
+
+import bisect
+import math
+import os
 from abc import ABC, abstractmethod
+from concurrent.futures import Executor, ThreadPoolExecutor
 from concurrent.futures.process import ProcessPoolExecutor
-
-import hypernetx as hnx
-
+from contextlib import nullcontext
+from functools import partial
+
+from RNAHyperFold.hypergraph_folding.edge_model import EdgeTable, edge_table
+from RNAHyperFold.hypergraph_folding.fold_scheduler import FoldScheduler
+from RNAHyperFold.hypergraph_folding.shared_folding import fold_deduplicated
+from RNAHyperFold.hypergraph_folding.temperature_grid import (
+    Temperature,
+    normalize_temperature,
+    temperature_range,
+)
 from RNAHyperFold.incidence_producers.temperature_incidence_producer import (
     TemperatureIncidenceProducer,
 )
+from RNAHyperFold.lazy_modules import lazy_module
+from RNAHyperFold.profiling.stage_profiler import (
+    PROFILER,
+    collect_profiled_results,
+    profiled,
+    profiled_call,
+)
+
+hnx = lazy_module("hypernetx")
+
+
+def _indexed(HG: hnx.Hypergraph) -> hnx.Hypergraph:
+    """
+    Precalcola la tabella degli iperarchi e l'indice inverso nucleotide → iperarchi di un folding memorizzato.
+
+    Args:
+        HG (hnx.Hypergraph): L'ipergrafo del folding.
+
+    Returns:
+        hnx.Hypergraph: Lo stesso ipergrafo.
+    """
+    with PROFILER.stage("edge_model.index"):
+        edge_table(HG).node_index
+    return HG
 
 
 class TemporalHypergraph(ABC):
@@ -49,6 +86,21 @@ class TemporalHypergraph(ABC):
         """
         pass
 
+    def get_edge_table(self, time: int) -> EdgeTable | None:
+        """
+        Restituisce la tabella degli iperarchi, con l'indice inverso nucleotide → iperarchi, per un dato tempo.
+
+        Args:
+            time (int): Il tempo per cui ottenere la tabella.
+
+        Returns:
+            EdgeTable | None: La tabella degli iperarchi del folding, None se non esiste.
+        """
+        HG = self.get_time_hypergraph(time)
+        if HG is None:
+            return None
+        return edge_table(HG)
+
 
 class BasicTemporalHypergraph(TemporalHypergraph):
     """Ipergrafo dinamico standard"""
@@ -59,13 +111,14 @@ class BasicTemporalHypergraph(TemporalHypergraph):
     def add_incidence_dict(self, incidence_dict: dict, time: int) -> None:
         if incidence_dict is None or time is None:
             return
-        self.__temporal_hypergraph[time] = hnx.Hypergraph(incidence_dict)
+        with PROFILER.stage("hnx.hypergraph"):
+            self.__temporal_hypergraph[time] = _indexed(hnx.Hypergraph(incidence_dict))
 
     def get_time_hypergraph(self, time: int) -> hnx.Hypergraph | None:
-        return self.__temporal_hypergraph[time]
+        return self.__temporal_hypergraph.get(time)
 
     def time_hypergraph_exists(self, time: int) -> bool:
-        return time not in self.__temporal_hypergraph.keys()
+        return time in self.__temporal_hypergraph
 
 
 class MemoryOptimizedFoldingHypergraph(TemporalHypergraph):
@@ -75,18 +128,52 @@ class MemoryOptimizedFoldingHypergraph(TemporalHypergraph):
         self.__temporal_hypergraph: dict = {}
 
     def add_incidence_dict(self, incidence_dict: dict, time: int) -> None:
-        found: bool = False
-        for temps, HG in self.__temporal_hypergraph.items():
-            if incidence_dict == HG.incidence_dict:
-                new_temps: int = (min(temps[0], time), max(temps[1], time))
-                self.__temporal_hypergraph[new_temps] = self.__temporal_hypergraph[
-                    temps
-                ]
-                del self.__temporal_hypergraph[temps]
-                found = True
+        # gli intervalli restano disgiunti: un folding che si ripresenta dopo un altro ha un
+        # nuovo intervallo, che condivide l'ipergrafo con i precedenti
+        HG = None
+        for stored in self.__temporal_hypergraph.values():
+            if incidence_dict == stored.incidence_dict:
+                HG = stored
                 break
-        if not found:
-            self.__temporal_hypergraph[(time, time)] = hnx.Hypergraph(incidence_dict)
+        current = self.__interval(time)
+        if current is not None:
+            if self.__temporal_hypergraph[current] is HG:
+                return
+            # il folding cambia all'interno di un intervallo: lo si divide
+            start, end = current
+            previous = self.__temporal_hypergraph.pop(current)
+            if start < time:
+                self.__temporal_hypergraph[(start, math.nextafter(time, -math.inf))] = (
+                    previous
+                )
+            if end > time:
+                self.__temporal_hypergraph[(math.nextafter(time, math.inf), end)] = (
+                    previous
+                )
+        if HG is None:
+            with PROFILER.stage("hnx.hypergraph"):
+                HG = _indexed(hnx.Hypergraph(incidence_dict))
+        for temps, stored in list(self.__temporal_hypergraph.items()):
+            new_temps = (min(temps[0], time), max(temps[1], time))
+            if stored is HG and not self.__overlaps(new_temps, temps):
+                del self.__temporal_hypergraph[temps]
+                self.__temporal_hypergraph[new_temps] = HG
+                return
+        self.__temporal_hypergraph[(time, time)] = HG
+
+    def __interval(self, time) -> tuple | None:
+        """Restituisce l'intervallo che contiene time, None se nessuno."""
+        for temps in self.__temporal_hypergraph:
+            if temps[0] <= time <= temps[1]:
+                return temps
+        return None
+
+    def __overlaps(self, temps: tuple, excluded: tuple) -> bool:
+        """Indica se un intervallo interseca un intervallo memorizzato diverso da excluded."""
+        return any(
+            other != excluded and other[0] <= temps[1] and temps[0] <= other[1]
+            for other in self.__temporal_hypergraph
+        )
 
     def get_time_hypergraph(self, time: int) -> hnx.Hypergraph | None:
         for temps, HG in self.__temporal_hypergraph.items():
@@ -97,37 +184,99 @@ class MemoryOptimizedFoldingHypergraph(TemporalHypergraph):
     def time_hypergraph_exists(self, time: int) -> bool:
         return self.get_time_hypergraph(time) is not None
 
+    def get_intervals(self) -> list[tuple[tuple[int, int], hnx.Hypergraph]]:
+        """
+        Restituisce gli intervalli di tempi memorizzati, disgiunti, ognuno con il suo folding. Un
+        folding che si ripresenta dopo un altro compare in più intervalli con lo stesso ipergrafo.
+
+        Returns:
+            list[tuple[tuple[int, int], hnx.Hypergraph]]: Le coppie (intervallo, ipergrafo), nell'ordine in cui vengono cercate.
+        """
+        return list(self.__temporal_hypergraph.items())
+
 
 class SearchOptimizedFoldingHypergraph(TemporalHypergraph):
-    """Ipergrafo dinamico ottimizzato per la velocità di ricerca, progettato per gestire i diversi folding dell'RNA."""
+    """
+    Ipergrafo dinamico ottimizzato per la velocità di ricerca, progettato per gestire i diversi folding dell'RNA.
+    I folding sono memorizzati per intervalli di tempi disgiunti e ordinati, cercati per bisezione:
+    la memoria occupata dipende dal numero di strutture distinte e di cambiamenti di struttura,
+    non dalla risoluzione della griglia di tempi (anche non intera).
+    """
 
     def __init__(self):
-        self.__temporal_hypergraph: dict = {}
-        self.__time_to_set: dict = {}
+        # inizi degli intervalli, in ordine crescente, e intervalli [inizio, fine, ipergrafo]
+        self.__starts: list = []
+        self.__runs: list[list] = []
+        # un solo ipergrafo per ogni folding distinto
+        self.__hypergraphs: dict[frozenset, hnx.Hypergraph] = {}
+
+    def __hypergraph(self, incidence_dict: dict) -> hnx.Hypergraph:
+        """Restituisce l'ipergrafo di un folding, creandolo solo se il folding non è già memorizzato."""
+        key = frozenset((edge, tuple(nodes)) for edge, nodes in incidence_dict.items())
+        HG = self.__hypergraphs.get(key)
+        if HG is None:
+            with PROFILER.stage("hnx.hypergraph"):
+                HG = _indexed(hnx.Hypergraph(incidence_dict))
+            self.__hypergraphs[key] = HG
+        return HG
+
+    def __find(self, time) -> int:
+        """Restituisce l'indice dell'ultimo intervallo che inizia prima di time, -1 se nessuno."""
+        return bisect.bisect_right(self.__starts, time) - 1
+
+    def __insert_run(self, index: int, start, end, HG: hnx.Hypergraph) -> None:
+        self.__starts.insert(index, start)
+        self.__runs.insert(index, [start, end, HG])
 
     def add_incidence_dict(self, incidence_dict: dict, time: int) -> None:
-        found: bool = False
-        for temps, HG in self.__temporal_hypergraph.items():
-            if incidence_dict == HG.incidence_dict:
-                new_temps: int = (min(temps[0], time), max(temps[1], time))
-                self.__temporal_hypergraph[new_temps] = self.__temporal_hypergraph[
-                    temps
-                ]
-                del self.__temporal_hypergraph[temps]
-                for t in range(new_temps[0], new_temps[1] + 1):
-                    self.__time_to_set[t] = new_temps
-                found = True
-                break
-        if not found:
-            new_temp = (time, time)
-            self.__temporal_hypergraph[new_temp] = hnx.Hypergraph(incidence_dict)
-            self.__time_to_set[time] = new_temp
+        HG = self.__hypergraph(incidence_dict)
+        index = self.__find(time)
+        if index >= 0 and time <= self.__runs[index][1]:
+            start, end, current = self.__runs[index]
+            if current is HG:
+                return
+            # il folding cambia all'interno di un intervallo: lo si divide in tre
+            del self.__starts[index]
+            del self.__runs[index]
+            if end > time:
+                self.__insert_run(index, math.nextafter(time, math.inf), end, current)
+            self.__insert_run(index, time, time, HG)
+            if start < time:
+                self.__insert_run(
+                    index, start, math.nextafter(time, -math.inf), current
+                )
+            return
+        previous = self.__runs[index] if index >= 0 else None
+        following = self.__runs[index + 1] if index + 1 < len(self.__runs) else None
+        if previous is not None and previous[2] is HG:
+            previous[1] = time
+            if following is not None and following[2] is HG:
+                previous[1] = following[1]
+                del self.__starts[index + 1]
+                del self.__runs[index + 1]
+        elif following is not None and following[2] is HG:
+            following[0] = time
+            self.__starts[index + 1] = time
+        else:
+            self.__insert_run(index + 1, time, time, HG)
 
     def get_time_hypergraph(self, time) -> hnx.Hypergraph | None:
-        return self.__temporal_hypergraph[self.__time_to_set[time]]
+        index = self.__find(time)
+        if index < 0 or time > self.__runs[index][1]:
+            return None
+        return self.__runs[index][2]
 
     def time_hypergraph_exists(self, time: int) -> bool:
-        return time in self.__time_to_set.keys()
+        return self.get_time_hypergraph(time) is not None
+
+    def get_intervals(self) -> list[tuple[tuple[int, int], hnx.Hypergraph]]:
+        """
+        Restituisce gli intervalli di tempi memorizzati, ognuno con il suo folding.
+
+        Returns:
+            list[tuple[tuple[int, int], hnx.Hypergraph]]: Le coppie (intervallo, ipergrafo), in ordine di tempo.
+        """
+        return [((start, end), HG) for start, end, HG in self.__runs]
 
 
 class SingleFoldingHypergraph(TemporalHypergraph):
@@ -136,11 +285,17 @@ class SingleFoldingHypergraph(TemporalHypergraph):
     def __init__(self):
         self.__temporal_hypergraph: dict = None
         self.__analyzed_temperatures: set = set()
+        # indice numerico più alto tra i nomi degli iperarchi, usato per nominare i nuovi iperarchi
+        self.__last_edge: int = 0
 
     def add_incidence_dict(self, incidence_dict: dict, time: int) -> None:
         self.__analyzed_temperatures.add(time)
         if not self.__temporal_hypergraph:
-            self.__temporal_hypergraph = hnx.Hypergraph(incidence_dict)
+            with PROFILER.stage("hnx.hypergraph"):
+                self.__temporal_hypergraph = hnx.Hypergraph(incidence_dict)
+            self.__last_edge = int(
+                EdgeTable.from_incidence_dict(incidence_dict).indexes.max(initial=0)
+            )
             for h_arc in incidence_dict.keys():
                 self.__temporal_hypergraph.properties["properties"][0][h_arc] = {
                     "temperatures": set()
@@ -172,16 +327,12 @@ class SingleFoldingHypergraph(TemporalHypergraph):
     def __add_edge(
         self, HG: hnx.Hypergraph, name_begins: str, edge: list, temperature: int
     ) -> hnx.Hypergraph:
-        last_edge = max(
-            (
-                int(match)
-                for string in HG.incidence_dict.keys()
-                for match in re.findall(r"\d+", string)
-            )
-        )
+        self.__last_edge += 1
+        last_edge = self.__last_edge
         new_incidence_dict = HG.incidence_dict.copy()
         new_incidence_dict[f"{name_begins}_{last_edge}"] = edge
-        HG = hnx.Hypergraph(new_incidence_dict)
+        with PROFILER.stage("hnx.hypergraph"):
+            HG = hnx.Hypergraph(new_incidence_dict)
         HG.properties["properties"][0][f"{name_begins}_{last_edge}"] = {
             "temperatures": {temperature}
         }
@@ -213,6 +364,10 @@ class TemperatureFoldingHypergraph:
         self,
         producer: TemperatureIncidenceProducer,
         temporal_hypergraph: TemporalHypergraph,
+        max_workers: int | None = None,
+        scheduler: FoldScheduler | None = None,
+        deduplicate: bool = False,
+        threads: bool = False,
     ) -> None:
         """
         Inizializza un'istanza della classe TemperatureFoldingHypergraph.
@@ -220,70 +375,281 @@ class TemperatureFoldingHypergraph:
         Args:
             producer (TemperatureIncidenceProducer): Il produttore di incidenze per le temperature.
             temporal_hypergraph (TemporalHypergraph): L'ipergrafo temporale da utilizzare.
+            max_workers (int | None): Il numero massimo di processi usati per i folding. Default è il numero di CPU.
+            scheduler (FoldScheduler | None): Lo scheduler con cui condividere i folding con altre istanze
+                (ad esempio fold_scheduler.SCHEDULER). Se indicato, i folding vengono eseguiti sul suo
+                executor e max_workers viene ignorato.
+            deduplicate (bool): Se True, le temperature vengono inviate ai processi worker a blocchi e
+                ogni struttura distinta viene trasferita al padre una sola volta per processo (vedi
+                fold_deduplicated). Non viene usato con lo scheduler.
+            threads (bool): Se True, i folding vengono eseguiti da un pool di thread invece che di processi,
+                senza avviare processi né serializzare i risultati. Richiede un produttore rientrante,
+                come ViennaIncidenceProducer; ha la precedenza su deduplicate.
         """
         self.__producer: TemperatureIncidenceProducer = producer
         self.temperature_HG: TemporalHypergraph = temporal_hypergraph
         self.__analyzed_temperatures: set = set()
+        self.__max_workers: int | None = max_workers
+        self.__scheduler: FoldScheduler | None = scheduler
+        self.__deduplicate: bool = deduplicate
+        self.__threads: bool = threads
+
+    @property
+    def producer(self) -> TemperatureIncidenceProducer:
+        """Il produttore di incidenze usato per computare i folding."""
+        return self.__producer
+
+    def is_analyzed(self, temperature: Temperature) -> bool:
+        """
+        Verifica se il folding a una certa temperatura è già stato computato.
+
+        Args:
+            temperature (Temperature): La temperatura da verificare.
+
+        Returns:
+            bool: True se il folding è già stato computato.
+        """
+        return normalize_temperature(temperature) in self.__analyzed_temperatures
 
-    def insert_temperature(self, temperature: int) -> bool:
+    def analyzed_temperatures(self) -> list[Temperature]:
+        """
+        Restituisce le temperature a cui è stato computato il folding.
+
+        Returns:
+            list[Temperature]: Le temperature, in ordine crescente.
+        """
+        return sorted(self.__analyzed_temperatures)
+
+    def add_folding(self, temperature: Temperature, incidence_dict: dict) -> bool:
+        """
+        Memorizza un folding computato altrove, ad esempio in un pool condiviso tra più sequenze.
+
+        Args:
+            temperature (Temperature): La temperatura del folding.
+            incidence_dict (dict): Il dizionario di incidenza del folding.
+
+        Returns:
+            bool: True se il folding è stato memorizzato, False se era già presente.
+        """
+        temperature = normalize_temperature(temperature)
+        if temperature in self.__analyzed_temperatures:
+            PROFILER.count("temperature_hypergraph.cache_hits")
+            return False
+        self.__analyzed_temperatures.add(temperature)
+        with PROFILER.stage("temperature_hypergraph.store"):
+            self.temperature_HG.add_incidence_dict(incidence_dict, temperature)
+        return True
+
+    @profiled("temperature_hypergraph.insert_temperature")
+    def insert_temperature(self, temperature: Temperature) -> bool:
         """
         Computa il folding a una certa temperatura.
 
         Args:
-            temperature (int): La temperatura a cui computare il folding.
+            temperature (Temperature): La temperatura a cui computare il folding.
 
         Returns:
             bool: True se il folding è stato computato, False se il folding era già stato computato precedentemente.
         """
+        temperature = normalize_temperature(temperature)
         if temperature in self.__analyzed_temperatures:
+            PROFILER.count("temperature_hypergraph.cache_hits")
             return False
         self.__analyzed_temperatures.add(temperature)
-        incidence_dict = self.__producer.get_temperature_incidence_dict(temperature)
+        if self.__scheduler is not None:
+            incidence_dict = self.__scheduler.submit(
+                self.__producer, temperature
+            ).result()
+        else:
+            incidence_dict = self.__producer.get_temperature_incidence_dict(temperature)
         self.temperature_HG.add_incidence_dict(incidence_dict, temperature)
         return True
 
-    def insert_temperatures(self, temperatures: list[int]) -> None:
+    @profiled("temperature_hypergraph.insert_temperatures")
+    def insert_temperatures(self, temperatures: list[Temperature]) -> None:
         """
         Computa i folding per una lista di temperature.
 
         Args:
-            temperatures (list[int]): La lista delle temperature a cui computare i folding.
+            temperatures (list[Temperature]): La lista delle temperature a cui computare i folding.
         """
-        for temp in temperatures.copy():
+        requested = [normalize_temperature(temp) for temp in temperatures]
+        temperatures = []
+        for temp in requested:
             if temp in self.__analyzed_temperatures:
-                temperatures.remove(temp)
+                PROFILER.count("temperature_hypergraph.cache_hits")
             else:
                 self.__analyzed_temperatures.add(temp)
-        with ProcessPoolExecutor() as executor:
-            for i, incidence in enumerate(
-                executor.map(
-                    self.__producer.get_temperature_incidence_dict, temperatures
-                )
-            ):
-                self.temperature_HG.add_incidence_dict(incidence, temperatures[i])
+                temperatures.append(temp)
+        with self.__executor() as executor:
+            for i, incidence in enumerate(self.__fold(executor, temperatures)):
+                with PROFILER.stage("temperature_hypergraph.store"):
+                    self.temperature_HG.add_incidence_dict(incidence, temperatures[i])
+
+    def __executor(self):
+        """
+        Restituisce il contesto dell'executor per i folding: un nuovo pool di processi o di thread,
+        oppure nessuno se i folding sono delegati allo scheduler.
+        """
+        if self.__scheduler is not None:
+            return nullcontext()
+        if self.__threads:
+            return ThreadPoolExecutor(max_workers=self.__max_workers)
+        return ProcessPoolExecutor(max_workers=self.__max_workers)
+
+    def __fold(self, executor: Executor | None, temperatures: list[Temperature]):
+        """
+        Computa in parallelo i dizionari di incidenza per una lista di temperature.
+
+        Args:
+            executor (Executor | None): L'executor su cui distribuire i folding, None se si usa lo scheduler.
+            temperatures (list[Temperature]): Le temperature a cui computare i folding.
+
+        Returns:
+            Un iteratore sui dizionari di incidenza, nello stesso ordine delle temperature.
+        """
+        if self.__scheduler is not None:
+            return self.__scheduler.fold_many(self.__producer, temperatures)
+        if self.__deduplicate and not self.__threads:
+            workers = self.__max_workers or os.cpu_count() or 1
+            return fold_deduplicated(
+                executor,
+                self.__producer,
+                temperatures,
+                chunksize=max(1, len(temperatures) // (4 * workers)),
+            )
+        # i thread registrano le misurazioni direttamente nel profiler condiviso
+        if not PROFILER.enabled or self.__threads:
+            return executor.map(
+                self.__producer.get_temperature_incidence_dict, temperatures
+            )
+        # nei worker il profiler viene abilitato e le misurazioni tornano al padre
+        return collect_profiled_results(
+            executor.map(
+                partial(profiled_call, self.__producer.get_temperature_incidence_dict),
+                temperatures,
+            )
+        )
+
+    @profiled("temperature_hypergraph.insert_temperature_range_adaptive")
+    def insert_temperature_range_adaptive(
+        self,
+        start_temperature: Temperature,
+        end_temperature: Temperature,
+        step: Temperature = 1,
+    ) -> list[Temperature]:
+        """
+        Computa i folding per un intervallo di temperature bisezionando solo i sotto-intervalli
+        i cui estremi hanno folding diversi. Si assume che il folding non cambi tra due
+        temperature che producono lo stesso folding: le temperature interne a questi
+        sotto-intervalli non vengono computate né memorizzate, e i loro folding presunti si
+        ottengono con get_interpolated_hypergraph.
+
+        Args:
+            start_temperature (Temperature): La temperatura iniziale dell'intervallo.
+            end_temperature (Temperature): La temperatura finale dell'intervallo.
+            step (Temperature, opzionale): La risoluzione della ricerca, anche non intera. Default è 1.
+
+        Returns:
+            list[Temperature]: I punti di cambiamento, ovvero le temperature il cui folding è diverso da quello della temperatura precedente.
+        """
+        grid = temperature_range(start_temperature, end_temperature, step)
+        if len(grid) == 0:
+            return []
+        folds: dict = {}
+        pending = sorted({0, len(grid) - 1})
+        intervals = [(0, len(grid) - 1)]
+        with self.__executor() as executor:
+            while len(pending) > 0:
+                temperatures = [grid[i] for i in pending]
+                for i, incidence in zip(pending, self.__fold(executor, temperatures)):
+                    folds[i] = dict(incidence)
+                pending = []
+                next_intervals = []
+                for low, high in intervals:
+                    if high - low <= 1 or folds[low] == folds[high]:
+                        continue
+                    middle = (low + high) // 2
+                    pending.append(middle)
+                    next_intervals.extend([(low, middle), (middle, high)])
+                intervals = next_intervals
+
+        change_points = []
+        current = None
+        for i in sorted(folds):
+            temperature = grid[i]
+            if current is not None and folds[i] != current:
+                change_points.append(temperature)
+            current = folds[i]
+            if temperature in self.__analyzed_temperatures:
+                PROFILER.count("temperature_hypergraph.cache_hits")
+                continue
+            self.__analyzed_temperatures.add(temperature)
+            with PROFILER.stage("temperature_hypergraph.store"):
+                self.temperature_HG.add_incidence_dict(current, temperature)
+        return change_points
 
     def insert_temperature_range(
-        self, start_temperature: int, end_temperature: int, step: int = 1
+        self,
+        start_temperature: Temperature,
+        end_temperature: Temperature,
+        step: Temperature = 1,
     ) -> None:
         """
         Computa i folding per un intervallo di temperature.
 
         Args:
-            start_temperature (int): La temperatura iniziale dell'intervallo.
-            end_temperature (int): La temperatura finale dell'intervallo.
-            step (int, opzionale): Il passo tra le temperature nell'intervallo. Default è 1.
+            start_temperature (Temperature): La temperatura iniziale dell'intervallo.
+            end_temperature (Temperature): La temperatura finale dell'intervallo.
+            step (Temperature, opzionale): Il passo tra le temperature nell'intervallo, anche non intero. Default è 1.
         """
-        temperatures = list(range(start_temperature, end_temperature + 1, step))
-        self.insert_temperatures(temperatures)
+        self.insert_temperatures(
+            temperature_range(start_temperature, end_temperature, step)
+        )
 
-    def get_hypergraph(self, temperature: int) -> hnx.Hypergraph:
+    def get_hypergraph(self, temperature: Temperature) -> hnx.Hypergraph:
         """
         Restituisce l'ipergrafo per una certa temperatura.
 
         Args:
-            temperature (int): La temperatura per cui ottenere l'ipergrafo.
+            temperature (Temperature): La temperatura per cui ottenere l'ipergrafo.
 
         Returns:
             hnx.Hypergraph: L'ipergrafo associato alla temperatura specificata.
         """
-        return self.temperature_HG.get_time_hypergraph(temperature)
+        return self.temperature_HG.get_time_hypergraph(
+            normalize_temperature(temperature)
+        )
+
+    def get_interpolated_hypergraph(self, temperature: Temperature) -> hnx.Hypergraph:
+        """
+        Restituisce l'ipergrafo della temperatura analizzata più vicina non superiore a quella
+        indicata. Per le temperature della griglia di insert_temperature_range_adaptive è il
+        folding presunto dalla bisezione; la temperatura non viene segnata come analizzata.
+
+        Args:
+            temperature (Temperature): La temperatura per cui ottenere l'ipergrafo.
+
+        Returns:
+            hnx.Hypergraph: L'ipergrafo della temperatura analizzata più vicina.
+        """
+        temperature = normalize_temperature(temperature)
+        temperatures = self.analyzed_temperatures()
+        index = bisect.bisect_right(temperatures, temperature)
+        if index == 0:
+            raise ValueError(
+                f"Nessuna temperatura analizzata non superiore a {temperature}"
+            )
+        return self.get_hypergraph(temperatures[index - 1])
+
+    def get_edge_table(self, temperature: Temperature) -> EdgeTable | None:
+        """
+        Restituisce la tabella degli iperarchi, con l'indice inverso nucleotide → iperarchi, per una certa temperatura.
+
+        Args:
+            temperature (Temperature): La temperatura per cui ottenere la tabella.
+
+        Returns:
+            EdgeTable | None: La tabella degli iperarchi del folding.
+        """
+        return self.temperature_HG.get_edge_table(normalize_temperature(temperature))
@@ -0,0 +1,546 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import socket
+import sqlite3
+import sys
+import time
+import uuid
+
+from RNAHyperFold.hypergraph_folding.folding_conditions import FoldingConditions
+from RNAHyperFold.hypergraph_folding.rna_folder import RNAFolder
+from RNAHyperFold.hypergraph_folding.temperature_grid import (
+    Temperature,
+    temperature_range,
+)
+from RNAHyperFold.hypergraph_folding.temperature_hypergraph import (
+    TemperatureFoldingHypergraph,
+)
+from RNAHyperFold.incidence_producers.vienna_incidence_producer import (
+    ViennaIncidenceProducer,
+)
+from RNAHyperFold.profiling.stage_profiler import PROFILER, profiled
+
+STATUSES = ("pending", "leased", "done", "failed")
+"""Gli stati di un task della coda."""
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    sequence TEXT NOT NULL,
+    conditions TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    worker TEXT,
+    lease_expires REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    UNIQUE (sequence, conditions)
+);
+CREATE INDEX IF NOT EXISTS tasks_status ON tasks (status, lease_expires);
+CREATE TABLE IF NOT EXISTS results (
+    task_id INTEGER PRIMARY KEY REFERENCES tasks (id),
+    incidence_dict TEXT NOT NULL,
+    worker TEXT NOT NULL,
+    completed REAL NOT NULL
+);
+"""
+
+
+def _encode_conditions(conditions: FoldingConditions) -> str:
+    """Serializza delle condizioni in un testo canonico, usato come chiave dei task."""
+    return json.dumps(
+        {
+            "temperature": conditions.temperature,
+            "salt": conditions.salt,
+            "parameters": conditions.parameters,
+            "dangles": conditions.dangles,
+            "no_lonely_pairs": conditions.no_lonely_pairs,
+        },
+        sort_keys=True,
+    )
+
+
+def default_worker_id() -> str:
+    """
+    Restituisce un identificativo univoco del worker corrente, con nodo e processo.
+
+    Returns:
+        str: L'identificativo, nel formato "{host}:{pid}:{suffisso casuale}".
+    """
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+class FoldTask:
+    """Un folding da computare: una sequenza in certe condizioni, temperatura inclusa."""
+
+    __slots__ = ("id", "name", "sequence", "conditions", "attempts")
+
+    def __init__(
+        self,
+        id: int,
+        name: str,
+        sequence: str,
+        conditions: FoldingConditions,
+        attempts: int,
+    ) -> None:
+        self.id: int = id
+        self.name: str = name
+        self.sequence: str = sequence
+        self.conditions: FoldingConditions = conditions
+        self.attempts: int = attempts
+        """Il numero di volte in cui il task è stato assegnato, inclusa quella corrente."""
+
+    def __repr__(self) -> str:
+        return f"FoldTask({self.id}, {self.name!r}, {self.conditions!r})"
+
+
+class WorkQueue:
+    """
+    Coda di folding su un database SQLite, condivisibile tra processi e tra nodi che montano
+    lo stesso filesystem. I worker prendono i task in lease per un tempo limitato: se un
+    worker muore, il lease scade e il task viene riassegnato, fino a max_attempts volte.
+    Ogni (sequenza, condizioni) è un solo task anche se inviato più volte e i risultati sono
+    scritti una sola volta, per cui un worker lento che completa un task già riassegnato non
+    ha effetti. Il database usa il journal predefinito di SQLite e non WAL, che richiede
+    memoria condivisa tra i processi e non funziona su filesystem di rete.
+    """
+
+    def __init__(
+        self, path: str, lease_seconds: float = 600, max_attempts: int = 3
+    ) -> None:
+        """
+        Apre (creandola se necessario) una coda di folding.
+
+        Args:
+            path (str): Il percorso del database.
+            lease_seconds (float): La durata di un lease, da superare solo se il worker è morto. Default è 600.
+            max_attempts (int): Il numero massimo di assegnazioni di un task prima di considerarlo fallito. Default è 3.
+        """
+        self.path: str = path
+        self.lease_seconds: float = lease_seconds
+        self.max_attempts: int = max_attempts
+        self.__connection: sqlite3.Connection = sqlite3.connect(
+            path, timeout=60, isolation_level=None
+        )
+        self.__connection.executescript(_SCHEMA)
+
+    def __transaction(self):
+        """Apre una transazione che blocca subito le scritture degli altri processi."""
+        self.__connection.execute("BEGIN IMMEDIATE")
+        return self.__connection
+
+    @profiled("work_queue.submit")
+    def submit(
+        self, name: str, sequence: str, conditions: list[FoldingConditions]
+    ) -> int:
+        """
+        Inserisce nella coda i folding di una sequenza, ignorando quelli già presenti.
+
+        Args:
+            name (str): Il nome della sequenza.
+            sequence (str): La sequenza di RNA.
+            conditions (list[FoldingConditions]): Le condizioni dei folding, temperatura inclusa.
+
+        Returns:
+            int: Il numero di task nuovi.
+        """
+        connection = self.__transaction()
+        try:
+            before = connection.total_changes
+            connection.executemany(
+                "INSERT OR IGNORE INTO tasks (name, sequence, conditions) VALUES (?, ?, ?)",
+                [
+                    (name, sequence, _encode_conditions(condition))
+                    for condition in conditions
+                ],
+            )
+            added = connection.total_changes - before
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        return added
+
+    def submit_sweep(
+        self,
+        name: str,
+        sequence: str,
+        start_temperature: Temperature,
+        end_temperature: Temperature,
+        step: Temperature = 1,
+        conditions: FoldingConditions | None = None,
+    ) -> int:
+        """
+        Inserisce nella coda i folding di una sequenza in un intervallo di temperature.
+
+        Args:
+            name (str): Il nome della sequenza.
+            sequence (str): La sequenza di RNA.
+            start_temperature (Temperature): La temperatura iniziale dell'intervallo.
+            end_temperature (Temperature): La temperatura finale dell'intervallo.
+            step (Temperature, opzionale): Il passo tra le temperature, anche non intero. Default è 1.
+            conditions (FoldingConditions | None): Le condizioni, di cui viene ignorata la temperatura.
+
+        Returns:
+            int: Il numero di task nuovi.
+        """
+        conditions = conditions if conditions is not None else FoldingConditions()
+        return self.submit(
+            name,
+            sequence,
+            [
+                conditions.with_temperature(temperature)
+                for temperature in temperature_range(
+                    start_temperature, end_temperature, step
+                )
+            ],
+        )
+
+    def __expire(self, connection: sqlite3.Connection, now: float) -> None:
+        """
+        Rilascia i lease scaduti, all'interno di una transazione: i task tornano in attesa,
+        oppure vengono segnati come falliti se hanno già raggiunto max_attempts.
+        """
+        connection.execute(
+            "UPDATE tasks SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+            "error = CASE WHEN attempts >= ? THEN 'lease scaduto' ELSE error END, "
+            "lease_expires = NULL "
+            "WHERE status = 'leased' AND lease_expires < ?",
+            (self.max_attempts, self.max_attempts, now),
+        )
+
+    def release_expired(self) -> None:
+        """
+        Rilascia i lease scaduti dei worker morti: i task tornano in attesa, oppure vengono
+        segnati come falliti se hanno già raggiunto max_attempts.
+        """
+        connection = self.__transaction()
+        try:
+            self.__expire(connection, time.time())
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+
+    def lease(self, worker: str, count: int = 1) -> list[FoldTask]:
+        """
+        Assegna a un worker dei task in attesa o con il lease scaduto. I task con il lease
+        scaduto che hanno già raggiunto max_attempts vengono segnati come falliti.
+
+        Args:
+            worker (str): L'identificativo del worker.
+            count (int): Il numero massimo di task. Default è 1.
+
+        Returns:
+            list[FoldTask]: I task assegnati, vuota se non ce ne sono.
+        """
+        now = time.time()
+        connection = self.__transaction()
+        try:
+            self.__expire(connection, now)
+            rows = connection.execute(
+                "SELECT id, name, sequence, conditions, attempts FROM tasks "
+                "WHERE status = 'pending' ORDER BY id LIMIT ?",
+                (count,),
+            ).fetchall()
+            connection.executemany(
+                "UPDATE tasks SET status = 'leased', worker = ?, lease_expires = ?, "
+                "attempts = attempts + 1 WHERE id = ?",
+                [(worker, now + self.lease_seconds, row[0]) for row in rows],
+            )
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        PROFILER.count("work_queue.leased", len(rows))
+        return [
+            FoldTask(
+                id,
+                name,
+                sequence,
+                FoldingConditions(**json.loads(conditions)),
+                attempts + 1,
+            )
+            for id, name, sequence, conditions, attempts in rows
+        ]
+
+    def heartbeat(self, worker: str, task_ids: list[int]) -> None:
+        """
+        Rinnova i lease dei task ancora assegnati a un worker.
+
+        Args:
+            worker (str): L'identificativo del worker.
+            task_ids (list[int]): Gli id dei task.
+        """
+        self.__connection.executemany(
+            "UPDATE tasks SET lease_expires = ? "
+            "WHERE id = ? AND worker = ? AND status = 'leased'",
+            [
+                (time.time() + self.lease_seconds, task_id, worker)
+                for task_id in task_ids
+            ],
+        )
+
+    def complete(self, task_id: int, worker: str, incidence_dict: dict) -> bool:
+        """
+        Memorizza il risultato di un task. L'operazione è idempotente: se il task è già stato
+        completato, ad esempio da un altro worker dopo la scadenza del lease, non ha effetti.
+
+        Args:
+            task_id (int): L'id del task.
+            worker (str): L'identificativo del worker.
+            incidence_dict (dict): Il dizionario di incidenza del folding.
+
+        Returns:
+            bool: True se il risultato è stato memorizzato, False se era già presente.
+        """
+        connection = self.__transaction()
+        try:
+            stored = connection.execute(
+                "INSERT OR IGNORE INTO results (task_id, incidence_dict, worker, completed) "
+                "VALUES (?, ?, ?, ?)",
+                (task_id, json.dumps(incidence_dict), worker, time.time()),
+            ).rowcount
+            connection.execute(
+                "UPDATE tasks SET status = 'done', lease_expires = NULL, error = NULL "
+                "WHERE id = ?",
+                (task_id,),
+            )
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        return stored == 1
+
+    def fail(self, task_id: int, worker: str, error: str) -> None:
+        """
+        Segnala il fallimento di un task: viene rimesso in attesa se non ha raggiunto max_attempts.
+
+        Args:
+            task_id (int): L'id del task.
+            worker (str): L'identificativo del worker.
+            error (str): La descrizione dell'errore.
+        """
+        self.__connection.execute(
+            "UPDATE tasks SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+            "lease_expires = NULL, error = ? "
+            "WHERE id = ? AND worker = ? AND status = 'leased'",
+            (self.max_attempts, error, task_id, worker),
+        )
+
+    def progress(self, names: list[str] | None = None) -> dict[str, int]:
+        """
+        Restituisce il numero di task in ogni stato.
+
+        Args:
+            names (list[str] | None): Le sequenze da considerare. Default sono tutte.
+
+        Returns:
+            dict[str, int]: Il numero di task per stato, con tutti gli stati di STATUSES.
+        """
+        query = "SELECT status, COUNT(*) FROM tasks"
+        parameters: list = []
+        if names is not None:
+            query += f" WHERE name IN ({', '.join('?' * len(names))})"
+            parameters = list(names)
+        counts = dict.fromkeys(STATUSES, 0)
+        for status, count in self.__connection.execute(
+            query + " GROUP BY status", parameters
+        ):
+            counts[status] = count
+        return counts
+
+    def failures(self) -> list[tuple[str, FoldingConditions, str]]:
+        """
+        Restituisce i task falliti.
+
+        Returns:
+            list[tuple[str, FoldingConditions, str]]: Le tuple (nome, condizioni, errore).
+        """
+        return [
+            (name, FoldingConditions(**json.loads(conditions)), error)
+            for name, conditions, error in self.__connection.execute(
+                "SELECT name, conditions, error FROM tasks WHERE status = 'failed' ORDER BY id"
+            )
+        ]
+
+    def results(
+        self, sequence: str, conditions: FoldingConditions | None = None
+    ) -> dict[Temperature, dict]:
+        """
+        Restituisce i folding completati di una sequenza nelle condizioni indicate.
+
+        Args:
+            sequence (str): La sequenza di RNA.
+            conditions (FoldingConditions | None): Le condizioni, di cui viene ignorata la temperatura.
+                Default sono quelle predefinite.
+
+        Returns:
+            dict[Temperature, dict]: Il dizionario di incidenza di ogni temperatura.
+        """
+        conditions = conditions if conditions is not None else FoldingConditions()
+        folds = {}
+        for encoded, incidence_dict in self.__connection.execute(
+            "SELECT tasks.conditions, results.incidence_dict FROM tasks "
+            "JOIN results ON results.task_id = tasks.id WHERE tasks.sequence = ?",
+            (sequence,),
+        ):
+            task_conditions = FoldingConditions(**json.loads(encoded))
+            if task_conditions.base_key() == conditions.base_key():
+                folds[task_conditions.temperature] = json.loads(incidence_dict)
+        return folds
+
+    @profiled("work_queue.fill")
+    def fill_hypergraph(self, THG: TemperatureFoldingHypergraph) -> int:
+        """
+        Aggiunge a un ipergrafo dei folding i risultati della coda per la sua sequenza e le
+        condizioni del suo folder, così che le analisi non ricomputino quei folding.
+
+        Args:
+            THG (TemperatureFoldingHypergraph): L'ipergrafo, con un produttore di ViennaIncidenceProducer.
+
+        Returns:
+            int: Il numero di folding aggiunti.
+        """
+        added = 0
+        folds = self.results(THG.producer.sequence, THG.producer.folder.conditions)
+        for temperature, incidence_dict in sorted(folds.items()):
+            added += THG.add_folding(temperature, incidence_dict)
+        return added
+
+    def wait(
+        self,
+        names: list[str] | None = None,
+        poll_interval: float = 2.0,
+        report=None,
+    ) -> dict[str, int]:
+        """
+        Attende che tutti i task siano completati o falliti. A ogni controllo i lease scaduti
+        vengono rilasciati, per cui un worker morto non blocca l'attesa: i suoi task tornano
+        disponibili agli altri worker o, dopo max_attempts assegnazioni, risultano falliti.
+
+        Args:
+            names (list[str] | None): Le sequenze da attendere. Default sono tutte.
+            poll_interval (float): I secondi tra due controlli. Default è 2.
+            report: Una funzione chiamata con il dizionario di progress() a ogni controllo.
+
+        Returns:
+            dict[str, int]: Il numero finale di task per stato.
+        """
+        while True:
+            self.release_expired()
+            counts = self.progress(names)
+            if report is not None:
+                report(counts)
+            if counts["pending"] + counts["leased"] == 0:
+                return counts
+            time.sleep(poll_interval)
+
+    def close(self) -> None:
+        """Chiude la connessione al database."""
+        self.__connection.close()
+
+    def __enter__(self) -> "WorkQueue":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def run_worker(
+    path: str,
+    worker: str | None = None,
+    batch: int = 1,
+    wait: bool = False,
+    poll_interval: float = 2.0,
+    lease_seconds: float = 600,
+    max_attempts: int = 3,
+) -> int:
+    """
+    Esegue un worker: prende task dalla coda, ne computa i folding con ViennaIncidenceProducer
+    e ne memorizza i risultati, finché la coda non è vuota. Può essere eseguito su qualunque
+    nodo che veda il database, anche in più processi per nodo.
+
+    Args:
+        path (str): Il percorso del database della coda.
+        worker (str | None): L'identificativo del worker. Default è generato da nodo e processo.
+        batch (int): Il numero di task presi in lease insieme. Default è 1.
+        wait (bool): Se True, il worker attende nuovi task finché ce ne sono in lease ad altri worker,
+            per riprendere quelli dei worker morti. Default è False.
+        poll_interval (float): I secondi di attesa tra due richieste a una coda vuota. Default è 2.
+        lease_seconds (float): La durata di un lease. Default è 600.
+        max_attempts (int): Il numero massimo di assegnazioni di un task. Default è 3.
+
+    Returns:
+        int: Il numero di task completati dal worker.
+    """
+    worker = worker or default_worker_id()
+    completed = 0
+    with WorkQueue(path, lease_seconds, max_attempts) as queue:
+        while True:
+            tasks = queue.lease(worker, batch)
+            if len(tasks) == 0:
+                if wait and queue.progress()["leased"] > 0:
+                    time.sleep(poll_interval)
+                    continue
+                return completed
+            for i, task in enumerate(tasks):
+                try:
+                    producer = ViennaIncidenceProducer(
+                        RNAFolder(task.sequence, task.conditions)
+                    )
+                    incidence_dict = producer.get_temperature_incidence_dict(
+                        task.conditions.temperature
+                    )
+                except Exception as error:
+                    queue.fail(task.id, worker, repr(error))
+                    continue
+                queue.complete(task.id, worker, dict(incidence_dict))
+                completed += 1
+                queue.heartbeat(worker, [other.id for other in tasks[i + 1 :]])
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Worker e stato di una coda di folding condivisa tra nodi."
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    worker_parser = subparsers.add_parser(
+        "worker", help="Computa i folding della coda finché non è vuota."
+    )
+    worker_parser.add_argument("queue", help="Il database della coda.")
+    worker_parser.add_argument(
+        "--batch", type=int, default=1, help="Task presi in lease insieme."
+    )
+    worker_parser.add_argument(
+        "--wait",
+        action="store_true",
+        help="Attende i task in lease ad altri worker per riprenderli se muoiono.",
+    )
+    worker_parser.add_argument(
+        "--lease", type=float, default=600, help="Durata di un lease in secondi."
+    )
+    status_parser = subparsers.add_parser(
+        "status", help="Mostra il numero di task per stato."
+    )
+    status_parser.add_argument("queue", help="Il database della coda.")
+    args = parser.parse_args(argv)
+    if args.command == "worker":
+        completed = run_worker(
+            args.queue, batch=args.batch, wait=args.wait, lease_seconds=args.lease
+        )
+        print(f"{completed} folding completati")
+        return 0
+    with WorkQueue(args.queue) as queue:
+        counts = queue.progress()
+        print(", ".join(f"{status}: {count}" for status, count in counts.items()))
+        for name, conditions, error in queue.failures():
+            print(f"fallito {name} {conditions!r}: {error}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
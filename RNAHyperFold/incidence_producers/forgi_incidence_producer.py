@@ -1,8 +1,12 @@
-import forgi
+from __future__ import annotations
 
 from RNAHyperFold.incidence_producers.forna_incidence_producer import (
     FornaIncidenceProducer,
 )
+from RNAHyperFold.lazy_modules import lazy_module
+from RNAHyperFold.profiling.stage_profiler import profiled
+
+forgi = lazy_module("forgi")
 
 
 class ForgiIncidenceProducer(FornaIncidenceProducer):
@@ -28,6 +32,7 @@ class ForgiIncidenceProducer(FornaIncidenceProducer):
         for i in range(len(structures[0])):
             self.incidence_dict[f"{structures[0][i]}_{structures[1][i]}"].append(i)
 
+    @profiled("forgi.structures")
     def get_structures(self) -> list[str]:
         """
         Ottiene le strutture dell'RNA dal file Forna.
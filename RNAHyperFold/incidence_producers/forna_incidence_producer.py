@@ -4,6 +4,7 @@ from collections import deque
 
 from RNAHyperFold.incidence_producers.connector import Connector
 from RNAHyperFold.incidence_producers.incidence_producer import IncidenceProducer
+from RNAHyperFold.profiling.stage_profiler import profiled
 
 
 class FornaIncidenceProducer(IncidenceProducer, Connector):
@@ -28,6 +29,7 @@ class FornaIncidenceProducer(IncidenceProducer, Connector):
         self.incidence_dict: defaultdict = defaultdict(list)
         self.edge: int = 0
 
+    @profiled("forna_producer.incidence_dict")
     def get_incidence_dict(self, node_with_nucleotide: bool = False) -> dict:
         """
         Restituisce il dizionario di incidenza.
@@ -1,5 +1,6 @@
 from abc import abstractmethod
 
+from RNAHyperFold.hypergraph_folding.folding_conditions import FoldingConditions
 from RNAHyperFold.incidence_producers.incidence_producer import IncidenceProducer
 
 
@@ -10,18 +11,61 @@ class TemperatureIncidenceProducer(IncidenceProducer):
     """
 
     @abstractmethod
-    def get_temperature_incidence_dict(self, temperature: int) -> dict:
+    def get_temperature_incidence_dict(self, temperature: float) -> dict:
         """
         Restituisce il dizionario di incidenza per una data temperatura.
 
         Args:
-            temperature (int): La temperatura per cui ottenere il dizionario di incidenza.
+            temperature (float): La temperatura per cui ottenere il dizionario di incidenza.
 
         Returns:
             dict: Il dizionario di incidenza.
         """
         pass
 
+    def with_conditions(
+        self, conditions: FoldingConditions
+    ) -> "TemperatureIncidenceProducer":
+        """
+        Restituisce un produttore che computa i folding nelle condizioni indicate, a meno della
+        temperatura che resta un parametro di get_temperature_incidence_dict.
+
+        Args:
+            conditions (FoldingConditions): Le condizioni dei folding.
+
+        Returns:
+            TemperatureIncidenceProducer: Il produttore, self se le condizioni sono quelle predefinite.
+        """
+        if conditions.base_key() != FoldingConditions().base_key():
+            raise NotImplementedError(
+                f"{type(self).__name__} non supporta condizioni diverse dalla temperatura"
+            )
+        return self
+
+    def get_conditions_incidence_dict(self, conditions: FoldingConditions) -> dict:
+        """
+        Restituisce il dizionario di incidenza per delle condizioni di folding.
+
+        Args:
+            conditions (FoldingConditions): Le condizioni del folding.
+
+        Returns:
+            dict: Il dizionario di incidenza.
+        """
+        return self.with_conditions(conditions).get_temperature_incidence_dict(
+            conditions.temperature
+        )
+
+    def fold_key(self) -> tuple | None:
+        """
+        Restituisce una chiave che identifica i folding computati dal produttore: due produttori
+        con la stessa chiave producono lo stesso dizionario di incidenza a ogni temperatura.
+
+        Returns:
+            tuple | None: La chiave, None se i folding non possono essere condivisi con altri produttori.
+        """
+        return None
+
     def get_incidence_dict(self) -> dict:
         """
         Restituisce il dizionario di incidenza per la temperatura predefinita di 37°C.
@@ -1,13 +1,39 @@
+from __future__ import annotations
+
 from collections import defaultdict
 from collections import deque
 
-import forgi
-
+from RNAHyperFold.hypergraph_folding.folding_conditions import FoldingConditions
 from RNAHyperFold.hypergraph_folding.rna_folder import RNAFolder
 from RNAHyperFold.incidence_producers.connector import Connector
 from RNAHyperFold.incidence_producers.temperature_incidence_producer import (
     TemperatureIncidenceProducer,
 )
+from RNAHyperFold.lazy_modules import lazy_module
+from RNAHyperFold.profiling.stage_profiler import PROFILER, profiled
+
+forgi = lazy_module("forgi")
+
+
+def _backbone_edges(dotbracket: str, incidence_dict: dict) -> None:
+    """Aggiunge a un dizionario di incidenza gli iperarchi tra ogni nucleotide e il successivo."""
+    for i in range(len(dotbracket) - 1):
+        incidence_dict[f"l_{i}"] = [i, i + 1]
+
+
+def _pair_edges(dotbracket: str, incidence_dict: dict) -> None:
+    """Aggiunge a un dizionario di incidenza gli iperarchi delle coppie di basi."""
+    edge: int = 0
+    stack = deque()
+    for i, value in enumerate(dotbracket):
+        if value == "(":
+            stack.append(i)
+        elif value == ")":
+            if len(stack) == 0:
+                raise (ValueError("Closing bracket not matching"))
+            start = stack.pop()
+            incidence_dict[f"db_{edge}"] = [start, i]
+            edge += 1
 
 
 class ViennaIncidenceProducer(TemperatureIncidenceProducer, Connector):
@@ -25,65 +51,96 @@ class ViennaIncidenceProducer(TemperatureIncidenceProducer, Connector):
         """
         self.folder: RNAFolder = folder
         self.sequence: str = folder.sequence
+        # stato usato solo dai metodi di Connector, non dal percorso di folding
         self.dotbracket: str = None
         self.incidence_dict: defaultdict = defaultdict(list)
 
-    def get_temperature_incidence_dict(self, temperature: int) -> dict:
+    @profiled("vienna_producer.incidence_dict")
+    def get_temperature_incidence_dict(self, temperature: float) -> dict:
+        """
+        Restituisce il dizionario di incidenza per una data temperatura. Il dizionario è
+        costruito a ogni chiamata e il produttore non viene modificato, per cui più thread
+        possono computare folding a temperature diverse contemporaneamente.
+
+        Args:
+            temperature (float): La temperatura per cui ottenere il dizionario di incidenza.
+
+        Returns:
+            dict: Il dizionario di incidenza.
+        """
+        return self.get_dotbracket_incidence_dict(
+            self.folder.get_dot_bracket(temperature)
+        )
+
+    def get_dotbracket_incidence_dict(self, dotbracket: str) -> dict:
         """
-        Restituisce il dizionario di incidenza per una data temperatura.
+        Restituisce il dizionario di incidenza di una struttura data, ad esempio una struttura subottimale.
 
         Args:
-            temperature (int): La temperatura per cui ottenere il dizionario di incidenza.
+            dotbracket (str): La struttura in dot-bracket.
 
         Returns:
             dict: Il dizionario di incidenza.
         """
-        self.folder.set_temperature(temperature)
-        self.dotbracket = self.folder.get_dot_bracket()
-        self.incidence_dict.clear()
-        self.connect_to_next()
-        self.dotbracket_connections()
-        self.structure_connections()
-        return self.incidence_dict
+        incidence_dict: dict = {}
+        with PROFILER.stage("vienna_producer.dict_building"):
+            _backbone_edges(dotbracket, incidence_dict)
+            _pair_edges(dotbracket, incidence_dict)
+        incidence_dict.update(self.get_structures(dotbracket))
+        return incidence_dict
+
+    def fold_key(self) -> tuple | None:
+        """
+        Restituisce una chiave che identifica i folding computati dal produttore.
+
+        Returns:
+            tuple | None: La classe del produttore, la sequenza e le condizioni a meno della temperatura.
+        """
+        return type(self).__name__, self.sequence, self.folder.conditions.base_key()
+
+    def with_conditions(
+        self, conditions: FoldingConditions
+    ) -> "ViennaIncidenceProducer":
+        """
+        Restituisce un produttore della stessa sequenza che computa i folding nelle condizioni indicate.
+
+        Args:
+            conditions (FoldingConditions): Le condizioni dei folding.
+
+        Returns:
+            ViennaIncidenceProducer: Il produttore, self se ha già le stesse condizioni a meno della temperatura.
+        """
+        if conditions.base_key() == self.folder.conditions.base_key():
+            return self
+        return ViennaIncidenceProducer(RNAFolder(self.sequence, conditions))
 
     def connect_to_next(self) -> None:
         """Collega ogni nucleotide con il suo successivo"""
-        edge: int = 0
-        for i in range(len(self.dotbracket) - 1):
-            self.incidence_dict[f"l_{edge}"] = [i, i + 1]
-            edge += 1
+        _backbone_edges(self.dotbracket, self.incidence_dict)
 
     def dotbracket_connections(self) -> None:
         """Collega i nucleotidi in base alla rappresentazione punto-parentesi"""
-        edge: int = 0
-        stack = deque()
-        for i, value in enumerate(self.dotbracket):
-            if value == "(":
-                stack.append(i)
-            elif value == ")":
-                if len(stack) == 0:
-                    raise (ValueError("Closing bracket not matching"))
-
-                start = stack.pop()
-                self.incidence_dict[f"db_{edge}"] = [start, i]
-                # self.incidence_dict[f"db_{edge}"].append(i)
-                edge += 1
+        _pair_edges(self.dotbracket, self.incidence_dict)
 
     def structure_connections(self):
         """Collega le strutture rilevate da forna"""
-        structures = self.get_structures()
-        for struct, indexes in structures.items():
-            self.incidence_dict[struct] = indexes
+        self.incidence_dict.update(self.get_structures())
 
-    def get_structures(self) -> dict:
+    @profiled("forgi.structures")
+    def get_structures(self, dotbracket: str | None = None) -> dict:
         """
         Ottiene le strutture dell'RNA dal file Forna.
 
+        Args:
+            dotbracket (str | None): La struttura in dot-bracket. Se None, quella memorizzata nel produttore.
+
         Returns:
             dict: Un dizionario che rappresenta le strutture dell'RNA.
         """
         structures_dict = defaultdict(list)
-        cg = forgi.load_rna(self.dotbracket, allow_many=False)
+        cg = forgi.load_rna(
+            self.dotbracket if dotbracket is None else dotbracket, allow_many=False
+        )
         structures = cg.to_element_string(with_numbers=True)
         structures = structures.split("\n")
         for i in range(len(structures[0])):
@@ -0,0 +1,38 @@
+import importlib
+import sys
+import types
+
+
+class LazyModule(types.ModuleType):
+    """
+    Segnaposto di un modulo che viene importato solo al primo accesso a un suo attributo.
+    Permette ai moduli del pacchetto di riferirsi a dipendenze pesanti (HyperNetX, matplotlib,
+    forgi, ...) senza pagarne l'importazione quando non vengono usate, ad esempio nei processi
+    worker che si limitano a computare folding.
+    """
+
+    def __getattr__(self, attribute: str):
+        module = importlib.import_module(self.__name__)
+        return getattr(module, attribute)
+
+    def __repr__(self) -> str:
+        loaded = "caricato" if self.__name__ in sys.modules else "non caricato"
+        return f"<modulo lazy {self.__name__!r} ({loaded})>"
+
+
+def lazy_module(name: str) -> types.ModuleType:
+    """
+    Restituisce un modulo importato al primo utilizzo, o il modulo stesso se è già stato importato.
+    Nei moduli che lo usano nelle annotazioni di tipo va abilitato
+    "from __future__ import annotations", così che le annotazioni non ne forzino l'importazione.
+
+    Args:
+        name (str): Il nome completo del modulo, ad esempio "hypernetx" o "matplotlib.pyplot".
+
+    Returns:
+        types.ModuleType: Il modulo o il suo segnaposto.
+    """
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    return LazyModule(name)
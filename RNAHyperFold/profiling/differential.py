@@ -0,0 +1,572 @@
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import time
+from collections import defaultdict
+from functools import partial
+
+import numpy as np
+
+from RNAHyperFold.hypergraph_folding.edge_model import EdgeTable
+from RNAHyperFold.hypergraph_folding.pair_table import (
+    dotbracket_from_pair_table,
+    pair_table_from_dotbracket,
+)
+from RNAHyperFold.hypergraph_folding.rna_folder import RNAFolder
+from RNAHyperFold.hypergraph_folding.temperature_grid import temperature_range
+from RNAHyperFold.hypergraph_folding.temperature_hypergraph import (
+    BasicTemporalHypergraph,
+    MemoryOptimizedFoldingHypergraph,
+    SearchOptimizedFoldingHypergraph,
+    TemperatureFoldingHypergraph,
+)
+from RNAHyperFold.incidence_producers.vienna_incidence_producer import (
+    ViennaIncidenceProducer,
+)
+from RNAHyperFold.lazy_modules import lazy_module
+
+forgi = lazy_module("forgi")
+hnx = lazy_module("hypernetx")
+
+NUCLEOTIDES = "ACGU"
+
+
+def random_sequence(rng: np.random.Generator, length: int) -> str:
+    """
+    Genera una sequenza di RNA casuale.
+
+    Args:
+        rng (np.random.Generator): Il generatore di numeri casuali.
+        length (int): La lunghezza della sequenza.
+
+    Returns:
+        str: La sequenza.
+    """
+    return "".join(NUCLEOTIDES[i] for i in rng.integers(0, 4, length))
+
+
+def random_dotbracket(
+    rng: np.random.Generator,
+    length: int,
+    pair_probability: float = 0.3,
+    stack_probability: float = 0.7,
+    min_loop: int = 3,
+) -> str:
+    """
+    Genera una struttura secondaria casuale senza pseudonodi, con eliche formate da coppie impilate.
+
+    Args:
+        rng (np.random.Generator): Il generatore di numeri casuali.
+        length (int): La lunghezza della struttura.
+        pair_probability (float): La probabilità che un nucleotide apra una coppia. Default è 0.3.
+        stack_probability (float): La probabilità che una coppia prosegua l'elica. Default è 0.7.
+        min_loop (int): Il numero minimo di nucleotidi non appaiati in un hairpin. Default è 3.
+
+    Returns:
+        str: La struttura in dot-bracket.
+    """
+    structure = ["."] * length
+    ranges = [(0, length - 1)]
+    while ranges:
+        i, j = ranges.pop()
+        while j - i > min_loop:
+            if rng.random() >= pair_probability:
+                i += 1
+                continue
+            k = int(rng.integers(i + min_loop + 1, j + 1))
+            start, end = i, k
+            structure[start], structure[end] = "(", ")"
+            while end - start - 2 > min_loop and rng.random() < stack_probability:
+                start, end = start + 1, end - 1
+                structure[start], structure[end] = "(", ")"
+            ranges.append((start + 1, end - 1))
+            i = k + 1
+    return "".join(structure)
+
+
+# implementazioni di riferimento: quelle originali basate sui dizionari di incidenza,
+# a cui devono corrispondere i percorsi ottimizzati
+
+
+def reference_incidence_dict(dotbracket: str) -> dict:
+    """
+    Costruisce il dizionario di incidenza di una struttura come l'implementazione originale
+    di ViennaIncidenceProducer.
+
+    Args:
+        dotbracket (str): La struttura in dot-bracket.
+
+    Returns:
+        dict: Il dizionario di incidenza.
+    """
+    incidence_dict = defaultdict(list)
+    for i in range(len(dotbracket) - 1):
+        incidence_dict[f"l_{i}"] = [i, i + 1]
+    edge = 0
+    stack = []
+    for i, value in enumerate(dotbracket):
+        if value == "(":
+            stack.append(i)
+        elif value == ")":
+            incidence_dict[f"db_{edge}"] = [stack.pop(), i]
+            edge += 1
+    cg = forgi.load_rna(dotbracket, allow_many=False)
+    elements, numbers = cg.to_element_string(with_numbers=True).split("\n")[:2]
+    for i in range(len(elements)):
+        incidence_dict[f"{elements[i]}_{numbers[i]}"].append(i)
+    return dict(incidence_dict)
+
+
+def reference_secondary_structures(incidence_dict: dict) -> dict:
+    """Restituisce le strutture secondarie di un folding, come RnaAnalyst.secondary_structures."""
+    return {
+        name: nodes
+        for name, nodes in incidence_dict.items()
+        if not name.startswith("l") and not name.startswith("db")
+    }
+
+
+def reference_nucleotide_structures(incidence_dict: dict, length: int) -> list:
+    """Restituisce per ogni nucleotide il nome della prima struttura secondaria che lo contiene."""
+    labels = [None] * length
+    for name, nodes in reference_secondary_structures(incidence_dict).items():
+        for node in nodes:
+            if labels[node] is None:
+                labels[node] = name
+    return labels
+
+
+def reference_connection_differences(this: dict, other: dict) -> tuple[list, list]:
+    """Restituisce le connessioni rimosse e aggiunte, come RnaAnalyst.connection_differences."""
+    this_connections = {v[0]: v[1] for k, v in this.items() if k[0:2] == "db"}
+    other_connections = {v[0]: v[1] for k, v in other.items() if k[0:2] == "db"}
+    old = []
+    new = []
+    for k, v in this_connections.items():
+        if k not in other_connections:
+            old.append((k, v))
+            continue
+        if v != other_connections[k]:
+            old.append((k, v))
+            new.append((k, other_connections[k]))
+    return old, new
+
+
+def reference_structure_differences(this: dict, other: dict) -> dict:
+    """Restituisce le differenze nel numero di strutture, come RnaAnalyst.structure_differences."""
+    this_count = defaultdict(int)
+    for name in reference_secondary_structures(this):
+        this_count[name[0]] += 1
+    other_count = defaultdict(int)
+    for name in reference_secondary_structures(other):
+        other_count[name[0]] += 1
+    return {
+        key: this_count[key] - other_count[key]
+        for key in this_count
+        if key in other_count and this_count[key] != other_count[key]
+    }
+
+
+def reference_nucleotides_change_structure(this: dict, other: dict) -> list:
+    """Restituisce i nucleotidi che cambiano struttura, come RnaAnalyst.get_nucleotides_change_structure."""
+    this_structures = reference_secondary_structures(this)
+    other_structures = reference_secondary_structures(other)
+    differences = []
+    for name, structure in this_structures.items():
+        if name in other_structures:
+            differences.extend(
+                item for item in structure if item not in other_structures[name]
+            )
+    return differences
+
+
+def reference_structure_sensibility(folds: list[dict]) -> dict:
+    """
+    Restituisce le sensibilità ai cambiamenti di struttura dei folding di una griglia di
+    temperature, come TemperatureFoldingStats.get_nucleotide_sensibility_to_changes, che
+    confronta le coppie di temperature consecutive a partire dalla seconda.
+    """
+    counts = defaultdict(int)
+    for this, other in zip(folds[1:], folds[2:]):
+        for node in reference_nucleotides_change_structure(this, other):
+            counts[node] += 1
+    return dict(counts)
+
+
+def reference_connection_sensibility(folds: list[dict]) -> dict:
+    """
+    Restituisce le sensibilità ai cambiamenti di connessione dei folding di una griglia di
+    temperature rispetto al primo, come TemperatureFoldingStats.get_nucleotide_sensibility_to_change_connection.
+    """
+    counts = defaultdict(int)
+    for other in folds[1:]:
+        for connections in reference_connection_differences(folds[0], other):
+            for pair in connections:
+                for node in pair:
+                    counts[node] += 1
+    return dict(counts)
+
+
+class Comparison:
+    """L'esito del confronto tra un percorso ottimizzato e l'implementazione di riferimento."""
+
+    __slots__ = ("check", "cases", "mismatches", "reference_seconds", "fast_seconds")
+
+    def __init__(self, check: str) -> None:
+        self.check: str = check
+        self.cases: int = 0
+        self.mismatches: list[str] = []
+        """La descrizione di ogni differenza trovata, con il caso che la riproduce."""
+        self.reference_seconds: float = 0.0
+        self.fast_seconds: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        """True se nessun caso ha dato risultati diversi."""
+        return len(self.mismatches) == 0
+
+    @property
+    def speedup(self) -> float:
+        """Il rapporto tra il tempo dell'implementazione di riferimento e quello del percorso ottimizzato."""
+        return self.reference_seconds / self.fast_seconds if self.fast_seconds else 0.0
+
+    def expect(self, description: str, reference, fast) -> None:
+        """Registra una differenza se i due risultati non sono identici."""
+        if reference != fast:
+            self.mismatches.append(
+                f"{description}: riferimento {reference!r}, ottimizzato {fast!r}"
+            )
+
+    def to_dict(self) -> dict:
+        return {
+            "check": self.check,
+            "cases": self.cases,
+            "mismatches": self.mismatches,
+            "reference_seconds": self.reference_seconds,
+            "fast_seconds": self.fast_seconds,
+            "speedup": self.speedup,
+        }
+
+
+def _timed(function, *args):
+    """Esegue una funzione e restituisce il suo risultato e il tempo impiegato."""
+    begin = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - begin
+
+
+def check_incidence(rng: np.random.Generator, cases: int, lengths: tuple) -> Comparison:
+    """
+    Confronta i dizionari di incidenza di ViennaIncidenceProducer, le loro tabelle degli
+    iperarchi e le tabelle delle coppie con l'implementazione originale.
+    """
+    comparison = Comparison("incidence")
+    producer = ViennaIncidenceProducer(RNAFolder("A"))
+    for _ in range(cases):
+        dotbracket = random_dotbracket(rng, int(rng.integers(*lengths)))
+        reference, reference_time = _timed(reference_incidence_dict, dotbracket)
+        fast, fast_time = _timed(producer.get_dotbracket_incidence_dict, dotbracket)
+        comparison.reference_seconds += reference_time
+        comparison.fast_seconds += fast_time
+        comparison.cases += 1
+        comparison.expect(
+            f"{dotbracket} dizionario", list(reference.items()), list(fast.items())
+        )
+        comparison.expect(
+            f"{dotbracket} tabella degli iperarchi",
+            reference,
+            EdgeTable.from_incidence_dict(fast).to_incidence_dict(),
+        )
+        comparison.expect(
+            f"{dotbracket} tabella delle coppie",
+            dotbracket,
+            dotbracket_from_pair_table(pair_table_from_dotbracket(dotbracket)),
+        )
+    return comparison
+
+
+def check_labels(rng: np.random.Generator, cases: int, lengths: tuple) -> Comparison:
+    """
+    Confronta le strutture secondarie e le etichette dei nucleotidi di RnaAnalyst con quelle
+    lette dal dizionario di incidenza dell'ipergrafo, come nell'implementazione originale.
+    """
+    from RNAHyperFold.rna_stats.rna_analyst import RnaAnalyst
+
+    comparison = Comparison("labels")
+    for _ in range(cases):
+        length = int(rng.integers(*lengths))
+        dotbracket = random_dotbracket(rng, length)
+        HG = hnx.Hypergraph(reference_incidence_dict(dotbracket))
+        analyst = RnaAnalyst(HG)
+        (structures, labels), reference_time = _timed(
+            lambda: (
+                reference_secondary_structures(HG.incidence_dict),
+                reference_nucleotide_structures(HG.incidence_dict, length),
+            )
+        )
+        (fast_structures, fast_labels), fast_time = _timed(
+            lambda: (
+                analyst.secondary_structures(),
+                [analyst.nucleotide_structure(i) for i in range(length)],
+            )
+        )
+        comparison.reference_seconds += reference_time
+        comparison.fast_seconds += fast_time
+        comparison.cases += 1
+        comparison.expect(
+            f"{dotbracket} strutture",
+            list(structures.items()),
+            list(fast_structures.items()),
+        )
+        comparison.expect(f"{dotbracket} etichette", labels, fast_labels)
+    return comparison
+
+
+def check_diffs(rng: np.random.Generator, cases: int, lengths: tuple) -> Comparison:
+    """Confronta le differenze di connessione e di struttura tra due folding di RnaAnalyst."""
+    from RNAHyperFold.rna_stats.rna_analyst import RnaAnalyst
+
+    comparison = Comparison("diffs")
+    for _ in range(cases):
+        length = int(rng.integers(*lengths))
+        this, other = (random_dotbracket(rng, length) for _ in range(2))
+        this_HG, other_HG = (
+            hnx.Hypergraph(reference_incidence_dict(dotbracket))
+            for dotbracket in (this, other)
+        )
+        for name, reference_function, fast_function in (
+            (
+                "connessioni",
+                reference_connection_differences,
+                RnaAnalyst.connection_differences,
+            ),
+            (
+                "strutture",
+                reference_structure_differences,
+                RnaAnalyst.structure_differences,
+            ),
+            (
+                "nucleotidi",
+                reference_nucleotides_change_structure,
+                RnaAnalyst.get_nucleotides_change_structure,
+            ),
+        ):
+            reference, reference_time = _timed(
+                lambda: reference_function(
+                    this_HG.incidence_dict, other_HG.incidence_dict
+                )
+            )
+            fast, fast_time = _timed(
+                lambda: fast_function(RnaAnalyst(this_HG), other_HG)
+            )
+            comparison.reference_seconds += reference_time
+            comparison.fast_seconds += fast_time
+            comparison.expect(f"{this} -> {other} {name}", reference, fast)
+        comparison.cases += 1
+    return comparison
+
+
+def check_temporal_store(
+    backend: type, rng: np.random.Generator, cases: int, lengths: tuple
+) -> Comparison:
+    """
+    Confronta un ipergrafo temporale ottimizzato con BasicTemporalHypergraph, che memorizza
+    un ipergrafo per tempo, su sequenze di folding in cui le strutture possono ripresentarsi,
+    inserite in ordine di tempo o, come nella ricerca adattiva, in ordine sparso.
+
+    Args:
+        backend (type): La classe dell'ipergrafo temporale ottimizzato.
+        rng (np.random.Generator): Il generatore di numeri casuali.
+        cases (int): Il numero di casi.
+        lengths (tuple): La lunghezza minima e massima (esclusa) delle strutture.
+
+    Returns:
+        Comparison: L'esito del confronto.
+    """
+    comparison = Comparison(backend.__name__)
+    for case in range(cases):
+        length = int(rng.integers(*lengths))
+        pool = [
+            reference_incidence_dict(random_dotbracket(rng, length)) for _ in range(3)
+        ]
+        times = temperature_range(0, 10, [1, 0.5, 0.25][case % 3])
+        folds = []
+        current = 0
+        for _ in times:
+            if rng.random() < 0.3:
+                current = int(rng.integers(0, len(pool)))
+            folds.append(current)
+        order = np.arange(len(times))
+        if case % 2 == 1:
+            rng.shuffle(order)
+        stores = []
+        for store in (BasicTemporalHypergraph(), backend()):
+            begin = time.perf_counter()
+            for i in order:
+                store.add_incidence_dict(pool[folds[i]], times[i])
+            hypergraphs = [store.get_time_hypergraph(t) for t in times]
+            stores.append((hypergraphs, time.perf_counter() - begin))
+        (reference, reference_time), (fast, fast_time) = stores
+        comparison.reference_seconds += reference_time
+        comparison.fast_seconds += fast_time
+        comparison.cases += 1
+        comparison.expect(
+            f"folding {folds} inseriti nell'ordine {order.tolist()}, tempi errati",
+            [],
+            [
+                t
+                for t, expected, HG in zip(times, reference, fast)
+                if HG is None or HG.incidence_dict != expected.incidence_dict
+            ],
+        )
+    return comparison
+
+
+def check_sensitivities(
+    rng: np.random.Generator, cases: int, lengths: tuple
+) -> Comparison:
+    """
+    Confronta le sensibilità ai cambiamenti di struttura e di connessione di
+    TemperatureFoldingStats e del suo indice delle regioni con quelle calcolate dai folding
+    di due griglie di temperature con lo stesso passo e sfasate. Ogni caso richiede i folding di una sequenza casuale, per
+    cui i casi sono un decimo di cases; i tempi non includono il calcolo dei folding.
+    """
+    from RNAHyperFold.rna_stats.rna_analyst import TemperatureFoldingStats
+
+    comparison = Comparison("sensitivities")
+    for _ in range(max(1, cases // 10)):
+        sequence = random_sequence(rng, int(rng.integers(*lengths)))
+        THG = TemperatureFoldingHypergraph(
+            ViennaIncidenceProducer(RNAFolder(sequence)),
+            MemoryOptimizedFoldingHypergraph(),
+            max_workers=1,
+            threads=True,
+        )
+        stats = TemperatureFoldingStats(THG)
+        # due griglie con lo stesso passo ma sfasate, interrogate sulle stesse statistiche
+        for start, end, step in ((20, 80, 4), (21, 81, 4)):
+            grid = temperature_range(start, end, step)
+            THG.insert_temperatures(grid)
+            folds = [
+                reference_incidence_dict(THG.producer.folder.get_dot_bracket(t))
+                for t in grid
+            ]
+            case = f"{sequence} {start}..{end}/{step}"
+            for name, reference_function, fast_function, connection in (
+                (
+                    "struttura",
+                    reference_structure_sensibility,
+                    stats.get_nucleotide_sensibility_to_changes,
+                    False,
+                ),
+                (
+                    "connessione",
+                    reference_connection_sensibility,
+                    stats.get_nucleotide_sensibility_to_change_connection,
+                    True,
+                ),
+            ):
+                reference, reference_time = _timed(reference_function, folds)
+                fast, fast_time = _timed(
+                    lambda: dict(fast_function(start, end, step=step))
+                )
+                region, region_time = _timed(
+                    lambda: stats.get_region_sensibility(
+                        0, len(sequence) - 1, start, end, step, connection
+                    )
+                )
+                comparison.reference_seconds += 2 * reference_time
+                comparison.fast_seconds += fast_time + region_time
+                comparison.expect(f"{case} {name}", reference, fast)
+                comparison.expect(
+                    f"{case} {name} per regione",
+                    {node: count for node, count in reference.items() if count > 0},
+                    region,
+                )
+        comparison.cases += 1
+    return comparison
+
+
+CHECKS = {
+    "incidence": check_incidence,
+    "labels": check_labels,
+    "diffs": check_diffs,
+    "memory_store": partial(check_temporal_store, MemoryOptimizedFoldingHypergraph),
+    "search_store": partial(check_temporal_store, SearchOptimizedFoldingHypergraph),
+    "sensitivities": check_sensitivities,
+}
+"""I confronti disponibili, ognuno tra un percorso ottimizzato e la sua implementazione di riferimento."""
+
+
+def run_checks(
+    checks: list[str] | None = None,
+    cases: int = 50,
+    seed: int = 0,
+    lengths: tuple[int, int] = (20, 120),
+) -> list[Comparison]:
+    """
+    Esegue i confronti su sequenze e strutture casuali, riproducibili a partire dal seme.
+
+    Args:
+        checks (list[str] | None): I confronti da eseguire, tra le chiavi di CHECKS. Default sono tutti.
+        cases (int): Il numero di casi casuali per confronto. Default è 50.
+        seed (int): Il seme del generatore di numeri casuali. Default è 0.
+        lengths (tuple[int, int]): La lunghezza minima e massima (esclusa) delle sequenze. Default è (20, 120).
+
+    Returns:
+        list[Comparison]: L'esito di ogni confronto.
+    """
+    results = []
+    for check in checks or CHECKS:
+        rng = np.random.default_rng([seed, list(CHECKS).index(check)])
+        results.append(CHECKS[check](rng, cases, lengths))
+    return results
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Confronta i percorsi ottimizzati di RNAHyperFold con le implementazioni di riferimento."
+    )
+    parser.add_argument(
+        "--checks",
+        nargs="+",
+        choices=list(CHECKS),
+        default=None,
+        help="Confronti da eseguire, default tutti.",
+    )
+    parser.add_argument(
+        "--cases", type=int, default=50, help="Numero di casi casuali per confronto."
+    )
+    parser.add_argument("--seed", type=int, default=0, help="Seme dei casi casuali.")
+    parser.add_argument(
+        "--min-length", type=int, default=20, help="Lunghezza minima delle sequenze."
+    )
+    parser.add_argument(
+        "--max-length", type=int, default=120, help="Lunghezza massima delle sequenze."
+    )
+    parser.add_argument(
+        "--json", default=None, help="File in cui salvare gli esiti in formato JSON."
+    )
+    args = parser.parse_args(argv)
+    results = run_checks(
+        args.checks, args.cases, args.seed, (args.min_length, args.max_length + 1)
+    )
+    for result in results:
+        status = "ok" if result.ok else f"{len(result.mismatches)} DIFFERENZE"
+        print(
+            f"{status:>16}  {result.check}: {result.cases} casi, "
+            f"riferimento {result.reference_seconds:.3f}s, "
+            f"ottimizzato {result.fast_seconds:.3f}s ({result.speedup:.1f}x)"
+        )
+        for mismatch in result.mismatches[:3]:
+            print(f"{'':>18}{mismatch}")
+    if args.json is not None:
+        with open(args.json, "w") as json_file:
+            json.dump([result.to_dict() for result in results], json_file, indent=2)
+    return 0 if all(result.ok for result in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
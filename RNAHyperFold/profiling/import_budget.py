@@ -0,0 +1,108 @@
+import argparse
+import json
+import subprocess
+import sys
+
+IMPORT_BUDGETS: dict[str, float] = {
+    "RNAHyperFold.hypergraph_folding.rna_folder": 0.5,
+    "RNAHyperFold.hypergraph_folding.pair_table": 0.75,
+    "RNAHyperFold.incidence_producers.vienna_incidence_producer": 0.5,
+    "RNAHyperFold.hypergraph_folding.temperature_hypergraph": 1.0,
+    "RNAHyperFold.rna_stats.rna_analyst": 1.0,
+    "RNAHyperFold.cli": 1.0,
+}
+"""Il tempo massimo di importazione, in secondi, dei moduli del percorso di folding."""
+
+HEAVY_MODULES: tuple[str, ...] = (
+    "hypernetx",
+    "matplotlib",
+    "forgi",
+    "networkx",
+    "pandas",
+)
+"""Le dipendenze pesanti che non devono essere importate insieme ai moduli del percorso di folding."""
+
+_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+heavy = [name for name in {heavy!r} if name in sys.modules]
+print(json.dumps({{"time": elapsed, "heavy": heavy}}))
+"""
+
+
+def measure_import(module: str, repeat: int = 3) -> dict:
+    """
+    Misura il tempo di importazione di un modulo in processi Python nuovi, così che nessun
+    modulo sia già in cache, e le dipendenze pesanti che l'importazione carica.
+
+    Args:
+        module (str): Il nome completo del modulo.
+        repeat (int): Il numero di misurazioni, viene tenuta la più veloce. Default è 3.
+
+    Returns:
+        dict: Il tempo di importazione in secondi ("time") e le dipendenze pesanti caricate ("heavy").
+    """
+    best = None
+    for _ in range(repeat):
+        output = subprocess.run(
+            [sys.executable, "-c", _PROBE.format(module=module, heavy=HEAVY_MODULES)],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        if best is None or result["time"] < best["time"]:
+            best = result
+    return best
+
+
+def check_budgets(budgets: dict[str, float] | None = None, repeat: int = 3) -> list:
+    """
+    Verifica che ogni modulo rispetti il proprio budget di importazione e non carichi dipendenze pesanti.
+
+    Args:
+        budgets (dict[str, float] | None): Il budget in secondi di ogni modulo. Default è IMPORT_BUDGETS.
+        repeat (int): Il numero di misurazioni per modulo. Default è 3.
+
+    Returns:
+        list: Le tuple (modulo, tempo, budget, dipendenze pesanti, esito) di ogni modulo.
+    """
+    results = []
+    for module, budget in (budgets or IMPORT_BUDGETS).items():
+        measure = measure_import(module, repeat)
+        ok = measure["time"] <= budget and len(measure["heavy"]) == 0
+        results.append((module, measure["time"], budget, measure["heavy"], ok))
+    return results
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Verifica il budget del tempo di importazione dei moduli di RNAHyperFold."
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=3,
+        help="Numero di misurazioni per modulo, viene tenuta la più veloce.",
+    )
+    parser.add_argument(
+        "--scale",
+        type=float,
+        default=1.0,
+        help="Fattore con cui moltiplicare i budget, per macchine più lente.",
+    )
+    args = parser.parse_args(argv)
+    budgets = {module: budget * args.scale for module, budget in IMPORT_BUDGETS.items()}
+    failed = 0
+    for module, elapsed, budget, heavy, ok in check_budgets(budgets, args.repeat):
+        failed += not ok
+        status = "ok" if ok else "FUORI BUDGET"
+        extra = f", dipendenze pesanti: {', '.join(heavy)}" if heavy else ""
+        print(f"{status:>12}  {module}: {elapsed:.3f}s / {budget:.3f}s{extra}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,308 @@
+import json
+import os
+import pickle
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager, nullcontext
+from functools import wraps
+
+try:
+    import resource
+except ImportError:  # piattaforme senza getrusage (Windows)
+    resource = None
+
+
+_NULL_CONTEXT = nullcontext()
+
+
+def _peak_rss() -> int:
+    """
+    Restituisce il picco di memoria residente del processo corrente in byte.
+
+    Returns:
+        int: Il picco di RSS, 0 se non misurabile sulla piattaforma corrente.
+    """
+    if resource is None:
+        return 0
+    # su Linux ru_maxrss è espresso in KB
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class StageRecord:
+    """Misurazione di una singola esecuzione di una fase della pipeline."""
+
+    __slots__ = ("stage", "start", "wall_time", "cpu_time", "peak_rss", "pid", "tid")
+
+    def __init__(
+        self,
+        stage: str,
+        start: float,
+        wall_time: float,
+        cpu_time: float,
+        peak_rss: int,
+        pid: int,
+        tid: int,
+    ) -> None:
+        """
+        Inizializza un'istanza della classe StageRecord.
+
+        Args:
+            stage (str): Il nome della fase misurata.
+            start (float): L'istante di inizio (epoch, in secondi).
+            wall_time (float): Il tempo reale impiegato, in secondi.
+            cpu_time (float): Il tempo di CPU impiegato, in secondi.
+            peak_rss (int): Il picco di memoria residente al termine della fase, in byte.
+            pid (int): Il processo in cui è stata eseguita la fase.
+            tid (int): Il thread in cui è stata eseguita la fase.
+        """
+        self.stage = stage
+        self.start = start
+        self.wall_time = wall_time
+        self.cpu_time = cpu_time
+        self.peak_rss = peak_rss
+        self.pid = pid
+        self.tid = tid
+
+    def __getstate__(self) -> tuple:
+        return tuple(getattr(self, slot) for slot in self.__slots__)
+
+    def __setstate__(self, state: tuple) -> None:
+        for slot, value in zip(self.__slots__, state):
+            setattr(self, slot, value)
+
+
+class StageProfiler:
+    """
+    Raccoglie tempi, memoria e contatori delle fasi della pipeline di folding.
+    Quando è disabilitato ogni misurazione si riduce al controllo di un flag.
+    """
+
+    def __init__(self) -> None:
+        """Inizializza un'istanza disabilitata della classe StageProfiler."""
+        self.enabled: bool = False
+        self.records: list[StageRecord] = []
+        self.counters: defaultdict = defaultdict(int)
+        self.__lock = threading.Lock()
+
+    def enable(self) -> None:
+        """Abilita la raccolta delle misurazioni."""
+        self.enabled = True
+
+    def disable(self) -> None:
+        """Disabilita la raccolta delle misurazioni."""
+        self.enabled = False
+
+    def reset(self) -> None:
+        """Elimina tutte le misurazioni raccolte."""
+        with self.__lock:
+            self.records = []
+            self.counters = defaultdict(int)
+
+    def stage(self, stage: str):
+        """
+        Restituisce un context manager che misura la fase indicata.
+
+        Args:
+            stage (str): Il nome della fase.
+
+        Returns:
+            Un context manager, privo di costo se il profiler è disabilitato.
+        """
+        if not self.enabled:
+            return _NULL_CONTEXT
+        return self.__measure(stage)
+
+    @contextmanager
+    def __measure(self, stage: str):
+        start = time.time()
+        wall = time.perf_counter()
+        # tempo di CPU del solo thread corrente, così che fasi eseguite in thread diversi non si sommino
+        cpu = time.thread_time()
+        try:
+            yield
+        finally:
+            record = StageRecord(
+                stage,
+                start,
+                time.perf_counter() - wall,
+                time.thread_time() - cpu,
+                _peak_rss(),
+                os.getpid(),
+                threading.get_ident(),
+            )
+            with self.__lock:
+                self.records.append(record)
+
+    def count(self, counter: str, amount: int = 1) -> None:
+        """
+        Incrementa un contatore (es. cache hit o byte serializzati).
+
+        Args:
+            counter (str): Il nome del contatore.
+            amount (int): L'incremento. Default è 1.
+        """
+        if not self.enabled:
+            return
+        with self.__lock:
+            self.counters[counter] += amount
+
+    def merge(self, records: list[StageRecord], counters: dict) -> None:
+        """
+        Unisce le misurazioni raccolte in un altro processo.
+
+        Args:
+            records (list[StageRecord]): Le misurazioni da aggiungere.
+            counters (dict): I contatori da sommare.
+        """
+        with self.__lock:
+            self.records.extend(records)
+            for counter, amount in counters.items():
+                self.counters[counter] += amount
+
+    def drain(self) -> tuple[list[StageRecord], dict]:
+        """
+        Restituisce ed elimina le misurazioni raccolte finora.
+
+        Returns:
+            tuple[list[StageRecord], dict]: Le misurazioni e i contatori.
+        """
+        with self.__lock:
+            records, counters = self.records, dict(self.counters)
+            self.records = []
+            self.counters = defaultdict(int)
+        return records, counters
+
+    def report(self) -> dict:
+        """
+        Restituisce un resoconto aggregato per fase.
+
+        Returns:
+            dict: Per ogni fase il numero di chiamate, il tempo reale e di CPU totale e medio,
+            il picco di RSS osservato e il numero di processi coinvolti; sotto la chiave
+            "counters" i contatori.
+        """
+        stages = {}
+        with self.__lock:
+            records = list(self.records)
+            counters = dict(self.counters)
+        for record in records:
+            stats = stages.setdefault(
+                record.stage,
+                {
+                    "calls": 0,
+                    "wall_time": 0.0,
+                    "cpu_time": 0.0,
+                    "peak_rss": 0,
+                    "processes": set(),
+                },
+            )
+            stats["calls"] += 1
+            stats["wall_time"] += record.wall_time
+            stats["cpu_time"] += record.cpu_time
+            stats["peak_rss"] = max(stats["peak_rss"], record.peak_rss)
+            stats["processes"].add(record.pid)
+        for stats in stages.values():
+            stats["mean_wall_time"] = stats["wall_time"] / stats["calls"]
+            stats["mean_cpu_time"] = stats["cpu_time"] / stats["calls"]
+            stats["processes"] = len(stats["processes"])
+        return {"stages": stages, "counters": counters}
+
+    def export_json(self, path: str) -> None:
+        """
+        Salva il resoconto aggregato in formato JSON.
+
+        Args:
+            path (str): Il percorso del file da scrivere.
+        """
+        with open(path, "w") as json_file:
+            json.dump(self.report(), json_file, indent=2)
+
+    def export_chrome_trace(self, path: str) -> None:
+        """
+        Salva le misurazioni nel formato Trace Event di Chrome (chrome://tracing, Perfetto).
+
+        Args:
+            path (str): Il percorso del file da scrivere.
+        """
+        with self.__lock:
+            records = list(self.records)
+            counters = dict(self.counters)
+        events = [
+            {
+                "name": record.stage,
+                "cat": "rnahyperfold",
+                "ph": "X",
+                "ts": record.start * 1e6,
+                "dur": record.wall_time * 1e6,
+                "pid": record.pid,
+                "tid": record.tid,
+                "args": {"cpu_time": record.cpu_time, "peak_rss": record.peak_rss},
+            }
+            for record in records
+        ]
+        with open(path, "w") as json_file:
+            json.dump(
+                {"traceEvents": events, "otherData": {"counters": counters}}, json_file
+            )
+
+
+PROFILER = StageProfiler()
+"""Profiler condiviso da tutto il processo."""
+
+
+def profiled(stage: str):
+    """
+    Decoratore che misura ogni chiamata della funzione come fase del profiler condiviso.
+
+    Args:
+        stage (str): Il nome della fase.
+    """
+
+    def decorator(function):
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            if not PROFILER.enabled:
+                return function(*args, **kwargs)
+            with PROFILER.stage(stage):
+                return function(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def profiled_call(function, argument) -> tuple:
+    """
+    Esegue una funzione in un processo worker raccogliendone le misurazioni,
+    da usare con executor.map quando il profiler del processo padre è abilitato.
+
+    Args:
+        function: La funzione da eseguire.
+        argument: L'argomento da passare alla funzione.
+
+    Returns:
+        tuple: Il risultato, le misurazioni e i contatori raccolti nel worker.
+    """
+    PROFILER.reset()
+    PROFILER.enable()
+    result = function(argument)
+    with PROFILER.stage("worker.pickle_result"):
+        PROFILER.count("worker.bytes_pickled", len(pickle.dumps(result)))
+    records, counters = PROFILER.drain()
+    return result, records, counters
+
+
+def collect_profiled_results(results):
+    """
+    Unisce al profiler condiviso le misurazioni restituite da profiled_call.
+
+    Args:
+        results: L'iterabile dei risultati di profiled_call.
+
+    Yields:
+        I risultati delle funzioni eseguite nei worker.
+    """
+    for result, records, counters in results:
+        PROFILER.merge(records, counters)
+        yield result
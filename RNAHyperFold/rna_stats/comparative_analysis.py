@@ -0,0 +1,347 @@
+from __future__ import annotations
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from RNAHyperFold.hypergraph_folding.pair_table import (
+    UNPAIRED,
+    pair_table_from_incidence_dict,
+)
+from RNAHyperFold.hypergraph_folding.rna_folder import RNAFolder
+from RNAHyperFold.hypergraph_folding.temperature_grid import (
+    Temperature,
+    temperature_range,
+)
+from RNAHyperFold.hypergraph_folding.temperature_hypergraph import (
+    MemoryOptimizedFoldingHypergraph,
+    TemperatureFoldingHypergraph,
+)
+from RNAHyperFold.incidence_producers.vienna_incidence_producer import (
+    ViennaIncidenceProducer,
+)
+from RNAHyperFold.lazy_modules import lazy_module
+from RNAHyperFold.profiling.stage_profiler import profiled
+from RNAHyperFold.rna_stats.rna_analyst import TemperatureFoldingStats
+
+Align = lazy_module("Bio.Align")
+
+GAP: int = -2
+"""Valore delle matrici per colonna per le specie con un gap nella colonna."""
+
+
+def _fold(task: tuple) -> dict:
+    """
+    Computa un folding, eseguito nei processi worker.
+
+    Args:
+        task (tuple): Il produttore di incidenze e la temperatura.
+
+    Returns:
+        dict: Il dizionario di incidenza.
+    """
+    producer, temperature = task
+    return dict(producer.get_temperature_incidence_dict(temperature))
+
+
+class SequenceAlignment:
+    """
+    Allineamento a stella di più sequenze rispetto a una sequenza di riferimento: ogni sequenza
+    è allineata globalmente al riferimento e le colonne sono le posizioni del riferimento.
+    I nucleotidi inseriti rispetto al riferimento non sono associati a nessuna colonna.
+    """
+
+    def __init__(
+        self,
+        sequences: dict[str, str],
+        reference: str | None = None,
+        aligner: Align.PairwiseAligner | None = None,
+    ) -> None:
+        """
+        Inizializza un'istanza della classe SequenceAlignment.
+
+        Args:
+            sequences (dict[str, str]): Le sequenze da allineare, indicizzate per nome.
+            reference (str | None): Il nome della sequenza di riferimento. Default è la prima sequenza.
+            aligner (Align.PairwiseAligner | None): L'allineatore da usare. Default è un allineamento globale
+                con penalità affini per i gap.
+        """
+        if len(sequences) == 0:
+            raise ValueError("Nessuna sequenza da allineare")
+        self.names: list[str] = list(sequences.keys())
+        self.sequences: dict[str, str] = sequences
+        self.reference: str = reference if reference is not None else self.names[0]
+        if aligner is None:
+            aligner = Align.PairwiseAligner()
+            aligner.mode = "global"
+            aligner.match_score = 2
+            aligner.mismatch_score = -1
+            aligner.open_gap_score = -4
+            aligner.extend_gap_score = -1
+        self.__aligner = aligner
+        self.n_columns: int = len(sequences[self.reference])
+        self.column_to_position: np.ndarray = np.full(
+            (len(self.names), self.n_columns), GAP, dtype=np.int32
+        )
+        self.position_to_column: dict[str, np.ndarray] = {}
+        for row, name in enumerate(self.names):
+            self.__align(row, name)
+
+    def __align(self, row: int, name: str) -> None:
+        """
+        Allinea una sequenza al riferimento e ne registra la corrispondenza con le colonne.
+
+        Args:
+            row (int): La riga della sequenza nella matrice delle colonne.
+            name (str): Il nome della sequenza.
+        """
+        sequence = self.sequences[name]
+        to_column = np.full(len(sequence), GAP, dtype=np.int32)
+        if name == self.reference or sequence == self.sequences[self.reference]:
+            to_column[:] = np.arange(len(sequence))
+        else:
+            alignment = self.__aligner.align(self.sequences[self.reference], sequence)[
+                0
+            ]
+            for (t_start, t_end), (q_start, _) in zip(*alignment.aligned):
+                to_column[q_start : q_start + t_end - t_start] = np.arange(
+                    t_start, t_end
+                )
+        self.position_to_column[name] = to_column
+        mapped = np.flatnonzero(to_column != GAP)
+        self.column_to_position[row, to_column[mapped]] = mapped
+
+    def row(self, name: str) -> int:
+        """
+        Restituisce la riga di una sequenza nelle matrici per colonna.
+
+        Args:
+            name (str): Il nome della sequenza.
+
+        Returns:
+            int: L'indice della riga.
+        """
+        return self.names.index(name)
+
+    def to_columns(self, name: str, values: np.ndarray, fill=np.nan) -> np.ndarray:
+        """
+        Riporta sulle colonne dell'allineamento un vettore indicizzato per nucleotide.
+
+        Args:
+            name (str): Il nome della sequenza.
+            values (np.ndarray): Un valore per ogni nucleotide della sequenza.
+            fill: Il valore delle colonne in cui la sequenza ha un gap.
+
+        Returns:
+            np.ndarray: Un valore per ogni colonna dell'allineamento.
+        """
+        values = np.asarray(values)
+        dtype = np.result_type(values.dtype, np.min_scalar_type(fill))
+        result = np.full(self.n_columns, fill, dtype=dtype)
+        to_column = self.position_to_column[name]
+        mapped = to_column != GAP
+        result[to_column[mapped]] = values[mapped]
+        return result
+
+
+class ComparativeFoldingAnalysis:
+    """
+    Classe che confronta i folding di sequenze omologhe a diverse temperature sulle colonne
+    di un allineamento. I folding di ogni sequenza distinta sono computati una sola volta,
+    in un unico pool di processi, e condivisi tra le analisi.
+    """
+
+    def __init__(
+        self,
+        sequences: dict[str, str],
+        reference: str | None = None,
+        temporal_hypergraph_factory=MemoryOptimizedFoldingHypergraph,
+        max_workers: int | None = None,
+    ) -> None:
+        """
+        Inizializza un'istanza della classe ComparativeFoldingAnalysis.
+
+        Args:
+            sequences (dict[str, str]): Le sequenze da confrontare, indicizzate per nome (es. specie).
+            reference (str | None): Il nome della sequenza di riferimento. Default è la prima sequenza.
+            temporal_hypergraph_factory: La classe dell'ipergrafo temporale usato per ogni sequenza.
+            max_workers (int | None): Il numero massimo di processi usati per i folding.
+        """
+        self.alignment = SequenceAlignment(sequences, reference)
+        self.__max_workers = max_workers
+        # sequenze identiche condividono lo stesso ipergrafo temporale
+        by_sequence: dict[str, TemperatureFoldingHypergraph] = {}
+        self.folds: dict[str, TemperatureFoldingHypergraph] = {}
+        for name, sequence in sequences.items():
+            if sequence not in by_sequence:
+                by_sequence[sequence] = TemperatureFoldingHypergraph(
+                    ViennaIncidenceProducer(RNAFolder(sequence)),
+                    temporal_hypergraph_factory(),
+                    max_workers=max_workers,
+                )
+            self.folds[name] = by_sequence[sequence]
+        self.__distinct: list[TemperatureFoldingHypergraph] = list(by_sequence.values())
+
+    @profiled("comparative.insert_temperature_range")
+    def insert_temperature_range(
+        self,
+        start_temperature: Temperature,
+        end_temperature: Temperature,
+        step: Temperature = 1,
+    ) -> None:
+        """
+        Computa in un unico pool di processi i folding mancanti di tutte le sequenze in un intervallo di temperature.
+
+        Args:
+            start_temperature (Temperature): La temperatura iniziale dell'intervallo.
+            end_temperature (Temperature): La temperatura finale dell'intervallo.
+            step (Temperature, opzionale): Il passo tra le temperature nell'intervallo, anche non intero. Default è 1.
+        """
+        temperatures = temperature_range(start_temperature, end_temperature, step)
+        tasks = [
+            (THG, temperature)
+            for THG in self.__distinct
+            for temperature in temperatures
+            if not THG.is_analyzed(temperature)
+        ]
+        if len(tasks) == 0:
+            return
+        workers = self.__max_workers or os.cpu_count() or 1
+        with ProcessPoolExecutor(max_workers=self.__max_workers) as executor:
+            results = executor.map(
+                _fold,
+                [(THG.producer, temperature) for THG, temperature in tasks],
+                chunksize=max(1, len(tasks) // (4 * workers)),
+            )
+            for (THG, temperature), incidence in zip(tasks, results):
+                THG.add_folding(temperature, incidence)
+
+    def pair_tables(self, temperature: Temperature) -> dict[str, np.ndarray]:
+        """
+        Restituisce le tabelle delle coppie di tutte le sequenze a una certa temperatura.
+
+        Args:
+            temperature (Temperature): La temperatura.
+
+        Returns:
+            dict[str, np.ndarray]: La tabella delle coppie di ogni sequenza.
+        """
+        self.insert_temperature_range(temperature, temperature)
+        tables = {}
+        for name, THG in self.folds.items():
+            sequence = self.alignment.sequences[name]
+            tables[name] = pair_table_from_incidence_dict(
+                THG.get_hypergraph(temperature).incidence_dict, len(sequence)
+            )
+        return tables
+
+    def column_pairing(self, temperature: Temperature) -> np.ndarray:
+        """
+        Restituisce, per ogni sequenza e colonna dell'allineamento, la colonna del nucleotide appaiato.
+
+        Args:
+            temperature (Temperature): La temperatura.
+
+        Returns:
+            np.ndarray: Una matrice sequenze × colonne con la colonna del nucleotide appaiato,
+            UNPAIRED se il nucleotide non è appaiato (o il suo compagno non è allineato) e GAP se la
+            sequenza ha un gap nella colonna.
+        """
+        tables = self.pair_tables(temperature)
+        result = np.full(
+            (len(self.alignment.names), self.alignment.n_columns), GAP, dtype=np.int32
+        )
+        for row, name in enumerate(self.alignment.names):
+            to_column = self.alignment.position_to_column[name]
+            table = tables[name]
+            partner_column = np.where(
+                table == UNPAIRED, UNPAIRED, to_column[np.maximum(table, 0)]
+            )
+            partner_column[partner_column == GAP] = UNPAIRED
+            result[row] = self.alignment.to_columns(name, partner_column, fill=GAP)
+        return result
+
+    def column_pairing_conservation(self, temperature: Temperature) -> np.ndarray:
+        """
+        Restituisce, per ogni colonna, la frazione di sequenze (senza gap nella colonna) che vi
+        formano la stessa coppia della sequenza di riferimento.
+
+        Args:
+            temperature (Temperature): La temperatura.
+
+        Returns:
+            np.ndarray: La conservazione delle coppie per colonna, tra 0 e 1.
+        """
+        pairing = self.column_pairing(temperature)
+        reference = pairing[self.alignment.row(self.alignment.reference)]
+        present = pairing != GAP
+        same = (pairing == reference[None, :]) & present
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return same.sum(axis=0) / present.sum(axis=0)
+
+    def column_paired_profile(
+        self,
+        start_temperature: Temperature,
+        end_temperature: Temperature,
+        step: Temperature = 1,
+    ) -> np.ndarray:
+        """
+        Restituisce, per ogni temperatura, sequenza e colonna, se il nucleotide è appaiato.
+
+        Args:
+            start_temperature (Temperature): La temperatura iniziale.
+            end_temperature (Temperature): La temperatura finale.
+            step (Temperature, opzionale): Il passo tra le temperature, anche non intero. Default è 1.
+
+        Returns:
+            np.ndarray: Una matrice temperature × sequenze × colonne con 1 se appaiato, 0 se non
+            appaiato e NaN in corrispondenza dei gap.
+        """
+        self.insert_temperature_range(start_temperature, end_temperature, step)
+        profile = []
+        for temperature in temperature_range(start_temperature, end_temperature, step):
+            pairing = self.column_pairing(temperature)
+            paired = (pairing != UNPAIRED).astype(float)
+            paired[pairing == GAP] = np.nan
+            profile.append(paired)
+        return np.stack(profile)
+
+    def column_sensibility(
+        self,
+        start_temperature: Temperature,
+        end_temperature: Temperature,
+        step: Temperature = 1,
+    ) -> np.ndarray:
+        """
+        Restituisce la sensibilità ai cambiamenti di struttura di ogni sequenza riportata sulle
+        colonne dell'allineamento, così da poter confrontare sequenze di lunghezza diversa.
+
+        Args:
+            start_temperature (Temperature): La temperatura iniziale.
+            end_temperature (Temperature): La temperatura finale.
+            step (Temperature, opzionale): Il passo tra le temperature, anche non intero. Default è 1.
+
+        Returns:
+            np.ndarray: Una matrice sequenze × colonne con la sensibilità, NaN in corrispondenza dei gap.
+        """
+        self.insert_temperature_range(start_temperature, end_temperature, step)
+        computed: dict[int, np.ndarray] = {}
+        for THG in self.__distinct:
+            counts = TemperatureFoldingStats(THG).get_nucleotide_sensibility_to_changes(
+                start_temperature, end_temperature, step=step
+            )
+            sensibility = np.zeros(len(THG.producer.sequence))
+            if len(counts) > 0:
+                nodes = np.fromiter(counts.keys(), dtype=np.int64)
+                sensibility[nodes] = np.fromiter(counts.values(), dtype=float)
+            computed[id(THG)] = sensibility
+        # le sensibilità di tutte le sequenze in un solo vettore, seguito da un NaN per i gap:
+        # la matrice per colonna si ottiene con un solo accesso indicizzato
+        arrays = [computed[id(self.folds[name])] for name in self.alignment.names]
+        starts = np.cumsum([0] + [len(array) for array in arrays[:-1]])
+        values = np.concatenate(arrays + [np.array([np.nan])])
+        positions = self.alignment.column_to_position
+        return values[
+            np.where(positions == GAP, len(values) - 1, positions + starts[:, None])
+        ]
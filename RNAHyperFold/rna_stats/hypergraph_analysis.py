@@ -1,6 +1,10 @@
+from __future__ import annotations
+
 from abc import ABC, abstractmethod
 
-import hypernetx as hnx
+from RNAHyperFold.lazy_modules import lazy_module
+
+hnx = lazy_module("hypernetx")
 
 
 class StructuralHypergraphAnalysis(ABC):
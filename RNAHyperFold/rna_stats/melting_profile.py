@@ -0,0 +1,322 @@
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from RNAHyperFold.hypergraph_folding.pair_table import UNPAIRED
+from RNAHyperFold.hypergraph_folding.temperature_grid import Temperature
+from RNAHyperFold.hypergraph_folding.temperature_hypergraph import (
+    TemperatureFoldingHypergraph,
+)
+from RNAHyperFold.profiling.stage_profiler import profiled
+from RNAHyperFold.rna_stats.structure_distance import StructureDistanceMatrix
+
+MODES = ("mfe", "ensemble", "interpolated")
+
+
+def helices(pair_table: np.ndarray) -> list[np.ndarray]:
+    """
+    Divide le coppie di una struttura in eliche, ovvero sequenze di coppie impilate.
+
+    Args:
+        pair_table (np.ndarray): La tabella delle coppie.
+
+    Returns:
+        list[np.ndarray]: Per ogni elica, la matrice k×2 delle sue coppie (i, j) con i < j.
+    """
+    result = []
+    current = []
+    for i in np.flatnonzero(pair_table > np.arange(len(pair_table))):
+        j = int(pair_table[i])
+        if len(current) > 0 and current[-1][0] == i - 1 and current[-1][1] == j + 1:
+            current.append((int(i), j))
+            continue
+        if len(current) > 0:
+            result.append(np.array(current, dtype=np.int32))
+        current = [(int(i), j)]
+    if len(current) > 0:
+        result.append(np.array(current, dtype=np.int32))
+    return result
+
+
+def melting_temperatures(
+    temperatures: np.ndarray,
+    values: np.ndarray,
+    threshold: float = 0.5,
+    interpolate: bool = False,
+) -> np.ndarray:
+    """
+    Calcola, per ogni colonna, la temperatura alla quale il valore scende definitivamente
+    sotto la soglia.
+
+    Args:
+        temperatures (np.ndarray): Le temperature, in ordine crescente.
+        values (np.ndarray): Matrice temperature × elementi dei valori (frazioni o probabilità di appaiamento).
+        threshold (float): La soglia.
+        interpolate (bool): Se True la temperatura viene interpolata linearmente tra le due
+            temperature a cavallo della soglia, altrimenti è la prima temperatura sotto la soglia.
+
+    Returns:
+        np.ndarray: La temperatura di melting di ogni colonna, NaN se la colonna non è mai sopra la
+        soglia o non scende sotto la soglia nell'intervallo.
+    """
+    temperatures = np.asarray(temperatures, dtype=float)
+    count = len(temperatures)
+    above = values >= threshold
+    last = count - 1 - np.argmax(above[::-1], axis=0)
+    melted = above.any(axis=0) & (last < count - 1)
+    result = np.full(values.shape[1], np.nan)
+    columns = np.flatnonzero(melted)
+    before = last[columns]
+    if not interpolate:
+        result[columns] = temperatures[before + 1]
+        return result
+    v0 = values[before, columns]
+    v1 = values[before + 1, columns]
+    t0 = temperatures[before]
+    t1 = temperatures[before + 1]
+    result[columns] = t0 + (v0 - threshold) / (v0 - v1) * (t1 - t0)
+    return result
+
+
+def _ensemble_probabilities(task: tuple) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Calcola le probabilità di appaiamento dell'ensemble a una temperatura, eseguito nei processi worker.
+
+    Args:
+        task (tuple): La sequenza, le condizioni del folding (temperatura inclusa) e la matrice k×2
+            delle coppie di cui restituire la probabilità.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: La probabilità di appaiamento di ogni nucleotide e di ogni coppia richiesta.
+    """
+    sequence, conditions, pairs = task
+    fc = conditions.fold_compound(sequence, partition=True)
+    _, mfe = fc.mfe()
+    fc.exp_params_rescale(mfe)
+    fc.pf()
+    # la matrice di ViennaRNA è triangolare superiore e indicizzata da 1
+    bpp = np.array(fc.bpp())[1:, 1:]
+    paired = bpp.sum(axis=0) + bpp.sum(axis=1)
+    return paired, bpp[pairs[:, 0], pairs[:, 1]]
+
+
+class MeltingResult:
+    """Risultato di un'analisi del melting: temperature di melting per nucleotide ed elica e curva di appaiamento."""
+
+    def __init__(
+        self,
+        mode: str,
+        temperatures: np.ndarray,
+        paired: np.ndarray,
+        helices: list[np.ndarray],
+        helix_paired: np.ndarray,
+        element_exit: np.ndarray | None,
+    ) -> None:
+        """
+        Inizializza un'istanza della classe MeltingResult.
+
+        Args:
+            mode (str): La modalità di calcolo, uno tra "mfe", "ensemble" e "interpolated".
+            temperatures (np.ndarray): Le temperature.
+            paired (np.ndarray): Matrice temperature × nucleotidi delle probabilità di appaiamento (0 o 1 in modalità "mfe").
+            helices (list[np.ndarray]): Le eliche della struttura di riferimento.
+            helix_paired (np.ndarray): Matrice temperature × eliche della frazione di coppie presenti.
+            element_exit (np.ndarray | None): Per ogni nucleotide la prima temperatura in cui non fa più
+                parte della struttura secondaria di partenza, solo in modalità "mfe".
+        """
+        self.mode: str = mode
+        self.temperatures: np.ndarray = temperatures
+        self.paired: np.ndarray = paired
+        self.helices: list[np.ndarray] = helices
+        self.helix_paired: np.ndarray = helix_paired
+        self.element_exit: np.ndarray | None = element_exit
+        interpolate = mode != "mfe"
+        self.base_melting: np.ndarray = melting_temperatures(
+            temperatures, paired, interpolate=interpolate
+        )
+        """La temperatura di melting di ogni nucleotide."""
+        self.helix_melting: np.ndarray = melting_temperatures(
+            temperatures, helix_paired, interpolate=interpolate
+        )
+        """La temperatura di melting di ogni elica: quella in cui perde più di metà delle coppie."""
+
+    @property
+    def fraction_paired(self) -> np.ndarray:
+        """La frazione di nucleotidi appaiati per ogni temperatura."""
+        return self.paired.mean(axis=1)
+
+    @property
+    def global_melting(self) -> float:
+        """La temperatura in cui la frazione di nucleotidi appaiati scende sotto la metà del valore iniziale."""
+        curve = self.fraction_paired
+        if curve[0] == 0:
+            return float("nan")
+        return float(
+            melting_temperatures(
+                self.temperatures,
+                (curve / curve[0])[:, None],
+                interpolate=self.mode != "mfe",
+            )[0]
+        )
+
+
+class MeltingProfile:
+    """Classe che calcola il profilo di melting di una sequenza a partire dai folding a diverse temperature."""
+
+    def __init__(
+        self,
+        THG: TemperatureFoldingHypergraph,
+        max_workers: int | None = None,
+        shared_memory: bool = False,
+    ) -> None:
+        """
+        Inizializza un'istanza della classe MeltingProfile.
+
+        Args:
+            THG (TemperatureFoldingHypergraph): L'ipergrafo temporale dei folding dell'RNA.
+            max_workers (int | None): Il numero massimo di processi per i calcoli dell'ensemble.
+            shared_memory (bool): Se True, i folding a energia minima mancanti vengono computati
+                con StructureDistanceMatrix in memoria condivisa. Default è False.
+        """
+        self.THG: TemperatureFoldingHypergraph = THG
+        self.__max_workers: int | None = max_workers
+        self.__shared_memory: bool = shared_memory
+
+    @profiled("melting_profile.compute")
+    def compute(
+        self,
+        start_temperature: Temperature,
+        end_temperature: Temperature,
+        mode: str = "mfe",
+        step: Temperature = 1,
+    ) -> MeltingResult:
+        """
+        Calcola il profilo di melting in un intervallo di temperature.
+
+        Args:
+            start_temperature (Temperature): La temperatura iniziale.
+            end_temperature (Temperature): La temperatura finale.
+            mode (str): "mfe" usa i folding a energia minima, "ensemble" le probabilità di appaiamento
+                dell'ensemble a ogni temperatura, "interpolated" computa solo i folding necessari a
+                individuare i punti di cambiamento, calcola l'ensemble ai due lati di ogni
+                cambiamento e interpola linearmente le altre temperature.
+            step (Temperature): Il passo tra le temperature, anche non intero. Default è 1.
+
+        Returns:
+            MeltingResult: Il profilo di melting.
+        """
+        if mode not in MODES:
+            raise ValueError(f"Modalità non supportata: {mode}, usare una tra {MODES}")
+        # in modalità interpolata anche i folding a energia minima sono computati solo
+        # quanto basta a individuare i punti di cambiamento
+        matrix = StructureDistanceMatrix(
+            self.THG,
+            start_temperature,
+            end_temperature,
+            step,
+            adaptive=mode == "interpolated",
+            shared_memory=self.__shared_memory,
+            max_workers=self.__max_workers,
+        )
+        change_points = matrix.change_points
+        temperatures = np.array(matrix.temperatures)
+        # una sola matrice temperature × nucleotidi, ottenuta espandendo le strutture distinte
+        pair_tables = matrix.pair_tables[matrix.structure_index]
+        reference_helices = helices(pair_tables[0])
+        pairs = (
+            np.concatenate(reference_helices)
+            if len(reference_helices) > 0
+            else np.zeros((0, 2), dtype=np.int32)
+        )
+        if mode == "mfe":
+            paired = (pair_tables != UNPAIRED).astype(float)
+            pair_probabilities = (
+                pair_tables[:, pairs[:, 0]] == pairs[None, :, 1]
+            ).astype(float)
+            labels = matrix.labels[matrix.structure_index]
+            element_exit = melting_temperatures(
+                temperatures, (labels == labels[0]).astype(float)
+            )
+        else:
+            sampled = temperatures
+            if change_points is not None:
+                # il folding cambia tra la temperatura campionata precedente e c: l'ensemble è
+                # calcolato ai due lati di ogni cambiamento
+                index = np.searchsorted(temperatures, change_points).astype(int)
+                sampled = np.unique(
+                    np.concatenate(
+                        [
+                            temperatures[[0, -1]],
+                            temperatures[index - 1],
+                            temperatures[index],
+                        ]
+                    )
+                )
+            paired, pair_probabilities = self.__ensemble(sampled.tolist(), pairs)
+            if len(sampled) != len(temperatures):
+                paired = self.__interpolate(temperatures, sampled, paired)
+                pair_probabilities = self.__interpolate(
+                    temperatures, sampled, pair_probabilities
+                )
+            element_exit = None
+        # frazione di coppie di ogni elica presenti a ogni temperatura
+        helix_paired = np.zeros((len(temperatures), len(reference_helices)))
+        begin = 0
+        for h, helix in enumerate(reference_helices):
+            end = begin + len(helix)
+            helix_paired[:, h] = pair_probabilities[:, begin:end].mean(axis=1)
+            begin = end
+        return MeltingResult(
+            mode, temperatures, paired, reference_helices, helix_paired, element_exit
+        )
+
+    def __ensemble(
+        self, temperatures: list[Temperature], pairs: np.ndarray
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Calcola in parallelo le probabilità di appaiamento dell'ensemble.
+
+        Args:
+            temperatures (list[Temperature]): Le temperature.
+            pairs (np.ndarray): Le coppie di cui restituire la probabilità.
+
+        Returns:
+            tuple[np.ndarray, np.ndarray]: Le matrici temperature × nucleotidi e temperature × coppie.
+        """
+        sequence = self.THG.producer.sequence
+        folder = self.THG.producer.folder
+        with ProcessPoolExecutor(max_workers=self.__max_workers) as executor:
+            results = list(
+                executor.map(
+                    _ensemble_probabilities,
+                    [(sequence, folder.conditions_at(t), pairs) for t in temperatures],
+                )
+            )
+        return (
+            np.array([paired for paired, _ in results]),
+            np.array([probabilities for _, probabilities in results]).reshape(
+                len(temperatures), len(pairs)
+            ),
+        )
+
+    @staticmethod
+    def __interpolate(
+        temperatures: np.ndarray, sampled: np.ndarray, values: np.ndarray
+    ) -> np.ndarray:
+        """
+        Interpola linearmente, colonna per colonna, valori calcolati su un sottoinsieme delle temperature.
+
+        Args:
+            temperatures (np.ndarray): Tutte le temperature.
+            sampled (np.ndarray): Le temperature a cui i valori sono stati calcolati.
+            values (np.ndarray): Matrice temperature campionate × colonne.
+
+        Returns:
+            np.ndarray: Matrice temperature × colonne.
+        """
+        positions = np.searchsorted(sampled, temperatures, side="right") - 1
+        positions = np.clip(positions, 0, len(sampled) - 2)
+        t0 = sampled[positions]
+        t1 = sampled[positions + 1]
+        weight = ((temperatures - t0) / (t1 - t0))[:, None]
+        return values[positions] * (1 - weight) + values[positions + 1] * weight
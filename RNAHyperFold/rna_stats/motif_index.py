@@ -0,0 +1,392 @@
+from __future__ import annotations
+
+import re
+
+import numpy as np
+
+from RNAHyperFold.hypergraph_folding.edge_model import PREFIXES, EdgeTable, EdgeType
+from RNAHyperFold.hypergraph_folding.fold_archive import FoldArchive
+from RNAHyperFold.hypergraph_folding.temperature_grid import Temperature
+from RNAHyperFold.hypergraph_folding.temperature_hypergraph import (
+    TemperatureFoldingHypergraph,
+)
+from RNAHyperFold.profiling.stage_profiler import PROFILER, profiled
+
+
+def _element_type(element_type: EdgeType | str) -> EdgeType:
+    """Converte il prefisso di un tipo di struttura secondaria (ad esempio "h") nel suo EdgeType."""
+    if not isinstance(element_type, str):
+        return EdgeType(element_type)
+    for edge_type, prefix in PREFIXES.items():
+        if prefix == element_type and edge_type.is_element:
+            return edge_type
+    raise ValueError(f"Tipo di struttura secondaria non valido: {element_type}")
+
+
+def _table_key(table: EdgeTable) -> tuple:
+    """Restituisce una chiave che identifica un folding dal contenuto della sua tabella degli iperarchi."""
+    return (
+        table.types.tobytes(),
+        table.indexes.tobytes(),
+        table.offsets.tobytes(),
+        table.nodes.tobytes(),
+        tuple(table.name(edge) for edge in table.of_type(EdgeType.OTHER).tolist()),
+    )
+
+
+class Motif:
+    """
+    Descrizione di un motivo strutturale: il tipo di una struttura secondaria, un intervallo
+    di dimensioni, un'espressione regolare sulla sua sequenza e, opzionalmente, un motivo che
+    deve essere soddisfatto da una struttura adiacente. Ad esempio un hairpin con un loop di
+    4-6 nucleotidi chiuso da uno stem di almeno 5 coppie è
+    Motif("h", 4, 6, neighbor=Motif("s", min_size=5)).
+    """
+
+    def __init__(
+        self,
+        element_type: EdgeType | str,
+        min_size: int | None = None,
+        max_size: int | None = None,
+        sequence: str | None = None,
+        neighbor: "Motif | None" = None,
+    ) -> None:
+        """
+        Inizializza un'istanza della classe Motif.
+
+        Args:
+            element_type (EdgeType | str): Il tipo della struttura, o il suo prefisso ("s", "h", "i", "m", "f", "t").
+            min_size (int | None): La dimensione minima: coppie di basi per gli stem, nucleotidi per le altre strutture.
+            max_size (int | None): La dimensione massima, inclusa.
+            sequence (str | None): Un'espressione regolare che deve corrispondere all'intera sequenza
+                della struttura, letta in ordine di posizione.
+            neighbor (Motif | None): Il motivo di una struttura adiacente, ad esempio lo stem che chiude un loop.
+        """
+        self.element_type: EdgeType = _element_type(element_type)
+        self.min_size: int | None = min_size
+        self.max_size: int | None = max_size
+        self.sequence: str | None = sequence
+        self.neighbor: Motif | None = neighbor
+
+    def __repr__(self) -> str:
+        return (
+            f"Motif({self.element_type.prefix!r}, {self.min_size}, {self.max_size}, "
+            f"{self.sequence!r}, {self.neighbor!r})"
+        )
+
+
+class MotifMatch:
+    """Un'occorrenza di un motivo: la struttura secondaria e gli intervalli di temperature in cui compare."""
+
+    __slots__ = (
+        "transcript",
+        "element",
+        "element_type",
+        "start",
+        "end",
+        "size",
+        "sequence",
+        "intervals",
+    )
+
+    def __init__(
+        self,
+        transcript: str,
+        element: str,
+        element_type: EdgeType,
+        start: int,
+        end: int,
+        size: int,
+        sequence: str,
+        intervals: list[tuple[Temperature, Temperature]],
+    ) -> None:
+        self.transcript: str = transcript
+        self.element: str = element
+        self.element_type: EdgeType = element_type
+        self.start: int = start
+        """La posizione del primo nucleotide della struttura."""
+        self.end: int = end
+        """La posizione dell'ultimo nucleotide della struttura, inclusa."""
+        self.size: int = size
+        self.sequence: str = sequence
+        self.intervals: list[tuple[Temperature, Temperature]] = intervals
+        """Gli intervalli di temperature consecutive in cui il folding contiene la struttura."""
+
+    def __repr__(self) -> str:
+        return (
+            f"MotifMatch({self.transcript!r}, {self.element!r}, {self.start}-{self.end}, "
+            f"{self.sequence!r}, {self.intervals})"
+        )
+
+
+class MotifIndex:
+    """
+    Indice delle strutture secondarie dei folding di più sweep di temperatura, per cercare
+    motivi strutturali senza ripercorrere gli ipergrafi. Ogni folding distinto di uno sweep
+    viene scomposto una sola volta nelle sue strutture secondarie, memorizzate in array
+    paralleli con tipo, dimensione, posizioni, sequenza e strutture adiacenti; il folding
+    conserva gli intervalli di temperature in cui compare. Le ricerche per tipo e dimensione
+    sono bisezioni su un ordinamento per tipo, le sequenze esatte sono cercate in un dizionario.
+    """
+
+    def __init__(self) -> None:
+        """Inizializza un indice vuoto."""
+        self.transcripts: list[str] = []
+        """I nomi degli sweep indicizzati, nell'ordine di inserimento."""
+        self.__intervals: list[list[tuple[Temperature, Temperature]]] = []
+        self.__structure_transcripts: list[int] = []
+        self.__structures: list[int] = []
+        self.__names: list[str] = []
+        self.__types: list[int] = []
+        self.__sizes: list[int] = []
+        self.__starts: list[int] = []
+        self.__ends: list[int] = []
+        self.__sequences: list[str] = []
+        self.__neighbors: list[np.ndarray] = []
+        self.__arrays: dict | None = None
+
+    def __len__(self) -> int:
+        return len(self.__names)
+
+    def __add_structure(
+        self,
+        transcript: int,
+        table: EdgeTable,
+        sequence: str,
+        intervals: list[tuple[Temperature, Temperature]],
+    ) -> None:
+        """Scompone un folding distinto nelle sue strutture secondarie e le aggiunge all'indice."""
+        structure = len(self.__intervals)
+        self.__intervals.append(intervals)
+        self.__structure_transcripts.append(transcript)
+        labels = table.node_index.element_labels
+        first_row = len(self.__names)
+        rows = {
+            int(edge): first_row + i for i, edge in enumerate(table.element_edges())
+        }
+        for edge in rows:
+            nodes = np.sort(table.edge_nodes(edge))
+            edge_type = EdgeType(table.types[edge])
+            adjacent = np.concatenate((nodes - 1, nodes + 1))
+            adjacent = adjacent[(adjacent >= 0) & (adjacent < len(labels))]
+            neighbors = set(labels[adjacent].tolist()).difference((-1, edge))
+            self.__structures.append(structure)
+            self.__names.append(table.name(edge))
+            self.__types.append(int(edge_type))
+            self.__sizes.append(
+                len(nodes) // 2 if edge_type == EdgeType.STEM else len(nodes)
+            )
+            self.__starts.append(int(nodes[0]))
+            self.__ends.append(int(nodes[-1]))
+            self.__sequences.append(
+                "".join(sequence[p] for p in nodes.tolist()) if sequence else ""
+            )
+            self.__neighbors.append(
+                np.array(sorted(rows[n] for n in neighbors), dtype=np.int64)
+            )
+        self.__arrays = None
+
+    @profiled("motif_index.add")
+    def add_sweep(self, name: str, THG: TemperatureFoldingHypergraph) -> None:
+        """
+        Aggiunge all'indice i folding già computati di uno sweep.
+
+        Args:
+            name (str): Il nome con cui lo sweep compare nei risultati, ad esempio l'id del trascritto.
+            THG (TemperatureFoldingHypergraph): L'ipergrafo dei folding.
+        """
+        transcript = len(self.transcripts)
+        self.transcripts.append(name)
+        # intervalli di temperature consecutive con lo stesso folding, un solo folding per
+        # contenuto: non tutti gli ipergrafi temporali condividono la tabella tra le temperature
+        runs: dict[tuple, tuple[EdgeTable, list]] = {}
+        known: dict[int, tuple] = {}
+        previous = None
+        for temperature in THG.analyzed_temperatures():
+            table = THG.get_edge_table(temperature)
+            key = known.get(id(table))
+            if key is None:
+                key = known.setdefault(id(table), _table_key(table))
+            table_runs = runs.setdefault(key, (table, []))[1]
+            if previous == key:
+                table_runs[-1] = (table_runs[-1][0], temperature)
+            else:
+                table_runs.append((temperature, temperature))
+            previous = key
+        for table, intervals in runs.values():
+            self.__add_structure(transcript, table, THG.producer.sequence, intervals)
+        PROFILER.count("motif_index.structures", len(runs))
+
+    @profiled("motif_index.add")
+    def add_archive(self, name: str, archive: FoldArchive) -> None:
+        """
+        Aggiunge all'indice i folding di un archivio binario, leggendo le tabelle degli
+        iperarchi senza costruire gli ipergrafi.
+
+        Args:
+            name (str): Il nome con cui lo sweep compare nei risultati.
+            archive (FoldArchive): L'archivio aperto.
+        """
+        transcript = len(self.transcripts)
+        self.transcripts.append(name)
+        intervals: dict[int, list] = {}
+        for interval, structure in archive.intervals():
+            intervals.setdefault(structure, []).append(interval)
+        for structure, structure_intervals in intervals.items():
+            self.__add_structure(
+                transcript,
+                archive.structure_table(structure),
+                archive.sequence,
+                structure_intervals,
+            )
+        PROFILER.count("motif_index.structures", len(intervals))
+
+    @classmethod
+    def from_sweeps(
+        cls, sweeps: dict[str, TemperatureFoldingHypergraph | FoldArchive]
+    ) -> "MotifIndex":
+        """
+        Costruisce l'indice di un insieme di sweep.
+
+        Args:
+            sweeps (dict[str, TemperatureFoldingHypergraph | FoldArchive]): Gli sweep, indicizzati per nome.
+
+        Returns:
+            MotifIndex: L'indice.
+        """
+        index = cls()
+        for name, sweep in sweeps.items():
+            if isinstance(sweep, FoldArchive):
+                index.add_archive(name, sweep)
+            else:
+                index.add_sweep(name, sweep)
+        return index
+
+    def __index(self) -> dict:
+        """Restituisce gli array dell'indice, ricostruendoli dopo un'aggiunta."""
+        if self.__arrays is None:
+            with PROFILER.stage("motif_index.build"):
+                types = np.array(self.__types, dtype=np.int64)
+                sizes = np.array(self.__sizes, dtype=np.int64)
+                # ordinamento per tipo e dimensione: ogni tipo è un blocco contiguo ordinato per dimensione
+                order = np.lexsort((sizes, types))
+                neighbor_counts = [len(ids) for ids in self.__neighbors]
+                by_sequence: dict[tuple[int, str], list[int]] = {}
+                for row, key in enumerate(zip(self.__types, self.__sequences)):
+                    by_sequence.setdefault(key, []).append(row)
+                self.__arrays = {
+                    "types": types,
+                    "sizes": sizes,
+                    "order": order,
+                    "sorted_types": types[order],
+                    "sorted_sizes": sizes[order],
+                    "neighbor_owners": np.repeat(
+                        np.arange(len(types)), neighbor_counts
+                    ),
+                    "neighbor_ids": (
+                        np.concatenate(self.__neighbors)
+                        if len(self.__neighbors) > 0
+                        else np.zeros(0, dtype=np.int64)
+                    ),
+                    "by_sequence": by_sequence,
+                }
+        return self.__arrays
+
+    def __matching(self, motif: Motif) -> np.ndarray:
+        """Restituisce la maschera delle strutture che soddisfano un motivo."""
+        arrays = self.__index()
+        mask = np.zeros(len(self), dtype=bool)
+        if motif.sequence is not None and re.escape(motif.sequence) == motif.sequence:
+            # sequenza letterale: ricerca esatta nel dizionario
+            rows = arrays["by_sequence"].get(
+                (int(motif.element_type), motif.sequence), []
+            )
+            mask[rows] = True
+            low = -np.inf if motif.min_size is None else motif.min_size
+            high = np.inf if motif.max_size is None else motif.max_size
+            mask &= (arrays["sizes"] >= low) & (arrays["sizes"] <= high)
+        else:
+            block = (
+                np.searchsorted(
+                    arrays["sorted_types"], int(motif.element_type), "left"
+                ),
+                np.searchsorted(
+                    arrays["sorted_types"], int(motif.element_type), "right"
+                ),
+            )
+            sizes = arrays["sorted_sizes"][block[0] : block[1]]
+            first = block[0] + (
+                0
+                if motif.min_size is None
+                else np.searchsorted(sizes, motif.min_size, "left")
+            )
+            last = block[0] + (
+                len(sizes)
+                if motif.max_size is None
+                else np.searchsorted(sizes, motif.max_size, "right")
+            )
+            rows = arrays["order"][first:last]
+            if motif.sequence is not None:
+                pattern = re.compile(motif.sequence)
+                rows = [
+                    row
+                    for row in rows.tolist()
+                    if pattern.fullmatch(self.__sequences[row]) is not None
+                ]
+            mask[rows] = True
+        if motif.neighbor is not None:
+            neighbor_mask = self.__matching(motif.neighbor)
+            hits = arrays["neighbor_owners"][neighbor_mask[arrays["neighbor_ids"]]]
+            mask &= np.bincount(hits, minlength=len(self)) > 0
+        return mask
+
+    @profiled("motif_index.search")
+    def search(
+        self, motif: Motif, transcripts: list[str] | None = None
+    ) -> list[MotifMatch]:
+        """
+        Cerca le occorrenze di un motivo in tutti i folding indicizzati.
+
+        Args:
+            motif (Motif): Il motivo da cercare.
+            transcripts (list[str] | None): Gli sweep in cui cercare. Default sono tutti.
+
+        Returns:
+            list[MotifMatch]: Le occorrenze, in ordine di sweep, folding e posizione.
+        """
+        rows = np.flatnonzero(self.__matching(motif)).tolist()
+        selected = None if transcripts is None else set(transcripts)
+        matches = []
+        for row in rows:
+            structure = self.__structures[row]
+            transcript = self.transcripts[self.__structure_transcripts[structure]]
+            if selected is not None and transcript not in selected:
+                continue
+            matches.append(
+                MotifMatch(
+                    transcript,
+                    self.__names[row],
+                    EdgeType(self.__types[row]),
+                    self.__starts[row],
+                    self.__ends[row],
+                    self.__sizes[row],
+                    self.__sequences[row],
+                    list(self.__intervals[structure]),
+                )
+            )
+        return matches
+
+    def count(self, motif: Motif) -> dict[str, int]:
+        """
+        Conta le occorrenze di un motivo in ogni sweep, contando una volta ogni folding distinto.
+
+        Args:
+            motif (Motif): Il motivo da cercare.
+
+        Returns:
+            dict[str, int]: Il numero di occorrenze di ogni sweep con almeno un'occorrenza.
+        """
+        counts: dict[str, int] = {}
+        for match in self.search(motif):
+            counts[match.transcript] = counts.get(match.transcript, 0) + 1
+        return counts
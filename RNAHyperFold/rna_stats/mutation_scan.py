@@ -0,0 +1,456 @@
+from __future__ import annotations
+
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from ViennaRNA import RNA
+
+from RNAHyperFold.hypergraph_folding.folding_conditions import FoldingConditions
+from RNAHyperFold.hypergraph_folding.pair_table import (
+    base_pair_distance,
+    dotbracket_from_pair_table,
+    pair_table_from_dotbracket,
+    pair_table_from_incidence_dict,
+)
+from RNAHyperFold.hypergraph_folding.rna_folder import RNAFolder
+from RNAHyperFold.hypergraph_folding.temperature_grid import (
+    Temperature,
+    temperature_range,
+)
+from RNAHyperFold.hypergraph_folding.temperature_hypergraph import (
+    MemoryOptimizedFoldingHypergraph,
+    TemperatureFoldingHypergraph,
+)
+from RNAHyperFold.incidence_producers.vienna_incidence_producer import (
+    ViennaIncidenceProducer,
+)
+from RNAHyperFold.lazy_modules import lazy_module
+from RNAHyperFold.profiling.stage_profiler import PROFILER, profiled
+
+forgi = lazy_module("forgi")
+
+NUCLEOTIDES = "ACGU"
+
+# stato dei processi worker, inizializzato una sola volta per processo da _init_worker
+_STATE: dict = {}
+
+
+def fold_sequence(
+    sequence: str,
+    temperature: Temperature,
+    enforce_closing_pair: bool = False,
+    conditions: FoldingConditions | None = None,
+) -> str:
+    """
+    Computa il folding di una sequenza con un fold compound dedicato, senza modificare
+    la temperatura globale di ViennaRNA.
+
+    Args:
+        sequence (str): La sequenza da foldare.
+        temperature (Temperature): La temperatura del folding.
+        enforce_closing_pair (bool): Se True, il primo e l'ultimo nucleotide sono forzati ad appaiarsi.
+        conditions (FoldingConditions | None): Le condizioni del folding, di cui viene ignorata la
+            temperatura. Default sono quelle predefinite.
+
+    Returns:
+        str: La rappresentazione punto-parentesi del folding.
+    """
+    conditions = conditions if conditions is not None else FoldingConditions()
+    fc = conditions.with_temperature(temperature).fold_compound(sequence)
+    if enforce_closing_pair:
+        fc.hc_add_bp(
+            1,
+            len(sequence),
+            RNA.CONSTRAINT_CONTEXT_ENFORCE | RNA.CONSTRAINT_CONTEXT_ALL_LOOPS,
+        )
+    dotbracket, _ = fc.mfe()
+    return dotbracket
+
+
+def element_labels(dotbracket: str, names: dict[str, int]) -> np.ndarray:
+    """
+    Restituisce, per ogni nucleotide, la struttura secondaria di cui fa parte, con gli stessi
+    nomi degli iperarchi prodotti da ViennaIncidenceProducer.
+
+    Args:
+        dotbracket (str): La rappresentazione punto-parentesi.
+        names (dict[str, int]): Il dizionario che assegna un codice intero a ogni nome, viene esteso con i nuovi nomi.
+
+    Returns:
+        np.ndarray: Il codice del nome della struttura di ogni nucleotide.
+    """
+    cg = forgi.load_rna(dotbracket, allow_many=False)
+    elements, numbers = cg.to_element_string(with_numbers=True).split("\n")[:2]
+    return np.fromiter(
+        (
+            names.setdefault(f"{element}_{number}", len(names))
+            for element, number in zip(elements, numbers)
+        ),
+        dtype=np.int32,
+        count=len(dotbracket),
+    )
+
+
+def changed_nucleotides(labels: np.ndarray, next_labels: np.ndarray) -> np.ndarray:
+    """
+    Individua i nucleotidi che cambiano struttura tra due folding, con lo stesso criterio di
+    RnaAnalyst.get_nucleotides_change_structure: un nucleotide cambia se la sua struttura
+    esiste ancora nel secondo folding ma non lo contiene più.
+
+    Args:
+        labels (np.ndarray): I codici delle strutture del primo folding.
+        next_labels (np.ndarray): I codici delle strutture del secondo folding.
+
+    Returns:
+        np.ndarray: Una maschera booleana dei nucleotidi che cambiano struttura.
+    """
+    return (labels != next_labels) & np.isin(labels, next_labels)
+
+
+def _sensibility(labels: list[np.ndarray]) -> np.ndarray:
+    """
+    Conta, per ogni nucleotide, i cambiamenti di struttura tra temperature consecutive,
+    sugli stessi intervalli di TemperatureFoldingStats.get_nucleotide_sensibility_to_changes.
+
+    Args:
+        labels (list[np.ndarray]): I codici delle strutture per ogni temperatura.
+
+    Returns:
+        np.ndarray: Il numero di cambiamenti di ogni nucleotide.
+    """
+    counts = np.zeros(len(labels[0]), dtype=np.int32)
+    for i in range(1, len(labels) - 1):
+        if labels[i] is labels[i + 1]:
+            continue
+        counts += changed_nucleotides(labels[i], labels[i + 1])
+    return counts
+
+
+def _init_worker(
+    sequence: str,
+    temperatures: list[Temperature],
+    wild_type: list[str],
+    local_window: int,
+    conditions: FoldingConditions,
+) -> None:
+    """
+    Inizializza lo stato di un processo worker con i folding della sequenza originale.
+
+    Args:
+        sequence (str): La sequenza originale.
+        temperatures (list[Temperature]): Le temperature della scansione.
+        wild_type (list[str]): I folding della sequenza originale per ogni temperatura.
+        local_window (int): La lunghezza massima delle regioni ripiegate localmente.
+        conditions (FoldingConditions): Le condizioni dei folding della sequenza originale.
+    """
+    _STATE["sequence"] = sequence
+    _STATE["temperatures"] = temperatures
+    _STATE["wild_type"] = wild_type
+    _STATE["pair_tables"] = [pair_table_from_dotbracket(db) for db in wild_type]
+    _STATE["local_window"] = local_window
+    _STATE["conditions"] = conditions
+    _STATE["names"] = {}
+    _STATE["labels"] = {}
+
+
+def _local_region(pair_table: np.ndarray, position: int, window: int) -> tuple | None:
+    """
+    Restituisce la coppia più esterna che racchiude una posizione e delimita una regione
+    non più lunga della finestra.
+
+    Args:
+        pair_table (np.ndarray): La tabella delle coppie.
+        position (int): La posizione mutata.
+        window (int): La lunghezza massima della regione.
+
+    Returns:
+        tuple | None: Gli estremi della regione, None se nessuna coppia è adatta.
+    """
+    indexes = np.arange(len(pair_table))
+    candidates = np.flatnonzero(
+        (indexes < position) & (pair_table > position) & (pair_table - indexes < window)
+    )
+    if len(candidates) == 0:
+        return None
+    start = int(candidates[0])
+    return start, int(pair_table[start])
+
+
+def _labels(dotbracket: str) -> np.ndarray:
+    """Restituisce i codici delle strutture di un folding, memorizzandoli per il processo."""
+    labels = _STATE["labels"].get(dotbracket)
+    if labels is None:
+        labels = element_labels(dotbracket, _STATE["names"])
+        _STATE["labels"][dotbracket] = labels
+    return labels
+
+
+def _scan_variant(variant: tuple[int, str]) -> tuple:
+    """
+    Computa i folding di una variante a tutte le temperature della scansione.
+
+    Args:
+        variant (tuple[int, str]): La posizione mutata e il nuovo nucleotide.
+
+    Returns:
+        tuple: Le distanze dai folding originali, i folding computati localmente e la sensibilità per nucleotide.
+    """
+    position, nucleotide = variant
+    sequence = _STATE["sequence"]
+    mutant = sequence[:position] + nucleotide + sequence[position + 1 :]
+    window = _STATE["local_window"]
+    count = len(_STATE["temperatures"])
+    distances = np.zeros(count, dtype=np.int32)
+    local = np.zeros(count, dtype=bool)
+    labels = []
+    previous = None
+    for t, temperature in enumerate(_STATE["temperatures"]):
+        wild_type = _STATE["wild_type"][t]
+        region = (
+            _local_region(_STATE["pair_tables"][t], position, window)
+            if window > 0
+            else None
+        )
+        if region is None:
+            dotbracket = fold_sequence(
+                mutant, temperature, conditions=_STATE["conditions"]
+            )
+        else:
+            start, end = region
+            inner = fold_sequence(
+                mutant[start : end + 1], temperature, True, _STATE["conditions"]
+            )
+            dotbracket = wild_type[:start] + inner + wild_type[end + 1 :]
+            local[t] = True
+        distances[t] = base_pair_distance(
+            _STATE["pair_tables"][t], pair_table_from_dotbracket(dotbracket)
+        )
+        if dotbracket != previous:
+            labels.append(_labels(dotbracket))
+        else:
+            labels.append(labels[-1])
+        previous = dotbracket
+    return distances, local, _sensibility(labels)
+
+
+class MutationScanResult:
+    """Risultati di una scansione delle mutazioni puntiformi, in array compatti indicizzati per variante."""
+
+    def __init__(
+        self,
+        sequence: str,
+        temperatures: list[Temperature],
+        positions: np.ndarray,
+        nucleotides: np.ndarray,
+        distances: np.ndarray,
+        local: np.ndarray,
+        sensibility: np.ndarray,
+        wild_type_sensibility: np.ndarray,
+    ) -> None:
+        """
+        Inizializza un'istanza della classe MutationScanResult.
+
+        Args:
+            sequence (str): La sequenza originale.
+            temperatures (list[Temperature]): Le temperature della scansione.
+            positions (np.ndarray): La posizione mutata di ogni variante (a partire da 0).
+            nucleotides (np.ndarray): Il nuovo nucleotide di ogni variante.
+            distances (np.ndarray): Matrice varianti × temperature delle distanze dai folding originali.
+            local (np.ndarray): Matrice varianti × temperature che indica i folding computati localmente.
+            sensibility (np.ndarray): Matrice varianti × nucleotidi delle sensibilità ai cambiamenti di struttura.
+            wild_type_sensibility (np.ndarray): La sensibilità di ogni nucleotide della sequenza originale.
+        """
+        self.sequence: str = sequence
+        self.temperatures: list[Temperature] = temperatures
+        self.positions: np.ndarray = positions
+        self.nucleotides: np.ndarray = nucleotides
+        self.distances: np.ndarray = distances
+        self.local: np.ndarray = local
+        self.sensibility: np.ndarray = sensibility
+        self.wild_type_sensibility: np.ndarray = wild_type_sensibility
+
+    @property
+    def sensibility_deltas(self) -> np.ndarray:
+        """Matrice varianti × nucleotidi delle differenze di sensibilità rispetto alla sequenza originale."""
+        return self.sensibility - self.wild_type_sensibility[None, :]
+
+    def variant_names(self) -> list[str]:
+        """
+        Restituisce i nomi delle varianti nella notazione usuale, ad esempio "G12A" (posizioni a partire da 1).
+
+        Returns:
+            list[str]: I nomi delle varianti.
+        """
+        return [
+            f"{self.sequence[position]}{position + 1}{nucleotide}"
+            for position, nucleotide in zip(self.positions, self.nucleotides)
+        ]
+
+    def most_disruptive(self, n: int = 10) -> list[tuple[str, int]]:
+        """
+        Restituisce le varianti con la maggiore distanza totale dai folding originali.
+
+        Args:
+            n (int): Il numero di varianti da restituire.
+
+        Returns:
+            list[tuple[str, int]]: Le coppie (nome della variante, distanza totale).
+        """
+        totals = self.distances.sum(axis=1)
+        names = self.variant_names()
+        return [
+            (names[i], int(totals[i])) for i in np.argsort(-totals, kind="stable")[:n]
+        ]
+
+
+class MutationScan:
+    """
+    Classe che computa i folding di tutte le mutazioni puntiformi di una sequenza in un
+    intervallo di temperature, distribuendo le varianti su più processi.
+    I folding della sequenza originale vengono riutilizzati se già computati e ogni variante
+    viene ripiegata per intero. Con local_window > 0, quando la mutazione cade all'interno di
+    una coppia che delimita una regione abbastanza piccola, viene ripiegata solo quella regione
+    mantenendo il resto del folding originale: è un'approssimazione, perché il folding così
+    ottenuto non è in generale quello a energia minima della variante, e può cambiare
+    sensibilmente distanze, sensibilità e ordinamento delle varianti.
+    """
+
+    def __init__(
+        self,
+        wild_type: TemperatureFoldingHypergraph | str,
+        local_window: int = 0,
+        max_workers: int | None = None,
+        conditions: FoldingConditions | None = None,
+    ) -> None:
+        """
+        Inizializza un'istanza della classe MutationScan.
+
+        Args:
+            wild_type (TemperatureFoldingHypergraph | str): L'ipergrafo dei folding della sequenza
+                originale, i cui folding già computati vengono riutilizzati, oppure la sequenza.
+            local_window (int): La lunghezza massima delle regioni ripiegate localmente, in modo
+                approssimato. Default è 0, che ripiega sempre l'intera sequenza.
+            max_workers (int | None): Il numero massimo di processi. Default è il numero di CPU.
+            conditions (FoldingConditions | None): Le condizioni dei folding se wild_type è una
+                sequenza; altrimenti si usano quelle del suo produttore. Default sono quelle predefinite.
+        """
+        if isinstance(wild_type, str):
+            wild_type = TemperatureFoldingHypergraph(
+                ViennaIncidenceProducer(RNAFolder(wild_type, conditions)),
+                MemoryOptimizedFoldingHypergraph(),
+                max_workers=max_workers,
+            )
+        self.THG: TemperatureFoldingHypergraph = wild_type
+        self.sequence: str = wild_type.producer.sequence
+        self.local_window: int = local_window
+        self.__max_workers: int | None = max_workers
+
+    def variants(self, positions: list[int] | None = None) -> list[tuple[int, str]]:
+        """
+        Enumera le mutazioni puntiformi della sequenza.
+
+        Args:
+            positions (list[int] | None): Le posizioni da mutare. Default sono tutte le posizioni.
+
+        Returns:
+            list[tuple[int, str]]: Le coppie (posizione, nuovo nucleotide).
+        """
+        if positions is None:
+            positions = range(len(self.sequence))
+        return [
+            (position, nucleotide)
+            for position in positions
+            for nucleotide in NUCLEOTIDES
+            if nucleotide != self.sequence[position]
+        ]
+
+    def __wild_type_folds(self, temperatures: list[Temperature]) -> list[str]:
+        """
+        Restituisce i folding della sequenza originale, computando solo quelli mancanti.
+
+        Args:
+            temperatures (list[Temperature]): Le temperature.
+
+        Returns:
+            list[str]: Le rappresentazioni punto-parentesi per ogni temperatura.
+        """
+        missing = [t for t in temperatures if not self.THG.is_analyzed(t)]
+        PROFILER.count(
+            "mutation_scan.wild_type_reused", len(temperatures) - len(missing)
+        )
+        if len(missing) > 0:
+            self.THG.insert_temperatures(missing)
+        return [
+            dotbracket_from_pair_table(
+                pair_table_from_incidence_dict(
+                    self.THG.get_hypergraph(t).incidence_dict, len(self.sequence)
+                )
+            )
+            for t in temperatures
+        ]
+
+    @profiled("mutation_scan.run")
+    def run(
+        self,
+        start_temperature: Temperature,
+        end_temperature: Temperature,
+        step: Temperature = 1,
+        positions: list[int] | None = None,
+    ) -> MutationScanResult:
+        """
+        Computa i folding di tutte le varianti nell'intervallo di temperature.
+
+        Args:
+            start_temperature (Temperature): La temperatura iniziale.
+            end_temperature (Temperature): La temperatura finale.
+            step (Temperature, opzionale): Il passo tra le temperature, anche non intero. Default è 1.
+            positions (list[int] | None): Le posizioni da mutare. Default sono tutte le posizioni.
+
+        Returns:
+            MutationScanResult: Le distanze e le sensibilità di ogni variante.
+        """
+        temperatures = temperature_range(start_temperature, end_temperature, step)
+        wild_type = self.__wild_type_folds(temperatures)
+        names: dict[str, int] = {}
+        cache: dict[str, np.ndarray] = {}
+        for dotbracket in wild_type:
+            if dotbracket not in cache:
+                cache[dotbracket] = element_labels(dotbracket, names)
+        wild_type_labels = [cache[dotbracket] for dotbracket in wild_type]
+        variants = self.variants(positions)
+        n = len(self.sequence)
+        distances = np.zeros((len(variants), len(temperatures)), dtype=np.int32)
+        local = np.zeros((len(variants), len(temperatures)), dtype=bool)
+        sensibility = np.zeros((len(variants), n), dtype=np.int32)
+        # le varianti sono ripiegate nelle stesse condizioni della sequenza originale
+        initargs = (
+            self.sequence,
+            temperatures,
+            wild_type,
+            self.local_window,
+            self.THG.producer.folder.conditions,
+        )
+        with ProcessPoolExecutor(
+            max_workers=self.__max_workers,
+            initializer=_init_worker,
+            initargs=initargs,
+        ) as executor:
+            results = executor.map(
+                _scan_variant, variants, chunksize=max(1, len(variants) // 64)
+            )
+            for i, (variant_distances, variant_local, counts) in enumerate(results):
+                distances[i] = variant_distances
+                local[i] = variant_local
+                sensibility[i] = counts
+        PROFILER.count("mutation_scan.folds", distances.size)
+        PROFILER.count("mutation_scan.local_folds", int(local.sum()))
+        return MutationScanResult(
+            self.sequence,
+            temperatures,
+            np.array([position for position, _ in variants], dtype=np.int32),
+            np.array([nucleotide for _, nucleotide in variants], dtype="<U1"),
+            distances,
+            local,
+            sensibility,
+            _sensibility(wild_type_labels),
+        )
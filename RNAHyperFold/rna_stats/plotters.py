@@ -0,0 +1,658 @@
+from __future__ import annotations
+
+import os
+from collections import OrderedDict, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from statistics import mean
+
+import numpy as np
+
+from RNAHyperFold.hypergraph_folding.pair_table import (
+    UNPAIRED,
+    pair_table_from_incidence_dict,
+)
+from RNAHyperFold.lazy_modules import lazy_module
+from RNAHyperFold.rna_stats.structure_layout import (
+    compute_layout,
+    element_regions,
+    element_spans,
+)
+
+hnx = lazy_module("hypernetx")
+plt = lazy_module("matplotlib.pyplot")
+backend_agg = lazy_module("matplotlib.backends.backend_agg")
+mpl_collections = lazy_module("matplotlib.collections")
+figure = lazy_module("matplotlib.figure")
+
+_LAYOUT_CACHE_SIZE = 128
+_layout_cache: OrderedDict = OrderedDict()
+
+ELEMENT_COLORS = {
+    "s": "tab:green",
+    "h": "tab:blue",
+    "i": "tab:orange",
+    "m": "tab:red",
+    "f": "tab:gray",
+    "t": "tab:gray",
+}
+
+
+def _structure_key(HG: hnx.Hypergraph | dict) -> tuple:
+    """
+    Restituisce una chiave che identifica la struttura di un ipergrafo, usata per la cache dei layout.
+
+    Args:
+        HG (hnx.Hypergraph | dict): L'ipergrafo o il suo dizionario di incidenza.
+
+    Returns:
+        tuple: La chiave della struttura.
+    """
+    incidence_dict = HG if isinstance(HG, dict) else HG.incidence_dict
+    return tuple(sorted((str(k), tuple(v)) for k, v in incidence_dict.items()))
+
+
+def _cached_layout(key: tuple):
+    """Restituisce il layout memorizzato per una struttura, None se assente."""
+    pos = _layout_cache.get(key)
+    if pos is not None:
+        _layout_cache.move_to_end(key)
+    return pos
+
+
+def _store_layout(key: tuple, pos: dict) -> None:
+    """Memorizza il layout di una struttura, eliminando quello usato meno di recente."""
+    _layout_cache[key] = pos
+    if len(_layout_cache) > _LAYOUT_CACHE_SIZE:
+        _layout_cache.popitem(last=False)
+
+
+class Plotter:
+    """
+    Classe base dei plotter. In modalità interattiva i grafici vengono mostrati con pyplot,
+    in modalità headless vengono disegnati su figure Agg esplicite, salvate su file e chiuse.
+    """
+
+    def __init__(self, output_dir: str | None = None, file_format: str = "png") -> None:
+        """
+        Inizializza un'istanza della classe Plotter.
+
+        Args:
+            output_dir (str | None): La cartella in cui salvare i grafici. Se None i grafici vengono mostrati.
+            file_format (str): Il formato dei file salvati (es. "png", "svg"). Default è "png".
+        """
+        self.output_dir: str | None = output_dir
+        self.file_format: str = file_format
+
+    @property
+    def headless(self) -> bool:
+        """True se i grafici vengono salvati su file invece che mostrati."""
+        return self.output_dir is not None
+
+    def _new_figure(self, size: tuple):
+        """
+        Crea una nuova figura con un singolo asse.
+
+        Args:
+            size (tuple): La dimensione della figura.
+
+        Returns:
+            tuple: La figura e il suo asse.
+        """
+        if self.headless:
+            fig = figure.Figure(figsize=size)
+            backend_agg.FigureCanvasAgg(fig)
+            return fig, fig.add_subplot(111)
+        return plt.subplots(figsize=size)
+
+    def _finish(self, fig: figure.Figure, file_name: str) -> str | None:
+        """
+        Mostra la figura oppure, in modalità headless, la salva su file e la chiude.
+
+        Args:
+            fig (figure.Figure): La figura completata.
+            file_name (str): Il nome del file, senza estensione.
+
+        Returns:
+            str | None: Il percorso del file salvato, None in modalità interattiva.
+        """
+        if not self.headless:
+            plt.show()
+            return None
+        os.makedirs(self.output_dir, exist_ok=True)
+        path = os.path.join(self.output_dir, f"{file_name}.{self.file_format}")
+        fig.savefig(path, format=self.file_format)
+        fig.clear()
+        return path
+
+
+class RnaStatsPlotter(Plotter):
+    """Classe che fornisce metodi per disegnare grafici relativi agli ipergrafi dell'RNA."""
+
+    def plot_hypergraph(
+        self, HG: hnx.Hypergraph | dict, size, file_name: str = "hypergraph"
+    ) -> str | None:
+        """
+        Disegna un grafico che rappresenta l'ipergrafo costruito.
+
+        Args:
+            HG (hnx.Hypergraph | dict): L'ipergrafo da disegnare o il suo dizionario di incidenza,
+                da preferire nei PlotJob perché gli ipergrafi non sono serializzabili.
+            size (tuple): La dimensione del grafico.
+            file_name (str): Il nome del file in modalità headless.
+
+        Returns:
+            str | None: Il percorso del file salvato, None in modalità interattiva.
+        """
+        if isinstance(HG, dict):
+            HG = hnx.Hypergraph(HG)
+        if len(HG.nodes) > 250:
+            return self.plot_structure_layout(HG, size, file_name=file_name)
+        fig, ax = self._new_figure(size)
+        key = _structure_key(HG)
+        pos = hnx.draw(
+            HG,
+            pos=_cached_layout(key),
+            ax=ax,
+            return_pos=True,
+            **{"layout_kwargs": {"seed": 39}},
+        )
+        _store_layout(key, pos)
+        return self._finish(fig, file_name)
+
+    def plot_structure_layout(
+        self,
+        HG: hnx.Hypergraph | dict,
+        size=(20, 20),
+        layout: str = "radial",
+        file_name: str = "structure_layout",
+    ) -> str | None:
+        """
+        Disegna l'ipergrafo con un layout basato sulla struttura secondaria, calcolato in tempo lineare
+        dalla tabella delle coppie: la spina dorsale e le coppie come linee, gli iperarchi delle strutture
+        secondarie come regioni colorate. Ogni tipo di elemento è un'unica collezione, quindi il disegno
+        resta interattivo anche con decine di migliaia di nucleotidi.
+
+        Args:
+            HG (hnx.Hypergraph | dict): L'ipergrafo da disegnare o il suo dizionario di incidenza.
+            size (tuple): La dimensione del grafico.
+            layout (str): Il layout, uno tra "radial", "arc" e "circular". Default è "radial".
+            file_name (str): Il nome del file in modalità headless.
+
+        Returns:
+            str | None: Il percorso del file salvato, None in modalità interattiva.
+        """
+        incidence_dict = HG if isinstance(HG, dict) else HG.incidence_dict
+        pair_table = pair_table_from_incidence_dict(incidence_dict)
+        key = (layout, _structure_key(incidence_dict))
+        coordinates = _cached_layout(key)
+        if coordinates is None:
+            coordinates = compute_layout(pair_table, layout)
+            _store_layout(key, coordinates)
+        structures = {
+            k: v
+            for k, v in incidence_dict.items()
+            if not k.startswith("l") and not k.startswith("db")
+        }
+
+        fig, ax = self._new_figure(size)
+        i = np.flatnonzero(pair_table > np.arange(len(pair_table)))
+        j = pair_table[i]
+        if layout == "arc":
+            spans = element_spans(structures)
+            polygons = [
+                [(start - 0.5, -1), (end + 0.5, -1), (end + 0.5, 0), (start - 0.5, 0)]
+                for _, start, end in spans
+            ]
+            colors = [ELEMENT_COLORS.get(t, "tab:purple") for t, _, _ in spans]
+            # ogni coppia è un arco a semicerchio campionato in 16 punti
+            theta = np.linspace(0, np.pi, 16)
+            centers = (i + j) / 2
+            radii = (j - i) / 2
+            pairs = np.stack(
+                (
+                    centers[:, None] - radii[:, None] * np.cos(theta),
+                    radii[:, None] * np.sin(theta),
+                ),
+                axis=-1,
+            )
+        else:
+            regions = element_regions(structures, pair_table)
+            polygons = [coordinates[vertices] for _, vertices in regions]
+            colors = [ELEMENT_COLORS.get(t, "tab:purple") for t, _ in regions]
+            pairs = np.stack((coordinates[i], coordinates[j]), axis=1)
+
+        ax.add_collection(
+            mpl_collections.PolyCollection(
+                polygons, facecolors=colors, edgecolors="none", alpha=0.35
+            )
+        )
+        ax.add_collection(
+            mpl_collections.LineCollection(pairs, colors="tab:blue", linewidths=0.6)
+        )
+        ax.plot(coordinates[:, 0], coordinates[:, 1], color="black", linewidth=0.6)
+        if len(pair_table) <= 2000:
+            ax.scatter(
+                coordinates[:, 0],
+                coordinates[:, 1],
+                s=max(1, 2000 / max(len(pair_table), 1)),
+                c=np.where(pair_table == UNPAIRED, "tab:gray", "black"),
+                zorder=3,
+            )
+        ax.set_aspect("equal")
+        ax.autoscale_view()
+        ax.set_axis_off()
+        return self._finish(fig, file_name)
+
+    def plot_structures(
+        self, structures: dict, size=(20, 20), file_name: str = "structures"
+    ) -> str | None:
+        """
+        Disegna un grafico che rappresenta le strutture secondarie dell'RNA.
+
+        Args:
+            structures (dict): Il dizionario delle strutture secondarie.
+            size (tuple): La dimensione del grafico.
+            file_name (str): Il nome del file in modalità headless.
+
+        Returns:
+            str | None: Il percorso del file salvato, None in modalità interattiva.
+        """
+        fig, ax = self._new_figure(size)
+        HG = hnx.Hypergraph(structures)
+        key = _structure_key(HG)
+        pos = hnx.draw(HG, pos=_cached_layout(key), ax=ax, return_pos=True)
+        _store_layout(key, pos)
+        return self._finish(fig, file_name)
+
+    def plot_partitions_conductance(
+        self, conductances, size=(20, 10), file_name: str = "partitions_conductance"
+    ) -> str | None:
+        """
+        Disegna un grafico che rappresenta la conduttanza delle partizioni.
+
+        Args:
+            conductances (list[float]): La lista delle conduttanze delle partizioni.
+            size (tuple): La dimensione del grafico.
+            file_name (str): Il nome del file in modalità headless.
+
+        Returns:
+            str | None: Il percorso del file salvato, None in modalità interattiva.
+        """
+        fig, ax = self._new_figure(size)
+        seq = []
+        values = []
+        for i, c in enumerate(conductances, start=1):
+            seq.append(i)
+            values.append(c)
+        ax.bar(seq, values)
+        ax.set_title("Partitions Conductance")
+        ax.set_xlabel("Partition")
+        ax.set_ylabel("Conductance score")
+        return self._finish(fig, file_name)
+
+    def plot_s_between_centrality(
+        self,
+        centrality,
+        edges,
+        s: int = 1,
+        size=(20, 10),
+        file_name: str = "s_between_centrality",
+    ) -> str | None:
+        """
+        Disegna un grafico che rappresenta la n-between-centrality dei nucleotidi.
+
+        Args:
+            centrality (dict): Il dizionario delle centralità.
+            edges (bool): Indica se considerare anche gli archi.
+            s (int): Requisito di connessione.
+            size (tuple): La dimensione del grafico.
+            file_name (str): Il nome del file in modalità headless.
+
+        Returns:
+            str | None: Il percorso del file salvato, None in modalità interattiva.
+        """
+        fig, ax = self._new_figure(size)
+        if edges:
+            centrality = {k: v for k, v in sorted(centrality.items())}
+            ax.tick_params(axis="x", labelrotation=90)
+
+        seq = list(centrality.keys())
+        centr = list(centrality.values())
+
+        ax.bar(seq, centr)
+        ax.set_title(f"{s}-centrality")
+        ax.set_xlabel("Nucleotides")
+        ax.set_ylabel("Centrality")
+        return self._finish(fig, file_name)
+
+
+def get_changed_connections(diffs: dict) -> tuple[list, list]:
+    """
+    Restituisce le connessioni cambiate tra due ipergrafi.
+
+    Args:
+        diffs (dict): Il dizionario delle differenze di connessione.
+
+    Returns:
+        tuple[list, list]: Due liste che rappresentano le connessioni vecchie e nuove.
+    """
+    changes = defaultdict(dict)
+    for temp, conn in diffs.items():
+        new = conn[1]
+        for o in conn[0]:
+            n = [n for n in new if n[0] == o[0]]
+            if len(n) != 0:
+                changes[temp][o] = n[0]
+    old = []
+    new = []
+    for temp, conn in changes.items():
+        for o, n in conn.items():
+            old.append(o)
+            new.append(n)
+    return new, old
+
+
+def get_created_connections(diffs: dict) -> set:
+    """
+    Restituisce le connessioni create tra due ipergrafi.
+
+    Args:
+        diffs (dict): Il dizionario delle differenze di connessione.
+
+    Returns:
+        set: L'insieme delle connessioni create.
+    """
+
+    created_connections = defaultdict(list)
+    for temp, conn in diffs.items():
+        for new in conn[1]:
+            if new[0] not in [old[0] for old in conn[0]]:
+                created_connections[temp].append(new)
+    created = {tup for _, conn in created_connections.items() for tup in conn}
+    return created
+
+
+def get_deleted_connections(diffs: dict) -> set:
+    """
+    Restituisce le connessioni eliminate tra due ipergrafi.
+
+    Args:
+        diffs (dict): Il dizionario delle differenze di connessione.
+
+    Returns:
+        set: L'insieme delle connessioni eliminate.
+    """
+    deleted_connections = defaultdict(list)
+    for temp, conn in diffs.items():
+        for old in conn[0]:
+            if old[0] not in [new[0] for new in conn[1]]:
+                deleted_connections[temp].append(old)
+    deleted = {tup for _, conn in deleted_connections.items() for tup in conn}
+    return deleted
+
+
+class TemperatureFoldingStatsPlotter(Plotter):
+    """Classe che fornisce metodi per disegnare grafici relativi alle statistiche di folding dell'RNA a diverse temperature."""
+
+    def plot_nucleotide_sensibility_to_changes(
+        self,
+        sensibilities: dict,
+        size: tuple = (20, 10),
+        file_name: str = "nucleotide_sensibility",
+    ) -> str | None:
+        """
+        Disegna un grafico che rappresenta la sensibilità dei nucleotidi ai cambiamenti di struttura.
+
+        Args:
+            sensibilities (dict): Il dizionario delle sensibilità dei nucleotidi.
+            size (tuple): La dimensione del grafico.
+            file_name (str): Il nome del file in modalità headless.
+
+        Returns:
+            str | None: Il percorso del file salvato, None in modalità interattiva.
+        """
+        ordered_keys = sorted(sensibilities.keys())
+        ordered_values = [sensibilities[key] for key in ordered_keys]
+        seq = list(ordered_keys)
+        centr = list(ordered_values)
+        fig, ax = self._new_figure(size)
+        ax.bar(seq, centr)
+        ax.set_title("Nucleotide Sensibility")
+        ax.set_xlabel("Nucleotides")
+        ax.set_ylabel("Sensibility score")
+        return self._finish(fig, file_name)
+
+    def plot_structure_differences(
+        self,
+        diffs: dict,
+        size: tuple = (6.4, 4.8),
+        file_name: str = "structure_differences",
+    ) -> str | None:
+        """
+        Disegna un grafico che rappresenta le differenze strutturali tra diverse temperature.
+
+        Args:
+            diffs (dict): Il dizionario delle differenze strutturali.
+            size (tuple): La dimensione del grafico.
+            file_name (str): Il nome del file in modalità headless.
+
+        Returns:
+            str | None: Il percorso del file salvato, None in modalità interattiva.
+        """
+        negatives, positives, structures = self.__compute_number_of_structures(diffs)
+        fig, ax = self._new_figure(size)
+        ax.bar(structures, negatives, color="r")
+        ax.bar(structures, positives, color="b", bottom=0)
+        ax.set_title("Structure Differences")
+        ax.set_xlabel("Structure")
+        ax.set_ylabel("Structures added/removed")
+        return self._finish(fig, file_name)
+
+    def __compute_number_of_structures(self, diffs: dict) -> tuple:
+        """
+        Calcola il numero medio di strutture aggiunte e rimosse.
+
+        Args:
+            diffs (dict): Il dizionario delle differenze strutturali.
+
+        Returns:
+            tuple: Tre liste contenenti le strutture rimosse, aggiunte e i nomi delle strutture.
+        """
+        positives = defaultdict(list)
+        negatives = defaultdict(list)
+        for dic in diffs.values():
+            for k, v in dic.items():
+                if v > 0:
+                    positives[k].append(v)
+                else:
+                    negatives[k].append(v)
+        structures = sorted(positives.keys())
+        positives = {
+            k: (mean(positives[k]) if len(positives[k]) > 0 else 0) for k in structures
+        }.values()
+        negatives = {
+            k: (mean(negatives[k]) if len(negatives[k]) > 0 else 0) for k in structures
+        }.values()
+        return negatives, positives, structures
+
+    def plot_connection_differences(
+        self,
+        diffs: dict,
+        size: tuple = (8, 8),
+        file_name: str = "connection_differences",
+    ) -> str | None:
+        """
+        Disegna un grafico che rappresenta le differenze di connessione tra diverse temperature.
+        Frecce e marcatori sono disegnati come collezioni, con un solo artista per tipo.
+
+        Args:
+            diffs (dict): Il dizionario delle differenze di connessione.
+            size (tuple): La dimensione del grafico.
+            file_name (str): Il nome del file in modalità headless.
+
+        Returns:
+            str | None: Il percorso del file salvato, None in modalità interattiva.
+        """
+        fig, ax = self._new_figure(size)
+        self.__plot_changed_connections(ax, diffs)
+        self.__plot_deleted_connections(ax, diffs)
+        self.__plot_created_connections(ax, diffs)
+
+        ax.set_title("Connection Differences")
+        ax.set_xlabel("Nucleotide")
+        ax.set_ylabel("Number of changes")
+        return self._finish(fig, file_name)
+
+    def __plot_changed_connections(self, ax, diffs: dict) -> None:
+        """
+        Disegna le connessioni cambiate tra diverse temperature.
+
+        Args:
+            ax: L'asse su cui disegnare.
+            diffs (dict): Il dizionario delle differenze di connessione.
+        """
+        new, old = get_changed_connections(diffs)
+        if len(new) == 0:
+            return
+        x, y = zip(*old)
+        new_x, new_y = zip(*new)
+        ax.quiver(
+            x,
+            y,
+            [end - start for end, start in zip(new_x, x)],
+            [end - start for end, start in zip(new_y, y)],
+            angles="xy",
+            scale_units="xy",
+            scale=1,
+            width=0.003,
+            color="black",
+        )
+        ax.scatter(x, y, edgecolors="b")
+        ax.scatter(new_x, new_y, edgecolors="r")
+
+    def __plot_created_connections(self, ax, diffs: dict) -> None:
+        """
+        Disegna le connessioni create tra diverse temperature.
+
+        Args:
+            ax: L'asse su cui disegnare.
+            diffs (dict): Il dizionario delle differenze di connessione.
+        """
+        created = get_created_connections(diffs)
+        if len(created) > 0:
+            ax.scatter(*zip(*created), marker="x", color="blue")
+
+    def __plot_deleted_connections(self, ax, diffs: dict) -> None:
+        """
+        Disegna le connessioni eliminate tra diverse temperature.
+
+        Args:
+            ax: L'asse su cui disegnare.
+            diffs (dict): Il dizionario delle differenze di connessione.
+        """
+        deleted = get_deleted_connections(diffs)
+        if len(deleted) > 0:
+            ax.scatter(*zip(*deleted), marker="x", color="red")
+
+    def plot_sensibility_to_change_connection(
+        self,
+        count: dict,
+        size: tuple = (20, 10),
+        file_name: str = "connection_sensibility",
+    ) -> str | None:
+        """
+        Disegna un grafico che rappresenta la sensibilità dei nucleotidi ai cambiamenti di connessione.
+
+        Args:
+            count (dict): Il dizionario delle sensibilità dei nucleotidi.
+            size (tuple): La dimensione del grafico.
+            file_name (str): Il nome del file in modalità headless.
+
+        Returns:
+            str | None: Il percorso del file salvato, None in modalità interattiva.
+        """
+        count = dict(sorted(count.items()))
+        seq = list(count.keys())
+        sens = list(count.values())
+        fig, ax = self._new_figure(size)
+        ax.bar(seq, sens)
+        ax.set_title("Nucleotide Sensibility")
+        ax.set_xlabel("Nucleotides")
+        ax.set_ylabel("Sensibility score")
+        return self._finish(fig, file_name)
+
+
+PLOTTERS = {
+    "rna": RnaStatsPlotter,
+    "temperature": TemperatureFoldingStatsPlotter,
+}
+
+
+class PlotJob:
+    """Descrive un grafico da disegnare in un processo worker."""
+
+    def __init__(
+        self, plotter: str, method: str, file_name: str, *args, **kwargs
+    ) -> None:
+        """
+        Inizializza un'istanza della classe PlotJob.
+
+        Args:
+            plotter (str): Il plotter da usare, "rna" o "temperature".
+            method (str): Il nome del metodo del plotter (es. "plot_connection_differences").
+            file_name (str): Il nome del file, senza estensione.
+            *args: Gli argomenti posizionali del metodo; gli ipergrafi vanno passati come dizionari di incidenza.
+            **kwargs: Gli argomenti con nome del metodo.
+        """
+        self.plotter = plotter
+        self.method = method
+        self.file_name = file_name
+        self.args = args
+        self.kwargs = kwargs
+
+
+def _render_job(job: PlotJob, output_dir: str, file_format: str) -> str:
+    """
+    Disegna un grafico in modalità headless, eseguito nei processi worker.
+
+    Args:
+        job (PlotJob): Il grafico da disegnare.
+        output_dir (str): La cartella in cui salvare il file.
+        file_format (str): Il formato del file.
+
+    Returns:
+        str: Il percorso del file salvato.
+    """
+    plotter = PLOTTERS[job.plotter](output_dir, file_format)
+    return getattr(plotter, job.method)(
+        *job.args, file_name=job.file_name, **job.kwargs
+    )
+
+
+def render_plots(
+    jobs: list[PlotJob],
+    output_dir: str,
+    file_format: str = "png",
+    max_workers: int | None = None,
+) -> list[str]:
+    """
+    Disegna una lista di grafici in parallelo salvandoli direttamente su file.
+
+    Args:
+        jobs (list[PlotJob]): I grafici da disegnare.
+        output_dir (str): La cartella in cui salvare i file.
+        file_format (str): Il formato dei file (es. "png", "svg"). Default è "png".
+        max_workers (int | None): Il numero massimo di processi. Default è il numero di CPU.
+
+    Returns:
+        list[str]: I percorsi dei file salvati, nello stesso ordine dei grafici.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        return list(
+            executor.map(
+                partial(_render_job, output_dir=output_dir, file_format=file_format),
+                jobs,
+            )
+        )
@@ -1,37 +1,67 @@
+from __future__ import annotations
+
 from collections import defaultdict
 from concurrent.futures import ProcessPoolExecutor
-from statistics import mean
 
-import hypernetx as hnx
-import hypernetx.algorithms.hypergraph_modularity as hmod
-import matplotlib.pyplot as plt
-import networkx as nx
+import numpy as np
 
+from RNAHyperFold.hypergraph_folding.edge_model import EdgeType, edge_table
+from RNAHyperFold.hypergraph_folding.temperature_grid import (
+    Temperature,
+    consecutive_pairs,
+    normalize_temperature,
+    temperature_range,
+)
 from RNAHyperFold.hypergraph_folding.temperature_hypergraph import (
     TemperatureFoldingHypergraph,
 )
+from RNAHyperFold.lazy_modules import lazy_module
 from RNAHyperFold.rna_stats.hypergraph_analysis import (
     StructuralHypergraphAnalysis,
     CommunityHypergraphAnalysis,
     TemporalRnaStats,
 )
+from RNAHyperFold.rna_stats.sensibility_index import SensibilityIndex
+from RNAHyperFold.rna_stats.sparse_analytics import SparseHypergraphAnalytics
+from RNAHyperFold.rna_stats.plotters import (  # noqa: F401
+    RnaStatsPlotter,
+    TemperatureFoldingStatsPlotter,
+    get_changed_connections,
+    get_created_connections,
+    get_deleted_connections,
+)
+from RNAHyperFold.profiling.stage_profiler import profiled
+
+hnx = lazy_module("hypernetx")
+hmod = lazy_module("hypernetx.algorithms.hypergraph_modularity")
 
 
 class RnaAnalyst(StructuralHypergraphAnalysis, CommunityHypergraphAnalysis):
     """Classe che raccoglie metodi di analisi per una sequenza di RNA utilizzando un ipergrafo."""
 
-    def __init__(self, HG: hnx.Hypergraph) -> None:
+    def __init__(
+        self,
+        HG: hnx.Hypergraph,
+        plotter: RnaStatsPlotter | None = None,
+        weights: dict[str, float] | None = None,
+    ) -> None:
         """
         Inizializza un'istanza della classe RnaAnalyst.
 
         Args:
             HG (hnx.Hypergraph): L'ipergrafo da analizzare.
+            plotter (RnaStatsPlotter | None): Il plotter da usare, ad esempio in modalità headless. Default è un plotter interattivo.
+            weights (dict[str, float] | None): Il peso di ogni iperarco, ad esempio gli edge_weights di un
+                EnsembleHypergraph. Default è peso 1 per ogni iperarco.
         """
         if HG is None:
             raise Exception("None not valid")
         self.HG = HG
+        self.weights: dict[str, float] | None = weights
         self.__partitions: list = []
-        self.__plotter = RnaStatsPlotter()
+        self.__weighted_profile: np.ndarray | None = None
+        self.__sparse: SparseHypergraphAnalytics | None = None
+        self.__plotter = plotter if plotter is not None else RnaStatsPlotter()
 
     def plot_hypergraph(self, size: tuple = (40, 40)) -> None:
         """
@@ -42,6 +72,16 @@ class RnaAnalyst(StructuralHypergraphAnalysis, CommunityHypergraphAnalysis):
         """
         self.__plotter.plot_hypergraph(self.HG, size)
 
+    def plot_structure_layout(self, size: tuple = (20, 20), layout="radial") -> None:
+        """
+        Disegna l'ipergrafo con un layout basato sulla struttura secondaria, adatto anche a RNA molto lunghi.
+
+        Args:
+            size (tuple): La dimensione del grafico.
+            layout (str): Il layout, uno tra "radial", "arc" e "circular".
+        """
+        self.__plotter.plot_structure_layout(self.HG, size, layout)
+
     def plot_structures(self):
         """
         Disegna un grafico che rappresenta le strutture secondarie rilevate.
@@ -55,11 +95,228 @@ class RnaAnalyst(StructuralHypergraphAnalysis, CommunityHypergraphAnalysis):
         Returns:
             dict: Il dizionario delle strutture secondarie.
         """
-        structures = {}
-        for key, value in self.HG.incidence_dict.items():
-            if not key.startswith("l") and not key.startswith("db"):
-                structures[key] = value
-        return structures
+        table = edge_table(self.HG)
+        return {
+            table.name(edge): table.edge_node_list(edge)
+            for edge in self.__structure_edges()
+        }
+
+    def __structure_edges(self) -> list[int]:
+        """
+        Restituisce gli id degli iperarchi che rappresentano strutture secondarie.
+
+        Returns:
+            list[int]: Gli id degli iperarchi, nell'ordine del dizionario di incidenza.
+        """
+        table = edge_table(self.HG)
+        edges = table.element_edges()
+        others = table.of_type(EdgeType.OTHER)
+        if len(others) == 0:
+            return edges.tolist()
+        # iperarchi con nomi non standard: si mantiene il criterio basato sul prefisso
+        others = [
+            edge
+            for edge in others.tolist()
+            if not table.name(edge).startswith("l")
+            and not table.name(edge).startswith("db")
+        ]
+        return sorted(edges.tolist() + others)
+
+    def structure_type_counts(self) -> dict[str, int]:
+        """
+        Restituisce il numero di strutture secondarie di ogni tipo.
+
+        Returns:
+            dict[str, int]: Per ogni tipo (la lettera iniziale del nome) il numero di strutture.
+        """
+        table = edge_table(self.HG)
+        counts = defaultdict(int)
+        for edge in self.__structure_edges():
+            edge_type = EdgeType(table.types[edge])
+            prefix = (
+                table.name(edge)[0] if edge_type == EdgeType.OTHER else edge_type.prefix
+            )
+            counts[prefix] += 1
+        return counts
+
+    def nucleotide_edges(self, position: int) -> list[str]:
+        """
+        Restituisce i nomi degli iperarchi che contengono un nucleotide.
+
+        Args:
+            position (int): La posizione del nucleotide.
+
+        Returns:
+            list[str]: I nomi degli iperarchi.
+        """
+        table = edge_table(self.HG)
+        return [table.name(edge) for edge in table.node_index.edges_of(position)]
+
+    def nucleotide_structure(self, position: int) -> str | None:
+        """
+        Restituisce la struttura secondaria di cui fa parte un nucleotide.
+
+        Args:
+            position (int): La posizione del nucleotide.
+
+        Returns:
+            str | None: Il nome della struttura, None se il nucleotide non fa parte di nessuna struttura.
+        """
+        table = edge_table(self.HG)
+        edge = table.node_index.element_of(position)
+        return table.name(edge) if edge >= 0 else None
+
+    def window_structures(self, start: int, end: int) -> dict:
+        """
+        Restituisce le strutture secondarie che contengono almeno un nucleotide di una finestra.
+
+        Args:
+            start (int): La prima posizione della finestra.
+            end (int): L'ultima posizione della finestra (inclusa).
+
+        Returns:
+            dict: Il dizionario delle strutture secondarie coinvolte.
+        """
+        table = edge_table(self.HG)
+        edges = table.node_index.window_edges(start, end)
+        return {
+            table.name(edge): table.edge_node_list(edge)
+            for edge in edges[np.isin(edges, table.element_edges())]
+        }
+
+    def element_labels(self) -> np.ndarray:
+        """
+        Restituisce, per ogni nucleotide, l'id dell'iperarco della struttura secondaria di cui fa parte.
+
+        Returns:
+            np.ndarray: Gli id degli iperarchi, -1 per i nucleotidi che non fanno parte di nessuna struttura.
+        """
+        return edge_table(self.HG).node_index.element_labels
+
+    def sparse(self) -> SparseHypergraphAnalytics:
+        """
+        Restituisce le metriche sparse dell'ipergrafo, basate sulla sua matrice di incidenza.
+
+        Returns:
+            SparseHypergraphAnalytics: Le metriche sparse, la matrice di incidenza è condivisa tra le istanze.
+        """
+        if self.__sparse is None:
+            self.__sparse = SparseHypergraphAnalytics(self.HG)
+        return self.__sparse
+
+    def degree(self, s: int = 1) -> np.ndarray:
+        """
+        Restituisce il grado di ogni nucleotide.
+
+        Args:
+            s (int): La dimensione minima degli iperarchi considerati.
+
+        Returns:
+            np.ndarray: Il grado di ogni nucleotide, indicizzato per posizione.
+        """
+        return self.sparse().degree(s)
+
+    def __weight_vector(self) -> np.ndarray:
+        """Restituisce il peso di ogni iperarco, allineato agli id della tabella degli iperarchi."""
+        table = edge_table(self.HG)
+        if self.weights is None:
+            return np.ones(len(table))
+        return np.array([self.weights.get(name, 0.0) for name in table.names])
+
+    def weighted_type_profile(self) -> np.ndarray:
+        """
+        Restituisce, per ogni nucleotide, la somma dei pesi dei suoi iperarchi di ogni tipo,
+        calcolata con un solo passaggio sulla tabella degli iperarchi. Su un ensemble pesato
+        la colonna EdgeType.PAIR è la probabilità che il nucleotide sia appaiato e le colonne
+        degli elementi sono la probabilità che faccia parte di un elemento di quel tipo.
+
+        Returns:
+            np.ndarray: La matrice nucleotidi × EdgeType.
+        """
+        if self.__weighted_profile is None:
+            table = edge_table(self.HG)
+            sizes = table.edge_sizes()
+            profile = np.zeros((table.length, len(EdgeType)))
+            np.add.at(
+                profile,
+                (table.nodes, np.repeat(table.types, sizes)),
+                np.repeat(self.__weight_vector(), sizes),
+            )
+            self.__weighted_profile = profile
+        return self.__weighted_profile
+
+    def weighted_degree(self) -> np.ndarray:
+        """
+        Restituisce il grado pesato di ogni nucleotide, ovvero la somma dei pesi dei suoi iperarchi.
+
+        Returns:
+            np.ndarray: Il grado pesato di ogni nucleotide, indicizzato per posizione.
+        """
+        return self.weighted_type_profile().sum(axis=1)
+
+    def pairing_probabilities(self) -> np.ndarray:
+        """
+        Restituisce la somma dei pesi delle coppie di basi di ogni nucleotide, ovvero la
+        probabilità di essere appaiato se l'ipergrafo è un ensemble pesato.
+
+        Returns:
+            np.ndarray: La probabilità di ogni nucleotide, indicizzata per posizione.
+        """
+        return self.weighted_type_profile()[:, EdgeType.PAIR]
+
+    def element_entropy(self) -> np.ndarray:
+        """
+        Restituisce l'entropia di Shannon del tipo di elemento di ogni nucleotide, una misura
+        della sua variabilità strutturale all'interno dell'ensemble.
+
+        Returns:
+            np.ndarray: L'entropia di ogni nucleotide in nat, 0 se il tipo di elemento è sempre lo stesso.
+        """
+        profile = self.weighted_type_profile()[
+            :, [edge_type for edge_type in EdgeType if edge_type.is_element]
+        ]
+        totals = profile.sum(axis=1, keepdims=True)
+        probabilities = np.divide(
+            profile, totals, out=np.zeros_like(profile), where=totals > 0
+        )
+        logs = np.log(
+            probabilities, out=np.zeros_like(probabilities), where=probabilities > 0
+        )
+        return -(probabilities * logs).sum(axis=1)
+
+    def expected_structure_type_counts(self) -> dict[str, float]:
+        """
+        Restituisce, per ogni tipo di struttura secondaria, la somma dei pesi delle strutture di quel
+        tipo, ovvero il numero atteso di strutture se l'ipergrafo è un ensemble pesato.
+
+        Returns:
+            dict[str, float]: Per ogni tipo (la lettera iniziale del nome) il numero atteso di strutture.
+        """
+        table = edge_table(self.HG)
+        edges = table.element_edges()
+        totals = np.bincount(
+            table.types[edges],
+            weights=self.__weight_vector()[edges],
+            minlength=len(EdgeType),
+        )
+        return {
+            edge_type.prefix: float(totals[edge_type])
+            for edge_type in EdgeType
+            if edge_type.is_element and totals[edge_type] > 0
+        }
+
+    def s_connected_components(self, s: int = 1, edges: bool = False) -> list[set]:
+        """
+        Restituisce le componenti s-connesse dell'ipergrafo.
+
+        Args:
+            s (int): Requisito di connessione.
+            edges (bool): Se True le componenti sono insiemi di iperarchi, altrimenti di nucleotidi.
+
+        Returns:
+            list[set]: Le componenti s-connesse, escluse quelle con un solo elemento.
+        """
+        return self.sparse().s_connected_components(s, edges)
 
     def partitions(self) -> list:
         """
@@ -105,7 +362,7 @@ class RnaAnalyst(StructuralHypergraphAnalysis, CommunityHypergraphAnalysis):
         Returns:
             float: La conduttanza della partizione.
         """
-        return hmod.conductance(self.HG, subset)
+        return self.sparse().conductance(subset)
 
     def partitions_conductance(self, plot=False, plot_size=(20, 10)) -> list[float]:
         """
@@ -163,12 +420,8 @@ class RnaAnalyst(StructuralHypergraphAnalysis, CommunityHypergraphAnalysis):
             return None
         if len(self.HG.nodes) != len(hypergraph.nodes):
             raise Exception("Ipergrafi hanno un numero diverso di nodi")
-        this_connections = {
-            v[0]: v[1] for k, v in self.HG.incidence_dict.items() if k[0:2] == "db"
-        }
-        other_connections = {
-            v[0]: v[1] for k, v in hypergraph.incidence_dict.items() if k[0:2] == "db"
-        }
+        this_connections = self.__connections(self.HG)
+        other_connections = self.__connections(hypergraph)
 
         old = []
         new = []
@@ -180,11 +433,33 @@ class RnaAnalyst(StructuralHypergraphAnalysis, CommunityHypergraphAnalysis):
                 old.append((k, v))
                 new.append((k, other_connections[k]))
         if plot:
-            tfsp = TemperatureFoldingStatsPlotter()
+            tfsp = TemperatureFoldingStatsPlotter(
+                self.__plotter.output_dir, self.__plotter.file_format
+            )
             diffs = {0: (old, new)}
-            tfsp.plot_connection_differences(diffs)
+            tfsp.plot_connection_differences(diffs, size=plot_size)
         return old, new
 
+    @staticmethod
+    def __connections(hypergraph: hnx.Hypergraph) -> dict:
+        """
+        Restituisce le coppie di basi di un ipergrafo.
+
+        Args:
+            hypergraph (hnx.Hypergraph): L'ipergrafo.
+
+        Returns:
+            dict: Per ogni coppia, il primo nucleotide associato al secondo.
+        """
+        table = edge_table(hypergraph)
+        starts = table.offsets[table.of_type(EdgeType.PAIR)]
+        return {
+            table.node(i): table.node(j)
+            for i, j in zip(
+                table.nodes[starts].tolist(), table.nodes[starts + 1].tolist()
+            )
+        }
+
     def structure_differences(self, hypergraph: hnx.Hypergraph) -> dict:
         """
         Restituisce un dizionario che indica le strutture aggiunte o rimosse dall'ipergrafo preso in input.
@@ -199,15 +474,8 @@ class RnaAnalyst(StructuralHypergraphAnalysis, CommunityHypergraphAnalysis):
             return {}
         if len(self.HG.nodes) != len(hypergraph.nodes):
             raise Exception("Ipergrafi hanno un numero diverso di nodi")
-        this_structures = self.secondary_structures()
-        other_structures = RnaAnalyst(hypergraph).secondary_structures()
-
-        this_count = defaultdict(int)
-        for name in this_structures.keys():
-            this_count[name[0]] = this_count[name[0]] + 1
-        other_count = defaultdict(int)
-        for name in other_structures.keys():
-            other_count[name[0]] = other_count[name[0]] + 1
+        this_count = self.structure_type_counts()
+        other_count = RnaAnalyst(hypergraph).structure_type_counts()
 
         result = {
             key: this_count[key] - other_count[key]
@@ -230,70 +498,116 @@ class RnaAnalyst(StructuralHypergraphAnalysis, CommunityHypergraphAnalysis):
             raise Exception("Ipergrafi non hanno lo stesso numero di nucleotidi")
         this_structures = self.secondary_structures()
         other_structures = RnaAnalyst(hypergraph).secondary_structures()
+        # nucleotidi delle strutture presenti in entrambi gli ipergrafi che non ne fanno più parte
         differences = []
-        # Scorro le strutture dei due ipergrafi e individuo i nucleotidi che cambiano struttura
-        for this_name, this_structure in this_structures.items():
-            for other_name, other_structure in other_structures.items():
-                if this_name == other_name:
-                    differences.append(
-                        [item for item in this_structure if item not in other_structure]
-                    )
-                    break
-
-        return [element for row in differences for element in row]
+        for name, this_structure in this_structures.items():
+            other_structure = other_structures.get(name)
+            if other_structure is None:
+                continue
+            other_nodes = set(other_structure)
+            differences.extend(
+                item for item in this_structure if item not in other_nodes
+            )
+        return differences
 
 
 class TemperatureFoldingStats(TemporalRnaStats):
     """Classe che raccoglie metodi di analisi per i folding dell'RNA a diverse temperature."""
 
-    def __init__(self, THG: TemperatureFoldingHypergraph) -> None:
+    def __init__(
+        self,
+        THG: TemperatureFoldingHypergraph,
+        plotter: TemperatureFoldingStatsPlotter | None = None,
+    ) -> None:
         """
         Inizializza un'istanza della classe TemperatureFoldingStats.
 
         Args:
             THG (TemperatureFoldingHypergraph): L'ipergrafo temporale dei folding dell'RNA.
+            plotter (TemperatureFoldingStatsPlotter | None): Il plotter da usare, ad esempio in modalità headless. Default è un plotter interattivo.
         """
         self.THG = THG
-        self.__plotter = TemperatureFoldingStatsPlotter()
+        self.__plotter = (
+            plotter if plotter is not None else TemperatureFoldingStatsPlotter()
+        )
         self.__executor = ProcessPoolExecutor()
+        self.__indexes: dict[tuple, SensibilityIndex] = {}
 
-    def __compute_structure_change(self, temp: int) -> list:
+    def __compute_structure_change(
+        self, temp: Temperature, next_temp: Temperature
+    ) -> list:
         """
-        Computa i cambiamenti di struttura tra due temperature consecutive.
+        Computa i cambiamenti di struttura tra due temperature consecutive della griglia campionata.
 
         Args:
-            temp (int): La temperatura corrente.
+            temp (Temperature): La temperatura corrente.
+            next_temp (Temperature): La temperatura campionata successiva.
 
         Returns:
             list: La lista dei nucleotidi che hanno cambiato struttura.
         """
         h1 = self.THG.get_hypergraph(temp)
-        h2 = self.THG.get_hypergraph(temp + 1)
+        h2 = self.THG.get_hypergraph(next_temp)
         if h1 is h2:
             return None
         st = RnaAnalyst(h1)
         return st.get_nucleotides_change_structure(h2)
 
+    def get_nucleotide_structures(
+        self,
+        position: int,
+        start_temp: Temperature,
+        end_temp: Temperature,
+        step: Temperature = 1,
+    ) -> dict[Temperature, str | None]:
+        """
+        Restituisce la struttura secondaria di cui fa parte un nucleotide a ogni temperatura di un range.
+
+        Args:
+            position (int): La posizione del nucleotide.
+            start_temp (Temperature): La temperatura iniziale.
+            end_temp (Temperature): La temperatura finale.
+            step (Temperature): Il passo tra le temperature, anche non intero. Default è 1.
+
+        Returns:
+            dict[Temperature, str | None]: Per ogni temperatura il nome della struttura, None se nessuna.
+        """
+        self.THG.insert_temperature_range(start_temp, end_temp, step)
+        structures = {}
+        for temp in temperature_range(start_temp, end_temp, step):
+            table = self.THG.get_edge_table(temp)
+            edge = table.node_index.element_of(position)
+            structures[temp] = table.name(edge) if edge >= 0 else None
+        return structures
+
+    @profiled("stats.nucleotide_sensibility_to_changes")
     def get_nucleotide_sensibility_to_changes(
-        self, start_temp: int, end_temp: int, plot=False, plot_size: tuple = (20, 10)
+        self,
+        start_temp: Temperature,
+        end_temp: Temperature,
+        plot=False,
+        plot_size: tuple = (20, 10),
+        step: Temperature = 1,
     ) -> dict:
         """
         Restituisce un dizionario che indica, per ogni nucleotide, la sua sensibilità a cambiare struttura in un range di temperature.
 
         Args:
-            start_temp (int): La temperatura iniziale.
-            end_temp (int): La temperatura finale.
+            start_temp (Temperature): La temperatura iniziale.
+            end_temp (Temperature): La temperatura finale.
             plot (bool): Indica se fare il grafico della sensibilità.
             plot_size (tuple): Se viene richiesto il grafico, definisce la sua grandezza.
+            step (Temperature): Il passo tra le temperature, anche non intero. Default è 1.
 
         Returns:
             dict: Il dizionario delle sensibilità dei nucleotidi ai cambiamenti di temperatura.
         """
 
-        self.THG.insert_temperature_range(start_temp, end_temp)
+        self.THG.insert_temperature_range(start_temp, end_temp, step)
         counts = defaultdict(int)
-        for temp in range(start_temp + 1, end_temp):
-            changes = self.__compute_structure_change(temp)
+        grid = temperature_range(start_temp, end_temp, step)
+        for temp, next_temp in consecutive_pairs(grid[1:]):
+            changes = self.__compute_structure_change(temp, next_temp)
             if changes is None:
                 continue
             for elem in changes:
@@ -307,22 +621,24 @@ class TemperatureFoldingStats(TemporalRnaStats):
         # TODO fare in modo di vedere effettivamente struttura di partenza e di arriv
         return counts
 
-    def get_structure_differences(self, start_temp, end_temp, plot=False):
+    @profiled("stats.structure_differences")
+    def get_structure_differences(self, start_temp, end_temp, plot=False, step=1):
         """
         Restituisce un dizionario contenente il numero di strutture create o rimosse in un range di temperature dalla temperatura di partenza.
 
         Args:
-            start_temp (int): La temperatura iniziale.
-            end_temp (int): La temperatura finale.
+            start_temp (Temperature): La temperatura iniziale.
+            end_temp (Temperature): La temperatura finale.
             plot (bool): Indica se fare il grafico delle differenze strutturali.
+            step (Temperature): Il passo tra le temperature, anche non intero. Default è 1.
 
         Returns:
             dict: Il dizionario delle differenze strutturali.
         """
-        self.THG.insert_temperature_range(start_temp, end_temp)
+        self.THG.insert_temperature_range(start_temp, end_temp, step)
         diffs = {}
         h1 = self.THG.get_hypergraph(start_temp)
-        for temp in range(start_temp + 1, end_temp + 1):
+        for temp in temperature_range(start_temp, end_temp, step)[1:]:
             h2 = self.THG.get_hypergraph(temp)
             st = RnaAnalyst(h1)
             elements = st.structure_differences(h2)
@@ -332,23 +648,27 @@ class TemperatureFoldingStats(TemporalRnaStats):
             self.__plotter.plot_structure_differences(diffs)
         return diffs
 
-    def get_connection_differences(self, start_temp, end_temp, plot=False) -> dict:
+    @profiled("stats.connection_differences")
+    def get_connection_differences(
+        self, start_temp, end_temp, plot=False, step=1
+    ) -> dict:
         """
         Restituisce le differenze di connessione nucleotide-nucleotide in un range di temperature.
 
         Args:
-            start_temp (int): La temperatura iniziale.
-            end_temp (int): La temperatura finale.
+            start_temp (Temperature): La temperatura iniziale.
+            end_temp (Temperature): La temperatura finale.
             plot (bool): Indica se fare il grafico delle differenze di connessione.
+            step (Temperature): Il passo tra le temperature, anche non intero. Default è 1.
 
         Returns:
             dict: Il dizionario delle differenze di connessione.
         """
-        self.THG.insert_temperature_range(start_temp, end_temp)
+        self.THG.insert_temperature_range(start_temp, end_temp, step)
         diffs = {}
         h1 = self.THG.get_hypergraph(start_temp)
         st = RnaAnalyst(h1)
-        for temp in range(start_temp + 1, end_temp + 1):
+        for temp in temperature_range(start_temp, end_temp, step)[1:]:
             h2 = self.THG.get_hypergraph(temp)
             elements = st.connection_differences(h2)
             if elements is not None:
@@ -357,22 +677,29 @@ class TemperatureFoldingStats(TemporalRnaStats):
             self.__plotter.plot_connection_differences(diffs)
         return diffs
 
+    @profiled("stats.nucleotide_sensibility_to_change_connection")
     def get_nucleotide_sensibility_to_change_connection(
-        self, start_temp: int, end_temp: int, plot=False, plot_size: tuple = (20, 10)
+        self,
+        start_temp: Temperature,
+        end_temp: Temperature,
+        plot=False,
+        plot_size: tuple = (20, 10),
+        step: Temperature = 1,
     ) -> dict:
         """
         Restituisce un dizionario che indica, per ogni nucleotide, la sua sensibilità a cambiare connessione in un range di temperature.
 
         Args:
-            start_temp (int): La temperatura iniziale.
-            end_temp (int): La temperatura finale.
+            start_temp (Temperature): La temperatura iniziale.
+            end_temp (Temperature): La temperatura finale.
             plot (bool): Indica se fare il grafico della sensibilità.
             plot_size (tuple): Se viene richiesto il grafico, definisce la sua grandezza.
+            step (Temperature): Il passo tra le temperature, anche non intero. Default è 1.
 
         Returns:
             dict: Il dizionario delle sensibilità dei nucleotidi ai cambiamenti di connessione.
         """
-        diffs = self.get_connection_differences(start_temp, end_temp)
+        diffs = self.get_connection_differences(start_temp, end_temp, step=step)
         count = defaultdict(int)
         for conn in diffs.values():
             nodes = (n for lis in conn for tup in lis for n in tup)
@@ -382,308 +709,68 @@ class TemperatureFoldingStats(TemporalRnaStats):
             self.__plotter.plot_sensibility_to_change_connection(count, plot_size)
         return count
 
-
-class RnaStatsPlotter:
-    """Classe che fornisce metodi per disegnare grafici relativi agli ipergrafi dell'RNA."""
-
-    def plot_hypergraph(self, HG: hnx.Hypergraph, size) -> None:
-        """
-        Disegna un grafico che rappresenta l'ipergrafo costruito.
-
-        Args:
-            HG (hnx.Hypergraph): L'ipergrafo da disegnare.
-            size (tuple): La dimensione del grafico.
-        """
-        if len(HG.nodes) > 250:
-            plt.subplots(figsize=size)
-            G = hmod.two_section(HG).to_networkx()
-            nx.draw(G, node_size=50)
-            plt.show()
-        else:
-            plt.subplots(figsize=size)
-            hnx.draw(HG, **{"layout_kwargs": {"seed": 39}})
-            plt.show()
-
-    def plot_structures(self, structures: dict) -> None:
-        """
-        Disegna un grafico che rappresenta le strutture secondarie dell'RNA.
-
-        Args:
-            structures (dict): Il dizionario delle strutture secondarie.
-        """
-        HG = hnx.Hypergraph(structures)
-        hnx.draw(HG)
-
-    def plot_partitions_conductance(self, conductances, size=(20, 10)) -> None:
-        """
-        Disegna un grafico che rappresenta la conduttanza delle partizioni.
-
-        Args:
-            conductances (list[float]): La lista delle conduttanze delle partizioni.
-            size (tuple): La dimensione del grafico.
-        """
-        plt.subplots(figsize=size)
-        seq = []
-        values = []
-        for i, c in enumerate(conductances, start=1):
-            seq.append(i)
-            values.append(c)
-        plt.bar(seq, values)
-        plt.title("Partitions Conductance")
-        plt.xlabel("Partition")
-        plt.ylabel("Conductance score")
-        plt.show()
-
-    def plot_s_between_centrality(
-        self, centrality, edges, s: int = 1, size=(20, 10)
-    ) -> None:
-        """
-        Disegna un grafico che rappresenta la n-between-centrality dei nucleotidi.
-
-        Args:
-            centrality (dict): Il dizionario delle centralità.
-            edges (bool): Indica se considerare anche gli archi.
-            s (int): Requisito di connessione.
-            size (tuple): La dimensione del grafico.
-        """
-        plt.subplots(figsize=size)
-        if edges:
-            centrality = {k: v for k, v in sorted(centrality.items())}
-            plt.xticks(rotation=90)
-
-        seq = list(centrality.keys())
-        centr = list(centrality.values())
-
-        plt.bar(seq, centr)
-        plt.title(f"{s}-centrality")
-        plt.xlabel("Nucleotides")
-        plt.ylabel("Centrality")
-        plt.show()
-
-
-def get_changed_connections(diffs: dict) -> tuple[list, list]:
-    """
-    Restituisce le connessioni cambiate tra due ipergrafi.
-
-    Args:
-        diffs (dict): Il dizionario delle differenze di connessione.
-
-    Returns:
-        tuple[list, list]: Due liste che rappresentano le connessioni vecchie e nuove.
-    """
-    changes = defaultdict(dict)
-    for temp, conn in diffs.items():
-        new = conn[1]
-        for o in conn[0]:
-            n = [n for n in new if n[0] == o[0]]
-            if len(n) != 0:
-                changes[temp][o] = n[0]
-    old = []
-    new = []
-    for temp, conn in changes.items():
-        for o, n in conn.items():
-            old.append(o)
-            new.append(n)
-    return new, old
-
-
-def get_created_connections(diffs: dict) -> set:
-    """
-    Restituisce le connessioni create tra due ipergrafi.
-
-    Args:
-        diffs (dict): Il dizionario delle differenze di connessione.
-
-    Returns:
-        set: L'insieme delle connessioni create.
-    """
-
-    created_connections = defaultdict(list)
-    for temp, conn in diffs.items():
-        for new in conn[1]:
-            if new[0] not in [old[0] for old in conn[0]]:
-                created_connections[temp].append(new)
-    created = {tup for _, conn in created_connections.items() for tup in conn}
-    return created
-
-
-def get_deleted_connections(diffs: dict) -> set:
-    """
-    Restituisce le connessioni eliminate tra due ipergrafi.
-
-    Args:
-        diffs (dict): Il dizionario delle differenze di connessione.
-
-    Returns:
-        set: L'insieme delle connessioni eliminate.
-    """
-    deleted_connections = defaultdict(list)
-    for temp, conn in diffs.items():
-        for old in conn[0]:
-            if old[0] not in [new[0] for new in conn[1]]:
-                deleted_connections[temp].append(old)
-    deleted = {tup for _, conn in deleted_connections.items() for tup in conn}
-    return deleted
-
-
-class TemperatureFoldingStatsPlotter:
-    """Classe che fornisce metodi per disegnare grafici relativi alle statistiche di folding dell'RNA a diverse temperature."""
-
-    def plot_nucleotide_sensibility_to_changes(
-        self, sensibilities: dict, size: tuple = (20, 10)
-    ) -> None:
+    def sensibility_index(
+        self, start_temp: Temperature, end_temp: Temperature, step: Temperature = 1
+    ) -> SensibilityIndex:
         """
-        Disegna un grafico che rappresenta la sensibilità dei nucleotidi ai cambiamenti di struttura.
+        Restituisce l'indice delle sensibilità per la griglia indicata, estendendolo alle
+        temperature dell'intervallo se non le contiene già. Le griglie con lo stesso passo ma
+        sfasate (ad esempio 20, 22, ... e 21, 23, ...) hanno indici distinti, perché le
+        transizioni vengono contate tra temperature consecutive della griglia.
 
         Args:
-            sensibilities (dict): Il dizionario delle sensibilità dei nucleotidi.
-            size (tuple): La dimensione del grafico.
-        """
-        ordered_keys = sorted(sensibilities.keys())
-        ordered_values = [sensibilities[key] for key in ordered_keys]
-        seq = list(ordered_keys)
-        centr = list(ordered_values)
-        plt.subplots(figsize=size)
-        plt.bar(seq, centr)
-        plt.title("Nucleotide Sensibility")
-        plt.xlabel("Nucleotides")
-        plt.ylabel("Sensibility score")
-        plt.show()
-
-    def plot_structure_differences(self, diffs: dict) -> None:
-        """
-        Disegna un grafico che rappresenta le differenze strutturali tra diverse temperature.
-
-        Args:
-            diffs (dict): Il dizionario delle differenze strutturali.
-        """
-        negatives, positives, structures = self.__compute_number_of_structures(diffs)
-        fig = plt.figure()
-        ax = plt.subplot(111)
-        ax.bar(structures, negatives, color="r")
-        ax.bar(structures, positives, color="b", bottom=0)
-        plt.title("Structure Differences")
-        plt.xlabel("Structure")
-        plt.ylabel("Structures added/removed")
-        fig.show()
-
-    def __compute_number_of_structures(self, diffs: dict) -> tuple:
-        """
-        Calcola il numero medio di strutture aggiunte e rimosse.
-
-        Args:
-            diffs (dict): Il dizionario delle differenze strutturali.
+            start_temp (Temperature): La temperatura iniziale.
+            end_temp (Temperature): La temperatura finale.
+            step (Temperature): Il passo tra le temperature, anche non intero. Default è 1.
 
         Returns:
-            tuple: Tre liste contenenti le strutture rimosse, aggiunte e i nomi delle strutture.
-        """
-        positives = defaultdict(list)
-        negatives = defaultdict(list)
-        for dic in diffs.values():
-            for k, v in dic.items():
-                if v > 0:
-                    positives[k].append(v)
-                else:
-                    negatives[k].append(v)
-        structures = sorted(positives.keys())
-        positives = {
-            k: (mean(positives[k]) if len(positives[k]) > 0 else 0) for k in structures
-        }.values()
-        negatives = {
-            k: (mean(negatives[k]) if len(negatives[k]) > 0 else 0) for k in structures
-        }.values()
-        return negatives, positives, structures
-
-    def plot_connection_differences(self, diffs: dict) -> None:
-        """
-        Disegna un grafico che rappresenta le differenze di connessione tra diverse temperature.
-
-        Args:
-            diffs (dict): Il dizionario delle differenze di connessione.
-        """
-
-        def draw_arrow(plt, arr_start, arr_end):
-            dx = arr_end[0] - arr_start[0]
-            dy = arr_end[1] - arr_start[1]
-            plt.arrow(
-                arr_start[0],
-                arr_start[1],
-                dx,
-                dy,
-                head_width=0.22,
-                head_length=0.22,
-                length_includes_head=True,
-                color="black",
-            )
-
-        def draw_cross(plt, point, color):
-            plt.plot(point[0], point[1], marker="x", color=color)
-
-        self.__plot_changed_connections(diffs, draw_arrow)
-        self.__plot_deleted_connections(diffs, draw_cross)
-        self.__plot_created_connections(diffs, draw_cross)
-
-        plt.title("Connection Differences")
-        plt.xlabel("Nucleotide")
-        plt.ylabel("Number of changes")
-        plt.show()
-
-    def __plot_changed_connections(self, diffs: dict, draw_arrow) -> None:
-        """
-        Disegna le connessioni cambiate tra diverse temperature.
-
-        Args:
-            diffs (dict): Il dizionario delle differenze di connessione.
-            draw_arrow (function): La funzione per disegnare le frecce.
-        """
-        new, old = get_changed_connections(diffs)
-        for i in range(len(new)):
-            draw_arrow(plt, old[i], new[i])
-        if len(new) > 0:
-            plt.scatter(*zip(*old), edgecolors="b")
-            plt.scatter(*zip(*new), edgecolors="r")
-
-    def __plot_created_connections(self, diffs: dict, draw_cross) -> None:
-        """
-        Disegna le connessioni create tra diverse temperature.
-
-        Args:
-            diffs (dict): Il dizionario delle differenze di connessione.
-            draw_cross (function): La funzione per disegnare le croci.
-        """
-        created = get_created_connections(diffs)
-        for point in created:
-            draw_cross(plt, point, "blue")
-
-    def __plot_deleted_connections(self, diffs: dict, draw_cross) -> None:
+            SensibilityIndex: L'indice, condiviso dalle interrogazioni sulla stessa griglia.
+        """
+        temperatures = temperature_range(start_temp, end_temp, step)
+        step = normalize_temperature(step)
+        offset = normalize_temperature(start_temp % step)
+        key = (step, 0 if offset == step else offset)
+        index = self.__indexes.get(key)
+        if index is None:
+            index = SensibilityIndex(self.THG, temperatures)
+            self.__indexes[key] = index
+        else:
+            index.add_temperatures(temperatures)
+        return index
+
+    @profiled("stats.region_sensibility")
+    def get_region_sensibility(
+        self,
+        start_position: int,
+        end_position: int,
+        start_temp: Temperature,
+        end_temp: Temperature,
+        step: Temperature = 1,
+        connection: bool = False,
+    ) -> dict:
         """
-        Disegna le connessioni eliminate tra diverse temperature.
+        Restituisce la sensibilità dei nucleotidi di una regione, ad esempio una UTR o un sito
+        di legame, in un range di temperature. I conteggi coincidono con quelli di
+        get_nucleotide_sensibility_to_changes (o di get_nucleotide_sensibility_to_change_connection
+        se connection è True) ristretti alla regione, ma sono letti da un indice costruito una
+        sola volta per griglia ed esteso quando servono altre temperature.
 
         Args:
-            diffs (dict): Il dizionario delle differenze di connessione.
-            draw_cross (function): La funzione per disegnare le croci.
-        """
-        deleted = get_deleted_connections(diffs)
-        for point in deleted:
-            draw_cross(plt, point, "red")
-
-    def plot_sensibility_to_change_connection(
-        self, count: dict, size: tuple = (20, 10)
-    ) -> None:
-        """
-        Disegna un grafico che rappresenta la sensibilità dei nucleotidi ai cambiamenti di connessione.
+            start_position (int): La posizione iniziale della regione.
+            end_position (int): La posizione finale della regione, inclusa.
+            start_temp (Temperature): La temperatura iniziale.
+            end_temp (Temperature): La temperatura finale.
+            step (Temperature): Il passo tra le temperature, anche non intero. Default è 1.
+            connection (bool): Se True, conta i cambiamenti di connessione invece che di struttura.
 
-        Args:
-            count (dict): Il dizionario delle sensibilità dei nucleotidi.
-            size (tuple): La dimensione del grafico.
-        """
-        count = dict(sorted(count.items()))
-        seq = list(count.keys())
-        sens = list(count.values())
-        plt.subplots(figsize=(16, 8))
-        plt.bar(seq, sens)
-        plt.title("Nucleotide Sensibility")
-        plt.xlabel("Nucleotides")
-        plt.ylabel("Sensibility score")
-        plt.show()
-        pass
+        Returns:
+            dict: Il dizionario delle sensibilità dei nucleotidi della regione con almeno un cambiamento.
+        """
+        index = self.sensibility_index(start_temp, end_temp, step)
+        query = index.connection_changes if connection else index.structure_changes
+        counts = query(start_position, end_position, start_temp, end_temp)
+        return {
+            start_position + i: int(count)
+            for i, count in enumerate(counts.tolist())
+            if count > 0
+        }
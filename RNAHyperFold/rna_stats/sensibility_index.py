@@ -0,0 +1,348 @@
+from __future__ import annotations
+
+import bisect
+
+import numpy as np
+
+from RNAHyperFold.hypergraph_folding.edge_model import EdgeTable, EdgeType
+from RNAHyperFold.hypergraph_folding.temperature_grid import (
+    Temperature,
+    normalize_temperature,
+)
+from RNAHyperFold.hypergraph_folding.temperature_hypergraph import (
+    TemperatureFoldingHypergraph,
+)
+from RNAHyperFold.profiling.stage_profiler import PROFILER, profiled
+
+
+def structure_change_mask(labels: np.ndarray, next_labels: np.ndarray) -> np.ndarray:
+    """
+    Individua i nucleotidi che cambiano struttura tra due folding, con lo stesso criterio di
+    RnaAnalyst.get_nucleotides_change_structure: un nucleotide cambia se la sua struttura
+    esiste ancora nel secondo folding ma non lo contiene più.
+
+    Args:
+        labels (np.ndarray): Gli id globali delle strutture del primo folding, -1 se nessuna.
+        next_labels (np.ndarray): Gli id globali delle strutture del secondo folding, -1 se nessuna.
+
+    Returns:
+        np.ndarray: 1 per i nucleotidi che cambiano struttura, 0 altrimenti.
+    """
+    return (
+        (labels >= 0) & (labels != next_labels) & np.isin(labels, next_labels)
+    ).astype(np.int64)
+
+
+def connection_change_counts(partners: np.ndarray, other: np.ndarray) -> np.ndarray:
+    """
+    Conta, per ogni nucleotide, le volte in cui compare nelle differenze di connessione tra
+    due folding, con lo stesso criterio di RnaAnalyst.connection_differences: una coppia
+    rimossa conta per entrambi i nucleotidi, una coppia che cambia base appaiata conta anche
+    per il primo nucleotide e per la nuova base.
+
+    Args:
+        partners (np.ndarray): Per il primo nucleotide di ogni coppia del primo folding il secondo, -1 altrimenti.
+        other (np.ndarray): La stessa tabella per il secondo folding.
+
+    Returns:
+        np.ndarray: Il numero di occorrenze di ogni nucleotide nelle differenze.
+    """
+    counts = np.zeros(len(partners), dtype=np.int64)
+    changed = np.flatnonzero((partners >= 0) & (other != partners))
+    moved = changed[other[changed] >= 0]
+    for nodes in (changed, partners[changed], moved, other[moved]):
+        counts += np.bincount(nodes, minlength=len(counts))
+    return counts
+
+
+def _first_partners(table: EdgeTable, length: int) -> np.ndarray:
+    """Restituisce, per il primo nucleotide di ogni coppia di basi, il secondo nucleotide."""
+    partners = np.full(length, -1, dtype=np.int64)
+    starts = table.offsets[table.of_type(EdgeType.PAIR)]
+    partners[table.nodes[starts]] = table.nodes[starts + 1]
+    return partners
+
+
+def _summed_rows(base: np.ndarray, increments: list[np.ndarray]) -> np.ndarray:
+    """
+    Restituisce le righe che seguono base in una tabella cumulativa: ogni riga somma alla
+    precedente un incremento, memorizzato come somma prefissa sulle posizioni.
+    """
+    rows = np.zeros((len(increments), len(base)), dtype=np.int64)
+    if len(increments) > 0:
+        rows[:, 1:] = np.cumsum(np.stack(increments), axis=1)
+    return base + np.cumsum(rows, axis=0)
+
+
+class SensibilityIndex:
+    """
+    Indice delle sensibilità dei nucleotidi su una griglia di temperature, per interrogare
+    una regione (intervallo di nucleotidi × intervallo di temperature) senza ripetere il
+    confronto dei folding. I cambiamenti di struttura tra temperature consecutive sono
+    memorizzati come somme prefisse bidimensionali, sulle temperature e sulle posizioni:
+    il totale di una regione costa O(1) e i conteggi per nucleotide O(lunghezza della regione).
+    I cambiamenti di connessione sono misurati rispetto alla temperatura iniziale della
+    finestra, come in TemperatureFoldingStats.get_connection_differences, per cui viene
+    costruita una tabella per ogni struttura distinta usata come inizio di una finestra.
+    Aggiungere temperature ricalcola solo le righe dalla prima temperatura nuova in poi,
+    per cui estendere lo sweep verso l'alto costa quanto le temperature aggiunte.
+    """
+
+    def __init__(
+        self, THG: TemperatureFoldingHypergraph, temperatures: list[Temperature]
+    ) -> None:
+        """
+        Inizializza un'istanza della classe SensibilityIndex e computa i folding mancanti.
+
+        Args:
+            THG (TemperatureFoldingHypergraph): L'ipergrafo temporale dei folding dell'RNA.
+            temperatures (list[Temperature]): Le temperature della griglia.
+        """
+        self.THG: TemperatureFoldingHypergraph = THG
+        self.length: int = len(THG.producer.sequence)
+        self.temperatures: list[Temperature] = []
+        """Le temperature della griglia, in ordine crescente."""
+        self.__positions: dict[Temperature, int] = {}
+        self.__distinct: dict[int, int] = {}
+        self.__hypergraphs: list = []
+        self.__names: dict[str, int] = {}
+        self.__labels: list[np.ndarray] = []
+        self.__partners: list[np.ndarray] = []
+        self.__structure_ids: list[int] = []
+        self.__changes: np.ndarray = np.zeros((1, self.length + 1), dtype=np.int64)
+        self.__connections: dict[int, np.ndarray] = {}
+        self.__masks: dict[tuple[int, int], np.ndarray] = {}
+        self.add_temperatures(temperatures)
+
+    def __structure_id(self, temperature: Temperature) -> int:
+        """Restituisce l'id della struttura distinta di una temperatura, registrandola se nuova."""
+        HG = self.THG.get_hypergraph(temperature)
+        structure = self.__distinct.get(id(HG))
+        if structure is None:
+            structure = len(self.__labels)
+            self.__distinct[id(HG)] = structure
+            # l'ipergrafo resta referenziato perché il suo id non venga riusato
+            self.__hypergraphs.append(HG)
+            table = self.THG.get_edge_table(temperature)
+            local = table.node_index.element_labels[: self.length]
+            labels = np.full(self.length, -1, dtype=np.int64)
+            names = np.array(
+                [
+                    self.__names.setdefault(name, len(self.__names))
+                    for name in table.names
+                ]
+                + [-1],
+                dtype=np.int64,
+            )
+            labels[: len(local)] = names[local]
+            self.__labels.append(labels)
+            self.__partners.append(_first_partners(table, self.length))
+        return structure
+
+    def __structure_mask(self, structure: int, next_structure: int) -> np.ndarray:
+        key = (structure, next_structure)
+        mask = self.__masks.get(key)
+        if mask is None:
+            mask = structure_change_mask(
+                self.__labels[structure], self.__labels[next_structure]
+            )
+            self.__masks[key] = mask
+        return mask
+
+    def __connection_rows(self, start: int, first_row: int) -> list[np.ndarray]:
+        return [
+            connection_change_counts(self.__partners[start], self.__partners[other])
+            for other in self.__structure_ids[first_row:]
+        ]
+
+    @profiled("sensibility_index.add_temperatures")
+    def add_temperatures(self, temperatures: list[Temperature]) -> None:
+        """
+        Aggiunge delle temperature alla griglia, computandone i folding se necessario.
+
+        Args:
+            temperatures (list[Temperature]): Le temperature da aggiungere.
+        """
+        new = sorted(
+            set(map(normalize_temperature, temperatures)).difference(self.__positions)
+        )
+        if len(new) == 0:
+            return
+        self.THG.insert_temperatures(new)
+        first = bisect.bisect_left(self.temperatures, new[0])
+        self.temperatures = sorted(self.temperatures + new)
+        self.__positions = {t: i for i, t in enumerate(self.temperatures)}
+        self.__structure_ids = self.__structure_ids[:first] + [
+            self.__structure_id(t) for t in self.temperatures[first:]
+        ]
+        ids = self.__structure_ids
+        # la riga k somma le transizioni tra le temperature i e i + 1 con i < k
+        kept = max(first, 1)
+        self.__changes = np.concatenate(
+            (
+                self.__changes[:kept],
+                _summed_rows(
+                    self.__changes[kept - 1],
+                    [
+                        self.__structure_mask(ids[i], ids[i + 1])
+                        for i in range(kept - 1, len(ids) - 1)
+                    ],
+                ),
+            )
+        )
+        # la riga k somma le differenze rispetto alla struttura iniziale delle temperature i < k
+        for start, table in self.__connections.items():
+            self.__connections[start] = np.concatenate(
+                (
+                    table[: first + 1],
+                    _summed_rows(table[first], self.__connection_rows(start, first)),
+                )
+            )
+        PROFILER.count("sensibility_index.temperatures", len(new))
+
+    def __window(
+        self,
+        start_position: int,
+        end_position: int,
+        start_temperature: Temperature,
+        end_temperature: Temperature,
+    ) -> tuple[int, int]:
+        """Valida una regione e restituisce le righe delle due temperature nella griglia."""
+        if not 0 <= start_position <= end_position < self.length:
+            raise ValueError(
+                f"Intervallo di nucleotidi non valido: {start_position}-{end_position}"
+            )
+        rows = []
+        for temperature in (start_temperature, end_temperature):
+            row = self.__positions.get(normalize_temperature(temperature))
+            if row is None:
+                raise ValueError(f"Temperatura {temperature} non presente nell'indice")
+            rows.append(row)
+        if rows[0] > rows[1]:
+            raise ValueError("La temperatura iniziale supera quella finale")
+        return rows[0], rows[1]
+
+    def __structure_difference(self, rows: tuple[int, int]) -> np.ndarray:
+        start, end = rows
+        # stessi intervalli di get_nucleotide_sensibility_to_changes, che salta la prima transizione
+        if end <= start + 1:
+            return np.zeros(self.length + 1, dtype=np.int64)
+        return self.__changes[end] - self.__changes[start + 1]
+
+    def __connection_difference(self, rows: tuple[int, int]) -> np.ndarray:
+        start, end = rows
+        structure = self.__structure_ids[start]
+        table = self.__connections.get(structure)
+        if table is None:
+            table = _summed_rows(
+                np.zeros(self.length + 1, dtype=np.int64),
+                self.__connection_rows(structure, 0),
+            )
+            table = np.concatenate((np.zeros((1, self.length + 1), np.int64), table))
+            self.__connections[structure] = table
+        return table[end + 1] - table[start + 1]
+
+    def structure_changes(
+        self,
+        start_position: int,
+        end_position: int,
+        start_temperature: Temperature,
+        end_temperature: Temperature,
+    ) -> np.ndarray:
+        """
+        Restituisce, per ogni nucleotide di una regione, il numero di cambiamenti di struttura
+        tra temperature consecutive, sugli stessi intervalli di
+        TemperatureFoldingStats.get_nucleotide_sensibility_to_changes.
+
+        Args:
+            start_position (int): La posizione iniziale della regione.
+            end_position (int): La posizione finale della regione, inclusa.
+            start_temperature (Temperature): La temperatura iniziale, presente nella griglia.
+            end_temperature (Temperature): La temperatura finale, presente nella griglia.
+
+        Returns:
+            np.ndarray: Il numero di cambiamenti di ogni nucleotide della regione.
+        """
+        rows = self.__window(
+            start_position, end_position, start_temperature, end_temperature
+        )
+        difference = self.__structure_difference(rows)
+        return np.diff(difference[start_position : end_position + 2])
+
+    def structure_change_total(
+        self,
+        start_position: int,
+        end_position: int,
+        start_temperature: Temperature,
+        end_temperature: Temperature,
+    ) -> int:
+        """
+        Restituisce il numero totale di cambiamenti di struttura dei nucleotidi di una regione, in tempo costante.
+
+        Args:
+            start_position (int): La posizione iniziale della regione.
+            end_position (int): La posizione finale della regione, inclusa.
+            start_temperature (Temperature): La temperatura iniziale, presente nella griglia.
+            end_temperature (Temperature): La temperatura finale, presente nella griglia.
+
+        Returns:
+            int: La somma dei cambiamenti dei nucleotidi della regione.
+        """
+        rows = self.__window(
+            start_position, end_position, start_temperature, end_temperature
+        )
+        difference = self.__structure_difference(rows)
+        return int(difference[end_position + 1] - difference[start_position])
+
+    def connection_changes(
+        self,
+        start_position: int,
+        end_position: int,
+        start_temperature: Temperature,
+        end_temperature: Temperature,
+    ) -> np.ndarray:
+        """
+        Restituisce, per ogni nucleotide di una regione, il numero di differenze di connessione
+        rispetto alla temperatura iniziale, con lo stesso criterio di
+        TemperatureFoldingStats.get_nucleotide_sensibility_to_change_connection.
+
+        Args:
+            start_position (int): La posizione iniziale della regione.
+            end_position (int): La posizione finale della regione, inclusa.
+            start_temperature (Temperature): La temperatura iniziale, presente nella griglia.
+            end_temperature (Temperature): La temperatura finale, presente nella griglia.
+
+        Returns:
+            np.ndarray: Il numero di differenze di ogni nucleotide della regione.
+        """
+        rows = self.__window(
+            start_position, end_position, start_temperature, end_temperature
+        )
+        difference = self.__connection_difference(rows)
+        return np.diff(difference[start_position : end_position + 2])
+
+    def connection_change_total(
+        self,
+        start_position: int,
+        end_position: int,
+        start_temperature: Temperature,
+        end_temperature: Temperature,
+    ) -> int:
+        """
+        Restituisce il numero totale di differenze di connessione dei nucleotidi di una regione,
+        in tempo costante una volta costruita la tabella della struttura iniziale.
+
+        Args:
+            start_position (int): La posizione iniziale della regione.
+            end_position (int): La posizione finale della regione, inclusa.
+            start_temperature (Temperature): La temperatura iniziale, presente nella griglia.
+            end_temperature (Temperature): La temperatura finale, presente nella griglia.
+
+        Returns:
+            int: La somma delle differenze dei nucleotidi della regione.
+        """
+        rows = self.__window(
+            start_position, end_position, start_temperature, end_temperature
+        )
+        difference = self.__connection_difference(rows)
+        return int(difference[end_position + 1] - difference[start_position])
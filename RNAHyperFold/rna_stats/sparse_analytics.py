@@ -0,0 +1,337 @@
+from __future__ import annotations
+
+import weakref
+
+import numpy as np
+
+from RNAHyperFold.hypergraph_folding.edge_model import EdgeTable, edge_table
+from RNAHyperFold.hypergraph_folding.pair_table import node_position
+from RNAHyperFold.hypergraph_folding.temperature_grid import (
+    Temperature,
+    temperature_range,
+)
+from RNAHyperFold.hypergraph_folding.temperature_hypergraph import (
+    TemperatureFoldingHypergraph,
+)
+from RNAHyperFold.lazy_modules import lazy_module
+from RNAHyperFold.profiling.stage_profiler import profiled
+
+hnx = lazy_module("hypernetx")
+sparse = lazy_module("scipy.sparse")
+csgraph = lazy_module("scipy.sparse.csgraph")
+
+# matrici già costruite, rilasciate insieme al rispettivo ipergrafo
+_matrices: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+
+
+def incidence_matrix(table: EdgeTable) -> sparse.csr_matrix:
+    """
+    Costruisce la matrice di incidenza nucleotidi × iperarchi di un folding.
+
+    Args:
+        table (EdgeTable): La tabella degli iperarchi del folding.
+
+    Returns:
+        sparse.csr_matrix: La matrice binaria, con righe indicizzate per posizione e colonne per id dell'iperarco.
+    """
+    columns = np.repeat(np.arange(len(table), dtype=np.int32), table.edge_sizes())
+    matrix = sparse.csr_matrix(
+        (np.ones(len(table.nodes), dtype=np.int32), (table.nodes, columns)),
+        shape=(table.length, len(table)),
+    )
+    # un nodo ripetuto nello stesso iperarco conta una sola volta
+    matrix.data[:] = 1
+    return matrix
+
+
+def cached_incidence_matrix(HG: hnx.Hypergraph) -> sparse.csr_matrix:
+    """
+    Restituisce la matrice di incidenza di un ipergrafo, costruendola una sola volta per ipergrafo.
+
+    Args:
+        HG (hnx.Hypergraph): L'ipergrafo.
+
+    Returns:
+        sparse.csr_matrix: La matrice di incidenza nucleotidi × iperarchi.
+    """
+    matrix = _matrices.get(HG)
+    if matrix is None:
+        matrix = incidence_matrix(edge_table(HG))
+        _matrices[HG] = matrix
+    return matrix
+
+
+def _positions(subset) -> np.ndarray:
+    """Converte un insieme di nodi nelle rispettive posizioni."""
+    return np.fromiter((node_position(node) for node in subset), dtype=np.int64)
+
+
+def _conductance(
+    matrix: sparse.csr_matrix, in_subset: np.ndarray, present: np.ndarray
+) -> float:
+    """
+    Calcola la conduttanza di un sottoinsieme di nodi con la stessa definizione di HyperNetX:
+    la somma delle dimensioni degli iperarchi che attraversano il taglio divisa per la somma
+    dei gradi dei nodi del sottoinsieme.
+
+    Args:
+        matrix (sparse.csr_matrix): La matrice di incidenza.
+        in_subset (np.ndarray): La maschera dei nodi del sottoinsieme.
+        present (np.ndarray): La maschera dei nodi presenti nell'ipergrafo.
+
+    Returns:
+        float: La conduttanza.
+    """
+    if not np.any(present & ~in_subset):
+        raise Exception("True subset is not allowed")
+    sizes = np.asarray(matrix.sum(axis=0)).ravel()
+    inside = matrix.T @ in_subset.astype(np.int32)
+    crossing = (inside > 0) & (inside < sizes)
+    degree = np.asarray(matrix.sum(axis=1)).ravel()
+    return float(sizes[crossing].sum() / degree[in_subset].sum())
+
+
+class SparseHypergraphAnalytics:
+    """
+    Metriche di un folding calcolate con prodotti tra matrici sparse sulla matrice di incidenza
+    nucleotidi × iperarchi, invece di attraversare gli oggetti HyperNetX.
+    """
+
+    def __init__(self, HG: hnx.Hypergraph) -> None:
+        """
+        Inizializza un'istanza della classe SparseHypergraphAnalytics.
+
+        Args:
+            HG (hnx.Hypergraph): L'ipergrafo del folding.
+        """
+        self.HG: hnx.Hypergraph = HG
+        self.table: EdgeTable = edge_table(HG)
+        self.incidence: sparse.csr_matrix = cached_incidence_matrix(HG)
+        """La matrice di incidenza nucleotidi × iperarchi."""
+
+    def edge_sizes(self) -> np.ndarray:
+        """
+        Restituisce il numero di nodi di ogni iperarco.
+
+        Returns:
+            np.ndarray: La dimensione di ogni iperarco, indicizzata per id.
+        """
+        return np.asarray(self.incidence.sum(axis=0)).ravel()
+
+    def degree(self, s: int = 1) -> np.ndarray:
+        """
+        Restituisce il grado di ogni nucleotide, ovvero il numero di iperarchi di dimensione almeno s che lo contengono.
+
+        Args:
+            s (int): La dimensione minima degli iperarchi considerati.
+
+        Returns:
+            np.ndarray: Il grado di ogni nucleotide, indicizzato per posizione.
+        """
+        if s <= 1:
+            return np.asarray(self.incidence.sum(axis=1)).ravel()
+        large = (self.edge_sizes() >= s).astype(np.int32)
+        return self.incidence @ large
+
+    def s_adjacency(self, s: int = 1, edges: bool = False) -> sparse.csr_matrix:
+        """
+        Restituisce la matrice di s-adiacenza: due nucleotidi (o iperarchi) sono s-adiacenti se
+        condividono almeno s iperarchi (o nucleotidi).
+
+        Args:
+            s (int): Il numero minimo di elementi condivisi.
+            edges (bool): Se True la matrice è tra iperarchi, altrimenti tra nucleotidi.
+
+        Returns:
+            sparse.csr_matrix: La matrice di adiacenza binaria, senza diagonale.
+        """
+        incidence = self.incidence.T.tocsr() if edges else self.incidence
+        shared = (incidence @ incidence.T).tocsr()
+        shared.setdiag(0)
+        shared.data = (shared.data >= s).astype(np.int32)
+        shared.eliminate_zeros()
+        return shared
+
+    def two_section(self) -> sparse.csr_matrix:
+        """
+        Restituisce la matrice di adiacenza della two-section: due nucleotidi sono adiacenti se
+        appartengono a uno stesso iperarco.
+
+        Returns:
+            sparse.csr_matrix: La matrice di adiacenza binaria tra nucleotidi.
+        """
+        return self.s_adjacency(1)
+
+    @profiled("sparse.s_connected_components")
+    def s_connected_components(
+        self, s: int = 1, edges: bool = False, return_singletons: bool = False
+    ) -> list[set]:
+        """
+        Restituisce le componenti s-connesse dei nucleotidi (o degli iperarchi).
+
+        Args:
+            s (int): Il numero minimo di elementi condivisi tra elementi adiacenti.
+            edges (bool): Se True le componenti sono insiemi di nomi di iperarchi, altrimenti di nodi.
+            return_singletons (bool): Se True restituisce anche le componenti con un solo elemento.
+
+        Returns:
+            list[set]: Le componenti s-connesse.
+        """
+        adjacency = self.s_adjacency(s, edges)
+        count, labels = csgraph.connected_components(adjacency, directed=False)
+        if edges:
+            # un iperarco più piccolo di s non è s-connesso nemmeno a sé stesso
+            valid = self.edge_sizes() >= s
+            name = self.table.name
+        else:
+            valid = self.degree() > 0
+            name = self.table.node
+        order = np.argsort(labels, kind="stable")
+        bounds = np.searchsorted(labels[order], np.arange(count + 1))
+        components = []
+        for component in range(count):
+            members = order[bounds[component] : bounds[component + 1]]
+            members = members[valid[members]]
+            if len(members) == 0 or (len(members) == 1 and not return_singletons):
+                continue
+            components.append({name(int(member)) for member in members})
+        return components
+
+    @profiled("sparse.conductance")
+    def conductance(self, subset: set) -> float:
+        """
+        Restituisce la conduttanza di un sottoinsieme di nucleotidi, con la definizione di HyperNetX.
+
+        Args:
+            subset (set): Il sottoinsieme di nodi.
+
+        Returns:
+            float: La conduttanza del sottoinsieme.
+        """
+        in_subset = np.zeros(self.incidence.shape[0], dtype=bool)
+        in_subset[_positions(subset)] = True
+        return _conductance(self.incidence, in_subset, self.degree() > 0)
+
+
+class SweepAnalytics:
+    """
+    Metriche sparse calcolate su tutti i folding di un intervallo di temperature con un unico
+    prodotto su una matrice di incidenza a blocchi diagonali, un blocco per folding distinto.
+    """
+
+    def __init__(
+        self,
+        THG: TemperatureFoldingHypergraph,
+        start_temperature: Temperature,
+        end_temperature: Temperature,
+        step: Temperature = 1,
+    ) -> None:
+        """
+        Inizializza un'istanza della classe SweepAnalytics.
+
+        Args:
+            THG (TemperatureFoldingHypergraph): L'ipergrafo temporale dei folding dell'RNA.
+            start_temperature (Temperature): La temperatura iniziale.
+            end_temperature (Temperature): La temperatura finale.
+            step (Temperature): Il passo tra le temperature, anche non intero. Default è 1.
+        """
+        THG.insert_temperature_range(start_temperature, end_temperature, step)
+        self.temperatures: list[Temperature] = temperature_range(
+            start_temperature, end_temperature, step
+        )
+        self.length: int = len(THG.producer.sequence)
+        distinct: dict[int, int] = {}
+        blocks = []
+        structure_index = []
+        for temperature in self.temperatures:
+            HG = THG.get_hypergraph(temperature)
+            if id(HG) not in distinct:
+                distinct[id(HG)] = len(blocks)
+                matrix = cached_incidence_matrix(HG)
+                if matrix.shape[0] != self.length:
+                    # tutti i blocchi hanno una riga per nucleotide
+                    matrix = matrix.copy()
+                    matrix.resize((self.length, matrix.shape[1]))
+                blocks.append(matrix)
+            structure_index.append(distinct[id(HG)])
+        self.structure_index: np.ndarray = np.array(structure_index, dtype=np.int32)
+        """L'indice del folding distinto di ogni temperatura."""
+        self.incidence: sparse.csr_matrix = sparse.block_diag(blocks, format="csr")
+        """La matrice di incidenza a blocchi (folding distinti × nucleotidi) × iperarchi."""
+        self.edge_offsets: np.ndarray = np.concatenate(
+            ([0], np.cumsum([block.shape[1] for block in blocks]))
+        )
+        """Le colonne del folding distinto k sono edge_offsets[k]:edge_offsets[k + 1]."""
+
+    @property
+    def distinct_count(self) -> int:
+        """Il numero di folding distinti nell'intervallo."""
+        return len(self.edge_offsets) - 1
+
+    def __per_temperature(self, values: np.ndarray) -> np.ndarray:
+        """Espande valori calcolati per folding distinto a tutte le temperature."""
+        return values[self.structure_index]
+
+    @profiled("sparse.sweep_degrees")
+    def degrees(self) -> np.ndarray:
+        """
+        Restituisce il grado di ogni nucleotide a ogni temperatura.
+
+        Returns:
+            np.ndarray: La matrice temperature × nucleotidi dei gradi.
+        """
+        degree = np.asarray(self.incidence.sum(axis=1)).ravel()
+        return self.__per_temperature(degree.reshape(self.distinct_count, self.length))
+
+    @profiled("sparse.sweep_conductance")
+    def conductance(self, subset: set) -> np.ndarray:
+        """
+        Restituisce la conduttanza di un sottoinsieme di nucleotidi a ogni temperatura.
+
+        Args:
+            subset (set): Il sottoinsieme di nodi.
+
+        Returns:
+            np.ndarray: La conduttanza del sottoinsieme a ogni temperatura.
+        """
+        positions = _positions(subset)
+        in_subset = np.zeros((self.distinct_count, self.length), dtype=bool)
+        in_subset[:, positions] = True
+        in_subset = in_subset.ravel()
+        sizes = np.asarray(self.incidence.sum(axis=0)).ravel()
+        inside = self.incidence.T @ in_subset.astype(np.int32)
+        crossing = (inside > 0) & (inside < sizes)
+        degree = np.asarray(self.incidence.sum(axis=1)).ravel()
+        present = (degree > 0).reshape(self.distinct_count, self.length)
+        if not np.all(np.any(present & ~in_subset.reshape(present.shape), axis=1)):
+            raise Exception("True subset is not allowed")
+        crossing_sizes = np.add.reduceat(
+            np.where(crossing, sizes, 0), self.edge_offsets[:-1]
+        )
+        subset_degree = (degree * in_subset).reshape(present.shape).sum(axis=1)
+        return self.__per_temperature(crossing_sizes / subset_degree)
+
+    @profiled("sparse.sweep_components")
+    def s_connected_component_counts(self, s: int = 1) -> np.ndarray:
+        """
+        Restituisce il numero di componenti s-connesse dei nucleotidi (escluse quelle con un solo nucleotide) a ogni temperatura.
+
+        Args:
+            s (int): Il numero minimo di iperarchi condivisi tra nucleotidi adiacenti.
+
+        Returns:
+            np.ndarray: Il numero di componenti a ogni temperatura.
+        """
+        shared = (self.incidence @ self.incidence.T).tocsr()
+        shared.setdiag(0)
+        shared.data = (shared.data >= s).astype(np.int32)
+        shared.eliminate_zeros()
+        _, labels = csgraph.connected_components(shared, directed=False)
+        sizes = np.bincount(labels)
+        # i blocchi sono indipendenti: ogni componente appartiene a un solo folding
+        block_of_component = np.zeros(len(sizes), dtype=np.int64)
+        block_of_component[labels] = np.arange(len(labels)) // self.length
+        counts = np.bincount(
+            block_of_component[sizes > 1], minlength=self.distinct_count
+        )
+        return self.__per_temperature(counts)
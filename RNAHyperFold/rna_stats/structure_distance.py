@@ -0,0 +1,395 @@
+import bisect
+import os
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+
+import numpy as np
+
+from RNAHyperFold.hypergraph_folding.pair_table import (
+    node_position,
+    pair_table_from_incidence_dict,
+)
+from RNAHyperFold.hypergraph_folding.shared_folding import SharedFoldSweep
+from RNAHyperFold.hypergraph_folding.temperature_grid import (
+    Temperature,
+    temperature_range,
+)
+from RNAHyperFold.hypergraph_folding.temperature_hypergraph import (
+    TemperatureFoldingHypergraph,
+)
+from RNAHyperFold.profiling.stage_profiler import profiled
+
+NO_ELEMENT: int = -1
+"""Codice dei nucleotidi che non fanno parte di nessuna struttura secondaria."""
+
+
+def element_labels_from_incidence_dict(
+    incidence_dict: dict, length: int, names: dict[str, int]
+) -> np.ndarray:
+    """
+    Restituisce, per ogni nucleotide, il codice della struttura secondaria di cui fa parte.
+
+    Args:
+        incidence_dict (dict): Il dizionario di incidenza.
+        length (int): Il numero di nucleotidi.
+        names (dict[str, int]): Il dizionario che assegna un codice intero a ogni nome di
+            struttura, viene esteso con i nuovi nomi.
+
+    Returns:
+        np.ndarray: Il codice della struttura di ogni nucleotide, NO_ELEMENT se non ne fa parte.
+    """
+    labels = np.full(length, NO_ELEMENT, dtype=np.int32)
+    for key, nodes in incidence_dict.items():
+        if key.startswith("l") or key.startswith("db"):
+            continue
+        code = names.setdefault(key, len(names))
+        labels[[node_position(node) for node in nodes]] = code
+    return labels
+
+
+def pair_distance_matrix(pair_tables: np.ndarray, chunk_size: int = 64) -> np.ndarray:
+    """
+    Calcola la distanza tra coppie di basi di ogni coppia di strutture, ovvero il numero di
+    coppie presenti in una sola delle due strutture.
+
+    Args:
+        pair_tables (np.ndarray): Matrice strutture × nucleotidi delle tabelle delle coppie.
+        chunk_size (int): Il numero di righe confrontate contemporaneamente, limita la memoria usata.
+
+    Returns:
+        np.ndarray: La matrice simmetrica delle distanze.
+    """
+    count, length = pair_tables.shape
+    indexes = np.arange(length)
+    # un nucleotide è "apertura" se appaiato con un nucleotide successivo: ogni coppia viene contata una volta
+    opening = pair_tables > indexes
+    distances = np.zeros((count, count), dtype=np.int32)
+    for begin in range(0, count, chunk_size):
+        rows = pair_tables[begin : begin + chunk_size]
+        different = rows[:, None, :] != pair_tables[None, :, :]
+        distances[begin : begin + chunk_size] = (
+            different & opening[begin : begin + chunk_size, None, :]
+        ).sum(axis=2) + (different & opening[None, :, :]).sum(axis=2)
+    return distances
+
+
+def hamming_distance_matrix(labels: np.ndarray, chunk_size: int = 64) -> np.ndarray:
+    """
+    Calcola la distanza di Hamming tra le etichette di struttura di ogni coppia di folding.
+
+    Args:
+        labels (np.ndarray): Matrice strutture × nucleotidi dei codici delle strutture secondarie.
+        chunk_size (int): Il numero di righe confrontate contemporaneamente, limita la memoria usata.
+
+    Returns:
+        np.ndarray: La matrice simmetrica delle distanze.
+    """
+    count = len(labels)
+    distances = np.zeros((count, count), dtype=np.int32)
+    for begin in range(0, count, chunk_size):
+        rows = labels[begin : begin + chunk_size]
+        distances[begin : begin + chunk_size] = (
+            rows[:, None, :] != labels[None, :, :]
+        ).sum(axis=2)
+    return distances
+
+
+class StructureDistanceMatrix:
+    """
+    Classe che confronta tra loro tutti i folding di un intervallo di temperature.
+    I confronti vengono eseguiti solo tra strutture distinte, che con gli ipergrafi
+    temporali deduplicati (MemoryOptimizedFoldingHypergraph, SearchOptimizedFoldingHypergraph)
+    sono già raggruppate per intervallo di temperature, e poi estesi a tutte le temperature.
+    """
+
+    def __init__(
+        self,
+        THG: TemperatureFoldingHypergraph,
+        start_temperature: Temperature,
+        end_temperature: Temperature,
+        step: Temperature = 1,
+        adaptive: bool = False,
+        shared_memory: bool = False,
+        max_workers: int | None = None,
+    ) -> None:
+        """
+        Inizializza un'istanza della classe StructureDistanceMatrix.
+
+        Args:
+            THG (TemperatureFoldingHypergraph): L'ipergrafo temporale dei folding dell'RNA.
+            start_temperature (Temperature): La temperatura iniziale.
+            end_temperature (Temperature): La temperatura finale.
+            step (Temperature): Il passo tra le temperature, anche non intero. Default è 1.
+            adaptive (bool): Se True, computa solo i folding necessari a individuare i punti di
+                cambiamento (vedi TemperatureFoldingHypergraph.insert_temperature_range_adaptive)
+                e assegna alle altre temperature il folding presunto. Default è False.
+            shared_memory (bool): Se True, i folding mancanti vengono computati in un pool di
+                processi con SharedFoldSweep e le loro tabelle delle coppie ed etichette vengono
+                lette dalla memoria condivisa invece di essere ricostruite dai dizionari di
+                incidenza. Non viene usato con adaptive. Default è False.
+            max_workers (int | None): Il numero massimo di processi se shared_memory è True.
+                Default è il numero di CPU.
+        """
+        self.temperatures: list[Temperature] = temperature_range(
+            start_temperature, end_temperature, step
+        )
+        self.change_points: list[Temperature] | None = None
+        """I punti di cambiamento del folding, se la matrice è stata costruita in modo adattivo."""
+        sweep = None
+        if adaptive:
+            self.change_points = THG.insert_temperature_range_adaptive(
+                start_temperature, end_temperature, step
+            )
+        elif shared_memory:
+            sweep = self.__fold_shared(THG, max_workers)
+        else:
+            THG.insert_temperature_range(start_temperature, end_temperature, step)
+        length = len(THG.producer.sequence)
+        self.names: dict[str, int] = {}
+        pair_tables = []
+        labels = []
+        keys: dict[int, bytes] = {}
+        indexes: dict[bytes, int] = {}
+        structure_index = []
+        with sweep if sweep is not None else nullcontext():
+            rows = (
+                {}
+                if sweep is None
+                else {t: row for row, t in enumerate(sweep.temperatures)}
+            )
+            for temperature, HG in self.__hypergraphs(THG, adaptive):
+                # ipergrafi identici (stesso oggetto) non vengono nemmeno riconvertiti
+                key = keys.get(id(HG))
+                if key is None:
+                    row = rows.get(temperature)
+                    if row is None:
+                        pair_table = pair_table_from_incidence_dict(
+                            HG.incidence_dict, length
+                        )
+                        label = element_labels_from_incidence_dict(
+                            HG.incidence_dict, length, self.names
+                        )
+                    else:
+                        pair_table, label = self.__shared_row(sweep, row)
+                    key = pair_table.tobytes() + label.tobytes()
+                    keys[id(HG)] = key
+                    if key not in indexes:
+                        indexes[key] = len(pair_tables)
+                        pair_tables.append(pair_table)
+                        labels.append(label)
+                structure_index.append(indexes[key])
+        self.structure_index: np.ndarray = np.array(structure_index, dtype=np.int32)
+        """L'indice della struttura distinta di ogni temperatura."""
+        self.pair_tables: np.ndarray = np.array(pair_tables, dtype=np.int32)
+        """Matrice strutture distinte × nucleotidi delle tabelle delle coppie."""
+        self.labels: np.ndarray = np.array(labels, dtype=np.int32)
+        """Matrice strutture distinte × nucleotidi dei codici delle strutture secondarie."""
+        self.__pair_distances: np.ndarray | None = None
+        self.__label_distances: np.ndarray | None = None
+
+    def __fold_shared(
+        self, THG: TemperatureFoldingHypergraph, max_workers: int | None
+    ) -> SharedFoldSweep | None:
+        """
+        Computa con uno sweep in memoria condivisa i folding della griglia non ancora analizzati
+        e li memorizza nell'ipergrafo temporale.
+
+        Args:
+            THG (TemperatureFoldingHypergraph): L'ipergrafo temporale dei folding dell'RNA.
+            max_workers (int | None): Il numero massimo di processi.
+
+        Returns:
+            SharedFoldSweep | None: Lo sweep, da chiudere dopo averne letto le matrici, None se
+            tutti i folding erano già stati computati.
+        """
+        missing = [t for t in self.temperatures if not THG.is_analyzed(t)]
+        if len(missing) == 0:
+            return None
+        sweep = SharedFoldSweep(THG.producer, missing)
+        try:
+            workers = max_workers or os.cpu_count() or 1
+            with ProcessPoolExecutor(max_workers=max_workers) as executor:
+                sweep.run(executor, chunksize=max(1, len(missing) // (4 * workers)))
+            for row, temperature in enumerate(sweep.temperatures):
+                THG.add_folding(temperature, sweep.incidence_dict(row))
+        except BaseException:
+            sweep.close()
+            raise
+        return sweep
+
+    def __shared_row(
+        self, sweep: SharedFoldSweep, row: int
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Restituisce la tabella delle coppie e i codici delle strutture secondarie di una riga
+        dello sweep. Le etichette dello sweep sono gli id degli iperarchi nel folding della riga,
+        che vengono convertiti nei codici di names con un solo accesso indicizzato.
+
+        Args:
+            sweep (SharedFoldSweep): Lo sweep.
+            row (int): L'indice della temperatura nello sweep.
+
+        Returns:
+            tuple[np.ndarray, np.ndarray]: La tabella delle coppie e i codici, copiati dalla memoria condivisa.
+        """
+        # stesso ordine di assegnazione dei codici di element_labels_from_incidence_dict
+        codes = np.array(
+            [
+                (
+                    NO_ELEMENT
+                    if key.startswith("l") or key.startswith("db")
+                    else self.names.setdefault(key, len(self.names))
+                )
+                for key in sweep.incidence_dict(row)
+            ],
+            dtype=np.int32,
+        )
+        edges = sweep.element_labels[row]
+        label = np.where(edges >= 0, codes[np.maximum(edges, 0)], NO_ELEMENT)
+        return sweep.pair_tables[row].copy(), label.astype(np.int32)
+
+    def __hypergraphs(self, THG: TemperatureFoldingHypergraph, adaptive: bool):
+        """
+        Restituisce l'ipergrafo di ogni temperatura, usando gli intervalli dell'ipergrafo
+        temporale se disponibili per non cercare ogni temperatura.
+
+        Args:
+            THG (TemperatureFoldingHypergraph): L'ipergrafo temporale dei folding dell'RNA.
+            adaptive (bool): Se True, le temperature non analizzate hanno il folding della
+                temperatura analizzata precedente, come in TemperatureFoldingHypergraph.get_interpolated_hypergraph.
+
+        Returns:
+            Un iteratore sulle coppie (temperatura, ipergrafo).
+        """
+        if adaptive:
+            analyzed = THG.analyzed_temperatures()
+            for temperature in self.temperatures:
+                source = analyzed[bisect.bisect_right(analyzed, temperature) - 1]
+                yield temperature, THG.get_hypergraph(source)
+            return
+        get_intervals = getattr(THG.temperature_HG, "get_intervals", None)
+        if get_intervals is None:
+            for temperature in self.temperatures:
+                yield temperature, THG.get_hypergraph(temperature)
+            return
+        # gli intervalli sono disgiunti e possono avere estremi non interi: ogni temperatura
+        # della griglia viene cercata per bisezione tra gli inizi ordinati
+        intervals = sorted(get_intervals(), key=lambda interval: interval[0][0])
+        starts = [low for (low, _), _ in intervals]
+        for temperature in self.temperatures:
+            yield temperature, intervals[bisect.bisect_right(starts, temperature) - 1][
+                1
+            ]
+
+    @property
+    def distinct_count(self) -> int:
+        """Il numero di strutture distinte nell'intervallo."""
+        return len(self.pair_tables)
+
+    @profiled("structure_distance.pair_distances")
+    def distinct_pair_distances(self) -> np.ndarray:
+        """
+        Restituisce la matrice delle distanze tra coppie di basi delle strutture distinte.
+
+        Returns:
+            np.ndarray: La matrice strutture distinte × strutture distinte.
+        """
+        if self.__pair_distances is None:
+            self.__pair_distances = pair_distance_matrix(self.pair_tables)
+        return self.__pair_distances
+
+    @profiled("structure_distance.label_distances")
+    def distinct_label_distances(self) -> np.ndarray:
+        """
+        Restituisce la matrice delle distanze di Hamming tra le etichette di struttura delle strutture distinte.
+
+        Returns:
+            np.ndarray: La matrice strutture distinte × strutture distinte.
+        """
+        if self.__label_distances is None:
+            self.__label_distances = hamming_distance_matrix(self.labels)
+        return self.__label_distances
+
+    def pair_distances(self) -> np.ndarray:
+        """
+        Restituisce la matrice T×T delle distanze tra coppie di basi dei folding di ogni temperatura.
+
+        Returns:
+            np.ndarray: La matrice temperature × temperature.
+        """
+        return self.distinct_pair_distances()[
+            np.ix_(self.structure_index, self.structure_index)
+        ]
+
+    def label_distances(self) -> np.ndarray:
+        """
+        Restituisce la matrice T×T delle distanze di Hamming tra le etichette di struttura dei folding di ogni temperatura.
+
+        Returns:
+            np.ndarray: La matrice temperature × temperature.
+        """
+        return self.distinct_label_distances()[
+            np.ix_(self.structure_index, self.structure_index)
+        ]
+
+    def cluster_structures(self, threshold: int, metric: str = "pairs") -> np.ndarray:
+        """
+        Raggruppa le strutture distinte con un clustering single-linkage: due strutture sono
+        nello stesso cluster se sono collegate da una catena di strutture a distanza non
+        superiore alla soglia.
+
+        Args:
+            threshold (int): La distanza massima tra due strutture collegate.
+            metric (str): La distanza da usare, "pairs" o "labels".
+
+        Returns:
+            np.ndarray: Il cluster di ogni struttura distinta, numerati in ordine di temperatura.
+        """
+        if metric == "pairs":
+            distances = self.distinct_pair_distances()
+        elif metric == "labels":
+            distances = self.distinct_label_distances()
+        else:
+            raise ValueError(f"Distanza non supportata: {metric}")
+        parent = list(range(self.distinct_count))
+
+        def find(i: int) -> int:
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        for i, j in zip(*np.nonzero(np.triu(distances <= threshold, k=1))):
+            root_i, root_j = find(int(i)), find(int(j))
+            if root_i != root_j:
+                parent[max(root_i, root_j)] = min(root_i, root_j)
+        # le strutture distinte sono indicizzate in ordine di prima comparsa
+        roots = [find(i) for i in range(self.distinct_count)]
+        numbering: dict[int, int] = {}
+        return np.array(
+            [numbering.setdefault(root, len(numbering)) for root in roots],
+            dtype=np.int32,
+        )
+
+    def regimes(
+        self, threshold: int, metric: str = "pairs"
+    ) -> list[tuple[int, int, int]]:
+        """
+        Divide l'intervallo di temperature in regimi strutturali, ovvero sotto-intervalli
+        consecutivi i cui folding appartengono allo stesso cluster.
+
+        Args:
+            threshold (int): La distanza massima tra due strutture dello stesso cluster.
+            metric (str): La distanza da usare, "pairs" o "labels".
+
+        Returns:
+            list[tuple[int, int, int]]: Le triple (temperatura iniziale, temperatura finale, cluster).
+        """
+        clusters = self.cluster_structures(threshold, metric)[self.structure_index]
+        boundaries = np.flatnonzero(np.diff(clusters)) + 1
+        starts = np.concatenate(([0], boundaries))
+        ends = np.concatenate((boundaries - 1, [len(clusters) - 1]))
+        return [
+            (self.temperatures[start], self.temperatures[end], int(clusters[start]))
+            for start, end in zip(starts, ends)
+        ]
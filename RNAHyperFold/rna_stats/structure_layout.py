@@ -0,0 +1,215 @@
+from math import pi
+
+import numpy as np
+
+from RNAHyperFold.hypergraph_folding.pair_table import UNPAIRED
+
+LAYOUTS = ("radial", "arc", "circular")
+
+
+def radial_layout(pair_table: np.ndarray, radius: float = 15.0) -> np.ndarray:
+    """
+    Calcola le coordinate dei nucleotidi disponendo ogni loop come un poligono regolare
+    e ogni stem come una scala, come nel layout "simple" di ViennaRNA (Bruccoleri-Heinrich).
+    Il tempo di calcolo è lineare nel numero di nucleotidi e i loop sono visitati
+    senza ricorsione, quindi anche strutture molto annidate sono supportate.
+
+    Args:
+        pair_table (np.ndarray): La tabella delle coppie.
+        radius (float): La distanza tra due nucleotidi consecutivi.
+
+    Returns:
+        np.ndarray: Una matrice n×2 con le coordinate dei nucleotidi.
+    """
+    n = len(pair_table)
+    if n == 0:
+        return np.zeros((0, 2))
+    # tabella delle coppie indicizzata da 1 come in ViennaRNA, 0 indica un nucleotide non appaiato
+    pt = np.zeros(n + 2, dtype=np.int64)
+    pt[1 : n + 1] = np.where(pair_table != UNPAIRED, pair_table + 1, 0)
+    pt = pt.tolist()
+    angle = np.zeros(n + 5)
+
+    # ogni loop è identificato dalle posizioni successive all'ultima coppia dello stem che lo chiude;
+    # gli angoli vengono solo sommati, quindi l'ordine di visita dei loop è irrilevante
+    loops = [(0, n)]
+    while len(loops) > 0:
+        i, j = loops.pop()
+        count = 2
+        remember = []
+        i_old = i - 1
+        j += 1
+        while i != j:
+            partner = pt[i]
+            if partner == 0 or i == 0:
+                i += 1
+                count += 1
+                continue
+            count += 2
+            k, l = i, partner
+            remember.extend((k, l))
+            i = partner + 1
+            start_k, start_l = k, l
+            ladder = 0
+            while True:
+                k += 1
+                l -= 1
+                ladder += 1
+                if pt[k] != l:
+                    break
+            fill = ladder - 2
+            if ladder >= 2:
+                angle[start_k + 1 + fill] += pi / 2
+                angle[start_l - 1 - fill] += pi / 2
+                angle[start_k] += pi / 2
+                angle[start_l] += pi / 2
+                if ladder > 2:
+                    angle[start_k + 1 : start_k + fill + 1] = pi
+                    angle[start_l - fill : start_l] = pi
+            loops.append((k, l))
+
+        polygon = pi * (count - 2) / count
+        remember.append(j)
+        begin = max(i_old, 0)
+        v = 0
+        while v < len(remember):
+            angle[begin : remember[v] + 1] += polygon
+            v += 1
+            if v >= len(remember):
+                break
+            begin = remember[v]
+            v += 1
+
+    alpha = np.concatenate(([0.0], np.cumsum(pi - angle[2 : n + 1])))[: n - 1]
+    coordinates = np.zeros((n, 2))
+    coordinates[1:, 0] = np.cumsum(radius * np.cos(alpha))
+    coordinates[1:, 1] = np.cumsum(radius * np.sin(alpha))
+    return coordinates
+
+
+def arc_layout(pair_table: np.ndarray) -> np.ndarray:
+    """
+    Dispone i nucleotidi su una retta, nell'ordine della sequenza (diagramma ad archi).
+
+    Args:
+        pair_table (np.ndarray): La tabella delle coppie.
+
+    Returns:
+        np.ndarray: Una matrice n×2 con le coordinate dei nucleotidi.
+    """
+    coordinates = np.zeros((len(pair_table), 2))
+    coordinates[:, 0] = np.arange(len(pair_table))
+    return coordinates
+
+
+def circular_layout(pair_table: np.ndarray) -> np.ndarray:
+    """
+    Dispone i nucleotidi su una circonferenza, nell'ordine della sequenza.
+
+    Args:
+        pair_table (np.ndarray): La tabella delle coppie.
+
+    Returns:
+        np.ndarray: Una matrice n×2 con le coordinate dei nucleotidi.
+    """
+    n = len(pair_table)
+    theta = np.pi / 2 - 2 * np.pi * np.arange(n) / max(n, 1)
+    return np.column_stack((np.cos(theta), np.sin(theta))) * max(n, 1) / (2 * np.pi)
+
+
+def compute_layout(pair_table: np.ndarray, layout: str = "radial") -> np.ndarray:
+    """
+    Calcola le coordinate dei nucleotidi con il layout richiesto.
+
+    Args:
+        pair_table (np.ndarray): La tabella delle coppie.
+        layout (str): Il layout, uno tra "radial", "arc" e "circular".
+
+    Returns:
+        np.ndarray: Una matrice n×2 con le coordinate dei nucleotidi.
+    """
+    if layout == "radial":
+        return radial_layout(pair_table)
+    if layout == "arc":
+        return arc_layout(pair_table)
+    if layout == "circular":
+        return circular_layout(pair_table)
+    raise ValueError(f"Layout non supportato: {layout}, usare uno tra {LAYOUTS}")
+
+
+def _runs(
+    positions: list[int], pair_table: np.ndarray | None = None
+) -> list[list[int]]:
+    """
+    Divide una lista di posizioni in sequenze di posizioni consecutive.
+
+    Args:
+        positions (list[int]): Le posizioni.
+        pair_table (np.ndarray | None): Se indicata, le sequenze vengono divise anche dove
+            due posizioni consecutive non formano coppie impilate.
+
+    Returns:
+        list[list[int]]: Le sequenze di posizioni consecutive.
+    """
+    runs = []
+    for position in sorted(positions):
+        if (
+            len(runs) > 0
+            and runs[-1][-1] + 1 == position
+            and (
+                pair_table is None
+                or pair_table[position] == pair_table[position - 1] - 1
+            )
+        ):
+            runs[-1].append(position)
+        else:
+            runs.append([position])
+    return runs
+
+
+def element_spans(structures: dict) -> list[tuple[str, int, int]]:
+    """
+    Restituisce gli intervalli di posizioni consecutive occupati da ogni struttura secondaria.
+
+    Args:
+        structures (dict): Il dizionario delle strutture secondarie con nodi interi.
+
+    Returns:
+        list[tuple[str, int, int]]: Le triple (tipo di struttura, prima posizione, ultima posizione).
+    """
+    return [
+        (name[0], run[0], run[-1])
+        for name, positions in structures.items()
+        for run in _runs(positions)
+    ]
+
+
+def element_regions(
+    structures: dict, pair_table: np.ndarray
+) -> list[tuple[str, list[int]]]:
+    """
+    Restituisce, per ogni struttura secondaria, i poligoni che ne delimitano la regione.
+    Gli stem sono chiusi dai nucleotidi appaiati, i loop dai nucleotidi appaiati che li delimitano.
+
+    Args:
+        structures (dict): Il dizionario delle strutture secondarie con nodi interi.
+        pair_table (np.ndarray): La tabella delle coppie.
+
+    Returns:
+        list[tuple[str, list[int]]]: Le coppie (tipo di struttura, vertici del poligono).
+    """
+    n = len(pair_table)
+    regions = []
+    for name, positions in structures.items():
+        if name[0] == "s":
+            for run in _runs(positions, pair_table):
+                # ogni elica è disegnata una sola volta, a partire dal filamento 5'
+                if pair_table[run[0]] < run[0]:
+                    continue
+                partners = [int(pair_table[p]) for p in reversed(run)]
+                regions.append((name[0], run + partners))
+            continue
+        for run in _runs(positions):
+            flanks = [p for p in (run[0] - 1, run[-1] + 1) if 0 <= p < n]
+            regions.append((name[0], sorted(run + flanks)))
+    return regions
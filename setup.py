@@ -10,6 +10,7 @@ setup(
     description="A library that provides a number of classes and methods designed to facilitate the analysis and visualization of changes in RNA folding at different temperatures using hypergraph-based approaches.",
     author="Nicol Buratti",
     install_requires=requirements,
+    entry_points={"console_scripts": ["rnahyperfold=RNAHyperFold.cli:main"]},
     setup_requires=[],
     tests_require=[],
     test_suite="",
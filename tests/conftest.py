@@ -0,0 +1,25 @@
+import pytest
+
+from RNAHyperFold.hypergraph_folding.rna_folder import RNAFolder
+from RNAHyperFold.hypergraph_folding.temperature_hypergraph import (
+    SearchOptimizedFoldingHypergraph,
+    TemperatureFoldingHypergraph,
+)
+from RNAHyperFold.incidence_producers.vienna_incidence_producer import (
+    ViennaIncidenceProducer,
+)
+
+# il folding cambia a 64 e a 96 gradi
+SEQUENCE = "GGGAAACCCAGGCUUCGGCCUGGGAAUUCCCAUAUGCGCAUAGGCAUCG"
+
+
+@pytest.fixture
+def producer() -> ViennaIncidenceProducer:
+    return ViennaIncidenceProducer(RNAFolder(SEQUENCE))
+
+
+@pytest.fixture
+def THG(producer) -> TemperatureFoldingHypergraph:
+    return TemperatureFoldingHypergraph(
+        producer, SearchOptimizedFoldingHypergraph(), threads=True
+    )
@@ -0,0 +1,33 @@
+import json
+
+from RNAHyperFold.cli import main
+
+from conftest import SEQUENCE
+
+
+def _fasta(tmp_path) -> str:
+    path = tmp_path / "input.fasta"
+    path.write_text(f">seq\n{SEQUENCE}\n")
+    return str(path)
+
+
+def test_adaptive_writes_change_points_only(tmp_path):
+    output = tmp_path / "out"
+    assert main([_fasta(tmp_path), "-o", str(output), "--adaptive"]) == 0
+    summary = json.loads((output / "seq" / "summary.json").read_text())
+    assert summary["change_points"] == [64, 96]
+    assert summary["analyses"] == []
+    assert not (output / "seq" / "sensibility.json").exists()
+
+
+def test_adaptive_rejects_analyses(tmp_path):
+    output = tmp_path / "out"
+    argv = [_fasta(tmp_path), "-o", str(output), "--adaptive"]
+    assert main(argv + ["--analyses", "sensibility"]) == 2
+
+
+def test_default_analysis(tmp_path):
+    output = tmp_path / "out"
+    argv = [_fasta(tmp_path), "-o", str(output), "--start", "30", "--end", "40"]
+    assert main(argv + ["--workers", "1"]) == 0
+    assert (output / "seq" / "sensibility.json").exists()
@@ -0,0 +1,30 @@
+import numpy as np
+
+from RNAHyperFold.rna_stats.comparative_analysis import ComparativeFoldingAnalysis
+from RNAHyperFold.rna_stats.rna_analyst import TemperatureFoldingStats
+
+from conftest import SEQUENCE
+
+SEQUENCES = {
+    "reference": SEQUENCE,
+    # una delezione, un'inserzione e una sequenza identica al riferimento
+    "deletion": SEQUENCE[:10] + SEQUENCE[14:],
+    "insertion": SEQUENCE[:30] + "AAAA" + SEQUENCE[30:],
+    "copy": SEQUENCE,
+}
+
+
+def test_column_sensibility_matches_per_sequence_mapping():
+    analysis = ComparativeFoldingAnalysis(SEQUENCES, max_workers=2)
+    result = analysis.column_sensibility(40, 100, 5)
+    assert result.shape == (len(SEQUENCES), len(SEQUENCE))
+    for row, name in enumerate(analysis.alignment.names):
+        counts = TemperatureFoldingStats(
+            analysis.folds[name]
+        ).get_nucleotide_sensibility_to_changes(40, 100, step=5)
+        sensibility = np.zeros(len(SEQUENCES[name]))
+        for node, count in counts.items():
+            sensibility[node] = count
+        expected = analysis.alignment.to_columns(name, sensibility)
+        np.testing.assert_array_equal(result[row], expected)
+    assert np.isnan(result[analysis.alignment.row("deletion")]).sum() == 4
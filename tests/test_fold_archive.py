@@ -0,0 +1,56 @@
+import pytest
+
+from RNAHyperFold.hypergraph_folding.fold_archive import (
+    FoldArchive,
+    load_folding_hypergraph,
+    save_folding_hypergraph,
+)
+from RNAHyperFold.hypergraph_folding.pair_table import pair_table_from_incidence_dict
+from RNAHyperFold.hypergraph_folding.temperature_hypergraph import (
+    MemoryOptimizedFoldingHypergraph,
+)
+
+from conftest import SEQUENCE
+
+
+@pytest.fixture
+def archive_path(THG, tmp_path):
+    THG.insert_temperature_range(40, 100, 2.5)
+    path = tmp_path / "folding.rhf"
+    save_folding_hypergraph(THG, str(path), compression="zlib")
+    return str(path)
+
+
+def test_round_trip(THG, archive_path):
+    loaded = load_folding_hypergraph(archive_path, MemoryOptimizedFoldingHypergraph())
+    assert loaded.analyzed_temperatures() == THG.analyzed_temperatures()
+    assert loaded.producer.sequence == SEQUENCE
+    for temperature in THG.analyzed_temperatures():
+        assert (
+            loaded.get_hypergraph(temperature).incidence_dict
+            == THG.get_hypergraph(temperature).incidence_dict
+        )
+
+
+def test_single_temperature(THG, archive_path):
+    with FoldArchive(archive_path) as archive:
+        assert archive.sequence == SEQUENCE
+        assert archive.compression == "zlib"
+        assert archive.temperatures == THG.analyzed_temperatures()
+        # una struttura per ogni intervallo tra i punti di cambiamento 64 e 96
+        assert archive.structure_count == 3
+        incidence_dict = THG.get_hypergraph(65).incidence_dict
+        assert archive.incidence_dict(65) == incidence_dict
+        assert (
+            archive.pair_table(65).tolist()
+            == pair_table_from_incidence_dict(incidence_dict, len(SEQUENCE)).tolist()
+        )
+        assert archive.incidence_dict(66) is None
+        assert archive.incidence_dict(30) is None
+
+
+def test_not_an_archive(tmp_path):
+    path = tmp_path / "folding.rhf"
+    path.write_bytes(b"not an archive" * 4)
+    with pytest.raises(ValueError):
+        FoldArchive(str(path))
@@ -0,0 +1,26 @@
+import numpy as np
+
+from RNAHyperFold.rna_stats.melting_profile import MeltingProfile
+from RNAHyperFold.rna_stats.structure_distance import StructureDistanceMatrix
+
+
+def test_adaptive_matrix_matches_full_grid(THG, producer):
+    adaptive = StructureDistanceMatrix(THG, 0, 100, 1, adaptive=True)
+    assert adaptive.change_points == [64, 96]
+    assert len(THG.analyzed_temperatures()) < 30
+    expected = [producer.folder.get_dot_bracket(t) for t in adaptive.temperatures]
+    distinct = {}
+    assert adaptive.structure_index.tolist() == [
+        distinct.setdefault(db, len(distinct)) for db in expected
+    ]
+
+
+def test_interpolated_mode_folds_only_bisection_points(THG):
+    result = MeltingProfile(THG, max_workers=1).compute(0, 100, mode="interpolated")
+    assert len(THG.analyzed_temperatures()) < 30
+    assert len(result.temperatures) == 101
+    assert result.paired.shape == (101, len(THG.producer.sequence))
+    ensemble = MeltingProfile(THG, max_workers=1).compute(0, 100, mode="ensemble")
+    # l'ensemble è calcolato esattamente agli estremi e ai due lati dei cambiamenti
+    sampled = [0, 63, 64, 95, 96, 100]
+    assert np.allclose(result.paired[sampled], ensemble.paired[sampled])
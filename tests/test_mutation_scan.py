@@ -0,0 +1,23 @@
+from RNAHyperFold.hypergraph_folding.pair_table import (
+    base_pair_distance,
+    pair_table_from_dotbracket,
+)
+from RNAHyperFold.hypergraph_folding.rna_folder import RNAFolder
+from RNAHyperFold.rna_stats.mutation_scan import MutationScan
+
+from conftest import SEQUENCE
+
+
+def test_default_scan_refolds_every_variant():
+    result = MutationScan(SEQUENCE, max_workers=2).run(30, 50, 10, positions=[3, 20])
+    assert not result.local.any()
+    folder = RNAFolder(SEQUENCE)
+    for i, (position, nucleotide) in enumerate(
+        zip(result.positions, result.nucleotides)
+    ):
+        mutant = RNAFolder(SEQUENCE[:position] + nucleotide + SEQUENCE[position + 1 :])
+        for t, temperature in enumerate(result.temperatures):
+            assert result.distances[i, t] == base_pair_distance(
+                pair_table_from_dotbracket(folder.get_dot_bracket(temperature)),
+                pair_table_from_dotbracket(mutant.get_dot_bracket(temperature)),
+            )
@@ -0,0 +1,68 @@
+import numpy as np
+
+from RNAHyperFold.rna_stats.rna_analyst import TemperatureFoldingStats
+from RNAHyperFold.rna_stats.sensibility_index import SensibilityIndex
+
+from conftest import SEQUENCE
+
+
+def _counts(counts: dict, start: int, end: int) -> np.ndarray:
+    result = np.zeros(len(SEQUENCE), dtype=np.int64)
+    for node, count in counts.items():
+        result[node] = count
+    return result[start : end + 1]
+
+
+def test_structure_changes_match_stats(THG):
+    stats = TemperatureFoldingStats(THG)
+    index = SensibilityIndex(THG, list(range(50, 101, 2)))
+    expected = stats.get_nucleotide_sensibility_to_changes(50, 100, step=2)
+    last = len(SEQUENCE) - 1
+    assert index.structure_changes(0, last, 50, 100).tolist() == (
+        _counts(expected, 0, last).tolist()
+    )
+    assert index.structure_change_total(10, 40, 50, 100) == int(
+        _counts(expected, 10, 40).sum()
+    )
+
+
+def test_connection_changes_match_stats(THG):
+    stats = TemperatureFoldingStats(THG)
+    index = SensibilityIndex(THG, list(range(50, 101, 2)))
+    expected = stats.get_nucleotide_sensibility_to_change_connection(60, 100, step=2)
+    last = len(SEQUENCE) - 1
+    assert index.connection_changes(0, last, 60, 100).tolist() == (
+        _counts(expected, 0, last).tolist()
+    )
+    assert index.connection_change_total(5, 30, 60, 100) == int(
+        _counts(expected, 5, 30).sum()
+    )
+
+
+def test_added_temperatures_match_new_index(THG):
+    index = SensibilityIndex(THG, list(range(50, 76, 5)))
+    index.add_temperatures(list(range(80, 101, 5)))
+    fresh = SensibilityIndex(THG, list(range(50, 101, 5)))
+    last = len(SEQUENCE) - 1
+    assert index.temperatures == fresh.temperatures
+    assert index.structure_changes(0, last, 50, 100).tolist() == (
+        fresh.structure_changes(0, last, 50, 100).tolist()
+    )
+    assert index.connection_changes(0, last, 55, 100).tolist() == (
+        fresh.connection_changes(0, last, 55, 100).tolist()
+    )
+
+
+def test_sensibility_index_per_grid(THG):
+    stats = TemperatureFoldingStats(THG)
+    even = stats.sensibility_index(50, 100, 2)
+    odd = stats.sensibility_index(51, 99, 2)
+    assert even is not odd
+    assert stats.sensibility_index(50, 80, 2) is even
+    assert stats.get_region_sensibility(0, len(SEQUENCE) - 1, 51, 99, 2) == {
+        node: count
+        for node, count in stats.get_nucleotide_sensibility_to_changes(
+            51, 99, step=2
+        ).items()
+        if count > 0
+    }
@@ -0,0 +1,57 @@
+import pytest
+
+from RNAHyperFold.hypergraph_folding.temperature_grid import temperature_range
+from RNAHyperFold.hypergraph_folding.temperature_hypergraph import (
+    BasicTemporalHypergraph,
+    MemoryOptimizedFoldingHypergraph,
+    SearchOptimizedFoldingHypergraph,
+    TemperatureFoldingHypergraph,
+)
+from RNAHyperFold.rna_stats.structure_distance import StructureDistanceMatrix
+
+
+@pytest.mark.parametrize(
+    "backend",
+    [
+        BasicTemporalHypergraph,
+        MemoryOptimizedFoldingHypergraph,
+        SearchOptimizedFoldingHypergraph,
+    ],
+)
+def test_structure_index_matches_folds(backend, producer):
+    THG = TemperatureFoldingHypergraph(producer, backend(), threads=True)
+    # temperature analizzate fuori ordine e fuori griglia, come dopo altre analisi
+    THG.insert_temperatures([100, 65.5, 20])
+    matrix = StructureDistanceMatrix(THG, 40, 100, 2.5)
+    dotbrackets = [
+        producer.folder.get_dot_bracket(t) for t in temperature_range(40, 100, 2.5)
+    ]
+    distinct = {}
+    expected = [distinct.setdefault(db, len(distinct)) for db in dotbrackets]
+    assert matrix.structure_index.tolist() == expected
+    assert matrix.distinct_count == len(distinct)
+
+
+@pytest.mark.parametrize(
+    "backend", [BasicTemporalHypergraph, MemoryOptimizedFoldingHypergraph]
+)
+def test_shared_memory_matches_incidence_dicts(backend, producer):
+    shared_THG = TemperatureFoldingHypergraph(producer, backend(), threads=True)
+    shared_THG.insert_temperatures([50, 70])
+    shared = StructureDistanceMatrix(
+        shared_THG, 40, 100, 2.5, shared_memory=True, max_workers=2
+    )
+    THG = TemperatureFoldingHypergraph(producer, backend(), threads=True)
+    expected = StructureDistanceMatrix(THG, 40, 100, 2.5)
+    assert shared_THG.analyzed_temperatures() == sorted(
+        set(THG.analyzed_temperatures()) | {50, 70}
+    )
+    assert shared.structure_index.tolist() == expected.structure_index.tolist()
+    assert shared.pair_tables.tolist() == expected.pair_tables.tolist()
+    # i codici dipendono dall'ordine degli iperarchi, i nomi delle strutture no
+    assert _element_names(shared) == _element_names(expected)
+
+
+def _element_names(matrix: StructureDistanceMatrix) -> list[list]:
+    names = {code: name for name, code in matrix.names.items()}
+    return [[names.get(code) for code in row] for row in matrix.labels.tolist()]
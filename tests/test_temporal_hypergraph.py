@@ -0,0 +1,84 @@
+import numpy as np
+import pytest
+
+from RNAHyperFold.hypergraph_folding.temperature_grid import temperature_range
+from RNAHyperFold.hypergraph_folding.temperature_hypergraph import (
+    BasicTemporalHypergraph,
+    MemoryOptimizedFoldingHypergraph,
+    SearchOptimizedFoldingHypergraph,
+)
+from RNAHyperFold.profiling.differential import reference_incidence_dict
+
+BACKENDS = [
+    BasicTemporalHypergraph,
+    MemoryOptimizedFoldingHypergraph,
+    SearchOptimizedFoldingHypergraph,
+]
+
+STRUCTURES = ["((((....))))..", "..((((....))))", ".............."]
+
+
+@pytest.fixture(scope="module")
+def folds() -> list[dict]:
+    return [reference_incidence_dict(structure) for structure in STRUCTURES]
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_folds_inserted_in_order(backend, folds):
+    store = backend()
+    times = temperature_range(0, 10, 0.5)
+    sequence = [0] * 8 + [1] * 6 + [0] * 7
+    for time, fold in zip(times, sequence):
+        store.add_incidence_dict(folds[fold], time)
+    for time, fold in zip(times, sequence):
+        assert store.time_hypergraph_exists(time)
+        assert store.get_time_hypergraph(time).incidence_dict == folds[fold]
+    assert not store.time_hypergraph_exists(10.5)
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_folds_inserted_out_of_order(backend, folds):
+    store = backend()
+    times = temperature_range(0, 20)
+    sequence = [0] * 7 + [2] * 5 + [1] * 4 + [0] * 5
+    order = np.random.default_rng(0).permutation(len(times))
+    for i in order:
+        store.add_incidence_dict(folds[sequence[i]], times[i])
+    assert [store.get_time_hypergraph(t).incidence_dict for t in times] == [
+        folds[fold] for fold in sequence
+    ]
+
+
+@pytest.mark.parametrize(
+    "backend", [MemoryOptimizedFoldingHypergraph, SearchOptimizedFoldingHypergraph]
+)
+def test_fold_inside_interval_splits_it(backend, folds):
+    store = backend()
+    for time in (0, 10):
+        store.add_incidence_dict(folds[0], time)
+    store.add_incidence_dict(folds[1], 5)
+    assert store.get_time_hypergraph(0).incidence_dict == folds[0]
+    assert store.get_time_hypergraph(5).incidence_dict == folds[1]
+    assert store.get_time_hypergraph(10).incidence_dict == folds[0]
+    intervals = sorted(temps for temps, _ in store.get_intervals())
+    for (_, end), (start, _) in zip(intervals, intervals[1:]):
+        assert end < start
+
+
+@pytest.mark.parametrize(
+    "backend", [MemoryOptimizedFoldingHypergraph, SearchOptimizedFoldingHypergraph]
+)
+def test_equal_folds_share_hypergraph(backend, folds):
+    store = backend()
+    for time in temperature_range(0, 5):
+        store.add_incidence_dict(dict(folds[2]), time)
+    assert len(store.get_intervals()) == 1
+    assert store.get_time_hypergraph(0) is store.get_time_hypergraph(5)
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_edge_table_matches_fold(backend, folds):
+    store = backend()
+    store.add_incidence_dict(folds[0], 1)
+    table = store.get_edge_table(1)
+    assert table.to_incidence_dict() == folds[0]
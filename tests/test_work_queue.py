@@ -0,0 +1,134 @@
+import multiprocessing
+import time
+
+import pytest
+
+from RNAHyperFold.hypergraph_folding.folding_conditions import FoldingConditions
+from RNAHyperFold.hypergraph_folding.work_queue import WorkQueue, run_worker
+
+from conftest import SEQUENCE
+
+
+@pytest.fixture
+def queue(tmp_path):
+    with WorkQueue(str(tmp_path / "queue.db"), max_attempts=2) as queue:
+        yield queue
+
+
+def _expire(queue: WorkQueue) -> None:
+    # i lease presi da qui in poi scadono subito
+    queue.lease_seconds = -1
+
+
+def test_submit_ignores_duplicates(queue):
+    assert queue.submit_sweep("a", SEQUENCE, 30, 40, 5) == 3
+    assert queue.submit_sweep("b", SEQUENCE, 35, 45, 5) == 1
+    assert queue.progress()["pending"] == 4
+
+
+def test_lease_and_complete(queue, producer):
+    queue.submit_sweep("a", SEQUENCE, 30, 40, 5)
+    tasks = queue.lease("w1", count=2)
+    assert [task.conditions.temperature for task in tasks] == [30, 35]
+    assert all(task.attempts == 1 for task in tasks)
+    assert [task.conditions.temperature for task in queue.lease("w2", count=5)] == [40]
+    assert queue.lease("w3") == []
+    incidence_dict = producer.get_temperature_incidence_dict(30)
+    assert queue.complete(tasks[0].id, "w1", incidence_dict)
+    assert not queue.complete(tasks[0].id, "w2", {})
+    assert queue.results(SEQUENCE) == {30: incidence_dict}
+    assert queue.progress() == {"pending": 0, "leased": 2, "done": 1, "failed": 0}
+
+
+def test_expired_lease_is_reassigned(queue):
+    queue.submit(
+        "a", SEQUENCE, [FoldingConditions(temperature=37, salt=0.5, dangles=0)]
+    )
+    _expire(queue)
+    (task,) = queue.lease("w1")
+    (retried,) = queue.lease("w2")
+    assert retried.id == task.id
+    assert retried.attempts == 2
+    assert retried.conditions.key() == task.conditions.key()
+    # con max_attempts raggiunto il lease scaduto fa fallire il task
+    assert queue.lease("w3") == []
+    assert queue.progress()["failed"] == 1
+    assert queue.failures()[0][2] == "lease scaduto"
+
+
+def test_heartbeat_keeps_lease(queue):
+    queue.submit_sweep("a", SEQUENCE, 37, 37)
+    _expire(queue)
+    (task,) = queue.lease("w1")
+    queue.lease_seconds = 600
+    queue.heartbeat("w1", [task.id])
+    assert queue.lease("w2") == []
+
+
+def test_failed_task_is_retried_until_max_attempts(queue):
+    queue.submit_sweep("a", SEQUENCE, 37, 37)
+    (task,) = queue.lease("w1")
+    queue.fail(task.id, "w1", "errore")
+    assert queue.progress()["pending"] == 1
+    (task,) = queue.lease("w2")
+    # il fallimento segnalato da un worker a cui il task non è assegnato è ignorato
+    queue.fail(task.id, "w1", "errore")
+    assert queue.progress()["leased"] == 1
+    queue.fail(task.id, "w2", "errore")
+    assert queue.progress()["failed"] == 1
+    assert queue.lease("w3") == []
+
+
+def test_fill_hypergraph(queue, THG):
+    queue.submit_sweep("a", SEQUENCE, 30, 40, 5)
+    for task in queue.lease("w1", count=3):
+        queue.complete(
+            task.id,
+            "w1",
+            THG.producer.get_temperature_incidence_dict(task.conditions.temperature),
+        )
+    assert queue.fill_hypergraph(THG) == 3
+    assert THG.analyzed_temperatures() == [30, 35, 40]
+
+
+def _hold_lease(path: str) -> None:
+    # un worker che prende un task e muore senza completarlo
+    with WorkQueue(path, lease_seconds=1) as queue:
+        queue.lease("dead")
+        time.sleep(600)
+
+
+def test_dead_worker_task_is_completed_by_others(tmp_path):
+    path = str(tmp_path / "queue.db")
+    with WorkQueue(path) as queue:
+        queue.submit_sweep("a", SEQUENCE, 30, 55, 5)
+        dead = multiprocessing.Process(target=_hold_lease, args=(path,))
+        dead.start()
+        while queue.progress()["leased"] == 0:
+            time.sleep(0.05)
+        dead.kill()
+        dead.join()
+        workers = [
+            multiprocessing.Process(
+                target=run_worker,
+                args=(path,),
+                kwargs={"wait": True, "poll_interval": 0.1, "lease_seconds": 30},
+            )
+            for _ in range(3)
+        ]
+        for worker in workers:
+            worker.start()
+        counts = queue.wait(poll_interval=0.1)
+        for worker in workers:
+            worker.join(timeout=60)
+            assert worker.exitcode == 0
+        assert counts == {"pending": 0, "leased": 0, "done": 6, "failed": 0}
+        assert sorted(queue.results(SEQUENCE)) == [30, 35, 40, 45, 50, 55]
+
+
+def test_wait_fails_expired_lease_after_max_attempts(tmp_path):
+    path = str(tmp_path / "queue.db")
+    with WorkQueue(path, lease_seconds=-1, max_attempts=1) as queue:
+        queue.submit_sweep("a", SEQUENCE, 37, 37)
+        queue.lease("dead")
+        assert queue.wait(poll_interval=0.01)["failed"] == 1